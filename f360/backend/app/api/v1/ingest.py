@@ -1,38 +1,70 @@
 """
 F360 – Data Ingestion Endpoints
 Upload PDF/Excel, extract structured financial entities.
+Spreadsheets are also stored as columnar tables, queryable under /tables.
+The ANN index over the chunk embeddings is inspected / rebuilt under /vector-index.
 """
 from __future__ import annotations
 
+import asyncio
 import uuid
 from pathlib import Path
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models.user import User
-from app.models.financial import Document
-from app.schemas.schemas import IngestionResult
+from app.models.financial import Document, DocumentTable
+from app.schemas.schemas import (
+    DocumentTableInfo,
+    IngestionJobStatus,
+    IngestionResult,
+    ParserPoolStats,
+    TableQuery,
+    TableQueryResult,
+    VectorIndexStatus,
+)
 from app.services.ingestion.pipeline import ingest_document
+from app.services.cognitive_ingestion.jobs import QueueFullError, get_ingestion_queue, queue_upload
+from app.services.cognitive_ingestion.indexer import duplicate_result, find_duplicate_document
+from app.services.cognitive_ingestion.vector_index import (
+    METHODS as VECTOR_INDEX_METHODS,
+    get_vector_index_maintainer,
+    poke_on_commit,
+    vector_index_status,
+)
+from app.services.cognitive_ingestion.tabular_store import (
+    TABULAR_FILE_TYPES,
+    list_document_tables,
+    query_table,
+    store_document_tables,
+)
+from app.services.sources.executor import ParserBusyError, parser_pool_stats
+from app.services.sources.uploads import UploadTooLargeError, spool_upload
 
 settings = get_settings()
 router = APIRouter()
 
 
-@router.post("/upload", response_model=IngestionResult)
+@router.post("/upload", response_model=IngestionResult | IngestionJobStatus)
 async def upload_document(
     file: UploadFile = File(...),
     company_id: uuid.UUID | None = None,
     entity_type: str | None = None,
+    background: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Upload a PDF or Excel file, extract financial entities,
     chunk content and store embeddings for RAG.
+    With `background=true` the file is queued for the cognitive ingestion
+    pipeline and a job status is returned immediately (see `/jobs/{job_id}`).
+    A file already ingested for the same company is not processed again:
+    the result (status "duplicate") points at the existing document.
     """
     # Validate file type
     allowed_types = {".pdf", ".xlsx", ".xls", ".csv", ".docx"}
@@ -43,15 +75,22 @@ async def upload_document(
             detail=f"Unsupported file type: {ext}. Allowed: {allowed_types}",
         )
 
-    # Validate file size
-    contents = await file.read()
-    if len(contents) > settings.max_upload_size_mb * 1024 * 1024:
+    # Stream to disk in blocks: size limit + content hash without buffering the file
+    file_id = uuid.uuid4()
+    try:
+        stored = await spool_upload(
+            file,
+            settings.upload_path / f"{file_id}{ext}",
+            max_bytes=settings.max_upload_size_mb * 1024 * 1024,
+        )
+    except UploadTooLargeError:
         raise HTTPException(status_code=413, detail="File exceeds maximum upload size")
 
-    # Save file to disk
-    file_id = uuid.uuid4()
-    file_path = settings.upload_path / f"{file_id}{ext}"
-    file_path.write_bytes(contents)
+    # Same bytes already indexed for this company: link to that document, do not re-ingest
+    existing = await find_duplicate_document(stored.sha256, company_id, db)
+    if existing is not None:
+        stored.path.unlink(missing_ok=True)
+        return await duplicate_result(existing, db)
 
     # Create document record
     doc = Document(
@@ -59,18 +98,151 @@ async def upload_document(
         company_id=company_id,
         filename=file.filename,
         file_type=ext.lstrip("."),
-        file_path=str(file_path),
-        file_size_bytes=len(contents),
+        file_path=str(stored.path),
+        file_size_bytes=stored.size,
+        content_sha256=stored.sha256,
         entity_type=entity_type,
     )
     db.add(doc)
     await db.flush()
 
+    if background:
+        try:
+            job = await queue_upload(doc, db)
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        return job.to_dict()
+
     # Run ingestion pipeline
-    result = await ingest_document(doc, contents, db)
+    try:
+        result = await ingest_document(doc, stored.path, db)
+    except ParserBusyError as e:
+        stored.path.unlink(missing_ok=True)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    if result.status != "error":
+        poke_on_commit(db)   # get_db commits once the response is ready
     return result
 
 
+@router.get("/jobs", response_model=list[IngestionJobStatus])
+async def list_ingestion_jobs(
+    limit: int = 50,
+    current_user: User = Depends(get_current_user),
+):
+    """Recent background ingestion jobs, newest first."""
+    return [job.to_dict() for job in get_ingestion_queue().list(limit)]
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobStatus)
+async def get_ingestion_job(
+    job_id: uuid.UUID,
+    current_user: User = Depends(get_current_user),
+):
+    """Status of a background ingestion job with per-stage progress and timings."""
+    job = get_ingestion_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job.to_dict()
+
+
+@router.get("/parsers", response_model=list[ParserPoolStats])
+async def get_parser_pools_status(
+    current_user: User = Depends(get_current_user),
+):
+    """Per-format parser pools: load, rejections, queue-wait and run-time percentiles."""
+    return parser_pool_stats()
+
+
+@router.get("/vector-index", response_model=VectorIndexStatus)
+async def get_vector_index_status(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """ANN index over the chunk embeddings: live index, build progress, whether a (re)build is due."""
+    status = await vector_index_status(db)
+    status["maintenance"] = get_vector_index_maintainer().last_result
+    return status
+
+
+@router.post("/vector-index/build", response_model=VectorIndexStatus, status_code=202)
+async def rebuild_vector_index(
+    method: str | None = Query(default=None, description="hnsw | ivfflat (default: VECTOR_INDEX_METHOD)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    (Re)build the ANN index CONCURRENTLY in the background – IVFFlat lists are
+    retrained on the current data. Searches keep using the old index until the
+    new one is swapped in.
+    """
+    if method is not None and method not in VECTOR_INDEX_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown index method: {method}")
+    maintainer = get_vector_index_maintainer()
+    if not maintainer.rebuild(method):
+        raise HTTPException(status_code=409, detail="A vector index build is already running")
+    status = await vector_index_status(db)
+    status["maintenance"] = {"status": "scheduled", "method": method or settings.vector_index_method}
+    return status
+
+
+@router.get("/tables", response_model=list[DocumentTableInfo])
+async def list_tables(
+    document_id: uuid.UUID | None = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Columnar tables stored from spreadsheet documents, newest first."""
+    return await list_document_tables(db, document_id)
+
+
+@router.post("/tables/{document_id}/build", response_model=list[DocumentTableInfo])
+async def build_tables(
+    document_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """(Re)build the columnar tables of an uploaded spreadsheet."""
+    doc = await db.get(Document, document_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if (doc.file_type or "").lower() not in TABULAR_FILE_TYPES:
+        raise HTTPException(status_code=400, detail=f"Not a spreadsheet: {doc.file_type}")
+    if not doc.file_path or not Path(doc.file_path).exists():
+        raise HTTPException(status_code=404, detail="Stored file not found")
+    return await store_document_tables(doc, Path(doc.file_path), db)
+
+
+@router.post("/tables/{table_id}/query", response_model=TableQueryResult)
+async def query_stored_table(
+    table_id: uuid.UUID,
+    query: TableQuery,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Filter / aggregate a stored table without going through RAG:
+    e.g. `{"filters": {"Catégorie": "Recettes"}, "period_from": "2025-01-01",
+    "group_by": ["period"], "aggregates": ["sum"]}`.
+    """
+    table = await db.get(DocumentTable, table_id)
+    if not table:
+        raise HTTPException(status_code=404, detail="Table not found")
+    try:
+        result = await asyncio.to_thread(
+            query_table,
+            table.file_path,
+            filters=query.filters,
+            period_from=query.period_from,
+            period_to=query.period_to,
+            group_by=query.group_by,
+            aggregates=query.aggregates,
+            limit=query.limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"table_id": table.id, **result}
+
+
 @router.post("/erp/sync")
 async def sync_erp(
     company_id: uuid.UUID,
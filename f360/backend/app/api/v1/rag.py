@@ -31,5 +31,8 @@ async def rag_query(
         company_id=payload.company_id,
         top_k=payload.top_k,
         db=db,
+        ef_search=payload.ef_search,
+        probes=payload.probes,
+        mode=payload.mode,
     )
     return response
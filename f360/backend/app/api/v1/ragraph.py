@@ -42,6 +42,9 @@ async def ragraph_query(
         company_id=payload.company_id,
         top_k=payload.top_k,
         db=db,
+        ef_search=payload.ef_search,
+        probes=payload.probes,
+        mode=payload.mode,
     )
     return result
 
@@ -17,7 +17,12 @@ from app.core.database import get_db
 from app.core.security import get_current_user
 from app.models.user import User
 from app.models.financial import Document
-from app.schemas.schemas import IngestionResult, ConnectorTestResult, IoTIngestPayload
+from app.schemas.schemas import IngestionJobStatus, IngestionResult, ConnectorTestResult, IoTIngestPayload
+from app.services.cognitive_ingestion.indexer import duplicate_result, find_duplicate_document
+from app.services.cognitive_ingestion.jobs import QueueFullError, queue_upload
+from app.services.cognitive_ingestion.vector_index import poke_on_commit
+from app.services.sources.executor import ParserBusyError
+from app.services.sources.uploads import UploadTooLargeError, spool_upload
 
 settings = get_settings()
 router = APIRouter()
@@ -25,11 +30,12 @@ router = APIRouter()
 
 # ── File Upload (multimodal) ────────────────────────────────────
 
-@router.post("/upload", response_model=IngestionResult)
+@router.post("/upload", response_model=IngestionResult | IngestionJobStatus)
 async def upload_document(
     file: UploadFile = File(...),
     company_id: uuid.UUID | None = None,
     entity_type: str | None = None,
+    background: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -37,6 +43,10 @@ async def upload_document(
     Upload a file (PDF, Excel, CSV, DOCX, images, audio, video).
     The cognitive ingestion pipeline will extract text, entities
     and generate vector embeddings.
+    With `background=true` the pipeline runs in the ingestion worker pool
+    and a job status is returned immediately (poll `/ingest/jobs/{job_id}`).
+    A file already ingested for the same company is not processed again:
+    the result (status "duplicate") points at the existing document.
     """
     allowed_types = {
         ".pdf", ".xlsx", ".xls", ".csv", ".docx",
@@ -51,29 +61,52 @@ async def upload_document(
             detail=f"Unsupported file type: {ext}. Allowed: {allowed_types}",
         )
 
-    contents = await file.read()
-    if len(contents) > settings.max_upload_size_mb * 1024 * 1024:
+    # Stream to disk in blocks: size limit + content hash without buffering the file
+    file_id = uuid.uuid4()
+    try:
+        stored = await spool_upload(
+            file,
+            settings.upload_path / f"{file_id}{ext}",
+            max_bytes=settings.max_upload_size_mb * 1024 * 1024,
+        )
+    except UploadTooLargeError:
         raise HTTPException(status_code=413, detail="File exceeds maximum upload size")
 
-    file_id = uuid.uuid4()
-    file_path = settings.upload_path / f"{file_id}{ext}"
-    file_path.write_bytes(contents)
+    # Same bytes already indexed for this company: link to that document, do not re-ingest
+    existing = await find_duplicate_document(stored.sha256, company_id, db)
+    if existing is not None:
+        stored.path.unlink(missing_ok=True)
+        return await duplicate_result(existing, db)
 
     doc = Document(
         id=file_id,
         company_id=company_id,
         filename=file.filename,
         file_type=ext.lstrip("."),
-        file_path=str(file_path),
-        file_size_bytes=len(contents),
+        file_path=str(stored.path),
+        file_size_bytes=stored.size,
+        content_sha256=stored.sha256,
         entity_type=entity_type,
     )
     db.add(doc)
     await db.flush()
 
+    if background:
+        try:
+            job = await queue_upload(doc, db)
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        return job.to_dict()
+
     # Use new cognitive ingestion pipeline
     from app.services.cognitive_ingestion.indexer import ingest_document
-    result = await ingest_document(doc, contents, db)
+    try:
+        result = await ingest_document(doc, stored.path, db)
+    except ParserBusyError as e:
+        stored.path.unlink(missing_ok=True)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    if result.status != "error":
+        poke_on_commit(db)   # get_db commits once the response is ready
     return result
 
 
@@ -0,0 +1,3 @@
+"""
+F360 – Command-line tools
+"""
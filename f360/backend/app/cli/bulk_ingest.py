@@ -0,0 +1,92 @@
+"""
+F360 – Bulk Ingestion CLI
+Ingest a directory or manifest of documents straight into the vector index.
+
+Usage (from f360/backend):
+    python -m app.cli.bulk_ingest ../../Input/Contracts_30_English/CUAD_v1/full_contract_txt \
+        --entity-type contract --checkpoint cuad.checkpoint.jsonl --report-json cuad.report.json
+
+Re-running with the same --checkpoint skips files that were already ingested.
+Once the load is done, the vector indexes (shared and per company) are built
+or rebuilt when due.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import uuid
+from pathlib import Path
+
+from app.services.cognitive_ingestion.bulk import (
+    DEFAULT_EXTENSIONS,
+    STAGES,
+    BulkIngestionPipeline,
+    Checkpoint,
+    discover_files,
+    format_report,
+    store_item,
+)
+from app.services.cognitive_ingestion.vector_index import maintain_vector_indexes
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli.bulk_ingest",
+        description="Bulk-ingest documents: parse → extract → chunk → embed → store.",
+    )
+    parser.add_argument("source", type=Path, help="directory to walk, or a .csv / .jsonl manifest with a 'path' column")
+    parser.add_argument("--company-id", type=uuid.UUID, default=None, help="company the documents belong to")
+    parser.add_argument("--entity-type", default=None, help="entity type stored on every document (e.g. contract)")
+    parser.add_argument(
+        "--ext", default=",".join(DEFAULT_EXTENSIONS),
+        help=f"comma-separated extensions to pick up in a directory (default: {','.join(DEFAULT_EXTENSIONS)})",
+    )
+    parser.add_argument("--checkpoint", type=Path, default=None, help="JSONL checkpoint file used to resume")
+    parser.add_argument("--queue-size", type=int, default=8, help="documents buffered between two stages")
+    for stage in STAGES:
+        parser.add_argument(f"--{stage}-workers", type=int, default=None, help=f"concurrency of the {stage} stage")
+    parser.add_argument("--dry-run", action="store_true", help="run every stage except the database write")
+    parser.add_argument("--report-json", type=Path, default=None, help="also write the report as JSON")
+    parser.add_argument("--no-vector-index", action="store_true", help="skip the vector index checks after loading")
+    return parser
+
+
+async def run(args: argparse.Namespace) -> dict:
+    items = discover_files(
+        args.source,
+        extensions=tuple(e.strip() for e in args.ext.split(",") if e.strip()),
+        company_id=args.company_id,
+        entity_type=args.entity_type,
+    )
+    pipeline = BulkIngestionPipeline(
+        workers={stage: getattr(args, f"{stage}_workers") for stage in STAGES},
+        queue_size=args.queue_size,
+        checkpoint=Checkpoint(args.checkpoint),
+        store=None if args.dry_run else store_item,
+    )
+    report = await pipeline.run(items)
+    if not (args.dry_run or args.no_vector_index):
+        # Building once after the load beats growing the index row by row during it
+        report["vector_index"] = await maintain_vector_indexes()
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.source.exists():
+        print(f"Source not found: {args.source}", file=sys.stderr)
+        return 2
+
+    report = asyncio.run(run(args))
+    print(format_report(report))
+    if args.report_json:
+        args.report_json.write_text(json.dumps(report, indent=2))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
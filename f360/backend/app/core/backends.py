@@ -0,0 +1,53 @@
+"""
+F360 – Backend Registry
+Pluggable implementations (embeddings, transcription, vector search) chosen
+by name in settings, with a process-wide override for tests and benchmarks.
+"""
+from __future__ import annotations
+
+from typing import Callable, Generic, TypeVar
+
+from app.core.config import get_settings
+
+T = TypeVar("T")
+
+
+class BackendRegistry(Generic[T]):
+    """
+    Named factories plus the setting that picks one of them.
+    The configured backend is built once, on first use; `set` swaps in
+    another instance until it is called with None.
+    """
+
+    def __init__(self, kind: str, setting: str, factories: dict[str, Callable[[], T]]):
+        self.kind = kind
+        self.setting = setting
+        self.factories = factories
+        self._configured: T | None = None
+        self._override: T | None = None
+
+    def get(self) -> T:
+        """The override when one is set, else the backend named by settings."""
+        if self._override is not None:
+            return self._override
+        if self._configured is None:
+            self._configured = self._build()
+        return self._configured
+
+    def set(self, backend: T | None) -> None:
+        """Swap the backend process-wide (None restores the configured one)."""
+        self._override = backend
+
+    def reset(self) -> None:
+        """Forget the configured backend: the next `get` reads settings again."""
+        self._configured = None
+
+    def _build(self) -> T:
+        name = getattr(get_settings(), self.setting)
+        try:
+            factory = self.factories[name]
+        except KeyError:
+            raise ValueError(
+                f"Unknown {self.kind} backend '{name}'. Choose from: {', '.join(self.factories)}"
+            )
+        return factory()
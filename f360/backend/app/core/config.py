@@ -40,6 +40,75 @@ class Settings(BaseSettings):
     openai_api_key: str = ""
     openai_model: str = "gpt-4o"
     openai_embedding_model: str = "text-embedding-3-small"
+    embedding_backend: str = "openai"   # "openai" | "hash" (deterministic offline stand-in)
+
+    # ── Embedding batching ──
+    embedding_batch_size: int = 256            # inputs per embeddings request
+    embedding_batch_max_tokens: int = 100_000  # tokens per request
+    embedding_max_concurrency: int = 4         # batches in flight at once
+
+    # ── Embedding cache ──
+    embedding_cache_enabled: bool = True
+    embedding_cache_memory_entries: int = 10_000   # in-process LRU tier
+    embedding_cache_disk_entries: int = 500_000    # on-disk tier (0 = disabled)
+
+    # ── Retrieval cache (repeated questions skip embedding + vector search) ──
+    retrieval_cache_enabled: bool = True
+    retrieval_cache_entries: int = 2_000           # LRU bound
+    retrieval_cache_ttl: int = 600                 # seconds an answer set is served at most
+
+    # ── Chunking ──
+    chunking_mode: str = "chars"      # "chars" (CHUNK_SIZE characters) | "tokens" (token budget)
+    chunk_max_tokens: int = 512       # token budget per chunk in "tokens" mode
+    chunk_overlap_tokens: int = 64    # tokens carried over between chunks in "tokens" mode
+    tokenizer_threads: int = 4        # threads for batched tokenization
+
+    # ── PDF extraction ──
+    pdf_parallel_workers: int = 0       # process pool size (0 = one per CPU core)
+    pdf_parallel_min_pages: int = 32    # PDFs with fewer pages are parsed in-process (0 = never parallel)
+
+    # ── OCR ──
+    ocr_workers: int = 0                  # Tesseract process pool size (0 = one per CPU core, 1 = in-process)
+    ocr_languages: str = "fra+eng"
+    ocr_tile_height: int = 2400           # taller scans are OCR'd in bands cut between text lines (0 = never tile)
+    ocr_pdf_dpi: int = 200                # rendering of image-only PDF pages (0 = do not OCR PDF pages)
+    ocr_cache_memory_entries: int = 1000  # in-process LRU tier
+    ocr_cache_disk_mb: int = 256          # on-disk tier budget (0 = disabled)
+
+    # ── Audio / video (ffmpeg pipes) ──
+    ffmpeg_binary: str = "ffmpeg"
+    media_segment_seconds: int = 300      # longest audio segment per transcription request (≤ 780 keeps a WAV under 25 MB)
+    media_idle_timeout: int = 120         # seconds without ffmpeg output before it is killed
+    video_scene_threshold: float = 0.3    # scene-change score above which a frame is OCR'd
+    video_max_keyframes: int = 200
+    video_frame_width: int = 1600         # keyframes are downscaled to at most this width
+
+    # ── Transcription ──
+    transcription_backend: str = "openai"       # "openai" (Whisper API) | "offline" (deterministic stand-in)
+    transcription_split: str = "silence"        # "silence" (cut at pauses) | "fixed" (MEDIA_SEGMENT_SECONDS windows)
+    transcription_min_segment_seconds: int = 60  # silence mode: pauses searched between min and max length
+    transcription_silence_db: float = -40.0     # frames quieter than this (dBFS) count as silence
+    transcription_concurrency: int = 4          # segments transcribed at once
+
+    # ── Parser execution ──
+    # Per format family: documents parsed at once : parses waiting before new ones are refused (HTTP 503)
+    parser_pools: str = "pdf=2:16,spreadsheet=2:16,text=4:64,image=2:16,media=2:8"
+
+    # ── Parse cache ──
+    parse_cache_enabled: bool = True   # reuse parsed text of files already seen (same bytes, same parser version)
+    parse_cache_disk_mb: int = 1024    # compressed on-disk budget, least recently used evicted first (0 = disabled)
+
+    # ── Spreadsheets ──
+    spreadsheet_segment_rows: int = 500  # rows read and rendered per segment (CSV / Excel)
+
+    # ── Tabular store ──
+    tabular_store_enabled: bool = True   # also store spreadsheets as columnar (Parquet) tables
+    tables_dir: str = "./tables"
+
+    # ── Background ingestion jobs ──
+    ingestion_workers: int = 2          # documents ingested concurrently
+    ingestion_queue_size: int = 100     # jobs waiting before uploads are refused
+    ingestion_job_history: int = 1000   # finished jobs kept for status queries
 
     # ── JWT ──
     jwt_secret_key: str = "change-me-jwt"
@@ -50,10 +119,43 @@ class Settings(BaseSettings):
     pgvector_collection: str = "f360_documents"
     embedding_dimension: int = 1536
 
+    # ── Vector index (built once the table has data, see vector_index.py) ──
+    vector_index_method: str = "hnsw"            # "hnsw" | "ivfflat"
+    vector_index_min_rows: int = 10_000          # embedded chunks before an index is worth building
+    vector_index_auto: bool = True               # check after ingestion, build / rebuild in the background
+    vector_index_check_interval: int = 300       # seconds between two checks
+    vector_index_retrain_factor: float = 2.0     # IVFFlat: retrain once the ideal list count has grown this much
+    vector_index_maintenance_work_mem: str = "1GB"
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 64
+    hnsw_ef_search: int = 40                     # default per query; raise for recall, lower for latency
+    ivfflat_probes: int = 10
+    vector_tenant_index_min_rows: int = 100_000  # a company's chunks before it gets a partial index of its own (0: never)
+    vector_tenant_index_max: int = 32            # partial indexes at most, largest companies first
+    vector_iterative_scan: str = "relaxed_order" # company-filtered scans: "relaxed_order" | "strict_order" | "off" (pgvector < 0.8)
+
+    # ── Vector search backend ──
+    vector_backend: str = "pgvector"             # "pgvector" | "local" (in-process) | "cached" (local in front of pgvector)
+    vectors_dir: str = "./vectors"               # local index: memory-mapped shards + chunk payloads
+    local_vector_shard_rows: int = 65_536        # embeddings per shard file
+    local_vector_hnsw: bool = False              # HNSW graph over the shards (needs hnswlib), else exact top-k
+    vector_cache_max_company_rows: int = 200_000 # "cached": larger companies stay on pgvector
+
+    # ── Hybrid retrieval (lexical + vector, reciprocal rank fusion – see hybrid.py) ──
+    retrieval_mode: str = "vector"               # default RAG mode: "vector" | "hybrid"
+    hybrid_vector_weight: float = 1.0            # RRF weight of the ANN ranking
+    hybrid_lexical_weight: float = 1.0           # RRF weight of the trigram / ILIKE ranking
+    hybrid_rrf_k: int = 60                       # RRF constant: higher flattens the rank contributions
+    hybrid_candidates: int = 50                  # candidates taken from each ranking before fusion
+    hybrid_max_terms: int = 8                    # question terms matched literally
+
     # ── Upload ──
     upload_dir: str = "./uploads"
     max_upload_size_mb: int = 50
 
+    # ── Local caches ──
+    cache_dir: str = "./cache"
+
     @property
     def database_url(self) -> str:
         return (
@@ -74,6 +176,24 @@ class Settings(BaseSettings):
         p.mkdir(parents=True, exist_ok=True)
         return p
 
+    @property
+    def tables_path(self) -> Path:
+        p = Path(self.tables_dir)
+        p.mkdir(parents=True, exist_ok=True)
+        return p
+
+    @property
+    def vectors_path(self) -> Path:
+        p = Path(self.vectors_dir)
+        p.mkdir(parents=True, exist_ok=True)
+        return p
+
+    @property
+    def cache_path(self) -> Path:
+        p = Path(self.cache_dir)
+        p.mkdir(parents=True, exist_ok=True)
+        return p
+
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -3,6 +3,10 @@ F360 – Async Database Session Management (PostgreSQL + pgvector)
 """
 from __future__ import annotations
 
+import numpy as np
+from pgvector.asyncpg import register_vector
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
@@ -18,6 +22,13 @@ engine = create_async_engine(
     pool_pre_ping=True,
 )
 
+
+@event.listens_for(engine.sync_engine, "connect")
+def _register_vector_codec(dbapi_connection, connection_record):
+    """Install pgvector's binary codec on every new asyncpg connection."""
+    dbapi_connection.run_async(register_vector)
+
+
 async_session_factory = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -25,6 +36,31 @@ async_session_factory = async_sessionmaker(
 )
 
 
+class EmbeddingVector(Vector):
+    """
+    pgvector column type with binary transport.
+    On asyncpg, values are handed over as float32 numpy arrays and encoded by
+    the binary codec registered above, instead of being formatted as
+    '[0.1,0.2,…]' text and parsed again by PostgreSQL.
+    """
+
+    cache_ok = True
+
+    def bind_processor(self, dialect):
+        if dialect.driver != "asyncpg":
+            return super().bind_processor(dialect)
+
+        def process(value):
+            if value is None:
+                return None
+            array = np.asarray(value, dtype=np.float32)
+            if self.dim is not None and array.shape != (self.dim,):
+                raise ValueError(f"expected {self.dim} dimensions, not {array.shape}")
+            return array
+
+        return process
+
+
 class Base(DeclarativeBase):
     """Declarative base for all SQLAlchemy models."""
     pass
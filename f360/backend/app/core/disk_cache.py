@@ -0,0 +1,167 @@
+"""
+F360 – Disk Cache Tier
+One SQLite table of key → value columns on local disk, with least recently
+used eviction, shared by the embedding, OCR and parse caches.
+Each row records its `size` and `last_used` time; once the table holds more
+than `max_entries` rows or more than `max_bytes` of `size`, the oldest rows
+go first. SQLite errors are logged and treated as misses, so a broken cache
+file never fails the caller.
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_PARAMS_PER_QUERY = 500   # SQLite caps bound parameters per statement
+
+
+class DiskLRU:
+    """
+    SQLite LRU table: `columns` maps value column names to SQL types.
+    Values travel as tuples in column order. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        table: str,
+        columns: dict[str, str],
+        max_entries: int = 0,
+        max_bytes: int = 0,
+        label: str = "Disk cache",
+    ):
+        self.table = table
+        self.columns = list(columns)
+        self.max_entries = max(0, max_entries)
+        self.max_bytes = max(0, max_bytes)
+        self.label = label
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._open(Path(path), columns)
+
+    def _open(self, path: Path, columns: dict[str, str]) -> None:
+        definitions = "".join(f"{name} {kind} NOT NULL, " for name, kind in columns.items())
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            layout = [row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")]
+            if layout and layout != ["key", *self.columns, "size", "last_used"]:
+                conn.execute(f"DROP TABLE {self.table}")   # written by an older version: start over
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key        TEXT PRIMARY KEY,
+                    {definitions}size INTEGER NOT NULL,
+                    last_used  REAL NOT NULL
+                )
+            """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_last_used ON {self.table}(last_used)")
+            conn.commit()
+            self._conn = conn
+        except sqlite3.Error as e:
+            logger.warning(f"{self.label} unavailable ({path}): {e}")
+            self._conn = None
+
+    @property
+    def available(self) -> bool:
+        return self._conn is not None
+
+    # ── Lookup / store ──
+
+    def get_many(self, keys: list[str]) -> dict[str, tuple]:
+        """Values of the keys that are present; their last use becomes now."""
+        rows: dict[str, tuple] = {}
+        if self._conn is None or not keys:
+            return rows
+        selected = ", ".join(self.columns)
+        with self._lock:
+            try:
+                for start in range(0, len(keys), _PARAMS_PER_QUERY):
+                    part = keys[start:start + _PARAMS_PER_QUERY]
+                    cursor = self._conn.execute(
+                        f"SELECT key, {selected} FROM {self.table} WHERE key IN ({','.join('?' * len(part))})",
+                        part,
+                    )
+                    for key, *values in cursor.fetchall():
+                        rows[key] = tuple(values)
+                if rows:
+                    now = time.time()
+                    self._conn.executemany(
+                        f"UPDATE {self.table} SET last_used = ? WHERE key = ?", [(now, key) for key in rows],
+                    )
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"{self.label} read failed: {e}")
+        return rows
+
+    def get(self, key: str) -> tuple | None:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: dict[str, tuple[tuple, int]]) -> None:
+        """Store key → (values, size) rows, then evict down to the budgets."""
+        if self._conn is None or not items:
+            return
+        placeholders = ", ".join("?" * (len(self.columns) + 3))
+        with self._lock:
+            try:
+                now = time.time()
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, {', '.join(self.columns)}, size, last_used) "
+                    f"VALUES ({placeholders})",
+                    [(key, *values, size, now) for key, (values, size) in items.items()],
+                )
+                self._evict()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"{self.label} write failed: {e}")
+
+    def _evict(self) -> None:
+        if self.max_entries:
+            (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY last_used LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+        if self.max_bytes:
+            (total,) = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+            if total > self.max_bytes:
+                # Oldest rows first until the running total fits the budget again
+                cursor = self._conn.execute(f"SELECT key, size FROM {self.table} ORDER BY last_used")
+                evicted = []
+                for key, size in cursor:
+                    if total <= self.max_bytes:
+                        break
+                    evicted.append((key,))
+                    total -= size
+                self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", evicted)
+                self.evictions += len(evicted)
+
+    # ── Maintenance ──
+
+    def clear(self) -> None:
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def stats(self) -> dict[str, Any]:
+        """Rows and bytes stored (both 0 when the file is unavailable)."""
+        if self._conn is None:
+            return {"disk_size": 0, "disk_bytes": 0}
+        with self._lock:
+            size, total = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        return {"disk_size": size, "disk_bytes": total}
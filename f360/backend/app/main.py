@@ -4,6 +4,7 @@ Main FastAPI Application Entry Point
 """
 from __future__ import annotations
 
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
@@ -12,6 +13,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import get_settings
 from app.core.neo4j_client import close_neo4j_driver
 from app.api.v1 import router as api_v1_router
+from app.services.cognitive_ingestion.jobs import get_ingestion_queue
+from app.services.cognitive_ingestion.vector_index import get_vector_index_maintainer
+from app.services.cognitive_ingestion.vector_store import get_vector_backend
+from app.services.sources.executor import close_parser_pools
+from app.services.sources.ocr import close_ocr_process_pool
+from app.services.sources.parsers import close_pdf_process_pool
 
 settings = get_settings()
 
@@ -21,8 +28,17 @@ async def lifespan(app: FastAPI):
     """Startup / shutdown lifecycle."""
     # ── Startup ──
     settings.upload_path  # ensure upload directory exists
+    get_vector_index_maintainer().poke()   # build the ANN index if data arrived without one
+    vector_sync = asyncio.create_task(get_vector_backend().sync(), name="vector-sync")   # local index ← document_chunks
     yield
     # ── Shutdown ──
+    vector_sync.cancel()
+    await asyncio.gather(vector_sync, return_exceptions=True)
+    await get_ingestion_queue().stop()
+    await get_vector_index_maintainer().stop()
+    close_parser_pools()
+    close_pdf_process_pool()
+    close_ocr_process_pool()
     await close_neo4j_driver()
 
 
@@ -8,13 +8,14 @@ from datetime import date, datetime, timezone
 from decimal import Decimal
 
 from sqlalchemy import (
-    Boolean, Date, DateTime, ForeignKey, Integer, Numeric, String, Text,
+    BigInteger, Boolean, Date, DateTime, ForeignKey, Integer, Numeric, String, Text,
     CheckConstraint,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from app.core.database import Base
+from app.core.config import get_settings
+from app.core.database import Base, EmbeddingVector
 
 
 # ── Company ──
@@ -146,12 +147,14 @@ class Document(Base):
     file_type: Mapped[str | None] = mapped_column(String(20))
     file_path: Mapped[str | None] = mapped_column(Text)
     file_size_bytes: Mapped[int | None] = mapped_column()
+    content_sha256: Mapped[str | None] = mapped_column(String(64), index=True)
     entity_type: Mapped[str | None] = mapped_column(String(50))
     entity_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True))
     processed: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     chunks: Mapped[list["DocumentChunk"]] = relationship(back_populates="document", cascade="all, delete-orphan")
+    tables: Mapped[list["DocumentTable"]] = relationship(back_populates="document", cascade="all, delete-orphan")
 
 
 # ── Document Chunk (RAG) ──
@@ -163,12 +166,43 @@ class DocumentChunk(Base):
     chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
     chunk_metadata: Mapped[dict] = mapped_column("metadata", JSONB, default=dict)
-    # Note: embedding column managed via pgvector, not mapped here for simplicity
+    embedding: Mapped[list[float] | None] = mapped_column(EmbeddingVector(get_settings().embedding_dimension))
+    # Copied from the document by database triggers (init.sql): vector search filters without a join
+    company_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True))
+    entity_type: Mapped[str | None] = mapped_column(String(50))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     document: Mapped["Document"] = relationship(back_populates="chunks")
 
 
+# ── Chunk Generation (retrieval cache invalidation) ──
+class ChunkGeneration(Base):
+    __tablename__ = "chunk_generations"
+
+    # Company id, '' for documents without one; bumped whenever the company's chunks change
+    company_key: Mapped[str] = mapped_column(String(36), primary_key=True)
+    generation: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+# ── Document Table (columnar store) ──
+class DocumentTable(Base):
+    __tablename__ = "document_tables"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    document_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("documents.id", ondelete="CASCADE"))
+    sheet_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    file_path: Mapped[str] = mapped_column(Text, nullable=False)
+    layout: Mapped[str] = mapped_column(String(20))  # 'periods' | 'numeric'
+    dimensions: Mapped[list] = mapped_column(JSONB, default=list)
+    measures: Mapped[list] = mapped_column(JSONB, default=list)
+    source_rows: Mapped[int] = mapped_column(Integer, default=0)
+    row_count: Mapped[int] = mapped_column(Integer, default=0)
+    size_bytes: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    document: Mapped["Document"] = relationship(back_populates="tables")
+
+
 # ── Cashflow Entry ──
 class CashflowEntry(Base):
     __tablename__ = "cashflow_entries"
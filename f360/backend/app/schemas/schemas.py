@@ -6,7 +6,7 @@ from __future__ import annotations
 import uuid
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 
 from pydantic import BaseModel, EmailStr, Field
 
@@ -239,10 +239,113 @@ class IngestionResult(BaseModel):
     file_type: str
     entities_extracted: dict[str, Any]
     chunks_created: int
-    status: str  # 'success', 'partial', 'error'
+    chunks_embedded: int = 0   # chunks embedded in this run
+    chunks_reused: int = 0     # unchanged chunks kept with their vectors (incremental reindex)
+    chunks_deleted: int = 0    # stale chunks removed (incremental reindex)
+    tables_created: int = 0    # columnar tables stored (spreadsheets)
+    status: str  # 'success', 'partial', 'error', 'duplicate' (document_id is the existing copy)
     message: Optional[str] = None
 
 
+class IngestionStageStatus(BaseModel):
+    name: str      # parse, extract, chunk, embed, store
+    status: str    # 'pending', 'running', 'done', 'skipped'
+    items: int
+    duration_ms: float
+
+
+class IngestionJobStatus(BaseModel):
+    job_id: uuid.UUID
+    document_id: uuid.UUID
+    filename: str
+    status: str  # 'queued', 'running', 'success', 'error'
+    stages: list[IngestionStageStatus]
+    queued_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[float] = None
+    result: Optional[IngestionResult] = None
+    error: Optional[str] = None
+
+
+class VectorIndexInfo(BaseModel):
+    name: str
+    method: str                    # hnsw | ivfflat
+    valid: bool
+    options: dict[str, int]        # m / ef_construction, or lists
+    size_bytes: int
+    definition: str
+    progress: Optional[dict[str, Any]] = None   # pg_stat_progress_create_index, while building
+
+
+class TenantVectorIndex(BaseModel):
+    company_id: uuid.UUID
+    rows: int                      # embedded chunks of the company
+    index: Optional[VectorIndexInfo] = None        # partial index WHERE company_id = …
+    action: Optional[str] = None   # build | drop, when due
+
+
+class VectorIndexStatus(BaseModel):
+    rows: int                      # embedded chunks (planner estimate on large tables)
+    index: Optional[VectorIndexInfo] = None
+    building: Optional[VectorIndexInfo] = None
+    configured_method: str
+    action: Optional[str] = None   # build | rebuild, when due
+    reason: str
+    tenants: list[TenantVectorIndex] = []          # companies with (or due for) a partial index
+    maintenance: Optional[dict[str, Any]] = None   # outcome of the last background build / check
+
+
+class ParserPoolStats(BaseModel):
+    pool: str            # pdf, spreadsheet, text, image, media
+    threaded: bool       # blocking parsers on the pool's own threads
+    workers: int
+    max_queued: int
+    running: int
+    queued: int
+    completed: int
+    failed: int
+    rejected: int        # refused while saturated (HTTP 503)
+    wait_p50_ms: float   # time waiting for a slot
+    wait_p95_ms: float
+    run_p50_ms: float    # time spent parsing
+    run_p95_ms: float
+
+
+class DocumentTableInfo(BaseModel):
+    id: uuid.UUID
+    document_id: uuid.UUID
+    sheet_name: str
+    layout: str                 # 'periods' | 'numeric'
+    dimensions: list[str]
+    measures: list[str]
+    source_rows: int
+    row_count: int              # rows in long format (one per numeric cell)
+    size_bytes: int
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class TableQuery(BaseModel):
+    filters: dict[str, Any] = {}          # column → value or list of accepted values
+    period_from: Optional[date] = None
+    period_to: Optional[date] = None
+    group_by: list[str] = []
+    aggregates: list[str] = []            # sum, mean, min, max, count (of `value`)
+    limit: int = Field(default=1000, ge=1, le=100_000)
+
+
+class TableQueryResult(BaseModel):
+    table_id: uuid.UUID
+    columns: list[str]
+    rows: list[dict[str, Any]]
+    row_count: int
+    matched_rows: int
+    truncated: bool
+    elapsed_ms: float
+
+
 # ═══════════════════════════════════════════
 # RAG
 # ═══════════════════════════════════════════
@@ -251,6 +354,11 @@ class RAGQuery(BaseModel):
     question: str
     company_id: Optional[uuid.UUID] = None
     top_k: int = 5
+    # ANN search depth for this query (defaults: HNSW_EF_SEARCH / IVFFLAT_PROBES)
+    ef_search: Optional[int] = Field(default=None, ge=1, le=1000)
+    probes: Optional[int] = Field(default=None, ge=1, le=10_000)
+    # "hybrid" also matches the question's terms literally (default: RETRIEVAL_MODE)
+    mode: Optional[Literal["vector", "hybrid"]] = None
 
 
 class RAGResponse(BaseModel):
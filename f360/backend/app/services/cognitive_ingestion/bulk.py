@@ -0,0 +1,466 @@
+"""
+F360 – Bulk Ingestion Pipeline
+Ingests a whole corpus (directory or manifest) without going through HTTP.
+Documents flow through parse → extract → chunk → embed → store; every stage
+has its own worker count and stages are joined by bounded queues, so a slow
+stage applies backpressure instead of piling documents up in memory.
+Completed files are appended to a checkpoint file so an interrupted run
+resumes where it stopped.
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.database import async_session_factory
+from app.models.financial import Document
+from app.services.cognitive_ingestion.chunk_store import bulk_insert_chunks
+from app.services.cognitive_ingestion.vector_store import invalidate_on_commit
+from app.services.cognitive_ingestion.chunker import new_chunker
+from app.services.cognitive_ingestion.extractor import EntityCollector
+from app.services.cognitive_ingestion.tokenizer import get_token_counter
+from app.services.cognitive_ingestion.vectorizer import chunk_fingerprint, get_embeddings
+from app.services.sources.parsers import (
+    ASYNC_PARSERS,
+    SEGMENT_PARSERS,
+    SYNC_PARSERS,
+    iter_pdf_pages_parallel,
+    read_text_source,
+)
+from app.services.sources.executor import ParserBusyError
+from app.services.sources.parse_cache import cached_segments, get_parse_cache, iter_cached_segments
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+DEFAULT_EXTENSIONS = ("pdf", "txt", "csv", "xlsx", "xls")
+STAGES = ("parse", "extract", "chunk", "embed", "store")
+
+
+class BulkItem:
+    """One document travelling through the bulk pipeline."""
+
+    __slots__ = (
+        "path", "file_type", "size", "sha256", "company_id", "entity_type",
+        "segments", "entities", "chunks", "embeddings", "document_id", "started",
+    )
+
+    def __init__(
+        self,
+        path: Path,
+        company_id: uuid.UUID | None = None,
+        entity_type: str | None = None,
+    ):
+        self.path = path
+        self.file_type = path.suffix.lower().lstrip(".") or "txt"
+        self.size = 0
+        self.sha256 = ""
+        self.company_id = company_id
+        self.entity_type = entity_type
+        self.segments: list[str] = []
+        self.entities: dict[str, Any] = {}
+        self.chunks: list[Any] = []
+        self.embeddings: list[list[float] | None] = []
+        self.document_id: uuid.UUID | None = None
+        self.started = 0.0
+
+    def chunk_metadata(self) -> list[dict[str, Any]]:
+        """Chunk metadata in the same shape the online pipeline stores."""
+        base = {
+            "filename": self.path.name,
+            "file_type": self.file_type,
+            "entity_type": self.entity_type,
+            "entities": self.entities,
+            "total_chunks": len(self.chunks),
+        }
+        return [
+            {**base, **chunk.to_metadata(), "fingerprint": chunk_fingerprint(chunk.content)}
+            for chunk in self.chunks
+        ]
+
+
+# ═══════════════════════════════════════════════════════════════
+# INPUT DISCOVERY + CHECKPOINT
+# ═══════════════════════════════════════════════════════════════
+
+def discover_files(
+    source: Path,
+    extensions: tuple[str, ...] = DEFAULT_EXTENSIONS,
+    company_id: uuid.UUID | None = None,
+    entity_type: str | None = None,
+) -> Iterator[BulkItem]:
+    """
+    Walk a directory (recursively, sorted) or read a manifest.
+    Manifests are .csv or .jsonl files with a `path` column and optional
+    `company_id` / `entity_type` overriding the command-line defaults.
+    """
+    if source.is_dir():
+        wanted = {f".{ext.lower().lstrip('.')}" for ext in extensions}
+        for path in sorted(source.rglob("*")):
+            if path.is_file() and path.suffix.lower() in wanted:
+                yield BulkItem(path, company_id, entity_type)
+        return
+
+    if source.suffix.lower() == ".jsonl":
+        with open(source, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(source, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+
+    for row in rows:
+        path = Path(row["path"])
+        if not path.is_absolute():
+            path = source.parent / path
+        yield BulkItem(
+            path,
+            uuid.UUID(row["company_id"]) if row.get("company_id") else company_id,
+            row.get("entity_type") or entity_type,
+        )
+
+
+class Checkpoint:
+    """Append-only JSONL record of finished files; one line per document."""
+
+    def __init__(self, path: Path | None):
+        self.path = path
+        self.done: set[str] = set()
+        if path and path.exists():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        if entry.get("status") == "success":
+                            self.done.add(entry["path"])
+
+    def is_done(self, item: BulkItem) -> bool:
+        return str(item.path.resolve()) in self.done
+
+    def record(self, item: BulkItem, status: str, error: str | None = None) -> None:
+        key = str(item.path.resolve())
+        if status == "success":
+            self.done.add(key)
+        if self.path is None:
+            return
+        entry = {
+            "path": key,
+            "status": status,
+            "sha256": item.sha256,
+            "document_id": str(item.document_id) if item.document_id else None,
+            "chunks": len(item.chunks),
+        }
+        if error:
+            entry["error"] = error
+        # Line-buffered append: a crash loses at most the document in flight
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+# ═══════════════════════════════════════════════════════════════
+# STAGE ACCOUNTING
+# ═══════════════════════════════════════════════════════════════
+
+class StageStats:
+    """Items, failures and per-item latency of one stage."""
+
+    __slots__ = ("name", "workers", "items", "failures", "latencies", "first_start", "last_end")
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.failures = 0
+        self.latencies: list[float] = []
+        self.first_start: float | None = None
+        self.last_end: float | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        active = (self.last_end - self.first_start) if self.first_start and self.last_end else 0.0
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "items": self.items,
+            "failures": self.failures,
+            "items_per_s": round(self.items / active, 2) if active else 0.0,
+            "busy_s": round(float(np.sum(latencies)), 3),
+            "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1),
+            "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 1),
+        }
+
+
+StoreFn = Callable[[BulkItem], Awaitable[uuid.UUID]]
+
+
+async def store_item(item: BulkItem) -> uuid.UUID:
+    """Persist one document and all its chunks in a dedicated transaction."""
+    async with async_session_factory() as db:
+        doc = Document(
+            company_id=item.company_id,
+            filename=item.path.name,
+            file_type=item.file_type,
+            file_path=str(item.path.resolve()),
+            file_size_bytes=item.size,
+            content_sha256=item.sha256,
+            entity_type=item.entity_type,
+            processed=True,
+        )
+        db.add(doc)
+        await db.flush()
+        await bulk_insert_chunks(
+            db,
+            document_id=doc.id,
+            contents=[c.content for c in item.chunks],
+            embeddings=item.embeddings,
+            metadatas=item.chunk_metadata(),
+            chunk_indexes=[c.index for c in item.chunks],
+        )
+        invalidate_on_commit(db, item.company_id)
+        await db.commit()
+    return doc.id
+
+
+# ═══════════════════════════════════════════════════════════════
+# PIPELINE
+# ═══════════════════════════════════════════════════════════════
+
+class BulkIngestionPipeline:
+    """
+    parse → extract → chunk → embed → store with per-stage worker pools.
+    `store=None` runs everything except the database write (dry run).
+    """
+
+    def __init__(
+        self,
+        workers: dict[str, int] | None = None,
+        queue_size: int = 8,
+        checkpoint: Checkpoint | None = None,
+        store: StoreFn | None = store_item,
+    ):
+        defaults = {
+            "parse": os.cpu_count() or 1,
+            "extract": 2,
+            "chunk": 2,
+            "embed": max(1, settings.embedding_max_concurrency),
+            "store": 2,
+        }
+        defaults.update({k: v for k, v in (workers or {}).items() if v})
+        self.workers = {name: max(1, defaults[name]) for name in STAGES}
+        self.queue_size = max(1, queue_size)
+        self.checkpoint = checkpoint or Checkpoint(None)
+        self.store = store
+        self.stats = {name: StageStats(name, self.workers[name]) for name in STAGES}
+        self.documents = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes = 0
+        self.chunks = 0
+        self.doc_latencies: list[float] = []
+        self.elapsed = 0.0
+
+    async def run(self, items: Iterator[BulkItem]) -> dict[str, Any]:
+        """Push every item through the pipeline and return the throughput report."""
+        started = time.perf_counter()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in STAGES]
+        handlers = {
+            "parse": self._parse,
+            "extract": self._extract,
+            "chunk": self._chunk,
+            "embed": self._embed,
+            "store": self._store,
+        }
+
+        stages = []
+        for pos, name in enumerate(STAGES):
+            outbox = queues[pos + 1] if pos + 1 < len(STAGES) else None
+            downstream = self.workers[STAGES[pos + 1]] if outbox is not None else 0
+            stages.append(asyncio.create_task(
+                self._run_stage(name, handlers[name], queues[pos], outbox, downstream)
+            ))
+
+        for item in items:
+            if self.checkpoint.is_done(item):
+                self.skipped += 1
+                continue
+            item.started = time.perf_counter()
+            await queues[0].put(item)
+        for _ in range(self.workers["parse"]):
+            await queues[0].put(None)
+
+        await asyncio.gather(*stages)
+        self.elapsed = time.perf_counter() - started
+        return self.report()
+
+    async def _run_stage(
+        self,
+        name: str,
+        handler: Callable[[BulkItem], Awaitable[None]],
+        inbox: asyncio.Queue,
+        outbox: asyncio.Queue | None,
+        downstream: int,
+    ) -> None:
+        stats = self.stats[name]
+
+        async def _worker() -> None:
+            while (item := await inbox.get()) is not None:
+                begin = time.perf_counter()
+                stats.first_start = stats.first_start or begin
+                try:
+                    await handler(item)
+                except Exception as e:
+                    stats.failures += 1
+                    self.failed += 1
+                    logger.error(f"Bulk ingestion failed at {name} for {item.path}: {e}")
+                    self.checkpoint.record(item, "error", f"{name}: {e}")
+                    continue
+                finally:
+                    end = time.perf_counter()
+                    stats.last_end = end
+                    stats.latencies.append(end - begin)
+                stats.items += 1
+                if outbox is not None:
+                    await outbox.put(item)
+                else:
+                    self._complete(item)
+
+        await asyncio.gather(*(_worker() for _ in range(stats.workers)))
+        # Every downstream worker needs its own end-of-stream marker
+        for _ in range(downstream):
+            await outbox.put(None)
+
+    # ── Stage handlers ──
+
+    async def _parse(self, item: BulkItem) -> None:
+        # Hash first: files parsed before (by any pipeline) come from the parse cache
+        item.size, item.sha256 = await asyncio.to_thread(_hash_file, item.path)
+        cache = get_parse_cache()
+        if item.file_type in ASYNC_PARSERS:
+            while True:
+                try:
+                    item.segments = [
+                        s async for s in iter_cached_segments(item.path, item.file_type, item.sha256, cache)
+                    ]
+                    break
+                except ParserBusyError as e:   # shared with the API: wait for a slot
+                    await asyncio.sleep(e.retry_after)
+        else:
+            item.segments = await asyncio.to_thread(
+                cached_segments, item.path, item.file_type,
+                lambda: _parse_segments(item.path, item.file_type), item.sha256, cache,
+            )
+
+    async def _extract(self, item: BulkItem) -> None:
+        def _run() -> dict[str, Any]:
+            entities = EntityCollector()
+            for segment in item.segments:
+                entities.feed(segment)
+            return entities.entities
+
+        item.entities = await asyncio.to_thread(_run)
+
+    async def _chunk(self, item: BulkItem) -> None:
+        def _run() -> list[Any]:
+            chunker = new_chunker()
+            chunks = [c for segment in item.segments for c in chunker.feed(segment)]
+            chunks.extend(chunker.finish())
+            uncounted = [c for c in chunks if "token_count" not in c.metadata]
+            counts = get_token_counter().count_many([c.content for c in uncounted])
+            for chunk, tokens in zip(uncounted, counts):
+                chunk.metadata["token_count"] = tokens
+            return chunks
+
+        item.chunks = await asyncio.to_thread(_run)
+        item.segments = []  # parsed text is no longer needed downstream
+
+    async def _embed(self, item: BulkItem) -> None:
+        item.embeddings = await get_embeddings(
+            [c.content for c in item.chunks],
+            token_counts=[c.metadata["token_count"] for c in item.chunks],
+        )
+
+    async def _store(self, item: BulkItem) -> None:
+        if self.store is not None:
+            item.document_id = await self.store(item)
+
+    def _complete(self, item: BulkItem) -> None:
+        self.documents += 1
+        self.bytes += item.size
+        self.chunks += len(item.chunks)
+        self.doc_latencies.append(time.perf_counter() - item.started)
+        self.checkpoint.record(item, "success")
+        item.embeddings = []
+
+    # ── Report ──
+
+    def report(self) -> dict[str, Any]:
+        elapsed = self.elapsed or 1e-9
+        latencies = np.array(self.doc_latencies) if self.doc_latencies else np.zeros(1)
+        return {
+            "documents": self.documents,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "chunks": self.chunks,
+            "megabytes": round(self.bytes / 1_048_576, 2),
+            "elapsed_s": round(self.elapsed, 2),
+            "docs_per_s": round(self.documents / elapsed, 2),
+            "mb_per_s": round(self.bytes / 1_048_576 / elapsed, 2),
+            "chunks_per_s": round(self.chunks / elapsed, 2),
+            "doc_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1),
+            "doc_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 1),
+            "stages": [self.stats[name].to_dict() for name in STAGES],
+        }
+
+
+def _parse_segments(path: Path, file_type: str) -> list[str]:
+    """
+    Page / sheet texts of a file, parsed synchronously (runs in a worker thread).
+    Same segments as iter_file_segments, so both share parse cache entries.
+    """
+    if file_type == "pdf":
+        return list(iter_pdf_pages_parallel(path))
+    if file_type in SEGMENT_PARSERS:
+        return list(SEGMENT_PARSERS[file_type](path))
+    if file_type in SYNC_PARSERS:
+        return [SYNC_PARSERS[file_type](path)]
+    return [read_text_source(path)]
+
+
+def _hash_file(path: Path) -> tuple[int, str]:
+    with open(path, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256")
+    return path.stat().st_size, digest.hexdigest()
+
+
+def format_report(report: dict[str, Any]) -> str:
+    """Human-readable throughput / latency table."""
+    lines = [
+        f"Documents: {report['documents']} ingested, {report['skipped']} skipped (checkpoint), "
+        f"{report['failed']} failed",
+        f"Volume:    {report['megabytes']} MB, {report['chunks']} chunks in {report['elapsed_s']} s",
+        f"Rate:      {report['docs_per_s']} docs/s, {report['mb_per_s']} MB/s, "
+        f"{report['chunks_per_s']} chunks/s",
+        f"Latency:   p50 {report['doc_p50_ms']} ms, p95 {report['doc_p95_ms']} ms per document",
+        "",
+        f"{'stage':<8} {'workers':>7} {'items':>6} {'failed':>6} {'items/s':>8} "
+        f"{'busy s':>8} {'p50 ms':>8} {'p95 ms':>8}",
+    ]
+    for s in report["stages"]:
+        lines.append(
+            f"{s['stage']:<8} {s['workers']:>7} {s['items']:>6} {s['failures']:>6} "
+            f"{s['items_per_s']:>8} {s['busy_s']:>8} {s['p50_ms']:>8} {s['p95_ms']:>8}"
+        )
+    index = report.get("vector_index")
+    if index:
+        lines += ["", f"Vector index: {index['status']} – {index.get('reason') or index.get('definition', '')}"]
+    return "\n".join(lines)
@@ -0,0 +1,173 @@
+"""
+F360 – Chunk Store
+Bulk persistence of document chunks + embeddings.
+Writes every chunk of a document in one binary COPY (asyncpg) or one
+multi-row INSERT, instead of one add/flush/refresh/UPDATE cycle per chunk.
+Embeddings travel as float32 arrays through pgvector's binary codec.
+"""
+from __future__ import annotations
+
+import json
+import uuid
+import logging
+from datetime import datetime, timezone
+from typing import Any
+
+import numpy as np
+from sqlalchemy import bindparam, delete, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.financial import DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+_COPY_COLUMNS = ["id", "document_id", "chunk_index", "content", "metadata", "embedding", "created_at"]
+
+
+async def bulk_insert_chunks(
+    db: AsyncSession,
+    document_id: uuid.UUID,
+    contents: list[str],
+    embeddings: list[list[float] | None],
+    metadatas: list[dict[str, Any]],
+    chunk_indexes: list[int] | None = None,
+) -> list[uuid.UUID]:
+    """
+    Insert all chunks of a document in one round trip.
+    Chunk ids are generated client-side and returned in input order,
+    so no ORM objects need to be flushed or refreshed.
+    A None embedding (failed batch) is stored as NULL.
+    """
+    if not contents:
+        return []
+    if not (len(contents) == len(embeddings) == len(metadatas)):
+        raise ValueError("contents, embeddings and metadatas must have the same length")
+
+    chunk_ids = [uuid.uuid4() for _ in contents]
+    if chunk_indexes is None:
+        chunk_indexes = list(range(len(contents)))
+    vectors = [None if e is None else np.asarray(e, dtype=np.float32) for e in embeddings]
+    created_at = datetime.now(timezone.utc)
+
+    driver_conn = await _asyncpg_connection(db)
+    if driver_conn is not None:
+        # ── Fast path: binary COPY inside the session's transaction ──
+        await driver_conn.copy_records_to_table(
+            DocumentChunk.__tablename__,
+            columns=_COPY_COLUMNS,
+            records=[
+                (cid, document_id, idx, content, json.dumps(meta, default=str), vector, created_at)
+                for cid, idx, content, meta, vector in zip(
+                    chunk_ids, chunk_indexes, contents, metadatas, vectors,
+                )
+            ],
+        )
+    else:
+        # ── Portable path: one multi-row INSERT (insertmanyvalues) ──
+        await db.execute(
+            insert(DocumentChunk.__table__),
+            [
+                {
+                    "id": cid,
+                    "document_id": document_id,
+                    "chunk_index": idx,
+                    "content": content,
+                    "metadata": meta,
+                    "embedding": vector,
+                    "created_at": created_at,
+                }
+                for cid, idx, content, meta, vector in zip(
+                    chunk_ids, chunk_indexes, contents, metadatas, vectors,
+                )
+            ],
+        )
+
+    logger.debug(f"Bulk-inserted {len(chunk_ids)} chunks for document {document_id}")
+    return chunk_ids
+
+
+async def annotate_chunks(
+    db: AsyncSession,
+    document_id: uuid.UUID,
+    extra_metadata: dict[str, Any],
+) -> None:
+    """Merge document-level metadata known only after streaming into every chunk, in one UPDATE."""
+    await db.execute(
+        text("""
+            UPDATE document_chunks
+            SET metadata = metadata || CAST(:extra AS jsonb)
+            WHERE document_id = :document_id
+        """),
+        {"extra": json.dumps(extra_metadata, default=str), "document_id": document_id},
+    )
+
+
+async def load_document_chunks(db: AsyncSession, document_id: uuid.UUID) -> list[Any]:
+    """
+    Existing chunks of a document without their vectors:
+    (id, chunk_index, content, metadata, embedded).
+    """
+    result = await db.execute(
+        select(
+            DocumentChunk.id,
+            DocumentChunk.chunk_index,
+            DocumentChunk.content,
+            DocumentChunk.chunk_metadata.label("metadata"),
+            DocumentChunk.embedding.isnot(None).label("embedded"),
+        ).where(DocumentChunk.document_id == document_id)
+    )
+    return list(result.all())
+
+
+async def update_chunks(db: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    """
+    Move / relabel kept chunks in one executemany UPDATE.
+    Each row holds `id`, `chunk_index`, `content` and `metadata`; vectors are untouched.
+    """
+    if not rows:
+        return
+    table = DocumentChunk.__table__
+    await db.execute(
+        update(table)
+        .where(table.c.id == bindparam("chunk_id"))
+        .values(
+            chunk_index=bindparam("new_index"),
+            content=bindparam("new_content"),
+            metadata=bindparam("new_metadata"),
+        ),
+        [
+            {
+                "chunk_id": row["id"],
+                "new_index": row["chunk_index"],
+                "new_content": row["content"],
+                "new_metadata": row["metadata"],
+            }
+            for row in rows
+        ],
+    )
+
+
+async def delete_chunks(db: AsyncSession, chunk_ids: list[uuid.UUID]) -> int:
+    """Delete the given chunks in one statement. Returns the number of ids deleted."""
+    if not chunk_ids:
+        return 0
+    await db.execute(delete(DocumentChunk).where(DocumentChunk.id.in_(chunk_ids)))
+    return len(chunk_ids)
+
+
+async def _asyncpg_connection(db: AsyncSession) -> Any | None:
+    """
+    Return the raw asyncpg connection behind the session when COPY is safe:
+    the driver is asyncpg and a transaction is already open on it, so the
+    copied rows commit or roll back together with the rest of the session.
+    """
+    bind = getattr(db, "bind", None)
+    if bind is None or bind.dialect.driver != "asyncpg":
+        return None
+
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    driver_conn = raw.driver_connection
+    if not driver_conn.is_in_transaction():
+        return None
+    return driver_conn
@@ -0,0 +1,313 @@
+"""
+F360 – Streaming Chunker
+Single chunker shared by the cognitive ingestion and legacy RAG pipelines.
+Consumes page / sheet texts one at a time and yields overlapping,
+sentence-aware chunks as soon as enough text is buffered, so memory stays
+bounded by one chunk window regardless of document size.
+Two modes: fixed character windows (StreamingChunker) and token-budgeted
+sentence packing (TokenChunker).
+"""
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from typing import Any, Iterable, Iterator
+
+from app.core.config import get_settings
+from app.services.cognitive_ingestion.tokenizer import TokenCounter, get_token_counter
+
+# ── Chunking constants ──
+CHUNK_SIZE = 1000       # characters per chunk
+CHUNK_OVERLAP = 200     # overlap between chunks
+BOUNDARY_LOOKAHEAD = 50  # how far past chunk_size a sentence boundary may be
+SEPARATORS = [". ", ".\n", "\n\n", "\n", " "]
+SEGMENT_JOINER = "\n"    # inserted between consecutive pages / sheets
+CHUNK_MAX_TOKENS = 512
+CHUNK_OVERLAP_TOKENS = 64
+
+# Packing unit for token mode: a sentence or a line, with its trailing whitespace
+_UNIT_RE = re.compile(r".+?(?:[.!?](?=\s)|\n|$)\s*", re.S)
+
+
+class TextChunk:
+    """A chunk of document text with its position in the full document stream."""
+
+    __slots__ = ("index", "content", "start", "end", "segment", "metadata")
+
+    def __init__(
+        self,
+        index: int,
+        content: str,
+        start: int,
+        end: int,
+        segment: int = 0,
+        metadata: dict[str, Any] | None = None,
+    ):
+        self.index = index        # 0-based position among the document's chunks
+        self.content = content
+        self.start = start        # char offset of content[0] in the joined document
+        self.end = end            # char offset just past content[-1]
+        self.segment = segment    # page / sheet index where the chunk starts
+        self.metadata = metadata or {}
+
+    def to_metadata(self) -> dict[str, Any]:
+        return {
+            "chunk_index": self.index,
+            "char_start": self.start,
+            "char_end": self.end,
+            "segment": self.segment,
+            **self.metadata,
+        }
+
+
+class StreamingChunker:
+    """
+    Incremental chunker: `feed()` page texts, collect chunks, then `finish()`.
+    Cuts at the same boundaries as the whole-string algorithm would on the
+    joined text, while only buffering the unchunked tail.
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        self.chunk_size = chunk_size
+        self.overlap = max(0, overlap)
+        self._buffer = ""
+        self._buffer_offset = 0        # absolute offset of _buffer[0]
+        self._segment_starts: list[int] = []
+        self._next_index = 0
+
+    def feed(self, segment: str) -> list[TextChunk]:
+        """Add the next page / sheet text and return the chunks that are now complete."""
+        if self._segment_starts:
+            self._buffer += SEGMENT_JOINER
+        self._segment_starts.append(self._buffer_offset + len(self._buffer))
+        self._buffer += segment or ""
+
+        chunks: list[TextChunk] = []
+        # A window is final once the boundary search cannot see past the buffer
+        while len(self._buffer) >= self.chunk_size + BOUNDARY_LOOKAHEAD + 1:
+            chunk = self._cut(final=False)
+            if chunk is not None:
+                chunks.append(chunk)
+        return chunks
+
+    def finish(self) -> list[TextChunk]:
+        """Flush the remaining buffer."""
+        chunks: list[TextChunk] = []
+        while self._buffer:
+            chunk = self._cut(final=True)
+            if chunk is not None:
+                chunks.append(chunk)
+        return chunks
+
+    def _cut(self, final: bool) -> TextChunk | None:
+        buffer = self._buffer
+        end = self.chunk_size
+
+        # Try to end at a sentence boundary
+        if end < len(buffer):
+            for sep in SEPARATORS:
+                boundary = buffer.rfind(sep, self.chunk_size // 2, end + BOUNDARY_LOOKAHEAD)
+                if boundary != -1:
+                    end = boundary + len(sep)
+                    break
+        elif final:
+            end = len(buffer)
+
+        raw = buffer[:end]
+        content = raw.strip()
+        chunk = None
+        if content:
+            lead = len(raw) - len(raw.lstrip())
+            start = self._buffer_offset + lead
+            chunk = TextChunk(
+                index=self._next_index,
+                content=content,
+                start=start,
+                end=start + len(content),
+                segment=max(0, bisect_right(self._segment_starts, start) - 1),
+            )
+            self._next_index += 1
+
+        if end >= len(buffer):
+            # Nothing left to overlap with: the document is exhausted
+            self._buffer_offset += len(buffer)
+            self._buffer = ""
+            return chunk
+
+        # Always move forward, even when overlap >= the boundary distance
+        advance = max(end - self.overlap, 1)
+        self._buffer = buffer[advance:]
+        self._buffer_offset += advance
+        return chunk
+
+
+class TokenChunker:
+    """
+    Token-budgeted chunker with the same `feed()` / `finish()` interface.
+    Packs whole sentences / lines into chunks of at most `max_tokens` tokens
+    and carries up to `overlap_tokens` worth of trailing sentences into the
+    next chunk. Sentences are tokenized in one batch per page, and every
+    emitted chunk gets its exact `token_count` in its metadata.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = CHUNK_MAX_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        counter: TokenCounter | None = None,
+    ):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self.max_tokens = max_tokens
+        # Overlap above half the budget would leave little room for new text
+        self.overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+        self.counter = counter or get_token_counter()
+        self._text = ""
+        self._text_offset = 0                          # absolute offset of _text[0]
+        self._units: list[tuple[int, int, int]] = []   # pending (start, end, tokens)
+        self._pending_tokens = 0
+        self._segment_starts: list[int] = []
+        self._next_index = 0
+
+    def feed(self, segment: str) -> list[TextChunk]:
+        """Add the next page / sheet text and return the chunks that are now complete."""
+        segment = segment or ""
+        if self._segment_starts:
+            self._text += SEGMENT_JOINER
+        base = self._text_offset + len(self._text)
+        self._segment_starts.append(base)
+        self._text += segment
+
+        spans = [
+            (base + m.start(), base + m.end())
+            for m in _UNIT_RE.finditer(segment)
+            if m.group().strip()
+        ]
+        counts = self.counter.count_many([segment[s - base:e - base] for s, e in spans])
+
+        chunks: list[TextChunk] = []
+        for (start, end), tokens in zip(spans, counts):
+            for unit in self._fit(start, end, tokens):
+                chunk = self._add(unit)
+                if chunk is not None:
+                    chunks.append(chunk)
+        self._trim()
+        return self._count(chunks)
+
+    def finish(self) -> list[TextChunk]:
+        """Flush the remaining sentences as the last chunk."""
+        chunk = self._emit() if self._units else None
+        self._units.clear()
+        self._pending_tokens = 0
+        self._trim()
+        return self._count([chunk] if chunk is not None else [])
+
+    def _fit(self, start: int, end: int, tokens: int) -> Iterator[tuple[int, int, int]]:
+        """Split a unit that alone exceeds the budget into smaller pieces."""
+        if tokens <= self.max_tokens or end - start <= 1:
+            yield start, end, tokens
+            return
+
+        unit = self._slice(start, end)
+        size = max(1, len(unit) * self.max_tokens // tokens)
+        pieces: list[tuple[int, int]] = []
+        pos = 0
+        while pos < len(unit):
+            cut = min(pos + size, len(unit))
+            if cut < len(unit):
+                space = unit.rfind(" ", pos + size // 2, cut)
+                if space != -1:
+                    cut = space + 1
+            pieces.append((start + pos, start + cut))
+            pos = cut
+
+        counts = self.counter.count_many([self._slice(s, e) for s, e in pieces])
+        for (s, e), n in zip(pieces, counts):
+            yield from self._fit(s, e, n)
+
+    def _add(self, unit: tuple[int, int, int]) -> TextChunk | None:
+        chunk = None
+        if self._units and self._pending_tokens + unit[2] > self.max_tokens:
+            chunk = self._emit()
+            # Keep trailing units as overlap, but always drop at least one
+            # and leave room for the incoming unit
+            self._drop(1)
+            while self._units and (
+                self._pending_tokens > self.overlap_tokens
+                or self._pending_tokens + unit[2] > self.max_tokens
+            ):
+                self._drop(1)
+        self._units.append(unit)
+        self._pending_tokens += unit[2]
+        return chunk
+
+    def _drop(self, n: int) -> None:
+        for _ in range(min(n, len(self._units))):
+            self._pending_tokens -= self._units.pop(0)[2]
+
+    def _emit(self) -> TextChunk | None:
+        start, end = self._units[0][0], self._units[-1][1]
+        raw = self._slice(start, end)
+        content = raw.strip()
+        if not content:
+            return None
+        start += len(raw) - len(raw.lstrip())
+        chunk = TextChunk(
+            index=self._next_index,
+            content=content,
+            start=start,
+            end=start + len(content),
+            segment=max(0, bisect_right(self._segment_starts, start) - 1),
+        )
+        self._next_index += 1
+        return chunk
+
+    def _count(self, chunks: list[TextChunk]) -> list[TextChunk]:
+        """Store the exact token count of each emitted chunk (one batch)."""
+        for chunk, tokens in zip(chunks, self.counter.count_many([c.content for c in chunks])):
+            chunk.metadata["token_count"] = tokens
+        return chunks
+
+    def _slice(self, start: int, end: int) -> str:
+        return self._text[start - self._text_offset:end - self._text_offset]
+
+    def _trim(self) -> None:
+        """Forget text that no pending unit refers to."""
+        keep = self._units[0][0] if self._units else self._text_offset + len(self._text)
+        self._text = self._text[keep - self._text_offset:]
+        self._text_offset = keep
+
+
+def new_chunker(mode: str | None = None) -> StreamingChunker | TokenChunker:
+    """Chunker for the configured `chunking_mode` ("chars" or "tokens")."""
+    settings = get_settings()
+    mode = mode or settings.chunking_mode
+    if mode == "tokens":
+        return TokenChunker(settings.chunk_max_tokens, settings.chunk_overlap_tokens)
+    if mode != "chars":
+        raise ValueError(f"Unknown chunking mode: {mode}")
+    return StreamingChunker()
+
+
+def iter_chunks(
+    segments: Iterable[str],
+    chunk_size: int = CHUNK_SIZE,
+    overlap: int = CHUNK_OVERLAP,
+) -> Iterator[TextChunk]:
+    """Lazily chunk an iterator of page / sheet texts."""
+    chunker = StreamingChunker(chunk_size, overlap)
+    for segment in segments:
+        yield from chunker.feed(segment)
+    yield from chunker.finish()
+
+
+def chunk_text(content: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    """
+    Split text into overlapping chunks for embedding.
+    Uses sentence-aware splitting when possible.
+    """
+    if not content:
+        return []
+    return [chunk.content for chunk in iter_chunks([content], chunk_size, overlap)]
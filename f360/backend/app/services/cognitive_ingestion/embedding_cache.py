@@ -0,0 +1,160 @@
+"""
+F360 – Embedding Cache
+Content-addressed cache for embedding vectors.
+Two tiers: an in-process LRU (hot) and a SQLite file on local disk (persistent).
+Keys are derived from (model, dimension, normalized text hash), so identical
+chunks, re-indexed documents and repeated questions are embedded only once.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.disk_cache import DiskLRU
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text_input: str) -> str:
+    """Unicode-normalize and collapse whitespace so trivially different texts share a key."""
+    return " ".join(unicodedata.normalize("NFC", text_input).split())
+
+
+def make_cache_key(text_input: str, model: str, dimension: int) -> str:
+    """SHA-256 over (model, dimension, normalized text)."""
+    payload = f"{model}\x00{dimension}\x00{normalize_text(text_input)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ═══════════════════════════════════════════════════════════════
+# TWO-TIER CACHE
+# ═══════════════════════════════════════════════════════════════
+
+class EmbeddingCache:
+    """
+    LRU memory tier in front of an optional SQLite disk tier (DiskLRU).
+    Vectors are kept as float32 in both tiers.
+    Eviction:
+    - memory: least recently used entry once `memory_entries` is exceeded
+    - disk:   least recently used rows once `disk_entries` is exceeded
+    """
+
+    def __init__(
+        self,
+        memory_entries: int = 10_000,
+        disk_path: Path | str | None = None,
+        disk_entries: int = 500_000,
+    ):
+        self.memory_entries = max(0, memory_entries)
+        self.disk_entries = max(0, disk_entries)
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: DiskLRU | None = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+
+        if disk_path and self.disk_entries:
+            self._disk = DiskLRU(
+                disk_path, "embeddings", {"vector": "BLOB"},
+                max_entries=self.disk_entries, label="Embedding disk cache",
+            )
+
+    # ── Lookup ──
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Return cached vectors for the keys that are present (memory first, then disk)."""
+        found: dict[str, list[float]] = {}
+        missing: list[str] = []
+
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector.tolist()
+                    self.memory_hits += 1
+                else:
+                    missing.append(key)
+
+            if missing and self._disk is not None:
+                for key, (blob,) in self._disk.get_many(missing).items():
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector.tolist()
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+
+            self.misses += sum(1 for key in missing if key not in found)
+
+        return found
+
+    # ── Store ──
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        """Store vectors in both tiers, evicting least recently used entries."""
+        if not items:
+            return
+
+        with self._lock:
+            vectors = {key: np.asarray(value, dtype=np.float32) for key, value in items.items()}
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+
+            if self._disk is not None:
+                self._disk.put_many({key: ((vector.tobytes(),), vector.nbytes) for key, vector in vectors.items()})
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        if not self.memory_entries:
+            return
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.memory_evictions += 1
+
+    # ── Maintenance ──
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers (counters are kept)."""
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Hit/miss/eviction counters and current tier sizes."""
+        with self._lock:
+            disk = self._disk.stats() if self._disk is not None else {"disk_size": 0}
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_evictions": self.memory_evictions,
+                "disk_evictions": self._disk.evictions if self._disk is not None else 0,
+                "memory_size": len(self._memory),
+                "disk_size": disk["disk_size"],
+            }
+
+
+@lru_cache()
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide embedding cache configured from settings."""
+    settings = get_settings()
+    return EmbeddingCache(
+        memory_entries=settings.embedding_cache_memory_entries,
+        disk_path=settings.cache_path / "embeddings.sqlite3" if settings.embedding_cache_disk_entries else None,
+        disk_entries=settings.embedding_cache_disk_entries,
+    )
@@ -2,6 +2,8 @@
 F360 – Cognitive Extractor
 Entity extraction + enrichment from raw document text.
 Combines regex heuristics with optional LLM-based extraction.
+The regex heuristics run as one precompiled, single-pass scanner that can
+also be fed a document page by page (EntityCollector).
 """
 from __future__ import annotations
 
@@ -16,6 +18,235 @@ logger = logging.getLogger(__name__)
 # FINANCIAL ENTITY EXTRACTION (Regex + Heuristics)
 # ═══════════════════════════════════════════════════════════════
 
+# Patterns per entity type, each capturing the entity in group 1 and tagged
+# with the anchor it starts on. An anchor lists the lowercase words a match
+# of its patterns can begin with, or, in ANCHOR_CLASSES, the character class
+# its first character belongs to; the scanner looks for anchors only and
+# confirms the full patterns at the positions it finds.
+ANCHOR_CLASSES: dict[str, str] = {
+    "digit": r"\d",   # Unicode digits, as the patterns' own \d
+}
+
+ENTITY_ANCHORS: dict[str, tuple[str, ...]] = {
+    "currency": ("€", "eur"),
+    "montant": ("montant",),
+    "total": ("total",),
+    "payment": ("paiement", "règlement", "payment"),
+    "net": ("net",),
+    "penalty": ("pénalité", "penalty", "indemnité"),
+    "clause": ("clause", "liquidated"),
+    "late": ("retard", "late"),
+    "indexation": ("indexation", "indexé", "indexed", "révision"),
+    "inflation": ("inflation", "cpi", "ipc"),
+    "party": ("société", "company", "fournisseur", "supplier", "client", "prestataire"),
+}
+
+_AMOUNT = r"\d[\d\s]*[\d](?:[.,]\d{2})?"
+ENTITY_PATTERNS: dict[str, tuple[int, list[tuple[str, str]]]] = {
+    "amounts": (0, [
+        ("digit", rf"({_AMOUNT})\s*(?:€|EUR|euros?)"),
+        ("currency", rf"(?:€|EUR)\s*({_AMOUNT})"),
+        ("montant", rf"[Mm]ontant\s*(?::\s*|de\s+)({_AMOUNT})"),
+        ("total", rf"[Tt]otal\s*(?::\s*|TTC\s*:\s*)({_AMOUNT})"),
+    ]),
+    "dates": (re.IGNORECASE, [
+        ("digit", r"(\d{2}[/.-]\d{2}[/.-]\d{4})"),
+        ("digit", r"(\d{4}[/.-]\d{2}[/.-]\d{2})"),
+        ("digit", r"(\d{1,2}\s+(?:janvier|février|mars|avril|mai|juin|juillet|août|septembre|octobre|novembre|décembre)\s+\d{4})"),
+    ]),
+    "payment_terms": (re.IGNORECASE, [
+        ("payment", r"(?:paiement|règlement|payment)\s*(?:à|:)?\s*([\w\s]+(?:jours?|days?))"),
+        ("net", r"(net\s+\d+\s*(?:jours?|days?))"),
+        ("digit", r"(\d+\s*(?:jours?|days?)\s*(?:date\s+de\s+facture|fin\s+de\s+mois))"),
+    ]),
+    "penalty_clauses": (re.IGNORECASE, [
+        ("penalty", r"((?:pénalité|penalty|indemnité)[^.]*\.)"),
+        ("clause", r"((?:clause\s+pénale|liquidated\s+damages)[^.]*\.)"),
+        ("late", r"((?:retard|late\s+payment)[^.]*(?:intérêt|interest|pénalité|penalty)[^.]*\.)"),
+    ]),
+    "indexation_clauses": (re.IGNORECASE, [
+        ("indexation", r"((?:indexation|indexé|indexed|révision)[^.]*(?:inflation|CPI|IPC|indice|index)[^.]*\.)"),
+        ("inflation", r"((?:inflation|CPI|IPC)[^.]*(?:clause|ajustement|adjustment)[^.]*\.)"),
+    ]),
+    "counterparties": (0, [
+        ("party", r"(?:société|company|fournisseur|supplier|client|prestataire)\s*(?::\s*)?([A-Z][\w\s&.-]{2,50}(?:SAS|SARL|SA|SNC|EURL|GmbH|Ltd|Inc|Corp)?)"),
+    ]),
+}
+
+
+class EntityExtractor:
+    """
+    Single-pass entity scanner built once from ENTITY_PATTERNS.
+    All anchor words are folded into one alternation, factored by common
+    prefix so the regex engine can reject most positions on their first
+    character, and run over the lowercased text: the document is scanned
+    once and Python only sees the positions where some pattern could start.
+    There the patterns of the anchor that was hit are matched in place with
+    their own precompiled regex. Remembering where each pattern's last match
+    ended yields the same matches as one `finditer` per pattern, including
+    overlapping matches of different patterns, and keeping them per pattern
+    yields them in the same order.
+    """
+
+    def __init__(
+        self,
+        patterns: dict[str, tuple[int, list[tuple[str, str]]]] = ENTITY_PATTERNS,
+        anchors: dict[str, tuple[str, ...]] = ENTITY_ANCHORS,
+        classes: dict[str, str] = ANCHOR_CLASSES,
+    ):
+        self.types = list(patterns)
+        # anchor → [(slot, compiled pattern)]; a slot per pattern, in pattern order
+        by_anchor: dict[str, list[tuple[int, re.Pattern]]] = {name: [] for name in (*classes, *anchors)}
+        self._type_slots: dict[str, range] = {}
+        slot = 0
+        for entity_type, (flags, group) in patterns.items():
+            for offset, (anchor, pattern) in enumerate(group):
+                by_anchor[anchor].append((slot + offset, re.compile(pattern, flags)))
+            self._type_slots[entity_type] = range(slot, slot + len(group))
+            slot += len(group)
+        self._slots = slot
+        self._by_word = {
+            word.casefold(): by_anchor[name]
+            for name, words in anchors.items() if by_anchor[name]
+            for word in words
+        }
+        # Character-class anchors are the scanner's capture groups, in this order
+        self._by_group = [by_anchor[name] for name in classes if by_anchor[name]]
+
+        alternation = "|".join(
+            [f"({cls})" for name, cls in classes.items() if by_anchor[name]]
+            + [_prefix_alternation(list(self._by_word))]
+        )
+        self._scanner = re.compile(alternation)
+        # Used when lowercasing would shift offsets (a few non-ASCII characters)
+        self._scanner_ci = re.compile(alternation, re.IGNORECASE)
+
+    def empty(self) -> dict[str, list[Any]]:
+        return {name: [] for name in self.types}
+
+    def scan(self, text: str) -> dict[str, list[str]]:
+        """Raw group-1 captures per entity type, in `finditer` order, before cleanup."""
+        per_slot = self.scan_slots(text)
+        return {
+            entity_type: [capture for slot in slots for capture in per_slot[slot]]
+            for entity_type, slots in self._type_slots.items()
+        }
+
+    def scan_slots(self, text: str) -> list[list[str]]:
+        """Raw group-1 captures per pattern (slot), each in text order."""
+        found: list[list[str]] = [[] for _ in range(self._slots)]
+        if not text:
+            return found
+
+        haystack = text.lower()
+        scanner = self._scanner
+        if len(haystack) != len(text):
+            haystack, scanner = text, self._scanner_ci
+
+        ends = [0] * self._slots
+        by_word, by_group = self._by_word, self._by_group
+        hit = scanner.search(haystack)
+        while hit is not None:
+            pos = hit.start()
+            group = hit.lastindex
+            candidates = by_group[group - 1] if group else by_word.get(hit.group().casefold(), ())
+            for slot, pattern in candidates:
+                if pos < ends[slot]:
+                    continue   # inside this pattern's previous match
+                match = pattern.match(text, pos)
+                if match is not None:
+                    ends[slot] = match.end()
+                    found[slot].append(match.group(1))
+            # Resume one character later: anchor words may overlap ("fournisseur" / "eur")
+            hit = scanner.search(haystack, pos + 1)
+        return found
+
+    def extract(self, text: str) -> dict[str, Any]:
+        """Cleaned, deduplicated entities of one text (see `extract_financial_entities`)."""
+        collector = EntityCollector(self)
+        collector.feed(text)
+        return collector.entities
+
+
+class EntityCollector:
+    """
+    Accumulates entities over a stream of pages / chunks: `feed()` each text,
+    read `entities` at any time. Deduplication is incremental, and the
+    `entities` dict is updated in place, so it can be handed out before
+    the stream ends.
+    """
+
+    def __init__(self, extractor: EntityExtractor | None = None):
+        self.extractor = extractor or ENTITY_EXTRACTOR
+        self.entities: dict[str, list[Any]] = self.extractor.empty()
+        self._seen: dict[str, set[Any]] = {"amounts": set(), "dates": set(), "counterparties": set()}
+        # Clauses keep the per-pattern order of the whole text: a page's matches
+        # join those of the same pattern on earlier pages, not the end of the list
+        self._clauses: dict[str, list[list[str]]] = {
+            key: [[] for _ in self.extractor._type_slots[key]]
+            for key in ("payment_terms", "penalty_clauses", "indexation_clauses")
+        }
+
+    def feed(self, text: str) -> dict[str, list[Any]]:
+        per_slot = self.extractor.scan_slots(text)
+
+        def captures(key: str) -> list[str]:
+            return [capture for slot in self.extractor._type_slots[key] for capture in per_slot[slot]]
+
+        amounts = []
+        for raw in captures("amounts"):
+            try:
+                amount = float(raw.replace(" ", "").replace(",", "."))
+            except ValueError:
+                continue
+            if amount > 0:
+                amounts.append(amount)
+        if self._add("amounts", amounts):
+            self.entities["amounts"].sort(reverse=True)
+
+        self._add("dates", captures("dates"))
+        for key, per_pattern in self._clauses.items():
+            slots = self.extractor._type_slots[key]
+            added = False
+            for collected, slot in zip(per_pattern, slots):
+                collected.extend(value.strip() for value in per_slot[slot])
+                added = added or bool(per_slot[slot])
+            if added:
+                self.entities[key][:] = [value for collected in per_pattern for value in collected]
+        self._add("counterparties", [name for name in map(str.strip, captures("counterparties")) if len(name) > 2])
+        return self.entities
+
+    def _add(self, key: str, values: list[Any]) -> bool:
+        seen, target = self._seen[key], self.entities[key]
+        added = False
+        for value in values:
+            if value not in seen:
+                seen.add(value)
+                target.append(value)
+                added = True
+        return added
+
+
+def _prefix_alternation(words: list[str]) -> str:
+    """Regex alternation of literal words, factored by common prefix (a trie)."""
+    branches: dict[str, list[str]] = {}
+    for word in words:
+        branches.setdefault(word[0], []).append(word[1:])
+    parts = []
+    for first, rests in sorted(branches.items()):
+        if "" in rests:
+            parts.append(re.escape(first))
+        rests = [rest for rest in rests if rest]
+        if len(rests) == 1:
+            parts.append(re.escape(first + rests[0]))
+        elif rests:
+            parts.append(f"{re.escape(first)}(?:{_prefix_alternation(rests)})")
+    return "|".join(parts)
+
+
+ENTITY_EXTRACTOR = EntityExtractor()
+
+
 def extract_financial_entities(text: str) -> dict[str, Any]:
     """
     Extract key financial entities from raw text:
@@ -25,88 +256,7 @@ def extract_financial_entities(text: str) -> dict[str, Any]:
     - Payment terms
     - Contract clauses (penalty, indexation)
     """
-    entities: dict[str, Any] = {
-        "amounts": [],
-        "dates": [],
-        "counterparties": [],
-        "payment_terms": [],
-        "penalty_clauses": [],
-        "indexation_clauses": [],
-    }
-
-    # ── Amounts ──
-    amount_patterns = [
-        r"(\d[\d\s]*[\d](?:[.,]\d{2})?)\s*(?:€|EUR|euros?)",
-        r"(?:€|EUR)\s*(\d[\d\s]*[\d](?:[.,]\d{2})?)",
-        r"[Mm]ontant\s*(?::\s*|de\s+)(\d[\d\s]*[\d](?:[.,]\d{2})?)",
-        r"[Tt]otal\s*(?::\s*|TTC\s*:\s*)(\d[\d\s]*[\d](?:[.,]\d{2})?)",
-    ]
-    for pattern in amount_patterns:
-        for match in re.finditer(pattern, text):
-            raw_amount = match.group(1).replace(" ", "").replace(",", ".")
-            try:
-                amount = float(raw_amount)
-                if amount > 0:
-                    entities["amounts"].append(amount)
-            except ValueError:
-                pass
-
-    entities["amounts"] = sorted(set(entities["amounts"]), reverse=True)
-
-    # ── Dates ──
-    date_patterns = [
-        r"(\d{2}[/.-]\d{2}[/.-]\d{4})",
-        r"(\d{4}[/.-]\d{2}[/.-]\d{2})",
-        r"(\d{1,2}\s+(?:janvier|février|mars|avril|mai|juin|juillet|août|septembre|octobre|novembre|décembre)\s+\d{4})",
-    ]
-    for pattern in date_patterns:
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            entities["dates"].append(match.group(1))
-
-    entities["dates"] = list(set(entities["dates"]))
-
-    # ── Payment Terms ──
-    payment_patterns = [
-        r"(?:paiement|règlement|payment)\s*(?:à|:)?\s*([\w\s]+(?:jours?|days?))",
-        r"(net\s+\d+\s*(?:jours?|days?))",
-        r"(\d+\s*(?:jours?|days?)\s*(?:date\s+de\s+facture|fin\s+de\s+mois))",
-    ]
-    for pattern in payment_patterns:
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            entities["payment_terms"].append(match.group(1).strip())
-
-    # ── Penalty Clauses ──
-    penalty_patterns = [
-        r"((?:pénalité|penalty|indemnité)[^.]*\.)",
-        r"((?:clause\s+pénale|liquidated\s+damages)[^.]*\.)",
-        r"((?:retard|late\s+payment)[^.]*(?:intérêt|interest|pénalité|penalty)[^.]*\.)",
-    ]
-    for pattern in penalty_patterns:
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            entities["penalty_clauses"].append(match.group(1).strip())
-
-    # ── Indexation Clauses ──
-    indexation_patterns = [
-        r"((?:indexation|indexé|indexed|révision)[^.]*(?:inflation|CPI|IPC|indice|index)[^.]*\.)",
-        r"((?:inflation|CPI|IPC)[^.]*(?:clause|ajustement|adjustment)[^.]*\.)",
-    ]
-    for pattern in indexation_patterns:
-        for match in re.finditer(pattern, text, re.IGNORECASE):
-            entities["indexation_clauses"].append(match.group(1).strip())
-
-    # ── Counterparties ──
-    company_patterns = [
-        r"(?:société|company|fournisseur|supplier|client|prestataire)\s*(?::\s*)?([A-Z][\w\s&.-]{2,50}(?:SAS|SARL|SA|SNC|EURL|GmbH|Ltd|Inc|Corp)?)",
-    ]
-    for pattern in company_patterns:
-        for match in re.finditer(pattern, text):
-            name = match.group(1).strip()
-            if len(name) > 2:
-                entities["counterparties"].append(name)
-
-    entities["counterparties"] = list(set(entities["counterparties"]))
-
-    return entities
+    return ENTITY_EXTRACTOR.extract(text)
 
 
 # ═══════════════════════════════════════════════════════════════
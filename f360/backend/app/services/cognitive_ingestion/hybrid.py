@@ -0,0 +1,97 @@
+"""
+F360 – Hybrid Retrieval
+Lexical + vector retrieval fused with reciprocal rank fusion (RRF).
+Cosine search is weak on exactly what financial questions are full of –
+invoice / contract references, amounts, supplier names – so the question's
+distinctive terms are also matched literally against chunk content (ILIKE,
+served by the pg_trgm index idx_chunks_content_trgm). Both candidate lists
+are ranked separately and fused:
+    score(chunk) = Σ weight_r / (k + rank_r(chunk))
+This module holds the backend-independent parts: term extraction, LIKE
+patterns and the fusion itself.
+"""
+from __future__ import annotations
+
+import re
+from typing import Hashable, Iterable, TypeVar
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+K = TypeVar("K", bound=Hashable)
+
+MODES = ("vector", "hybrid")
+MIN_TERM_LENGTH = 3      # trigram index: shorter patterns cannot use it
+WEAK_TERM_LENGTH = 5     # plain words shorter than this are too common to help
+
+# Term strength: quoted phrases > references / amounts / names > other content words
+STRONG, MEDIUM, WEAK = 3, 2, 1
+
+_QUOTED_RE = re.compile(r'"([^"]+)"|«\s*([^»]+?)\s*»|“([^”]+)”')
+_TOKEN_RE = re.compile(r"\w(?:[\w./,'’\-]*\w)?")
+
+STOPWORDS = frozenset("""
+    about above after all also and any are been before being between both but can could did does doing
+    during each few for from had has have having her here hers him his how into its itself just more most
+    nor not now off once only other our out over own same she should some such than that the their them
+    then there these they this those through too under until very was were what when where which while
+    who whom why will with would you your list show give tell find contract contracts document documents
+    clause clauses les une des aux mais donc car cet cette ces son ses leur leurs mon mes ton tes notre
+    nos votre vos qui que quoi dont quel quelle quels quelles est sont être été avoir ont pour par sur
+    sous dans avec sans entre vers chez plus moins comme tout tous toute toutes combien comment pourquoi
+    quand contrat contrats
+""".split())
+
+
+def lexical_terms(question: str, max_terms: int | None = None) -> list[tuple[str, int]]:
+    """
+    Distinctive terms of a question with their strength, strongest first:
+    quoted phrases, then tokens holding a digit (references, amounts, dates)
+    or starting with a capital (names), then remaining content words.
+    """
+    max_terms = max_terms or settings.hybrid_max_terms
+    found: dict[str, tuple[str, int, int]] = {}
+
+    def _add(term: str, strength: int) -> None:
+        term = term.strip(" .,;:!?'’")
+        key = term.lower()
+        if len(term) < MIN_TERM_LENGTH or key in STOPWORDS:
+            return
+        if key not in found or found[key][1] < strength:
+            found[key] = (term, strength, found[key][2] if key in found else len(found))
+
+    for match in _QUOTED_RE.finditer(question):
+        _add(next(group for group in match.groups() if group), STRONG)
+    for n, token in enumerate(_TOKEN_RE.findall(_QUOTED_RE.sub(" ", question))):
+        # a capital on the opening word says nothing about a name
+        if any(ch.isdigit() for ch in token) or (n > 0 and token[0].isupper()):
+            _add(token, MEDIUM)
+        elif len(token) >= WEAK_TERM_LENGTH:
+            _add(token, WEAK)
+
+    ranked = sorted(found.values(), key=lambda t: (-t[1], t[2]))
+    return [(term, strength) for term, strength, _ in ranked[:max_terms]]
+
+
+def like_pattern(term: str) -> str:
+    """'%term%' with LIKE wildcards in the term escaped (ESCAPE '\\')."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def rrf_fuse(
+    rankings: Iterable[list[K]],
+    weights: Iterable[float],
+    k: int | None = None,
+) -> list[tuple[K, float]]:
+    """
+    Reciprocal rank fusion of ranked candidate lists (best first).
+    Ties keep the order in which candidates were first seen.
+    """
+    k = settings.hybrid_rrf_k if k is None else k
+    scores: dict[K, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
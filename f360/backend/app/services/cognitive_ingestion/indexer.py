@@ -10,16 +10,30 @@ import logging
 from datetime import datetime, timezone
 from typing import Any
 
-from sqlalchemy import text, select, delete
+from sqlalchemy import text, select, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
 from app.models.financial import Document, DocumentChunk
-from app.services.sources.parsers import parse_file
-from app.services.cognitive_ingestion.extractor import extract_financial_entities
-from app.services.cognitive_ingestion.vectorizer import vectorize_and_store
+from app.services.sources.executor import ParserBusyError
+from app.services.sources.parsers import DocumentSource
+from app.services.sources.parse_cache import iter_cached_segments
+from app.services.cognitive_ingestion.extractor import EntityCollector
+from app.services.cognitive_ingestion.vectorizer import get_embeddings, vectorize_segments
+from app.services.cognitive_ingestion.embedding_cache import get_embedding_cache
+from app.services.cognitive_ingestion.progress import IngestionProgress
+from app.services.cognitive_ingestion.tabular_store import ingest_document_tables
+from app.services.cognitive_ingestion.hybrid import MODES, lexical_terms
+from app.services.cognitive_ingestion.retrieval_cache import chunk_generation, get_retrieval_cache
+from app.services.cognitive_ingestion.vector_store import (  # noqa: F401 – embedding_param re-exported
+    embedding_param,
+    get_vector_backend,
+    invalidate_on_commit,
+)
 from app.schemas.schemas import IngestionResult
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -28,36 +42,53 @@ logger = logging.getLogger(__name__)
 
 async def ingest_document(
     doc: Document,
-    raw_bytes: bytes,
+    source: DocumentSource,
     db: AsyncSession,
+    incremental: bool = False,
+    progress: IngestionProgress | None = None,
 ) -> IngestionResult:
     """
-    Complete cognitive ingestion pipeline:
-    1. Parse document (multimodal) → raw text
-    2. Extract financial entities (regex + optional LLM)
-    3. Vectorize content → chunk & embed
-    4. Store vectors + metadata in pgvector
+    Complete cognitive ingestion pipeline, streamed page by page:
+    1. Parse document (multimodal) → page / sheet texts, replayed from the
+       parse cache when the same bytes were parsed before
+    2. Extract financial entities from each page as it arrives
+    3. Vectorize content → chunk & embed while parsing continues
+    4. Store vectors + metadata in pgvector (+ columnar tables for spreadsheets)
     5. Return structured result
+    With `incremental`, chunks already stored for the document are reused
+    when their fingerprint still occurs (see `vectorize_segments`).
+    Per-stage counters and timings are recorded in `progress`.
+    Raises ParserBusyError when the format's parser pool is saturated.
     """
+    progress = progress or IngestionProgress()
     try:
-        # ── 1. Parse (multimodal) ──
-        raw_text = await parse_file(raw_bytes, doc.file_type or "txt")
+        entities = EntityCollector()
 
-        # ── 2. Extract entities ──
-        entities = extract_financial_entities(raw_text)
+        # ── 1 & 2. Parse (multimodal) + extract entities per page ──
+        async def _segments():
+            pages = iter_cached_segments(source, doc.file_type or "txt", doc.content_sha256)
+            async for segment in progress.timed("parse", pages):
+                with progress.stage("extract", items=1):
+                    entities.feed(segment)
+                yield segment
 
         # ── 3 & 4. Vectorize & index ──
-        chunks = await vectorize_and_store(
-            text_content=raw_text,
+        vectorized = await vectorize_segments(
+            _segments(),
             document_id=doc.id,
             metadata={
                 "filename": doc.filename,
                 "file_type": doc.file_type,
                 "entity_type": doc.entity_type,
-                "entities": entities,
             },
             db=db,
+            late_metadata={"entities": entities.entities},
+            incremental=incremental,
+            progress=progress,
         )
+        with progress.stage("store"):
+            tables = await ingest_document_tables(doc, source, db)
+        invalidate_on_commit(db, doc.company_id)
 
         # ── 5. Mark processed ──
         doc.processed = True
@@ -66,11 +97,17 @@ async def ingest_document(
             document_id=doc.id,
             filename=doc.filename,
             file_type=doc.file_type,
-            entities_extracted=entities,
-            chunks_created=len(chunks),
+            entities_extracted=entities.entities,
+            chunks_created=len(vectorized.chunk_ids),
+            chunks_embedded=vectorized.embedded,
+            chunks_reused=vectorized.reused,
+            chunks_deleted=vectorized.deleted,
+            tables_created=len(tables),
             status="success",
         )
 
+    except ParserBusyError:
+        raise
     except Exception as e:
         logger.error(f"Ingestion failed for {doc.filename}: {e}")
         return IngestionResult(
@@ -88,39 +125,79 @@ async def ingest_document(
 # INDEX MANAGEMENT
 # ═══════════════════════════════════════════════════════════════
 
-async def reindex_document(doc_id: uuid.UUID, db: AsyncSession) -> IngestionResult:
+async def reindex_document(
+    doc_id: uuid.UUID,
+    db: AsyncSession,
+    incremental: bool = True,
+) -> IngestionResult:
     """
     Re-index a previously processed document.
-    Deletes old chunks and re-runs the pipeline.
+    Incremental (default): re-runs the pipeline but keeps every chunk whose
+    fingerprint is unchanged, so only new or changed chunks are embedded.
+    Full: deletes old chunks and re-runs the pipeline.
     """
-    # Delete existing chunks
-    await db.execute(
-        delete(DocumentChunk).where(DocumentChunk.document_id == doc_id)
-    )
-
     # Fetch document
     result = await db.execute(select(Document).where(Document.id == doc_id))
     doc = result.scalar_one_or_none()
     if not doc:
         raise ValueError(f"Document {doc_id} not found")
 
-    # Reload file bytes
+    if not incremental:
+        # Delete existing chunks
+        await db.execute(
+            delete(DocumentChunk).where(DocumentChunk.document_id == doc_id)
+        )
+        invalidate_on_commit(db, doc.company_id)
+
+    # Parse straight from the stored file (no in-memory copy)
     from pathlib import Path
     file_path = Path(doc.file_path) if doc.file_path else None
-    if file_path and file_path.exists():
-        raw_bytes = file_path.read_bytes()
-    else:
+    if not (file_path and file_path.exists()):
         raise FileNotFoundError(f"File not found: {doc.file_path}")
 
     doc.processed = False
-    return await ingest_document(doc, raw_bytes, db)
+    return await ingest_document(doc, file_path, db, incremental=incremental)
+
+
+async def find_duplicate_document(
+    content_sha256: str,
+    company_id: uuid.UUID | None,
+    db: AsyncSession,
+) -> Document | None:
+    """The first processed document of the same company with identical bytes, if any."""
+    same_company = Document.company_id.is_(None) if company_id is None else Document.company_id == company_id
+    result = await db.execute(
+        select(Document)
+        .where(Document.content_sha256 == content_sha256, same_company, Document.processed.is_(True))
+        .order_by(Document.created_at)
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def duplicate_result(existing: Document, db: AsyncSession) -> IngestionResult:
+    """Ingestion result for an upload linked to an already indexed copy of the same file."""
+    chunks = await db.scalar(
+        select(func.count()).select_from(DocumentChunk).where(DocumentChunk.document_id == existing.id)
+    )
+    return IngestionResult(
+        document_id=existing.id,
+        filename=existing.filename,
+        file_type=existing.file_type or "unknown",
+        entities_extracted={},
+        chunks_created=chunks or 0,
+        status="duplicate",
+        message=f"Identical content already ingested as '{existing.filename}'",
+    )
 
 
 async def delete_document_index(doc_id: uuid.UUID, db: AsyncSession) -> int:
     """Delete all chunks/vectors for a document. Returns count of deleted chunks."""
+    company_id = await db.scalar(select(Document.company_id).where(Document.id == doc_id))
     result = await db.execute(
         delete(DocumentChunk).where(DocumentChunk.document_id == doc_id)
     )
+    invalidate_on_commit(db, company_id)
     count = result.rowcount
     logger.info(f"Deleted {count} chunks for document {doc_id}")
     return count
@@ -132,53 +209,80 @@ async def search_index(
     top_k: int = 5,
     similarity_threshold: float = 0.3,
     db: AsyncSession = None,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    query_text: str | None = None,
+    mode: str | None = None,
 ) -> list[dict[str, Any]]:
     """
     Search the vector index for similar document chunks.
-    Returns ranked results with similarity scores.
+    Returns ranked results with similarity scores. `ef_search` (HNSW) and
+    `probes` (IVFFlat) trade latency for recall on this query only.
+    In "hybrid" mode (default: RETRIEVAL_MODE) chunks containing the terms of
+    `query_text` are ranked too and both rankings fused (see hybrid.py);
+    the similarity threshold then applies to the vector ranking only.
+    Served by the configured vector backend (pgvector, local or cached).
     """
-    filter_clause = ""
-    params: dict[str, Any] = {
-        "embedding": str(query_embedding),
-        "top_k": top_k,
-        "threshold": similarity_threshold,
-    }
-
-    if company_id:
-        filter_clause = "AND d.company_id = :company_id"
-        params["company_id"] = str(company_id)
-
-    sql = text(f"""
-        SELECT
-            dc.id,
-            dc.content,
-            dc.chunk_metadata,
-            d.filename,
-            d.id AS document_id,
-            1 - (dc.embedding <=> :embedding::vector) AS similarity
-        FROM document_chunks dc
-        JOIN documents d ON dc.document_id = d.id
-        WHERE dc.embedding IS NOT NULL
-        AND 1 - (dc.embedding <=> :embedding::vector) >= :threshold
-        {filter_clause}
-        ORDER BY dc.embedding <=> :embedding::vector
-        LIMIT :top_k
-    """)
+    mode = mode or settings.retrieval_mode
+    if mode not in MODES:
+        raise ValueError(f"Unknown retrieval mode '{mode}'. Choose from: {', '.join(MODES)}")
+    backend = get_vector_backend()
+    terms = lexical_terms(query_text) if mode == "hybrid" and query_text else []
+    if terms:
+        return await backend.hybrid_search(
+            query_embedding, terms, company_id, top_k, similarity_threshold, db, ef_search, probes,
+        )
+    return await backend.search(
+        query_embedding, company_id, top_k, similarity_threshold, db, ef_search, probes,
+    )
 
-    result = await db.execute(sql, params)
-    rows = result.fetchall()
 
-    return [
-        {
-            "chunk_id": str(row[0]),
-            "content": row[1],
-            "metadata": row[2],
-            "filename": row[3],
-            "document_id": str(row[4]),
-            "similarity": round(float(row[5]), 4),
-        }
-        for row in rows
-    ]
+async def retrieve(
+    question: str,
+    company_id: uuid.UUID | None = None,
+    top_k: int = 5,
+    similarity_threshold: float = 0.3,
+    db: AsyncSession = None,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    mode: str | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Embed a question and search_index it, through the retrieval cache:
+    the same question (normalized) with the same parameters is answered
+    from memory until the company's chunks change (chunk_generations) or
+    the entry expires.
+    """
+    mode = mode or settings.retrieval_mode
+    # the lexical terms depend on capitalisation, which the normalized question drops
+    terms = tuple(lexical_terms(question)) if mode == "hybrid" else ()
+    cache = get_retrieval_cache()
+    key = cache.key(
+        company_id, question, top_k, similarity_threshold,
+        mode=mode, terms=terms, ef_search=ef_search, probes=probes,
+    )
+    # read before searching: an ingest committing meanwhile makes the entry stale
+    generation = await chunk_generation(db, company_id)
+    rows = cache.get(key, generation)
+    if rows is not None:
+        return rows
+
+    # None when the backend failed: search with a zero vector, but do not cache that answer
+    (query_embedding,) = await get_embeddings([question])
+    rows = await search_index(
+        query_embedding or [0.0] * settings.embedding_dimension,
+        company_id=company_id,
+        top_k=top_k,
+        similarity_threshold=similarity_threshold,
+        db=db,
+        ef_search=ef_search,
+        probes=probes,
+        query_text=question,
+        mode=mode,
+    )
+    if query_embedding is not None:
+        cache.put(key, rows, generation)
+    return rows
 
 
 async def get_index_stats(company_id: uuid.UUID | None, db: AsyncSession) -> dict[str, Any]:
@@ -209,4 +313,7 @@ async def get_index_stats(company_id: uuid.UUID | None, db: AsyncSession) -> dic
         "total_chunks": row[1] or 0,
         "indexed_chunks": row[2] or 0,
         "total_size_bytes": row[3] or 0,
+        "embedding_cache": get_embedding_cache().stats(),
+        "vector_backend": get_vector_backend().stats(),
+        "retrieval_cache": get_retrieval_cache().stats(),
     }
@@ -0,0 +1,271 @@
+"""
+F360 – Ingestion Job Queue
+Background execution of the cognitive ingestion pipeline.
+Uploads are stored and registered, then queued here; a fixed pool of
+asyncio workers ingests them with bounded concurrency, each in its own
+DB session, while the HTTP request returns a job id immediately.
+In-process queue – no external broker; job state lives in memory.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import async_session_factory
+from app.models.financial import Document
+from app.schemas.schemas import IngestionResult
+from app.services.cognitive_ingestion.indexer import ingest_document
+from app.services.cognitive_ingestion.progress import IngestionProgress
+from app.services.cognitive_ingestion.vector_index import get_vector_index_maintainer
+from app.services.sources.executor import ParserBusyError
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the ingestion queue cannot accept more jobs."""
+
+
+class IngestionJob:
+    """One queued document ingestion and its live progress."""
+
+    __slots__ = (
+        "id", "document_id", "filename", "status", "progress",
+        "queued_at", "started_at", "finished_at", "result", "error",
+    )
+
+    def __init__(self, document_id: uuid.UUID, filename: str):
+        self.id = uuid.uuid4()
+        self.document_id = document_id
+        self.filename = filename
+        self.status = "queued"   # queued → running → success | error
+        self.progress = IngestionProgress()
+        self.queued_at = datetime.now(timezone.utc)
+        self.started_at: datetime | None = None
+        self.finished_at: datetime | None = None
+        self.result: IngestionResult | None = None
+        self.error: str | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("success", "error")
+
+    def to_dict(self) -> dict[str, Any]:
+        end = self.finished_at or datetime.now(timezone.utc)
+        return {
+            "job_id": self.id,
+            "document_id": self.document_id,
+            "filename": self.filename,
+            "status": self.status,
+            "stages": self.progress.to_list(),
+            "queued_at": self.queued_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_ms": round((end - self.started_at).total_seconds() * 1000, 1) if self.started_at else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+JobRunner = Callable[[IngestionJob], Awaitable[IngestionResult]]
+
+
+async def run_cognitive_ingestion(job: IngestionJob) -> IngestionResult:
+    """
+    Default runner: load the stored upload and ingest it in a dedicated session.
+    A job is already queued, so when the parser pool is saturated it waits
+    and starts over instead of failing. New chunks may make a vector index
+    (re)build due: the index maintainer is poked afterwards.
+    """
+    while True:
+        try:
+            result = await _ingest_stored_document(job)
+        except ParserBusyError as e:
+            logger.info(f"Ingestion job {job.id} waiting for the '{e.pool}' parsers ({e.retry_after} s)")
+            job.progress = IngestionProgress()
+            await asyncio.sleep(e.retry_after)
+            continue
+        if result.status != "error":
+            get_vector_index_maintainer().poke()
+        return result
+
+
+async def _ingest_stored_document(job: IngestionJob) -> IngestionResult:
+    async with async_session_factory() as db:
+        doc = await db.get(Document, job.document_id)
+        if doc is None:
+            raise ValueError(f"Document {job.document_id} not found")
+        if not doc.file_path or not Path(doc.file_path).exists():
+            raise FileNotFoundError(f"File not found: {doc.file_path}")
+
+        result = await ingest_document(doc, Path(doc.file_path), db, progress=job.progress)
+        if result.status == "error":
+            await db.rollback()
+        else:
+            await db.commit()
+        return result
+
+
+# ═══════════════════════════════════════════════════════════════
+# QUEUE + WORKER POOL
+# ═══════════════════════════════════════════════════════════════
+
+class IngestionJobQueue:
+    """
+    Bounded asyncio queue drained by `workers` tasks.
+    Workers start lazily on the first submission (inside the running loop).
+    Finished jobs are kept for status queries, oldest dropped beyond `history`.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queued: int = 100,
+        history: int = 1000,
+        runner: JobRunner = run_cognitive_ingestion,
+    ):
+        self.workers = max(1, workers)
+        self.max_queued = max(1, max_queued)
+        self.history = max(1, history)
+        self.runner = runner
+        self._queue: asyncio.Queue[IngestionJob] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._jobs: OrderedDict[uuid.UUID, IngestionJob] = OrderedDict()
+
+    def submit(self, document_id: uuid.UUID, filename: str) -> IngestionJob:
+        """Queue a stored document for ingestion. Raises QueueFullError when saturated."""
+        self._ensure_started()
+        job = IngestionJob(document_id, filename)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Ingestion queue is full ({self.max_queued} jobs waiting)")
+        self._jobs[job.id] = job
+        self._prune()
+        logger.info(f"Queued ingestion job {job.id} for {filename}")
+        return job
+
+    def get(self, job_id: uuid.UUID) -> IngestionJob | None:
+        return self._jobs.get(job_id)
+
+    def list(self, limit: int = 50) -> list[IngestionJob]:
+        """Most recent jobs first."""
+        return list(reversed(self._jobs.values()))[:limit]
+
+    def stats(self) -> dict[str, Any]:
+        counts: dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queued": self.max_queued,
+            "jobs": counts,
+        }
+
+    async def join(self) -> None:
+        """Wait until every queued job has finished."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self) -> None:
+        """Cancel the workers (jobs still queued are abandoned)."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._queue = None
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or loop is not self._loop:
+            # Queue and workers are bound to the loop they were started in:
+            # start over in this one, carrying over the jobs still waiting
+            pending = []
+            while self._queue is not None and not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+            for job in pending:
+                self._queue.put_nowait(job)
+            self._loop = loop
+            self._tasks = []
+        # Replace workers that ended (e.g. cancelled); the others keep running
+        for n in range(self.workers):
+            if n == len(self._tasks):
+                self._tasks.append(self._spawn(n))
+            elif self._tasks[n].done():
+                self._tasks[n] = self._spawn(n)
+
+    def _spawn(self, n: int) -> asyncio.Task:
+        return asyncio.create_task(self._worker(n), name=f"ingestion-worker-{n}")
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: IngestionJob) -> None:
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        try:
+            job.result = await self.runner(job)
+            job.status = "error" if job.result.status == "error" else "success"
+            job.error = job.result.message if job.status == "error" else None
+        except Exception as e:
+            logger.error(f"Ingestion job {job.id} failed: {e}")
+            job.status = "error"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            job.progress.finish()
+        logger.info(f"Ingestion job {job.id} finished: {job.status}")
+
+    def _prune(self) -> None:
+        overflow = len(self._jobs) - self.history
+        if overflow <= 0:
+            return
+        for job_id in [jid for jid, job in self._jobs.items() if job.done][:overflow]:
+            del self._jobs[job_id]
+
+
+@lru_cache()
+def get_ingestion_queue() -> IngestionJobQueue:
+    """Process-wide ingestion queue configured from settings."""
+    settings = get_settings()
+    return IngestionJobQueue(
+        workers=settings.ingestion_workers,
+        max_queued=settings.ingestion_queue_size,
+        history=settings.ingestion_job_history,
+    )
+
+
+async def queue_upload(doc: Document, db: AsyncSession, queue: IngestionJobQueue | None = None) -> IngestionJob:
+    """
+    Commit a freshly registered upload and queue it for ingestion.
+    When the queue is full, the document row and its stored file are removed
+    again before QueueFullError propagates: no row is left that no worker
+    will ever process, and a retry does not create a duplicate.
+    """
+    queue = queue or get_ingestion_queue()
+    await db.commit()   # the worker's session must see the document
+    try:
+        return queue.submit(doc.id, doc.filename)
+    except QueueFullError:
+        await db.delete(doc)
+        await db.commit()
+        if doc.file_path:
+            Path(doc.file_path).unlink(missing_ok=True)
+        raise
@@ -0,0 +1,75 @@
+"""
+F360 – Ingestion Progress
+Per-stage counters and timings for one run of the cognitive ingestion pipeline.
+Stages interleave when a document is streamed page by page, so each stage
+accumulates the time spent in it and the number of items it handled.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterable, AsyncIterator, Iterator
+
+STAGES = ("parse", "extract", "chunk", "embed", "store")
+
+
+class StageProgress:
+    """Counters of a single pipeline stage."""
+
+    __slots__ = ("name", "status", "items", "seconds")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.status = "pending"   # pending → running → done | skipped
+        self.items = 0            # pages, chunks, … handled so far
+        self.seconds = 0.0        # wall time spent inside the stage
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "status": self.status,
+            "items": self.items,
+            "duration_ms": round(self.seconds * 1000, 1),
+        }
+
+
+class IngestionProgress:
+    """Progress of one document through parse → extract → chunk → embed → store."""
+
+    def __init__(self):
+        self.stages = {name: StageProgress(name) for name in STAGES}
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0) -> Iterator[None]:
+        """Time a block of work belonging to `name` and count `items` when it completes."""
+        stage = self.stages[name]
+        stage.status = "running"
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage.seconds += time.perf_counter() - started
+        stage.items += items
+
+    def advance(self, name: str, items: int = 1) -> None:
+        self.stages[name].items += items
+
+    async def timed(self, name: str, source: AsyncIterable[Any]) -> AsyncIterator[Any]:
+        """Re-yield `source`, charging the wait for each item to stage `name`."""
+        iterator = source.__aiter__()
+        while True:
+            with self.stage(name):
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+            self.advance(name)
+            yield item
+
+    def finish(self) -> None:
+        """Close every stage: those that ran are done, the others were skipped."""
+        for stage in self.stages.values():
+            stage.status = "done" if stage.status == "running" else "skipped"
+
+    def to_list(self) -> list[dict[str, Any]]:
+        return [stage.to_dict() for stage in self.stages.values()]
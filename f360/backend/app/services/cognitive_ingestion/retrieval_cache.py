@@ -0,0 +1,185 @@
+"""
+F360 – Retrieval Cache
+Ranked chunks of recent questions, so a question asked again (dashboards,
+analysts re-running the same query) skips both the query embedding and the
+vector search. Entries are keyed by (company, normalized question, top_k,
+threshold, search options) and evicted LRU past `max_entries` or once older
+than `ttl` seconds.
+Each company has a generation counter in the chunk_generations table,
+bumped by the transaction that changes its chunks (ingest, reindex, delete,
+bulk load – see vector_store.invalidate_on_commit), whichever process runs
+it. An entry remembers the generation it was computed at and is never
+served once the counter has moved. Questions without a company span every
+company: they follow the sum of all counters.
+"""
+from __future__ import annotations
+
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Hashable
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import async_session_factory
+from app.services.cognitive_ingestion.embedding_cache import normalize_text
+
+ALL_COMPANIES = "*"   # cache key company of unfiltered questions
+NO_COMPANY = ""       # generation key of documents without a company
+
+
+def normalize_question(question: str) -> str:
+    """Case- and whitespace-insensitive form of a question, trailing punctuation dropped."""
+    return normalize_text(question).casefold().rstrip(" ?!.")
+
+
+class RetrievalCache:
+    """
+    LRU + TTL map of retrieval results, each stored with the generation
+    of its company it was computed at. Thread-safe.
+    """
+
+    def __init__(self, max_entries: int = 2_000, ttl: float = 600.0):
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[int, float, list[dict[str, Any]]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0        # dropped because the company's chunks changed
+        self.expired = 0      # dropped because older than ttl
+        self.evictions = 0
+
+    @staticmethod
+    def key(
+        company_id: uuid.UUID | str | None,
+        question: str,
+        top_k: int,
+        similarity_threshold: float,
+        **options: Any,
+    ) -> tuple:
+        """Cache key; `options` are the other inputs the result depends on (mode, ef_search, …)."""
+        company = ALL_COMPANIES if company_id is None else str(company_id)
+        return (company, normalize_question(question), top_k, float(similarity_threshold), *sorted(options.items()))
+
+    # ── Lookup / store ──
+
+    def get(self, key: tuple, generation: int) -> list[dict[str, Any]] | None:
+        """Rows stored under `key`, unless computed at another generation than the current one."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_generation, stored_at, rows = entry
+            if stored_generation != generation:
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(rows)
+
+    def put(self, key: tuple, rows: list[dict[str, Any]], generation: int) -> None:
+        """
+        Store rows computed at `generation` – read before the search started,
+        so a result that raced with an ingest is stored already stale.
+        """
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = (generation, time.monotonic(), copy.deepcopy(rows))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stale": self.stale,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+            }
+
+
+# ═══════════════════════════════════════════════════════════════
+# GENERATIONS (chunk_generations)
+# ═══════════════════════════════════════════════════════════════
+
+_BUMP_SQL = text("""
+    INSERT INTO chunk_generations (company_key, generation) VALUES (:company_key, 1)
+    ON CONFLICT (company_key) DO UPDATE SET generation = chunk_generations.generation + 1
+""")
+
+
+def _generation_key(company_id: uuid.UUID | str | None) -> str:
+    return NO_COMPANY if company_id is None else str(company_id)
+
+
+async def chunk_generation(db: AsyncSession | None, company_id: uuid.UUID | str | None) -> int:
+    """Current generation of a company's chunks; of all chunks when company_id is None."""
+    if db is None:
+        async with async_session_factory() as session:
+            return await chunk_generation(session, company_id)
+    if company_id is None:
+        return await db.scalar(text("SELECT COALESCE(SUM(generation), 0) FROM chunk_generations"))
+    generation = await db.scalar(
+        text("SELECT generation FROM chunk_generations WHERE company_key = :company_key"),
+        {"company_key": _generation_key(company_id)},
+    )
+    return generation or 0
+
+
+def bump_on_commit(db: AsyncSession, company_id: uuid.UUID | str | None) -> None:
+    """
+    The session is changing a company's chunks: bump its generation right
+    before the transaction commits, so the bump lands with the change (or
+    not at all) and the counter row stays locked for the commit only.
+    """
+    session = db.sync_session
+    if not event.contains(session, "before_commit", _bump_pending):
+        event.listen(session, "before_commit", _bump_pending)
+        event.listen(session, "after_rollback", _drop_pending)
+    session.info.setdefault("chunk_generations", set()).add(_generation_key(company_id))
+
+
+def _bump_pending(session) -> None:
+    # in key order: two transactions bumping the same companies cannot deadlock
+    for company_key in sorted(session.info.pop("chunk_generations", ())):
+        session.execute(_BUMP_SQL, {"company_key": company_key})
+
+
+def _drop_pending(session) -> None:
+    session.info.pop("chunk_generations", None)
+
+
+@lru_cache()
+def get_retrieval_cache() -> RetrievalCache:
+    """Process-wide retrieval cache configured from settings."""
+    settings = get_settings()
+    return RetrievalCache(
+        max_entries=settings.retrieval_cache_entries if settings.retrieval_cache_enabled else 0,
+        ttl=settings.retrieval_cache_ttl,
+    )
@@ -0,0 +1,447 @@
+"""
+F360 – Tabular Store
+Structured ingestion path for spreadsheets, next to the text / RAG path.
+Sheets are unpivoted into long format (dimensions…, variable, period,
+value) with vectorized numpy, written as zstd-compressed Parquet files
+registered against the Document, and queried with Arrow filters and
+aggregates. A numeric lookup is a columnar scan instead of an LLM call.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import shutil
+import time
+import uuid
+from datetime import date
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import delete, event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.financial import Document, DocumentTable
+from app.services.sources.parsers import DocumentSource, clean_column_labels, iter_sheet_frames
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+TABULAR_FILE_TYPES = ("csv", "xlsx", "xls")
+AGGREGATES = ("sum", "mean", "min", "max", "count")
+VARIABLE, PERIOD, VALUE, ROW = "variable", "period", "value", "row"
+PARQUET_COMPRESSION = "zstd"
+
+# Headers that name a period: 31/01/2024, 2024-01-31, 2024-01, 01/2024, 2024
+_PERIOD_RE = re.compile(
+    r"^(?:\d{1,2}[/.-]\d{1,2}[/.-]\d{4}|\d{4}[/.-]\d{1,2}(?:[/.-]\d{1,2})?|\d{1,2}[/.-]\d{4}|(?:19|20)\d{2})$"
+)
+_NUMBER_NOISE_RE = "[\\s\u00a0\u202f€$£%]"   # spaces (incl. non-breaking), currency, percent
+MEASURE_MIN_NUMERIC = 0.5   # share of filled cells that must parse as numbers ("Sans objet" is common)
+# Headers of integer columns that identify rather than measure (account numbers, codes, years)
+_IDENTIFIER_RE = re.compile(
+    r"(?<!\w)(?:code|id|ids|n°|no|num|numéro|numero|identifiant|identifier|compte|account|réf|ref|référence|reference"
+    r"|siren|siret|année|annee|year|niveau|level|rang|rank)(?!\w)",
+    re.IGNORECASE,
+)
+
+
+# ═══════════════════════════════════════════════════════════════
+# UNPIVOT (wide → long)
+# ═══════════════════════════════════════════════════════════════
+
+class TablePlan:
+    """How one sheet is unpivoted: which columns are dimensions and which are measures."""
+
+    __slots__ = ("dimensions", "measures", "periods", "layout")
+
+    def __init__(self, dimensions: list[str], measures: list[str], periods: list[date | None], layout: str):
+        self.dimensions = dimensions   # kept as string columns, repeated per measure
+        self.measures = measures       # become (variable, period, value) rows
+        self.periods = periods         # period named by each measure header, if any
+        self.layout = layout           # 'periods' (one column per period) | 'numeric'
+
+
+def parse_period(label: str) -> date | None:
+    """Date named by a column header, or None when the header is not a period."""
+    label = label.strip()
+    if not _PERIOD_RE.match(label):
+        return None
+    if re.fullmatch(r"(?:19|20)\d{2}", label):
+        return date(int(label), 1, 1)
+    if re.fullmatch(r"\d{1,2}[/.-]\d{4}", label):
+        label = f"01/{label}"
+    parsed = pd.to_datetime(label, dayfirst=not label[:4].isdigit(), errors="coerce")
+    return None if pd.isna(parsed) else parsed.date()
+
+
+def to_numbers(series: pd.Series) -> np.ndarray:
+    """
+    Column → float64 array (NaN where not a number), vectorized.
+    Accepts "1 234,56", "1,234.56", "-25741980707.95", "12 %", "3 €".
+    """
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    text = series.astype("string").str.replace(_NUMBER_NOISE_RE, "", regex=True)
+    # Both separators: the comma groups thousands; a lone comma is the decimal mark
+    both = text.str.contains(",", regex=False) & text.str.contains(".", regex=False)
+    text = text.mask(both.fillna(False), text.str.replace(",", "", regex=False))
+    text = text.str.replace(",", ".", regex=False)
+    return pd.to_numeric(text, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def plan_unpivot(
+    df: pd.DataFrame,
+    dimensions: list[str] | None = None,
+    measures: list[str] | None = None,
+) -> TablePlan | None:
+    """
+    Decide the long layout of a sheet from a sample frame (labels already cleaned).
+    Wide-by-period sheets (a column per month / year) unpivot their period
+    columns; other sheets unpivot their numeric columns. A column of whole
+    numbers is a measure too (whole-euro budgets, headcounts) unless its
+    header names an identifier – code, n°, compte, année… – in which case
+    it stays a dimension.
+    Returns None when the sheet has nothing numeric to store.
+    """
+    columns = list(df.columns)
+    periods = {column: parse_period(column) for column in columns}
+
+    if measures is not None:
+        layout = "periods" if any(periods[m] for m in measures) else "numeric"
+    elif any(periods.values()):
+        measures = [column for column in columns if periods[column]]
+        layout = "periods"
+    else:
+        measures = []
+        for column in columns:
+            if dimensions is not None and column in dimensions:
+                continue
+            filled = df[column].notna()
+            if not filled.any():
+                continue
+            values = to_numbers(df[column][filled])
+            numeric = values[~np.isnan(values)]
+            if len(numeric) < MEASURE_MIN_NUMERIC * len(values):
+                continue
+            if np.any(numeric != np.floor(numeric)) or not _IDENTIFIER_RE.search(str(column)):
+                measures.append(column)
+        layout = "numeric"
+
+    if not measures:
+        return None
+    if dimensions is None:
+        dimensions = [column for column in columns if column not in measures]
+    return TablePlan(dimensions, measures, [periods.get(m) for m in measures], layout)
+
+
+def unpivot(df: pd.DataFrame, plan: TablePlan) -> pd.DataFrame:
+    """
+    Long format of one frame: every (row, measure) cell with a number becomes
+    a row (dimensions…, variable, period, value, row). Built with numpy
+    tile / repeat over whole columns, no per-row Python.
+    `row` is the 1-based data row, taken from the frame's index.
+    """
+    n, m = len(df), len(plan.measures)
+    values = np.column_stack([to_numbers(df[column]) for column in plan.measures]) if n else np.empty((0, m))
+    values = values.ravel(order="F")            # measure-major: all rows of measure 0, then 1, …
+    keep = ~np.isnan(values)
+
+    long: dict[str, Any] = {}
+    for column in plan.dimensions:
+        text = df[column].astype("string").to_numpy(dtype=object, na_value=None)
+        long[column] = np.tile(text, m)[keep]
+    long[VARIABLE] = np.repeat(np.array(plan.measures, dtype=object), n)[keep]
+    long[PERIOD] = np.repeat(np.array(plan.periods, dtype=object), n)[keep]
+    long[VALUE] = values[keep]
+    long[ROW] = np.tile(df.index.to_numpy(dtype=np.int64) + 1, m)[keep]
+    return pd.DataFrame(long)
+
+
+def _arrow_schema(plan: TablePlan) -> pa.Schema:
+    return pa.schema(
+        [pa.field(column, pa.string()) for column in plan.dimensions]
+        + [
+            pa.field(VARIABLE, pa.string()),
+            pa.field(PERIOD, pa.date32()),
+            pa.field(VALUE, pa.float64()),
+            pa.field(ROW, pa.int64()),
+        ]
+    )
+
+
+def _unique_labels(labels: list[str]) -> list[str]:
+    """Dedupe header labels and keep them clear of the long-format column names."""
+    seen: dict[str, int] = {}
+    result = []
+    for label in labels:
+        label = label or "column"
+        if label in (VARIABLE, PERIOD, VALUE, ROW):
+            label = f"{label}_"
+        count = seen.get(label, 0)
+        seen[label] = count + 1
+        result.append(label if count == 0 else f"{label}.{count}")
+    return result
+
+
+# ═══════════════════════════════════════════════════════════════
+# WRITE
+# ═══════════════════════════════════════════════════════════════
+
+def write_tables(
+    source: DocumentSource,
+    file_type: str,
+    dest_dir: Path,
+    rows_per_frame: int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Unpivot every sheet of a spreadsheet into one Parquet file per sheet.
+    Frames are unpivoted and appended as row groups as they are read, so
+    memory is bounded by one frame. Sheets without numbers are skipped.
+    Returns one description per written file.
+    """
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for position, (sheet_name, frames) in enumerate(iter_sheet_frames(source, file_type, rows_per_frame)):
+        path = dest_dir / f"{position:03d}.parquet"
+        info = _write_sheet(frames, path)
+        if info is None:
+            continue
+        info["sheet_name"] = str(sheet_name)
+        written.append(info)
+    return written
+
+
+def _write_sheet(frames: Iterator[pd.DataFrame], path: Path) -> dict[str, Any] | None:
+    plan: TablePlan | None = None
+    writer: pq.ParquetWriter | None = None
+    labels: list[str] = []
+    source_rows = long_rows = 0
+    try:
+        for df in frames:
+            if plan is None:
+                labels = _unique_labels(clean_column_labels(df.columns))
+            df = df.set_axis(labels[:len(df.columns)], axis=1)
+            if plan is None:
+                plan = plan_unpivot(df)
+                if plan is None:
+                    return None
+                writer = pq.ParquetWriter(path, _arrow_schema(plan), compression=PARQUET_COMPRESSION)
+            long = unpivot(df, plan)
+            writer.write_table(pa.Table.from_pandas(long, schema=writer.schema, preserve_index=False))
+            source_rows += len(df)
+            long_rows += len(long)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if plan is None:
+        return None
+    return {
+        "path": str(path),
+        "layout": plan.layout,
+        "dimensions": plan.dimensions,
+        "measures": plan.measures,
+        "source_rows": source_rows,
+        "row_count": long_rows,
+        "size_bytes": path.stat().st_size,
+    }
+
+
+async def store_document_tables(doc: Document, source: DocumentSource, db: AsyncSession) -> list[DocumentTable]:
+    """
+    (Re)build the columnar tables of a spreadsheet document and register them.
+    Previous tables of the document are replaced: the new files go to a
+    version directory of their own and their rows are swapped in a savepoint,
+    so a failure leaves the session and the previous tables usable. Older
+    versions are deleted once the transaction commits – before that, a
+    rollback may still bring their rows back – and the new one if it rolls
+    back instead.
+    """
+    root = settings.tables_path / str(doc.id)
+    dest_dir = root / uuid.uuid4().hex
+    try:
+        written = await asyncio.to_thread(write_tables, source, (doc.file_type or "").lower(), dest_dir)
+        async with db.begin_nested():
+            await db.execute(delete(DocumentTable).where(DocumentTable.document_id == doc.id))
+            tables = [
+                DocumentTable(
+                    document_id=doc.id,
+                    sheet_name=info["sheet_name"],
+                    file_path=info["path"],
+                    layout=info["layout"],
+                    dimensions=info["dimensions"],
+                    measures=info["measures"],
+                    source_rows=info["source_rows"],
+                    row_count=info["row_count"],
+                    size_bytes=info["size_bytes"],
+                )
+                for info in written
+            ]
+            db.add_all(tables)
+            await db.flush()
+    except Exception:
+        await asyncio.to_thread(shutil.rmtree, dest_dir, True)
+        raise
+
+    _settle_versions(db, root, dest_dir)
+    logger.info(f"Stored {len(tables)} columnar table(s) for document {doc.id}")
+    return tables
+
+
+def _settle_versions(db: AsyncSession, root: Path, dest_dir: Path) -> None:
+    """
+    Once the transaction ends, keep only the version its rows point at: on
+    commit the latest one written in it, on rollback the ones from before.
+    """
+    session = db.sync_session
+    latest: dict[Path, Path] = session.info.setdefault("table_versions", {})
+    latest[root] = dest_dir
+    settled = False   # commit or rollback, whichever comes first
+
+    def _on_commit(session) -> None:
+        nonlocal settled
+        if not settled:
+            settled = True
+            if latest.get(root) == dest_dir:   # else a later rebuild in the same transaction cleans up
+                _remove_old_versions(root, dest_dir)
+
+    def _on_rollback(session) -> None:
+        nonlocal settled
+        if not settled:
+            settled = True
+            latest.pop(root, None)
+            shutil.rmtree(dest_dir, ignore_errors=True)
+
+    event.listen(session, "after_commit", _on_commit, once=True)
+    event.listen(session, "after_rollback", _on_rollback, once=True)
+
+
+def _remove_old_versions(root: Path, current: Path) -> None:
+    """Delete every table file / version directory of a document but the current one."""
+    for path in root.iterdir():
+        if path == current:
+            continue
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+
+
+async def ingest_document_tables(doc: Document, source: DocumentSource, db: AsyncSession) -> list[DocumentTable]:
+    """
+    Structured step of the ingestion pipelines: store the tables of spreadsheet
+    documents when the tabular store is enabled. A failure is logged and does
+    not fail the text ingestion.
+    """
+    if not settings.tabular_store_enabled or (doc.file_type or "").lower() not in TABULAR_FILE_TYPES:
+        return []
+    try:
+        return await store_document_tables(doc, source, db)
+    except Exception as e:
+        logger.warning(f"Columnar tables not stored for document {doc.id}: {e}")
+        return []
+
+
+async def list_document_tables(db: AsyncSession, document_id: uuid.UUID | None = None) -> list[DocumentTable]:
+    stmt = select(DocumentTable).order_by(DocumentTable.created_at.desc())
+    if document_id is not None:
+        stmt = stmt.where(DocumentTable.document_id == document_id)
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+# ═══════════════════════════════════════════════════════════════
+# QUERY
+# ═══════════════════════════════════════════════════════════════
+
+def query_table(
+    path: str | Path,
+    filters: dict[str, Any] | None = None,
+    period_from: date | None = None,
+    period_to: date | None = None,
+    group_by: list[str] | None = None,
+    aggregates: list[str] | None = None,
+    limit: int = 1000,
+) -> dict[str, Any]:
+    """
+    Filter and aggregate one stored table.
+    `filters` maps a column to a value or a list of accepted values; the
+    predicate is pushed down to the Parquet scan (row groups whose
+    statistics exclude it are skipped). With `aggregates`, `value` is
+    aggregated per `group_by` key (or over all matching rows); otherwise
+    the matching rows are returned.
+    """
+    started = time.perf_counter()
+    dataset = ds.dataset(str(path), format="parquet")
+    names = set(dataset.schema.names)
+    group_by = group_by or []
+    aggregates = aggregates or []
+
+    unknown = [c for c in [*(filters or {}), *group_by] if c not in names]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    invalid = [a for a in aggregates if a not in AGGREGATES]
+    if invalid:
+        raise ValueError(f"Unknown aggregate(s): {', '.join(invalid)}. Allowed: {', '.join(AGGREGATES)}")
+    if group_by and not aggregates:
+        aggregates = ["sum"]
+
+    expression = None
+    for column, accepted in (filters or {}).items():
+        values = accepted if isinstance(accepted, (list, tuple, set)) else [accepted]
+        term = pc.field(column).isin([_coerce(dataset.schema.field(column).type, v) for v in values])
+        expression = term if expression is None else expression & term
+    if period_from is not None:
+        term = pc.field(PERIOD) >= pa.scalar(period_from, pa.date32())
+        expression = term if expression is None else expression & term
+    if period_to is not None:
+        term = pc.field(PERIOD) <= pa.scalar(period_to, pa.date32())
+        expression = term if expression is None else expression & term
+
+    columns = None
+    if aggregates:
+        columns = list(dict.fromkeys([*group_by, VALUE]))
+    table = dataset.to_table(columns=columns, filter=expression)
+    matched = table.num_rows
+
+    if aggregates and group_by:
+        table = table.group_by(group_by).aggregate([(VALUE, agg) for agg in aggregates])
+        table = table.select([*group_by, *(f"{VALUE}_{agg}" for agg in aggregates)])
+        table = table.sort_by([(column, "ascending") for column in group_by])
+    elif aggregates:
+        table = pa.table({f"{VALUE}_{agg}": [_aggregate(table[VALUE], agg)] for agg in aggregates})
+
+    total = table.num_rows
+    return {
+        "columns": table.column_names,
+        "rows": table.slice(0, limit).to_pylist(),
+        "row_count": total,
+        "matched_rows": matched,
+        "truncated": total > limit,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def _aggregate(values: pa.ChunkedArray, name: str) -> Any:
+    if name == "count":
+        return pc.count(values).as_py()
+    if name in ("min", "max"):
+        return pc.min_max(values)[name].as_py()
+    return getattr(pc, name)(values).as_py()
+
+
+def _coerce(arrow_type: pa.DataType, value: Any) -> Any:
+    """Filter values arrive as JSON; match them to the column type."""
+    if pa.types.is_date(arrow_type) and isinstance(value, str):
+        return date.fromisoformat(value)
+    if pa.types.is_floating(arrow_type) or pa.types.is_integer(arrow_type):
+        return float(value) if pa.types.is_floating(arrow_type) else int(value)
+    return str(value)
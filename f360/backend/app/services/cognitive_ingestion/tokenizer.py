@@ -0,0 +1,66 @@
+"""
+F360 – Tokenizer
+Token counting for chunk packing and embedding request sizing.
+Uses the tiktoken encoding of the configured embedding model and counts
+texts in batches (tiktoken encodes a batch on a thread pool).
+Falls back to a character-based estimate when the encoding is unavailable.
+"""
+from __future__ import annotations
+
+import logging
+from functools import lru_cache
+from typing import Any
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_ENCODING = "cl100k_base"
+
+
+def estimate_tokens(text_input: str) -> int:
+    """Cheap token estimate (~4 characters per token) used when no tokenizer is available."""
+    return len(text_input) // 4 + 1
+
+
+class TokenCounter:
+    """Batch token counter backed by a tiktoken encoding (or the estimate)."""
+
+    __slots__ = ("encoding", "threads")
+
+    def __init__(self, encoding: Any | None = None, threads: int = 4):
+        self.encoding = encoding
+        self.threads = max(1, threads)
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count_many(self, texts: list[str]) -> list[int]:
+        """Token count of every text, tokenized in one batch."""
+        if not texts:
+            return []
+        if self.encoding is None:
+            return [estimate_tokens(t) for t in texts]
+        encoded = self.encoding.encode_ordinary_batch(texts, num_threads=self.threads)
+        return [len(tokens) for tokens in encoded]
+
+    def count(self, text_input: str) -> int:
+        return self.count_many([text_input])[0]
+
+
+@lru_cache()
+def get_token_counter() -> TokenCounter:
+    """Process-wide token counter for the configured embedding model."""
+    settings = get_settings()
+    try:
+        import tiktoken
+
+        try:
+            encoding = tiktoken.encoding_for_model(settings.openai_embedding_model)
+        except KeyError:
+            encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, estimating token counts: {e}")
+        encoding = None
+    return TokenCounter(encoding, threads=settings.tokenizer_threads)
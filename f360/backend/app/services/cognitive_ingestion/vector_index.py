@@ -0,0 +1,464 @@
+"""
+F360 – Vector Index Management
+The ANN index on document_chunks.embedding is not created with the schema:
+IVFFlat centroids trained on an empty table are useless, and HNSW gains
+nothing from being built row by row during a bulk load. Instead the index is
+(re)built here, CONCURRENTLY so searches and ingestion carry on:
+- once the table holds VECTOR_INDEX_MIN_ROWS embedded chunks
+- when the configured method or build parameters change
+- for IVFFlat, when the table has outgrown the number of lists it was trained with
+A build goes into a temporary index that replaces the live one in a short
+transaction. Companies with VECTOR_TENANT_INDEX_MIN_ROWS embedded chunks also
+get a partial index of their own (WHERE company_id = '<id>'), which their
+filtered searches scan instead of the shared one. Searches tune recall
+against latency per query with hnsw.ef_search / ivfflat.probes, and filtered
+ones use pgvector's iterative scans so a tenant filter cannot starve the
+top-k (tune_search).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import get_settings
+from app.core.database import engine as default_engine
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+INDEX_NAME = "idx_chunks_embedding"
+BUILD_NAME = "idx_chunks_embedding_build"
+TENANT_PREFIX = "idx_chunks_embedding_t_"   # + company id hex: partial index of one company
+METHODS = ("hnsw", "ivfflat")
+BUILD_LOCK_KEY = 0x46333630_5645_4358   # pg advisory lock: one build at a time across workers
+MAX_EF_SEARCH = 1000                     # pgvector's upper bound for hnsw.ef_search
+
+
+def ivfflat_lists(rows: int) -> int:
+    """pgvector's guideline: rows / 1000 up to a million rows, √rows beyond."""
+    if rows <= 1_000_000:
+        return max(1, rows // 1000)
+    return int(math.sqrt(rows))
+
+
+def index_definition(method: str, rows: int, name: str = BUILD_NAME, where: str | None = None) -> str:
+    """CREATE INDEX CONCURRENTLY statement for `method`, sized for `rows` chunks, partial with `where`."""
+    if method == "hnsw":
+        options = f"m = {int(settings.hnsw_m)}, ef_construction = {int(settings.hnsw_ef_construction)}"
+    elif method == "ivfflat":
+        options = f"lists = {ivfflat_lists(rows)}"
+    else:
+        raise ValueError(f"Unknown vector index method '{method}' (expected {' or '.join(METHODS)})")
+    return (
+        f"CREATE INDEX CONCURRENTLY {name} ON document_chunks "
+        f"USING {method} (embedding vector_cosine_ops) WITH ({options})"
+        + (f" WHERE {where}" if where else "")
+    )
+
+
+def tenant_predicate(company_id: uuid.UUID | str, alias: str | None = "dc") -> str:
+    """
+    company_id = '<id>'::uuid, with the id inlined: the planner only uses a
+    partial index when it can prove the query implies the index predicate,
+    which a bind parameter does not allow in a generic plan.
+    """
+    column = f"{alias}.company_id" if alias else "company_id"
+    return f"{column} = '{uuid.UUID(str(company_id))}'::uuid"
+
+
+def tenant_index_name(company_id: uuid.UUID | str) -> str:
+    return f"{TENANT_PREFIX}{uuid.UUID(str(company_id)).hex}"
+
+
+def parse_reloptions(reloptions: list[str] | None) -> dict[str, int]:
+    """['lists=100'] → {'lists': 100}."""
+    options: dict[str, int] = {}
+    for option in reloptions or ():
+        key, _, value = option.partition("=")
+        if value.isdigit():
+            options[key] = int(value)
+    return options
+
+
+def plan_vector_index(status: dict[str, Any], method: str | None = None) -> tuple[str | None, str]:
+    """
+    What the index needs given its status: ("build" | "rebuild" | None, reason).
+    Nothing happens below VECTOR_INDEX_MIN_ROWS: exact scans are fast there.
+    """
+    method = method or settings.vector_index_method
+    rows = status["rows"]
+    index = status.get("index")
+    if rows < settings.vector_index_min_rows:
+        return None, f"{rows} embedded chunks, index built from {settings.vector_index_min_rows}"
+    if index is None:
+        return "build", f"no vector index on {rows} embedded chunks"
+    if not index["valid"]:
+        return "rebuild", "the index is invalid (interrupted build)"
+    if index["method"] != method:
+        return "rebuild", f"configured method is {method}, index is {index['method']}"
+    options = index["options"]
+    if method == "hnsw":
+        wanted = {"m": settings.hnsw_m, "ef_construction": settings.hnsw_ef_construction}
+        changed = {k: v for k, v in wanted.items() if options.get(k, v) != v}
+        if changed:
+            return "rebuild", f"build parameters changed: {changed}"
+        return None, "HNSW index is up to date"
+    lists, target = options.get("lists", 0), ivfflat_lists(rows)
+    if target >= lists * settings.vector_index_retrain_factor:
+        return "rebuild", f"IVFFlat trained with {lists} lists, {rows} chunks call for {target}"
+    return None, f"IVFFlat index with {lists} lists fits {rows} chunks"
+
+
+def _index_outdated(index: dict[str, Any], method: str, rows: int) -> bool:
+    if not index["valid"] or index["method"] != method:
+        return True
+    action, _ = plan_vector_index({"rows": max(rows, settings.vector_index_min_rows), "index": index}, method)
+    return action is not None
+
+
+def plan_tenant_indexes(
+    counts: dict[str, int],
+    indexes: dict[str, dict[str, Any]],
+    method: str | None = None,
+) -> dict[str, list[str]]:
+    """
+    Companies whose partial index to build and to drop, given their embedded
+    chunk counts and their current partial indexes. Companies reaching
+    VECTOR_TENANT_INDEX_MIN_ROWS get one, largest first, up to
+    VECTOR_TENANT_INDEX_MAX; an index is dropped once its company has shrunk
+    below half the threshold (so a company hovering at it is not rebuilt
+    over and over). Invalid or outdated indexes are rebuilt.
+    """
+    method = method or settings.vector_index_method
+    min_rows = settings.vector_tenant_index_min_rows
+    if min_rows <= 0:
+        return {"build": [], "drop": sorted(indexes)}
+    drop = sorted(c for c in indexes if counts.get(c, 0) < min_rows / 2)
+    kept = [c for c in indexes if c not in drop]
+    build = [c for c in kept if _index_outdated(indexes[c], method, counts[c])]
+    room = settings.vector_tenant_index_max - len(kept)
+    candidates = sorted(
+        (c for c, rows in counts.items() if rows >= min_rows and c not in indexes),
+        key=lambda c: -counts[c],
+    )
+    build += candidates[:max(room, 0)]
+    return {"build": build, "drop": drop}
+
+
+# ═══════════════════════════════════════════════════════════════
+# STATUS
+# ═══════════════════════════════════════════════════════════════
+
+async def count_embedded_chunks(db: AsyncSession) -> int:
+    """
+    Planner estimate of the table size; counted exactly (up to the build
+    threshold only) while the estimate is below it or missing.
+    """
+    estimate = (await db.execute(text(
+        "SELECT reltuples::bigint FROM pg_class WHERE oid = 'document_chunks'::regclass"
+    ))).scalar() or 0
+    if estimate >= settings.vector_index_min_rows:
+        return int(estimate)
+    counted = (await db.execute(text("""
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM document_chunks WHERE embedding IS NOT NULL LIMIT :cap
+        ) s
+    """), {"cap": settings.vector_index_min_rows})).scalar()
+    return int(counted or 0)
+
+
+async def _describe_index(db: AsyncSession, name: str) -> dict[str, Any] | None:
+    row = (await db.execute(text("""
+        SELECT am.amname, i.indisvalid, c.reloptions, pg_relation_size(c.oid), pg_get_indexdef(c.oid)
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_am am ON am.oid = c.relam
+        WHERE i.indrelid = 'document_chunks'::regclass AND c.relname = :name
+    """), {"name": name})).fetchone()
+    if row is None:
+        return None
+    return {
+        "name": name,
+        "method": row[0],
+        "valid": bool(row[1]),
+        "options": parse_reloptions(row[2]),
+        "size_bytes": int(row[3] or 0),
+        "definition": row[4],
+    }
+
+
+async def vector_index_status(db: AsyncSession) -> dict[str, Any]:
+    """Live index, a build in progress (with pg_stat_progress_create_index) and the planned action."""
+    status: dict[str, Any] = {
+        "rows": await count_embedded_chunks(db),
+        "index": await _describe_index(db, INDEX_NAME),
+        "building": None,
+        "configured_method": settings.vector_index_method,
+    }
+    building = await _describe_index(db, BUILD_NAME)
+    if building is not None:
+        progress = (await db.execute(text("""
+            SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total
+            FROM pg_stat_progress_create_index
+            WHERE relid = 'document_chunks'::regclass
+        """))).fetchone()
+        building["progress"] = dict(zip(
+            ("phase", "blocks_done", "blocks_total", "tuples_done", "tuples_total"), progress,
+        )) if progress else None
+        status["building"] = building
+    status["action"], status["reason"] = plan_vector_index(status)
+    status["tenants"] = await tenant_index_status(db)
+    return status
+
+
+async def tenant_index_status(db: AsyncSession) -> list[dict[str, Any]]:
+    """Companies large enough to matter (or holding a partial index), with their index and planned action."""
+    counts, indexes = await _tenant_counts(db), await _tenant_indexes(db)
+    plan = plan_tenant_indexes(counts, indexes)
+    actions = {**{c: "build" for c in plan["build"]}, **{c: "drop" for c in plan["drop"]}}
+    return [
+        {"company_id": company, "rows": counts.get(company, 0), "index": indexes.get(company), "action": actions.get(company)}
+        for company in sorted(set(counts) | set(indexes), key=lambda c: -counts.get(c, 0))
+    ]
+
+
+async def _tenant_counts(db: AsyncSession) -> dict[str, int]:
+    """Embedded chunks per company, for companies at half the partial-index threshold or more."""
+    if settings.vector_tenant_index_min_rows <= 0:
+        return {}
+    result = await db.execute(text("""
+        SELECT company_id, COUNT(*) FROM document_chunks
+        WHERE company_id IS NOT NULL AND embedding IS NOT NULL
+        GROUP BY company_id
+        HAVING COUNT(*) >= :floor
+    """), {"floor": max(1, settings.vector_tenant_index_min_rows // 2)})
+    return {str(company): int(rows) for company, rows in result}
+
+
+async def _tenant_indexes(db: AsyncSession) -> dict[str, dict[str, Any]]:
+    result = await db.execute(text("""
+        SELECT c.relname FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = 'document_chunks'::regclass AND starts_with(c.relname, :prefix)
+    """), {"prefix": TENANT_PREFIX})
+    indexes = {}
+    for (name,) in result.fetchall():
+        info = await _describe_index(db, name)
+        if info is not None:
+            indexes[str(uuid.UUID(name[len(TENANT_PREFIX):]))] = info
+    return indexes
+
+
+# ═══════════════════════════════════════════════════════════════
+# BUILD
+# ═══════════════════════════════════════════════════════════════
+
+async def build_vector_index(method: str | None = None, engine: AsyncEngine | None = None) -> dict[str, Any]:
+    """
+    Build the index CONCURRENTLY under BUILD_NAME, then swap it in for the
+    live one. Returns the build details, or {"status": "busy"} when another
+    process is already building.
+    """
+    method = method or settings.vector_index_method
+    if method not in METHODS:
+        raise ValueError(f"Unknown vector index method '{method}' (expected {' or '.join(METHODS)})")
+    engine = engine or default_engine
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if not (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": BUILD_LOCK_KEY})).scalar():
+            return {"status": "busy", "method": method}
+        try:
+            await conn.execute(
+                text("SELECT set_config('maintenance_work_mem', :mem, false)"),
+                {"mem": settings.vector_index_maintenance_work_mem},
+            )
+            # Leftover of an interrupted build: CONCURRENTLY leaves an invalid index behind
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {BUILD_NAME}"))
+            rows = (await conn.execute(text(
+                "SELECT COUNT(*) FROM document_chunks WHERE embedding IS NOT NULL"
+            ))).scalar() or 0
+            definition = index_definition(method, rows)
+            logger.info(f"Building vector index over {rows} chunks: {definition}")
+            started = time.perf_counter()
+            await conn.execute(text(definition))
+            elapsed = time.perf_counter() - started
+        finally:
+            await conn.execute(text("RESET maintenance_work_mem"))
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": BUILD_LOCK_KEY})
+
+    # Swap: brief exclusive lock on the table, given up rather than queueing behind long queries
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT set_config('lock_timeout', :timeout, true)"), {"timeout": "10s"})
+        await conn.execute(text(f"DROP INDEX IF EXISTS {INDEX_NAME}"))
+        await conn.execute(text(f"ALTER INDEX {BUILD_NAME} RENAME TO {INDEX_NAME}"))
+        await conn.execute(text("ANALYZE document_chunks"))
+
+    logger.info(f"Vector index ({method}) built in {elapsed:.1f} s")
+    return {"status": "built", "method": method, "rows": rows, "seconds": round(elapsed, 1), "definition": definition}
+
+
+async def ensure_vector_index(engine: AsyncEngine | None = None) -> dict[str, Any]:
+    """Build or rebuild the index when plan_vector_index calls for it."""
+    engine = engine or default_engine
+    async with AsyncSession(engine) as db:
+        status = await vector_index_status(db)
+    if status["action"] is None:
+        return {"status": "unchanged", "reason": status["reason"]}
+    if status["building"] is not None and status["building"]["progress"]:
+        return {"status": "busy", "reason": "a build is already running"}
+    logger.info(f"Vector index {status['action']}: {status['reason']}")
+    return {**await build_vector_index(engine=engine), "reason": status["reason"]}
+
+
+async def ensure_tenant_indexes(engine: AsyncEngine | None = None) -> dict[str, Any]:
+    """Build / drop the per-company partial indexes plan_tenant_indexes calls for."""
+    engine = engine or default_engine
+    method = settings.vector_index_method
+    async with AsyncSession(engine) as db:
+        counts, indexes = await _tenant_counts(db), await _tenant_indexes(db)
+    plan = plan_tenant_indexes(counts, indexes, method)
+    if not plan["build"] and not plan["drop"]:
+        return {"status": "unchanged", "indexes": len(indexes)}
+
+    built: list[str] = []
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if not (await conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": BUILD_LOCK_KEY})).scalar():
+            return {"status": "busy"}
+        try:
+            await conn.execute(
+                text("SELECT set_config('maintenance_work_mem', :mem, false)"),
+                {"mem": settings.vector_index_maintenance_work_mem},
+            )
+            for company in plan["drop"] + plan["build"]:
+                await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {tenant_index_name(company)}"))
+            for company in plan["build"]:
+                definition = index_definition(
+                    method, counts[company], tenant_index_name(company), tenant_predicate(company, alias=None),
+                )
+                logger.info(f"Building partial vector index over {counts[company]} chunks of company {company}")
+                await conn.execute(text(definition))
+                built.append(company)
+        finally:
+            await conn.execute(text("RESET maintenance_work_mem"))
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": BUILD_LOCK_KEY})
+        await conn.execute(text("ANALYZE document_chunks"))
+    return {"status": "built", "built": built, "dropped": plan["drop"]}
+
+
+async def maintain_vector_indexes(engine: AsyncEngine | None = None) -> dict[str, Any]:
+    """The shared index first, then the per-company partial ones."""
+    result = await ensure_vector_index(engine)
+    if settings.vector_tenant_index_min_rows > 0 and result.get("status") != "busy":
+        result["tenants"] = await ensure_tenant_indexes(engine)
+    return result
+
+
+class VectorIndexMaintainer:
+    """
+    Runs maintain_vector_indexes in the background, at most once every
+    VECTOR_INDEX_CHECK_INTERVAL seconds, when poked after ingestion.
+    """
+
+    __slots__ = ("interval", "last_result", "_task", "_checked_at")
+
+    def __init__(self, interval: float = 300.0):
+        self.interval = interval
+        self.last_result: dict[str, Any] | None = None
+        self._task: asyncio.Task | None = None
+        self._checked_at = -math.inf
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def poke(self) -> bool:
+        """Schedule a check unless one ran recently or is still running."""
+        if not settings.vector_index_auto or self.running:
+            return False
+        if time.monotonic() - self._checked_at < self.interval:
+            return False
+        return self.start(maintain_vector_indexes)
+
+    def rebuild(self, method: str | None = None) -> bool:
+        """Schedule an unconditional rebuild; False when one is already running."""
+        if self.running:
+            return False
+        return self.start(build_vector_index, method)
+
+    def start(self, fn: Callable[..., Awaitable[dict[str, Any]]], *args: Any) -> bool:
+        self._checked_at = time.monotonic()
+        self._task = asyncio.create_task(self._run(fn, *args), name="vector-index")
+        return True
+
+    async def _run(self, fn: Callable[..., Awaitable[dict[str, Any]]], *args: Any) -> None:
+        try:
+            self.last_result = await fn(*args)
+        except Exception as e:
+            logger.warning(f"Vector index maintenance failed: {e}")
+            self.last_result = {"status": "error", "reason": str(e)}
+
+    async def stop(self) -> None:
+        """Cancel a running build (application shutdown); its leftover is dropped by the next one."""
+        if self.running:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+@lru_cache()
+def get_vector_index_maintainer() -> VectorIndexMaintainer:
+    return VectorIndexMaintainer(interval=settings.vector_index_check_interval)
+
+
+def poke_on_commit(db: AsyncSession) -> None:
+    """
+    The session is adding chunks: poke the index maintainer once the
+    transaction commits, when the new rows are visible to its check.
+    """
+    event.listen(db.sync_session, "after_commit", lambda session: get_vector_index_maintainer().poke(), once=True)
+
+
+# ═══════════════════════════════════════════════════════════════
+# SEARCH TUNING
+# ═══════════════════════════════════════════════════════════════
+
+def search_params(top_k: int, ef_search: int | None = None, probes: int | None = None) -> dict[str, str]:
+    """
+    hnsw.ef_search / ivfflat.probes for one query. HNSW returns at most
+    ef_search candidates, so it is never set below top_k.
+    """
+    ef = min(max(ef_search or settings.hnsw_ef_search, top_k), MAX_EF_SEARCH)
+    return {"ef_search": str(ef), "probes": str(max(1, probes or settings.ivfflat_probes))}
+
+
+async def tune_search(
+    db: AsyncSession,
+    top_k: int,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    filtered: bool = False,
+) -> None:
+    """
+    Apply search_params to the current transaction only (SET LOCAL semantics).
+    A `filtered` search (tenant predicate on a shared index) also turns on
+    iterative index scans: the scan goes on past ef_search / probes until
+    enough rows pass the filter, instead of returning fewer than top_k.
+    """
+    sql = "SELECT set_config('hnsw.ef_search', :ef_search, true), set_config('ivfflat.probes', :probes, true)"
+    params = search_params(top_k, ef_search, probes)
+    if filtered and settings.vector_iterative_scan != "off":
+        sql += (
+            ", set_config('hnsw.iterative_scan', :hnsw_scan, true)"
+            ", set_config('ivfflat.iterative_scan', 'relaxed_order', true)"   # IVFFlat has no strict order
+        )
+        params["hnsw_scan"] = settings.vector_iterative_scan
+    await db.execute(text(sql), params)
@@ -0,0 +1,1008 @@
+"""
+F360 – Vector Store Backends
+search_index runs on a pluggable backend (VECTOR_BACKEND):
+- pgvector: SQL over document_chunks, served by the ANN index (vector_index.py);
+  the company filter is on the chunks themselves, so it is applied inside
+  the index scan (a company's partial index, or an iterative scan of the
+  shared one) and documents is joined for the top-k rows only
+- local: an in-process index – float32 embeddings in memory-mapped shards,
+  chunk payloads and the slot ↔ chunk id map in SQLite – searched exactly
+  with numpy matrix products, or through an HNSW graph when hnswlib is
+  installed. Filled from document_chunks at startup (sync) and reloaded per
+  company as its chunks change; searching it needs no database.
+- cached: the local index as a hot cache in front of pgvector. A company's
+  chunks are loaded in the background after its first query; until then,
+  and again after every ingest / reindex / delete for the company, its
+  queries go to pgvector.
+Every backend returns the rows of the pgvector query: chunk_id, content,
+metadata, filename, document_id, similarity (cosine, rounded to 4 places).
+hybrid_search fuses those with literal matches of the question's terms
+(see hybrid.py) and adds each row's rrf_score.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import numpy as np
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.backends import BackendRegistry
+from app.core.config import get_settings
+from app.core.database import EmbeddingVector, async_session_factory
+from app.services.cognitive_ingestion.hybrid import like_pattern, rrf_fuse
+from app.services.cognitive_ingestion.retrieval_cache import bump_on_commit
+from app.services.cognitive_ingestion.vector_index import tenant_predicate, tune_search
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+NO_COMPANY = ""   # company key of chunks whose document has no company
+
+
+def embedding_param(name: str = "embedding"):
+    """Bind parameter that ships a query vector to pgvector in binary form."""
+    return bindparam(name, type_=EmbeddingVector(settings.embedding_dimension))
+
+
+def _company_key(company_id: uuid.UUID | str | None) -> str:
+    return NO_COMPANY if company_id is None else str(company_id)
+
+
+def _normalized(vectors: Any) -> np.ndarray:
+    array = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(array, axis=1, keepdims=True)
+    return array / np.where(norms > 0, norms, 1.0)
+
+
+# ═══════════════════════════════════════════════════════════════
+# LOCAL INDEX
+# ═══════════════════════════════════════════════════════════════
+
+class LocalVectorIndex:
+    """
+    Embeddings on local disk: slot i lives in row i % shard_rows of shard
+    i // shard_rows, a memory-mapped float32 file. Slots freed by removals
+    are reused. Vectors are stored normalized, so cosine similarity is a dot
+    product. With `hnsw` (and hnswlib installed) a graph over the slots is
+    rebuilt on open and kept up to date. Thread-safe, blocking.
+    """
+
+    def __init__(self, path: Path | str, dim: int, shard_rows: int = 65_536, hnsw: bool = False):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.shard_rows = max(1, shard_rows)
+        self._lock = threading.RLock()
+        self._shards: list[np.memmap] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._company = np.zeros(0, dtype=np.int32)
+        self._company_codes: dict[str, int] = {}
+        self._slots: dict[str, int] = {}                  # chunk id → slot
+        self._owners: dict[int, tuple[str, str]] = {}     # slot → (chunk id, document id)
+        self._documents: dict[str, set[int]] = {}
+        self._free: list[int] = []
+        self.size = 0                                     # slots handed out so far (high-water mark)
+        self.graph: Any = None
+
+        self._db = sqlite3.connect(str(self.path / "chunks.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                slot         INTEGER PRIMARY KEY,
+                chunk_id     TEXT NOT NULL UNIQUE,
+                document_id  TEXT NOT NULL,
+                company_id   TEXT NOT NULL,
+                filename     TEXT,
+                content      TEXT NOT NULL,
+                metadata     TEXT NOT NULL
+            )
+        """)
+        self._check_layout()
+        self._load()
+        if hnsw:
+            self._open_graph()
+
+    # ── Storage ──
+
+    def _check_layout(self) -> None:
+        layout = {"dim": str(self.dim), "shard_rows": str(self.shard_rows)}
+        stored = dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+        if stored and stored != layout:
+            raise ValueError(f"Local vector index at {self.path} was created with {stored}, not {layout}")
+        self._db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", layout.items())
+        self._db.commit()
+
+    def _shard(self, n: int) -> np.memmap:
+        while len(self._shards) <= n:
+            file = self.path / f"shard-{len(self._shards):05d}.f32"
+            mode = "r+" if file.exists() else "w+"
+            self._shards.append(np.memmap(file, dtype=np.float32, mode=mode, shape=(self.shard_rows, self.dim)))
+        return self._shards[n]
+
+    def _vectors(self, slots: np.ndarray) -> np.ndarray:
+        slots = np.asarray(slots, dtype=np.int64)
+        vectors = np.empty((len(slots), self.dim), dtype=np.float32)
+        shards = slots // self.shard_rows
+        for n in np.unique(shards).tolist():
+            picked = shards == n
+            vectors[picked] = self._shard(n)[slots[picked] % self.shard_rows]
+        return vectors
+
+    def _company_code(self, company: str) -> int:
+        if company not in self._company_codes:
+            self._company_codes[company] = len(self._company_codes)
+        return self._company_codes[company]
+
+    def _grow(self, size: int) -> None:
+        if size > len(self._alive):
+            capacity = max(size, 2 * len(self._alive), 1024)
+            self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+            self._company = np.concatenate([self._company, np.zeros(capacity - len(self._company), dtype=np.int32)])
+
+    def _load(self) -> None:
+        rows = self._db.execute("SELECT slot, chunk_id, document_id, company_id FROM chunks").fetchall()
+        self.size = max((slot for slot, *_ in rows), default=-1) + 1
+        self._grow(self.size)
+        for slot, chunk_id, document_id, company in rows:
+            self._track(slot, chunk_id, document_id, company)
+        self._free = sorted(set(range(self.size)) - set(self._slots.values()), reverse=True)
+        for n in range((self.size + self.shard_rows - 1) // self.shard_rows):
+            self._shard(n)
+
+    def _track(self, slot: int, chunk_id: str, document_id: str, company: str) -> None:
+        self._alive[slot] = True
+        self._company[slot] = self._company_code(company)
+        self._slots[chunk_id] = slot
+        self._owners[slot] = (chunk_id, document_id)
+        self._documents.setdefault(document_id, set()).add(slot)
+
+    def _take_slot(self) -> int:
+        if self._free:
+            return self._free.pop()
+        self.size += 1
+        self._grow(self.size)
+        return self.size - 1
+
+    def _release(self, slots: list[int]) -> None:
+        if not slots:
+            return
+        for slot in slots:
+            chunk_id, document_id = self._owners.pop(slot)
+            del self._slots[chunk_id]
+            self._documents[document_id].discard(slot)
+            if not self._documents[document_id]:
+                del self._documents[document_id]
+        self._alive[slots] = False
+        self._db.executemany("DELETE FROM chunks WHERE slot = ?", [(slot,) for slot in slots])
+        if self.graph is not None:
+            for slot in slots:
+                self.graph.mark_deleted(slot)
+        self._free.extend(slots)
+        self._free.sort(reverse=True)
+
+    # ── Writes ──
+
+    def add(self, rows: list[dict[str, Any]]) -> int:
+        """
+        Insert or replace chunks. Each row carries chunk_id, document_id,
+        company_id, filename, content, metadata and embedding.
+        """
+        if not rows:
+            return 0
+        vectors = _normalized([row["embedding"] for row in rows])
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"expected {self.dim} dimensions, not {vectors.shape[1]}")
+        with self._lock:
+            self._release([self._slots[str(r["chunk_id"])] for r in rows if str(r["chunk_id"]) in self._slots])
+            slots = [self._take_slot() for _ in rows]
+            for slot, vector in zip(slots, vectors):
+                self._shard(slot // self.shard_rows)[slot % self.shard_rows] = vector
+            records = [
+                (
+                    slot, str(row["chunk_id"]), str(row["document_id"]), _company_key(row.get("company_id")),
+                    row.get("filename"), row["content"], json.dumps(row.get("metadata") or {}, default=str),
+                )
+                for slot, row in zip(slots, rows)
+            ]
+            self._db.executemany(
+                "INSERT INTO chunks (slot, chunk_id, document_id, company_id, filename, content, metadata) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+            self._db.commit()
+            for slot, chunk_id, document_id, company, *_ in records:
+                self._track(slot, chunk_id, document_id, company)
+            for shard in {slot // self.shard_rows for slot in slots}:
+                self._shards[shard].flush()
+            if self.graph is not None:
+                self._graph_add(vectors, slots)
+        return len(rows)
+
+    def remove_document(self, document_id: uuid.UUID | str) -> int:
+        with self._lock:
+            slots = sorted(self._documents.get(str(document_id), ()))
+            self._release(slots)
+            self._db.commit()
+        return len(slots)
+
+    def remove_company(self, company_id: uuid.UUID | str | None) -> int:
+        with self._lock:
+            code = self._company_codes.get(_company_key(company_id))
+            if code is None:
+                return 0
+            slots = np.flatnonzero(self._alive[:self.size] & (self._company[:self.size] == code)).tolist()
+            self._release(slots)
+            self._db.commit()
+        return len(slots)
+
+    def companies(self) -> list[str]:
+        """Keys of the companies that have chunks in the index (NO_COMPANY included)."""
+        with self._lock:
+            codes = set(np.unique(self._company[:self.size][self._alive[:self.size]]).tolist())
+            return [company for company, code in self._company_codes.items() if code in codes]
+
+    def replace_company(self, company_id: uuid.UUID | str | None, rows: list[dict[str, Any]]) -> int:
+        """Drop every chunk of the company, then add `rows` (a fresh load from the database)."""
+        with self._lock:
+            self.remove_company(company_id)
+            return self.add(rows)
+
+    # ── Search ──
+
+    def search(
+        self,
+        query_embedding: Any,
+        top_k: int = 5,
+        company_id: uuid.UUID | str | None = None,
+        similarity_threshold: float = -1.0,
+        ef_search: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Nearest chunks by cosine similarity, within one company when `company_id` is given."""
+        query = _normalized(query_embedding)[0]
+        with self._lock:
+            mask = self._mask(company_id)
+            if mask is None or top_k <= 0:
+                return []
+            slots, scores = self._nearest(query, top_k, mask, ef_search)
+            keep = scores >= similarity_threshold
+            return self._rows(slots[keep], scores[keep])
+
+    def hybrid_search(
+        self,
+        query_embedding: Any,
+        terms: list[tuple[str, int]],
+        top_k: int = 5,
+        company_id: uuid.UUID | str | None = None,
+        similarity_threshold: float = -1.0,
+        ef_search: int | None = None,
+        candidates: int | None = None,
+        weights: tuple[float, float] | None = None,
+        rrf_k: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Nearest chunks and chunks containing the question's `terms` (see
+        hybrid.lexical_terms), fused by reciprocal rank. `weights` are the
+        (vector, lexical) RRF weights; settings supply every default.
+        """
+        query = _normalized(query_embedding)[0]
+        candidates = max(candidates or settings.hybrid_candidates, top_k)
+        weights = weights or (settings.hybrid_vector_weight, settings.hybrid_lexical_weight)
+        with self._lock:
+            mask = self._mask(company_id)
+            if mask is None or top_k <= 0:
+                return []
+            slots, scores = self._nearest(query, candidates, mask, ef_search)
+            vector = slots[scores >= similarity_threshold].tolist()
+            lexical = self._lexical_search(query, terms, candidates, company_id) if terms else []
+            fused = rrf_fuse([vector, lexical], weights, rrf_k)[:top_k]
+            if not fused:
+                return []
+            picked = np.array([slot for slot, _ in fused], dtype=np.int64)
+            rows = self._rows(picked, self._vectors(picked) @ query)
+        for row, (_, score) in zip(rows, fused):
+            row["rrf_score"] = round(score, 6)
+        return rows
+
+    def _mask(self, company_id: uuid.UUID | str | None) -> np.ndarray | None:
+        """Live slots (of one company), or None when there are none."""
+        mask = self._alive[:self.size].copy()
+        if company_id is not None:
+            code = self._company_codes.get(_company_key(company_id))
+            if code is None:
+                return None
+            mask &= self._company[:self.size] == code
+        return mask if mask.any() else None
+
+    def _nearest(
+        self, query: np.ndarray, top_k: int, mask: np.ndarray, ef_search: int | None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        found = None
+        if self.graph is not None:
+            found = self._graph_search(query, top_k, mask, ef_search)
+        return found if found is not None else self._exact_search(query, top_k, mask)
+
+    def _lexical_search(
+        self,
+        query: np.ndarray,
+        terms: list[tuple[str, int]],
+        limit: int,
+        company_id: uuid.UUID | str | None,
+    ) -> list[int]:
+        """
+        Slots whose content contains any term: the most summed term strength
+        first, nearest first among equals. SQLite's LIKE folds ASCII case only.
+        """
+        where = " OR ".join("content LIKE ? ESCAPE '\\'" for _ in terms)
+        params = [like_pattern(term) for term, _ in terms]
+        if company_id is not None:
+            where = f"company_id = ? AND ({where})"
+            params.insert(0, _company_key(company_id))
+        slots, strengths = [], []
+        for slot, content in self._db.execute(f"SELECT slot, content FROM chunks WHERE {where}", params):
+            folded = content.casefold()
+            slots.append(slot)
+            strengths.append(sum(strength for term, strength in terms if term.casefold() in folded))
+        if not slots:
+            return []
+        similarity = self._vectors(np.array(slots)) @ query
+        order = np.lexsort((-similarity, -np.array(strengths)))[:limit]
+        return [slots[i] for i in order]
+
+    def _exact_search(self, query: np.ndarray, top_k: int, mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k per shard by one matrix-vector product each, then merged."""
+        best_slots, best_scores = [], []
+        for n in range((self.size + self.shard_rows - 1) // self.shard_rows):
+            start = n * self.shard_rows
+            stop = min(start + self.shard_rows, self.size)
+            allowed = mask[start:stop]
+            if not allowed.any():
+                continue
+            scores = self._shard(n)[:stop - start] @ query
+            scores[~allowed] = -np.inf
+            k = min(top_k, int(allowed.sum()))
+            top = np.argpartition(-scores, k - 1)[:k]
+            best_slots.append(top + start)
+            best_scores.append(scores[top])
+        slots, scores = np.concatenate(best_slots), np.concatenate(best_scores)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return slots[order], scores[order]
+
+    def _rows(self, slots: np.ndarray, scores: np.ndarray) -> list[dict[str, Any]]:
+        if not len(slots):
+            return []
+        placeholders = ",".join("?" * len(slots))
+        payloads = {
+            row[0]: row[1:]
+            for row in self._db.execute(
+                f"SELECT slot, chunk_id, content, metadata, filename, document_id "
+                f"FROM chunks WHERE slot IN ({placeholders})",
+                [int(slot) for slot in slots],
+            )
+        }
+        results = []
+        for slot, score in zip(slots.tolist(), scores.tolist()):
+            chunk_id, content, metadata, filename, document_id = payloads[slot]
+            results.append({
+                "chunk_id": chunk_id,
+                "content": content,
+                "metadata": json.loads(metadata),
+                "filename": filename,
+                "document_id": document_id,
+                "similarity": round(float(score), 4),
+            })
+        return results
+
+    # ── HNSW graph (optional) ──
+
+    def _open_graph(self) -> None:
+        try:
+            import hnswlib
+        except ImportError:
+            logger.warning("hnswlib not installed – local vector search stays exact")
+            return
+        self.graph = hnswlib.Index(space="cosine", dim=self.dim)
+        self.graph.init_index(
+            max_elements=max(self.size, self.shard_rows),
+            M=settings.hnsw_m,
+            ef_construction=settings.hnsw_ef_construction,
+        )
+        alive = np.flatnonzero(self._alive[:self.size])
+        for start in range(0, len(alive), self.shard_rows):
+            batch = alive[start:start + self.shard_rows]
+            self.graph.add_items(self._vectors(batch), batch)
+
+    def _graph_add(self, vectors: np.ndarray, slots: list[int]) -> None:
+        capacity = self.graph.get_max_elements()
+        if self.size > capacity:
+            self.graph.resize_index(max(self.size, 2 * capacity))
+        self.graph.add_items(vectors, slots)   # a reused slot's label is undeleted and updated
+
+    def _graph_search(
+        self, query: np.ndarray, top_k: int, mask: np.ndarray, ef_search: int | None,
+    ) -> tuple[np.ndarray, np.ndarray] | None:
+        k = min(top_k, int(mask.sum()))
+        self.graph.set_ef(max(ef_search or settings.hnsw_ef_search, k))
+        try:
+            labels, distances = self.graph.knn_query(query, k=k, filter=lambda label: bool(mask[label]))
+        except RuntimeError:
+            return None   # too few reachable candidates under the filter: fall back to exact
+        return labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+
+    # ── Metrics ──
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "chunks": len(self._slots),
+                "slots": self.size,
+                "shards": len(self._shards),
+                "companies": len(self._company_codes),
+                "hnsw": self.graph is not None,
+                "disk_bytes": sum(f.stat().st_size for f in self.path.iterdir() if f.is_file()),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            for shard in self._shards:
+                shard.flush()
+            self._shards.clear()
+            self._db.close()
+
+
+@lru_cache()
+def get_local_vector_index() -> LocalVectorIndex:
+    """Process-wide local index configured from settings (VECTORS_DIR)."""
+    return LocalVectorIndex(
+        settings.vectors_path,
+        dim=settings.embedding_dimension,
+        shard_rows=settings.local_vector_shard_rows,
+        hnsw=settings.local_vector_hnsw,
+    )
+
+
+# ═══════════════════════════════════════════════════════════════
+# BACKENDS
+# ═══════════════════════════════════════════════════════════════
+
+class VectorBackend:
+    """Query vector → ranked chunk rows (see module docstring for their shape)."""
+
+    name = "base"
+
+    async def search(
+        self,
+        query_embedding: list[float],
+        company_id: uuid.UUID | None,
+        top_k: int,
+        similarity_threshold: float,
+        db: AsyncSession | None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[dict[str, Any]]:
+        raise NotImplementedError
+
+    async def hybrid_search(
+        self,
+        query_embedding: list[float],
+        terms: list[tuple[str, int]],
+        company_id: uuid.UUID | None,
+        top_k: int,
+        similarity_threshold: float,
+        db: AsyncSession | None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """Vector and lexical rankings fused by RRF; vector search alone unless overridden."""
+        return await self.search(query_embedding, company_id, top_k, similarity_threshold, db, ef_search, probes)
+
+    async def sync(self) -> int:
+        """Bring backend state in line with document_chunks (startup); rows loaded."""
+        return 0
+
+    def invalidate(self, company_id: uuid.UUID | None) -> None:
+        """The company's chunks changed (ingest, reindex, delete)."""
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": self.name}
+
+
+class PgVectorBackend(VectorBackend):
+    """SQL over document_chunks with per-query ef_search / probes."""
+
+    @staticmethod
+    def _company_filter(company_id: uuid.UUID | None) -> str:
+        return f"AND {tenant_predicate(company_id)}" if company_id else ""
+
+    name = "pgvector"
+
+    async def search(
+        self,
+        query_embedding: list[float],
+        company_id: uuid.UUID | None,
+        top_k: int,
+        similarity_threshold: float,
+        db: AsyncSession | None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[dict[str, Any]]:
+        params: dict[str, Any] = {
+            "embedding": query_embedding,
+            "top_k": top_k,
+            "threshold": similarity_threshold,
+        }
+
+        # The threshold is applied to the top-k, outside the scan: a WHERE on the
+        # distance would keep the index from returning rows in distance order.
+        # Iterative scans may return rows slightly out of order, hence the final sort.
+        sql = text(f"""
+            WITH nearest AS MATERIALIZED (
+                SELECT dc.id, dc.document_id, dc.content, dc.metadata, dc.embedding <=> :embedding AS distance
+                FROM document_chunks dc
+                WHERE dc.embedding IS NOT NULL
+                {self._company_filter(company_id)}
+                ORDER BY dc.embedding <=> :embedding
+                LIMIT :top_k
+            )
+            SELECT
+                n.id,
+                n.content,
+                n.metadata,
+                d.filename,
+                n.document_id,
+                1 - n.distance AS similarity
+            FROM nearest n
+            JOIN documents d ON d.id = n.document_id
+            WHERE 1 - n.distance >= :threshold
+            ORDER BY n.distance
+        """).bindparams(embedding_param())
+
+        await tune_search(db, top_k, ef_search, probes, filtered=company_id is not None)
+        result = await db.execute(sql, params)
+        rows = result.fetchall()
+
+        return [
+            {
+                "chunk_id": str(row[0]),
+                "content": row[1],
+                "metadata": row[2],
+                "filename": row[3],
+                "document_id": str(row[4]),
+                "similarity": round(float(row[5]), 4),
+            }
+            for row in rows
+        ]
+
+    async def hybrid_search(
+        self,
+        query_embedding: list[float],
+        terms: list[tuple[str, int]],
+        company_id: uuid.UUID | None,
+        top_k: int,
+        similarity_threshold: float,
+        db: AsyncSession | None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        One round trip: the ANN candidates (HNSW / IVFFlat index) and the
+        ILIKE candidates (trigram index idx_chunks_content_trgm) are ranked
+        in their own CTE, then fused by reciprocal rank in SQL.
+        """
+        if not terms:
+            return await self.search(query_embedding, company_id, top_k, similarity_threshold, db, ef_search, probes)
+
+        candidates = max(settings.hybrid_candidates, top_k)
+        filter_clause = self._company_filter(company_id)
+        params: dict[str, Any] = {
+            "embedding": query_embedding,
+            "top_k": top_k,
+            "threshold": similarity_threshold,
+            "candidates": candidates,
+            "vector_weight": settings.hybrid_vector_weight,
+            "lexical_weight": settings.hybrid_lexical_weight,
+            "rrf_k": settings.hybrid_rrf_k,
+        }
+        for n, (term, _) in enumerate(terms):
+            params[f"term_{n}"] = like_pattern(term)
+
+        matches = " OR ".join(f"dc.content ILIKE :term_{n}" for n in range(len(terms)))
+        strength = " + ".join(
+            f"CASE WHEN dc.content ILIKE :term_{n} THEN {int(weight)} ELSE 0 END"
+            for n, (_, weight) in enumerate(terms)
+        )
+
+        sql = text(f"""
+            WITH vector AS (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY distance) AS rank
+                FROM (
+                    SELECT dc.id, dc.embedding <=> :embedding AS distance
+                    FROM document_chunks dc
+                    WHERE dc.embedding IS NOT NULL
+                    {filter_clause}
+                    ORDER BY dc.embedding <=> :embedding
+                    LIMIT :candidates
+                ) nearest
+                WHERE 1 - distance >= :threshold
+            ),
+            lexical AS (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY strength DESC, distance) AS rank
+                FROM (
+                    SELECT dc.id, {strength} AS strength, dc.embedding <=> :embedding AS distance
+                    FROM document_chunks dc
+                    WHERE dc.embedding IS NOT NULL
+                    AND ({matches})
+                    {filter_clause}
+                    ORDER BY strength DESC, distance
+                    LIMIT :candidates
+                ) matching
+            ),
+            fused AS (
+                SELECT id, SUM(score) AS rrf_score
+                FROM (
+                    SELECT id, CAST(:vector_weight AS float8) / (CAST(:rrf_k AS integer) + rank) AS score FROM vector
+                    UNION ALL
+                    SELECT id, CAST(:lexical_weight AS float8) / (CAST(:rrf_k AS integer) + rank) AS score FROM lexical
+                ) ranked
+                GROUP BY id
+                ORDER BY rrf_score DESC
+                LIMIT :top_k
+            )
+            SELECT
+                dc.id,
+                dc.content,
+                dc.metadata,
+                d.filename,
+                d.id AS document_id,
+                1 - (dc.embedding <=> :embedding) AS similarity,
+                f.rrf_score
+            FROM fused f
+            JOIN document_chunks dc ON dc.id = f.id
+            JOIN documents d ON dc.document_id = d.id
+            ORDER BY f.rrf_score DESC
+        """).bindparams(embedding_param())
+
+        await tune_search(db, candidates, ef_search, probes, filtered=company_id is not None)
+        result = await db.execute(sql, params)
+
+        return [
+            {
+                "chunk_id": str(row[0]),
+                "content": row[1],
+                "metadata": row[2],
+                "filename": row[3],
+                "document_id": str(row[4]),
+                "similarity": round(float(row[5]), 4),
+                "rrf_score": round(float(row[6]), 6),
+            }
+            for row in result.fetchall()
+        ]
+
+
+CompanyLoader = Callable[[uuid.UUID | None], Awaitable[list[dict[str, Any]] | None]]
+
+
+async def list_chunk_companies() -> list[uuid.UUID | None]:
+    """Companies that have embedded chunks (None: chunks of documents without one)."""
+    async with async_session_factory() as db:
+        result = await db.execute(text(
+            "SELECT DISTINCT company_id FROM document_chunks WHERE embedding IS NOT NULL"
+        ))
+        return [row[0] for row in result]
+
+
+async def load_company_chunks(
+    company_id: uuid.UUID | None, max_rows: int | None = None,
+) -> list[dict[str, Any]] | None:
+    """
+    Every embedded chunk of a company, or None when it has more than
+    `max_rows` (default: VECTOR_CACHE_MAX_COMPANY_ROWS; 0 = no limit).
+    """
+    max_rows = settings.vector_cache_max_company_rows if max_rows is None else max_rows
+    company_filter = "dc.company_id IS NULL" if company_id is None else "dc.company_id = :company_id"
+    params = {} if company_id is None else {"company_id": str(company_id)}
+    async with async_session_factory() as db:
+        if max_rows:
+            count = (await db.execute(text(f"""
+                SELECT COUNT(*) FROM document_chunks dc
+                WHERE {company_filter} AND dc.embedding IS NOT NULL
+            """), params)).scalar()
+            if count > max_rows:
+                return None
+        result = await db.execute(text(f"""
+            SELECT dc.id, dc.document_id, d.filename, dc.content, dc.metadata, dc.embedding
+            FROM document_chunks dc
+            JOIN documents d ON dc.document_id = d.id
+            WHERE {company_filter} AND dc.embedding IS NOT NULL
+        """), params)
+        return [
+            {
+                "chunk_id": row[0],
+                "document_id": row[1],
+                "company_id": company_id,
+                "filename": row[2],
+                "content": row[3],
+                "metadata": row[4],
+                "embedding": np.asarray(row[5], dtype=np.float32),
+            }
+            for row in result
+        ]
+
+
+async def load_all_company_chunks(company_id: uuid.UUID | None) -> list[dict[str, Any]]:
+    """Every embedded chunk of a company, however many."""
+    return await load_company_chunks(company_id, max_rows=0)
+
+
+class LocalVectorBackend(VectorBackend):
+    """
+    The in-process index alone, filled from document_chunks: sync() (run at
+    startup) reloads every company, then each company whose chunks change
+    is reloaded as the change commits – again if it changes mid-load.
+    Before sync(), invalidations are only counted, so processes that never
+    serve queries (the bulk CLI) do not write the index; their chunks are
+    picked up by the next sync().
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        index: LocalVectorIndex | None = None,
+        loader: CompanyLoader = load_all_company_chunks,
+        companies: Callable[[], Awaitable[list[uuid.UUID | None]]] = list_chunk_companies,
+    ):
+        self._index = index
+        self.loader = loader
+        self.companies = companies
+        self.synced = False
+        self._generation: dict[str, int] = {}
+        self._loading: dict[str, asyncio.Task] = {}
+
+    @property
+    def index(self) -> LocalVectorIndex:
+        if self._index is None:
+            self._index = get_local_vector_index()
+        return self._index
+
+    async def search(
+        self,
+        query_embedding: list[float],
+        company_id: uuid.UUID | None,
+        top_k: int,
+        similarity_threshold: float,
+        db: AsyncSession | None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[dict[str, Any]]:
+        return await asyncio.to_thread(
+            self.index.search, query_embedding, top_k, company_id, similarity_threshold, ef_search,
+        )
+
+    async def hybrid_search(
+        self,
+        query_embedding: list[float],
+        terms: list[tuple[str, int]],
+        company_id: uuid.UUID | None,
+        top_k: int,
+        similarity_threshold: float,
+        db: AsyncSession | None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[dict[str, Any]]:
+        return await asyncio.to_thread(
+            self.index.hybrid_search, query_embedding, terms, top_k, company_id, similarity_threshold, ef_search,
+        )
+
+    async def sync(self) -> int:
+        """Reload every company from document_chunks, dropping those with no chunks left."""
+        self.synced = True
+        try:
+            companies = await self.companies()
+        except Exception as e:
+            logger.warning(f"Local vector index sync failed: {e}")
+            return 0
+        current = {_company_key(company_id) for company_id in companies}
+        for key in set(await asyncio.to_thread(self.index.companies)) - current:
+            await asyncio.to_thread(self.index.remove_company, key)
+        loaded = 0
+        for company_id in companies:
+            loaded += await self._schedule_load(company_id, _company_key(company_id))
+        logger.info(f"Local vector index: {loaded} chunks of {len(companies)} companies loaded")
+        return loaded
+
+    def invalidate(self, company_id: uuid.UUID | None) -> None:
+        key = _company_key(company_id)
+        self._generation[key] = self._generation.get(key, 0) + 1
+        if self.synced:
+            self._schedule_load(company_id, key)
+
+    def _schedule_load(self, company_id: uuid.UUID | None, key: str) -> asyncio.Task:
+        task = self._loading.get(key)
+        if task is None or task.done():
+            task = self._loading[key] = asyncio.create_task(self.load(company_id), name=f"vector-local-{key}")
+        return task
+
+    async def load(self, company_id: uuid.UUID | None) -> int:
+        """Replace the company's chunks in the index with those in document_chunks."""
+        key = _company_key(company_id)
+        try:
+            while True:
+                generation = self._generation.get(key, 0)
+                rows = await self.loader(company_id)
+                await asyncio.to_thread(self.index.replace_company, company_id, rows)
+                if self._generation.get(key, 0) == generation:
+                    return len(rows)
+                # changed while loading: read the rows again
+        except Exception as e:
+            logger.warning(f"Local vector index load failed for company {key}: {e}")
+            return 0
+        finally:
+            self._loading.pop(key, None)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.name,
+            "synced": self.synced,
+            "loading": sum(not task.done() for task in self._loading.values()),
+            **self.index.stats(),
+        }
+
+
+class CachedVectorBackend(VectorBackend):
+    """
+    Local index in front of pgvector, per company. The first query of a
+    company goes to pgvector and starts loading its chunks; once loaded,
+    its queries stay in-process until invalidate() – each call bumps the
+    company's generation, so a load that overlapped a change is discarded.
+    Queries without a company always go to pgvector.
+    """
+
+    name = "cached"
+
+    def __init__(
+        self,
+        fallback: VectorBackend | None = None,
+        index: LocalVectorIndex | None = None,
+        loader: CompanyLoader = load_company_chunks,
+    ):
+        self.fallback = fallback or PgVectorBackend()
+        self._local = LocalVectorBackend(index)
+        self.loader = loader
+        self._generation: dict[str, int] = {}
+        self._loaded: dict[str, int] = {}      # company → generation its chunks were loaded at
+        self._oversized: dict[str, int] = {}   # company → generation found too large to cache
+        self._loading: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def index(self) -> LocalVectorIndex:
+        return self._local.index
+
+    def is_loaded(self, company_id: uuid.UUID) -> bool:
+        key = _company_key(company_id)
+        return self._loaded.get(key, -1) == self._generation.get(key, 0)
+
+    async def search(
+        self,
+        query_embedding: list[float],
+        company_id: uuid.UUID | None,
+        top_k: int,
+        similarity_threshold: float,
+        db: AsyncSession | None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[dict[str, Any]]:
+        return await self._route(company_id).search(
+            query_embedding, company_id, top_k, similarity_threshold, db, ef_search, probes,
+        )
+
+    async def hybrid_search(
+        self,
+        query_embedding: list[float],
+        terms: list[tuple[str, int]],
+        company_id: uuid.UUID | None,
+        top_k: int,
+        similarity_threshold: float,
+        db: AsyncSession | None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+    ) -> list[dict[str, Any]]:
+        return await self._route(company_id).hybrid_search(
+            query_embedding, terms, company_id, top_k, similarity_threshold, db, ef_search, probes,
+        )
+
+    def _route(self, company_id: uuid.UUID | None) -> VectorBackend:
+        """The local index when the company is loaded, else the fallback (scheduling a load)."""
+        if company_id is not None:
+            key = _company_key(company_id)
+            generation = self._generation.get(key, 0)
+            if self._loaded.get(key, -1) == generation:
+                self.hits += 1
+                return self._local
+            if self._oversized.get(key, -1) != generation:
+                self._schedule_load(company_id, key)
+        self.misses += 1
+        return self.fallback
+
+    def _schedule_load(self, company_id: uuid.UUID, key: str) -> None:
+        task = self._loading.get(key)
+        if task is None or task.done():
+            self._loading[key] = asyncio.create_task(self.load(company_id), name=f"vector-cache-{key}")
+
+    async def load(self, company_id: uuid.UUID) -> bool:
+        """Load (or reload) a company's chunks into the local index."""
+        key = _company_key(company_id)
+        generation = self._generation.get(key, 0)
+        try:
+            rows = await self.loader(company_id)
+            if rows is None:
+                self._oversized[key] = generation
+                logger.info(f"Vector cache: company {key} has too many chunks, staying on pgvector")
+                return False
+            await asyncio.to_thread(self.index.replace_company, company_id, rows)
+        except Exception as e:
+            logger.warning(f"Vector cache load failed for company {key}: {e}")
+            return False
+        finally:
+            self._loading.pop(key, None)
+        if self._generation.get(key, 0) != generation:
+            return False   # changed while loading: the next query loads again
+        self._loaded[key] = generation
+        logger.info(f"Vector cache: {len(rows)} chunks of company {key} loaded")
+        return True
+
+    def invalidate(self, company_id: uuid.UUID | None) -> None:
+        key = _company_key(company_id)
+        self._generation[key] = self._generation.get(key, 0) + 1
+        self._loaded.pop(key, None)
+        self._oversized.pop(key, None)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "companies_loaded": sum(self.is_loaded(key) for key in self._loaded),
+            "loading": sum(not task.done() for task in self._loading.values()),
+            **self.index.stats(),
+        }
+
+
+VECTOR_BACKENDS = {
+    PgVectorBackend.name: PgVectorBackend,
+    LocalVectorBackend.name: LocalVectorBackend,
+    CachedVectorBackend.name: CachedVectorBackend,
+}
+
+_backends: BackendRegistry[VectorBackend] = BackendRegistry("vector", "vector_backend", VECTOR_BACKENDS)
+get_vector_backend = _backends.get
+set_vector_backend = _backends.set
+
+
+def invalidate_company(company_id: uuid.UUID | None) -> None:
+    """A company's chunks changed: the vector backend drops what it holds for it."""
+    get_vector_backend().invalidate(company_id)
+
+
+def invalidate_on_commit(db: AsyncSession, company_id: uuid.UUID | None) -> None:
+    """
+    The session is changing a company's chunks: invalidate now, and again
+    once the transaction commits, so a cache cannot load the rows as they
+    were before the commit and keep serving them. The commit also bumps
+    the company's generation, which the retrieval caches of every process
+    check.
+    """
+    invalidate_company(company_id)
+    bump_on_commit(db, company_id)
+    event.listen(db.sync_session, "after_commit", lambda session: invalidate_company(company_id), once=True)
@@ -2,74 +2,400 @@
 F360 – Vectorizer
 Text chunking + embedding generation via OpenAI.
 Converts raw text into vector representations for semantic search.
+The embedding backend is pluggable: OpenAI in production, a deterministic
+hash-based stand-in for tests and benchmarks.
 """
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import uuid
 import logging
-from typing import Any
+from typing import Any, AsyncIterable, AsyncIterator, Iterable
+
+import numpy as np
 
-from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.backends import BackendRegistry
 from app.core.config import get_settings
-from app.models.financial import DocumentChunk
+from app.services.cognitive_ingestion.chunk_store import (
+    annotate_chunks,
+    bulk_insert_chunks,
+    delete_chunks,
+    load_document_chunks,
+    update_chunks,
+)
+from app.services.cognitive_ingestion.chunker import TextChunk, chunk_text, new_chunker
+from app.services.cognitive_ingestion.embedding_cache import get_embedding_cache, make_cache_key
+from app.services.cognitive_ingestion.progress import IngestionProgress
+from app.services.cognitive_ingestion.tokenizer import estimate_tokens, get_token_counter
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# ── Chunking constants ──
-CHUNK_SIZE = 1000       # characters per chunk
-CHUNK_OVERLAP = 200     # overlap between chunks
 
+def plan_embedding_batches(
+    texts: list[str],
+    max_batch_size: int | None = None,
+    max_batch_tokens: int | None = None,
+    token_counts: list[int] | None = None,
+) -> list[list[int]]:
+    """
+    Group text indices into batches that respect both the per-request
+    input count and the token budget.
+    Uses the stored `token_counts` when given, the estimate otherwise.
+    A single text larger than the token budget gets a batch of its own.
+    """
+    max_batch_size = max_batch_size or settings.embedding_batch_size
+    max_batch_tokens = max_batch_tokens or settings.embedding_batch_max_tokens
+
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+
+    for idx, item in enumerate(texts):
+        tokens = token_counts[idx] if token_counts is not None else estimate_tokens(item)
+        if current and (
+            len(current) >= max_batch_size
+            or current_tokens + tokens > max_batch_tokens
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(idx)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+# ═══════════════════════════════════════════════════════════════
+# EMBEDDING BACKENDS
+# ═══════════════════════════════════════════════════════════════
+
+class EmbeddingBackend:
+    """One batch of texts → one vector per text. `model` namespaces cache keys."""
+
+    name = "base"
+
+    @property
+    def model(self) -> str:
+        return self.name
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        raise NotImplementedError
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """OpenAI embeddings API (`openai_embedding_model`)."""
+
+    name = "openai"
+
+    def __init__(self):
+        self._client: Any = None
+
+    @property
+    def model(self) -> str:
+        return settings.openai_embedding_model
 
-def chunk_text(content: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(api_key=settings.openai_api_key)
+        response = await self._client.embeddings.create(model=self.model, input=texts)
+        vectors: list[list[float]] = [None] * len(texts)
+        for item in response.data:
+            vectors[item.index] = item.embedding
+        return vectors
+
+
+class HashEmbeddingBackend(EmbeddingBackend):
     """
-    Split text into overlapping chunks for embedding.
-    Uses sentence-aware splitting when possible.
+    Deterministic offline stand-in for tests and benchmarks: each text maps
+    to a unit vector seeded by its SHA-256, so identical texts get identical
+    vectors across runs and machines. `latency` simulates a request round trip.
     """
-    if not content or len(content) <= chunk_size:
-        return [content] if content else []
 
-    chunks: list[str] = []
-    start = 0
-    while start < len(content):
-        end = start + chunk_size
+    name = "hash"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    @property
+    def model(self) -> str:
+        return f"hash-v1-{settings.embedding_dimension}"
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self.vector(text_input).tolist() for text_input in texts]
+
+    @staticmethod
+    def vector(text_input: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.sha256(text_input.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(settings.embedding_dimension, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+
+EMBEDDING_BACKENDS = {
+    OpenAIEmbeddingBackend.name: OpenAIEmbeddingBackend,
+    HashEmbeddingBackend.name: HashEmbeddingBackend,
+}
 
-        # Try to end at a sentence boundary
-        if end < len(content):
-            for sep in [". ", ".\n", "\n\n", "\n", " "]:
-                boundary = content.rfind(sep, start + chunk_size // 2, end + 50)
-                if boundary != -1:
-                    end = boundary + len(sep)
-                    break
+_backends: BackendRegistry[EmbeddingBackend] = BackendRegistry("embedding", "embedding_backend", EMBEDDING_BACKENDS)
+get_embedding_backend = _backends.get
+set_embedding_backend = _backends.set
 
-        chunk = content[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
 
-        start = end - overlap
+async def _request_embeddings(
+    texts: list[str],
+    token_counts: list[int] | None = None,
+    backend: EmbeddingBackend | None = None,
+) -> list[list[float] | None]:
+    """
+    Call the embedding backend for `texts`, batched and with bounded concurrency.
+    Entries whose batch failed are left as None.
+    """
+    backend = backend or get_embedding_backend()
+    results: list[list[float] | None] = [None] * len(texts)
+    batches = plan_embedding_batches(texts, token_counts=token_counts)
+    semaphore = asyncio.Semaphore(max(1, settings.embedding_max_concurrency))
+
+    async def _embed_batch(batch: list[int]) -> None:
+        async with semaphore:
+            try:
+                vectors = await backend.embed([texts[i] for i in batch])
+            except Exception as e:
+                logger.warning(f"Embedding batch of {len(batch)} texts failed: {e}")
+                return
+        for idx, vector in zip(batch, vectors):
+            results[idx] = vector
+
+    await asyncio.gather(*(_embed_batch(batch) for batch in batches))
+    return results
+
+
+async def get_embeddings(
+    texts: list[str],
+    token_counts: list[int] | None = None,
+) -> list[list[float] | None]:
+    """
+    Generate embeddings for many texts with as few API round trips as possible.
+    1. Serve what the embedding cache already knows
+    2. Embed each remaining distinct text once, in size- and token-limited
+       batches with at most `embedding_max_concurrency` requests in flight
+    3. Write fresh vectors back to the cache
+    `token_counts` (e.g. stored chunk counts) make the batch budget exact.
+    Results are returned in the same order as `texts`; texts whose batch
+    failed get None, so their chunks are stored without a vector and
+    embedded again on the next reindex.
+    """
+    if not texts:
+        return []
 
-    return chunks
+    backend = get_embedding_backend()
+    model = backend.model
+    dimension = settings.embedding_dimension
+    keys = [make_cache_key(t, model, dimension) for t in texts]
+    vectors: dict[str, list[float]] = {}
+
+    cache = get_embedding_cache() if settings.embedding_cache_enabled else None
+    if cache is not None:
+        vectors = await asyncio.to_thread(cache.get_many, list(dict.fromkeys(keys)))
+
+    # One request slot per distinct uncached text
+    pending: dict[str, int] = {}
+    for idx, key in enumerate(keys):
+        if key not in vectors and key not in pending:
+            pending[key] = idx
+
+    if pending:
+        fresh = await _request_embeddings(
+            [texts[i] for i in pending.values()],
+            [token_counts[i] for i in pending.values()] if token_counts is not None else None,
+            backend,
+        )
+        computed = {
+            key: embedding
+            for key, embedding in zip(pending.keys(), fresh)
+            if embedding is not None
+        }
+        vectors.update(computed)
+        if cache is not None and computed:
+            await asyncio.to_thread(cache.put_many, computed)
+
+    return [vectors.get(key) for key in keys]
 
 
 async def get_embedding(text_input: str) -> list[float]:
     """
-    Generate embedding vector using OpenAI API.
+    Generate embedding vector with the configured backend (OpenAI by default).
     Returns a list of floats (dimension = 1536 for text-embedding-3-small).
+    Falls back to a zero vector when the backend fails (e.g. development
+    without API key).
+    """
+    embeddings = await get_embeddings([text_input])
+    return embeddings[0] or [0.0] * settings.embedding_dimension
+
+
+def chunk_fingerprint(content: str) -> str:
+    """Identity of a chunk's embedding: same fingerprint ⇒ the stored vector can be reused."""
+    return make_cache_key(content, get_embedding_backend().model, settings.embedding_dimension)
+
+
+class VectorizeResult:
+    """Outcome of a vectorization run: stored chunk ids plus reuse accounting."""
+
+    __slots__ = ("chunk_ids", "embedded", "reused", "deleted")
+
+    def __init__(self):
+        self.chunk_ids: list[uuid.UUID] = []
+        self.embedded = 0   # chunks embedded and inserted
+        self.reused = 0     # existing rows kept with their vectors
+        self.deleted = 0    # existing rows no longer produced by the document
+
+
+async def vectorize_segments(
+    segments: AsyncIterable[str] | Iterable[str],
+    document_id: uuid.UUID,
+    metadata: dict[str, Any],
+    db: AsyncSession,
+    late_metadata: dict[str, Any] | None = None,
+    incremental: bool = False,
+    progress: IngestionProgress | None = None,
+) -> VectorizeResult:
     """
-    try:
-        from openai import AsyncOpenAI
+    Streaming vectorization: page / sheet texts → chunks → batched embeddings → bulk store.
+    Chunks are embedded and written in windows as soon as they are produced,
+    so only one window of chunks is held in memory at a time.
+    Each chunk's metadata records its `token_count` and `fingerprint`.
+    `late_metadata` may be filled while the segments are consumed (e.g. entities);
+    it is merged into every chunk's metadata, together with `total_chunks`,
+    once the stream is exhausted.
 
-        client = AsyncOpenAI(api_key=settings.openai_api_key)
-        response = await client.embeddings.create(
-            model=settings.openai_embedding_model,
-            input=text_input,
+    With `incremental`, the document's existing chunks are matched by
+    fingerprint: matches keep their row and vector (only position / metadata
+    are updated when they moved), new chunks are embedded and inserted, and
+    rows that no longer occur are deleted.
+    Time and item counts of the chunk / embed / store stages go to `progress`.
+    """
+    progress = progress or IngestionProgress()
+    chunker = new_chunker()
+    counter = get_token_counter()
+    window_size = settings.embedding_batch_size * max(1, settings.embedding_max_concurrency)
+    window: list[TextChunk] = []
+    result = VectorizeResult()
+
+    reusable: dict[str, list[Any]] = {}
+    unembedded: list[uuid.UUID] = []
+    if incremental:
+        for row in await load_document_chunks(db, document_id):
+            if not row.embedded:   # its embedding failed: replace it with a freshly embedded row
+                unembedded.append(row.id)
+                continue
+            fingerprint = (row.metadata or {}).get("fingerprint") or chunk_fingerprint(row.content)
+            reusable.setdefault(fingerprint, []).append(row)
+
+    async def _flush() -> None:
+        # Character-mode chunks are counted here, one batch per window, off the event loop
+        with progress.stage("chunk"):
+            uncounted = [c for c in window if "token_count" not in c.metadata]
+            if uncounted:
+                counts = await asyncio.to_thread(counter.count_many, [c.content for c in uncounted])
+                for chunk, tokens in zip(uncounted, counts):
+                    chunk.metadata["token_count"] = tokens
+
+        ids: list[uuid.UUID | None] = [None] * len(window)
+        fresh: list[int] = []
+        moved: list[dict[str, Any]] = []
+        metadatas: list[dict[str, Any]] = []
+
+        for pos, chunk in enumerate(window):
+            fingerprint = chunk_fingerprint(chunk.content)
+            chunk_metadata = {**metadata, **chunk.to_metadata(), "fingerprint": fingerprint}
+            metadatas.append(chunk_metadata)
+
+            row = _take_reusable(reusable.get(fingerprint), chunk.index)
+            if row is None:
+                fresh.append(pos)
+                continue
+            ids[pos] = row.id
+            stored = row.metadata or {}
+            if (
+                row.chunk_index != chunk.index
+                or row.content != chunk.content
+                or any(stored.get(k) != v for k, v in chunk_metadata.items())
+            ):
+                moved.append({
+                    "id": row.id,
+                    "chunk_index": chunk.index,
+                    "content": chunk.content,
+                    "metadata": {**stored, **chunk_metadata},
+                })
+
+        with progress.stage("store"):
+            await update_chunks(db, moved)
+        if fresh:
+            with progress.stage("embed", items=len(fresh)):
+                embeddings = await get_embeddings(
+                    [window[i].content for i in fresh],
+                    token_counts=[window[i].metadata["token_count"] for i in fresh],
+                )
+            with progress.stage("store", items=len(window)):
+                new_ids = await bulk_insert_chunks(
+                    db,
+                    document_id=document_id,
+                    contents=[window[i].content for i in fresh],
+                    embeddings=embeddings,
+                    metadatas=[metadatas[i] for i in fresh],
+                    chunk_indexes=[window[i].index for i in fresh],
+                )
+            for pos, chunk_id in zip(fresh, new_ids):
+                ids[pos] = chunk_id
+        else:
+            progress.advance("store", len(window))
+
+        result.chunk_ids.extend(ids)
+        result.embedded += len(fresh)
+        result.reused += len(window) - len(fresh)
+        window.clear()
+
+    async for segment in _aiter(segments):
+        with progress.stage("chunk"):
+            produced = chunker.feed(segment)
+        progress.advance("chunk", len(produced))
+        for chunk in produced:
+            window.append(chunk)
+            if len(window) >= window_size:
+                await _flush()
+    with progress.stage("chunk"):
+        produced = chunker.finish()
+    progress.advance("chunk", len(produced))
+    window.extend(produced)
+    if window:
+        await _flush()
+
+    with progress.stage("store"):
+        stale = [row.id for rows in reusable.values() for row in rows] + unembedded
+        result.deleted = await delete_chunks(db, stale)
+
+        if result.chunk_ids:
+            await annotate_chunks(
+                db, document_id, {**(late_metadata or {}), "total_chunks": len(result.chunk_ids)},
+            )
+
+    if incremental:
+        logger.info(
+            f"Re-vectorized document {document_id}: {result.reused} reused, "
+            f"{result.embedded} embedded, {result.deleted} deleted"
         )
-        return response.data[0].embedding
-    except Exception:
-        # Fallback: return zero vector for development without API key
-        return [0.0] * settings.embedding_dimension
+    else:
+        logger.info(f"Vectorized document {document_id}: {len(result.chunk_ids)} chunks stored")
+    return result
 
 
 async def vectorize_and_store(
@@ -77,38 +403,29 @@ async def vectorize_and_store(
     document_id: uuid.UUID,
     metadata: dict[str, Any],
     db: AsyncSession,
-) -> list[DocumentChunk]:
+) -> list[uuid.UUID]:
     """
-    Full vectorization pipeline: chunk text → embed each chunk → store in DB with pgvector.
+    Full vectorization pipeline: chunk text → embed chunks in batches → bulk-store in pgvector.
+    Returns the ids of the stored chunks.
     """
-    chunks_text = chunk_text(text_content)
-    stored_chunks: list[DocumentChunk] = []
-
-    for idx, chunk_content in enumerate(chunks_text):
-        embedding = await get_embedding(chunk_content)
-
-        chunk = DocumentChunk(
-            document_id=document_id,
-            chunk_index=idx,
-            content=chunk_content,
-            chunk_metadata={
-                **metadata,
-                "chunk_index": idx,
-                "total_chunks": len(chunks_text),
-            },
-        )
-        db.add(chunk)
-        await db.flush()
-        await db.refresh(chunk)
-
-        await db.execute(
-            text(
-                "UPDATE document_chunks SET embedding = :embedding WHERE id = :chunk_id"
-            ),
-            {"embedding": str(embedding), "chunk_id": str(chunk.id)},
-        )
+    result = await vectorize_segments([text_content] if text_content else [], document_id, metadata, db)
+    return result.chunk_ids
+
+
+def _take_reusable(rows: list[Any] | None, chunk_index: int) -> Any | None:
+    """Pop a stored row for a fingerprint, preferring the one already at `chunk_index`."""
+    if not rows:
+        return None
+    for pos, row in enumerate(rows):
+        if row.chunk_index == chunk_index:
+            return rows.pop(pos)
+    return rows.pop(0)
 
-        stored_chunks.append(chunk)
 
-    logger.info(f"Vectorized document {document_id}: {len(stored_chunks)} chunks stored")
-    return stored_chunks
+async def _aiter(segments: AsyncIterable[str] | Iterable[str]) -> AsyncIterator[str]:
+    if hasattr(segments, "__aiter__"):
+        async for segment in segments:
+            yield segment
+    else:
+        for segment in segments:
+            yield segment
@@ -17,32 +17,46 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.financial import Document, DocumentChunk
 from app.schemas.schemas import IngestionResult
-from app.services.ingestion.parsers import parse_pdf, parse_excel
+from app.services.ingestion.parsers import DocumentSource, read_text_source
+from app.services.sources.parsers import iter_excel_sheets, iter_pdf_pages_parallel
+from app.services.sources.executor import ParserBusyError, get_parser_pool
+from app.services.sources.parse_cache import cached_segments
 from app.services.ingestion.entity_extractor import extract_financial_entities
 from app.services.rag.embedder import chunk_and_embed
+from app.services.cognitive_ingestion.tabular_store import ingest_document_tables
+from app.services.cognitive_ingestion.vector_store import invalidate_on_commit
 
 
 async def ingest_document(
     doc: Document,
-    raw_bytes: bytes,
+    source: DocumentSource,
     db: AsyncSession,
 ) -> IngestionResult:
     """
     Main ingestion pipeline:
-    1. Parse document (PDF/Excel) → raw text
+    1. Parse document (PDF/Excel) → raw text (parse cache first)
     2. Extract financial entities (amount, date, counterparty, etc.)
     3. Chunk content for RAG
-    4. Store chunks + embeddings in pgvector
+    4. Store chunks + embeddings in pgvector (+ columnar tables for spreadsheets)
     5. Return structured result
+    Raises ParserBusyError when the format's parser pool is saturated.
     """
     try:
         # ── 1. Parse ──
-        if doc.file_type in ("pdf",):
-            raw_text = parse_pdf(raw_bytes)
-        elif doc.file_type in ("xlsx", "xls", "csv"):
-            raw_text = parse_excel(raw_bytes, doc.file_type)
+        # Same segments as the cognitive pipeline, so both share parse cache entries
+        file_type = doc.file_type
+        if file_type in ("pdf",):
+            parse, separator = (lambda: iter_pdf_pages_parallel(source)), "\n"
+        elif file_type in ("xlsx", "xls", "csv"):
+            parse, separator = (lambda: iter_excel_sheets(source, file_type)), "\n\n"
         else:
-            raw_text = raw_bytes.decode("utf-8", errors="ignore")
+            # Decoded as plain text, whatever the extension
+            file_type = "txt"
+            parse, separator = (lambda: [read_text_source(source)]), ""
+        segments = await get_parser_pool(file_type).run(
+            cached_segments, source, file_type, parse, doc.content_sha256,
+        )
+        raw_text = separator.join(segments)
 
         doc.raw_text = raw_text if hasattr(doc, "raw_text") else None
 
@@ -61,6 +75,8 @@ async def ingest_document(
             },
             db=db,
         )
+        tables = await ingest_document_tables(doc, source, db)
+        invalidate_on_commit(db, doc.company_id)
 
         # ── 4. Mark processed ──
         doc.processed = True
@@ -71,9 +87,12 @@ async def ingest_document(
             file_type=doc.file_type,
             entities_extracted=entities,
             chunks_created=len(chunks),
+            tables_created=len(tables),
             status="success",
         )
 
+    except ParserBusyError:
+        raise
     except Exception as e:
         return IngestionResult(
             document_id=doc.id,
@@ -7,12 +7,11 @@ from __future__ import annotations
 import uuid
 from typing import Any
 
-from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.schemas.schemas import RAGResponse
-from app.services.rag.embedder import get_embedding
+from app.services.cognitive_ingestion.indexer import retrieve
 
 settings = get_settings()
 
@@ -21,7 +20,9 @@ class RAGRetriever:
     """
     Retrieval-Augmented Generation engine.
     1. Embed the user query
-    2. Vector search in pgvector (cosine similarity)
+    2. Vector search (cosine similarity) on the configured vector backend,
+       fused with literal matches of the question's terms in hybrid mode –
+       steps 1 and 2 are skipped when the retrieval cache holds the question
     3. Build context from top-k chunks
     4. Send to LLM for answer generation
     """
@@ -32,48 +33,32 @@ class RAGRetriever:
         company_id: uuid.UUID | None,
         top_k: int,
         db: AsyncSession,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        mode: str | None = None,
     ) -> RAGResponse:
-        # ── 1. Embed the question ──
-        query_embedding = await get_embedding(question)
-
-        # ── 2. Vector similarity search ──
-        filter_clause = ""
-        params: dict[str, Any] = {
-            "embedding": str(query_embedding),
-            "top_k": top_k,
-        }
-        if company_id:
-            filter_clause = "AND d.company_id = :company_id"
-            params["company_id"] = str(company_id)
-
-        sql = text(f"""
-            SELECT
-                dc.id,
-                dc.content,
-                dc.chunk_metadata,
-                d.filename,
-                1 - (dc.embedding <=> :embedding::vector) AS similarity
-            FROM document_chunks dc
-            JOIN documents d ON dc.document_id = d.id
-            WHERE dc.embedding IS NOT NULL
-            {filter_clause}
-            ORDER BY dc.embedding <=> :embedding::vector
-            LIMIT :top_k
-        """)
-
-        result = await db.execute(sql, params)
-        rows = result.fetchall()
+        # ── 1 & 2. Embed the question + vector (or hybrid) search, no similarity floor ──
+        rows = await retrieve(
+            question,
+            company_id=company_id,
+            top_k=top_k,
+            similarity_threshold=-1.0,
+            db=db,
+            ef_search=ef_search,
+            probes=probes,
+            mode=mode,
+        )
 
         # ── 3. Build context ──
         sources: list[dict[str, Any]] = []
         context_parts: list[str] = []
 
         for row in rows:
-            chunk_id, content, metadata, filename, similarity = row
+            content, filename = row["content"], row["filename"]
             sources.append({
-                "chunk_id": str(chunk_id),
+                "chunk_id": row["chunk_id"],
                 "filename": filename,
-                "similarity": round(float(similarity), 4),
+                "similarity": row["similarity"],
                 "excerpt": content[:300] + "..." if len(content) > 300 else content,
             })
             context_parts.append(f"[Source: {filename}]\n{content}")
@@ -86,7 +71,7 @@ class RAGRetriever:
         return RAGResponse(
             answer=answer,
             sources=sources,
-            confidence=float(rows[0][4]) if rows else None,
+            confidence=float(rows[0]["similarity"]) if rows else None,
         )
 
     async def _generate_answer(self, question: str, context: str) -> str:
@@ -16,8 +16,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings
 from app.schemas.schemas import RAGResponse
-from app.services.cognitive_ingestion.vectorizer import get_embedding
-from app.services.cognitive_ingestion.indexer import search_index
+from app.services.cognitive_ingestion.indexer import retrieve
 from app.services.ragraph.episodic_memory import EpisodicMemory, Episode
 from app.services.ragraph.reasoning import ReasoningEngine
 
@@ -44,6 +43,9 @@ class RAGOrchestrator:
         use_memory: bool = True,
         use_graph: bool = True,
         db: AsyncSession = None,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        mode: str | None = None,
     ) -> RAGResponse:
         """
         Full RAG orchestration pipeline:
@@ -55,15 +57,15 @@ class RAGOrchestrator:
         6. Generate answer via LLM with reasoning
         7. Store the interaction as a new episode
         """
-        # ── 1. Embed query ──
-        query_embedding = await get_embedding(question)
-
-        # ── 2. Vector search ──
-        vector_results = await search_index(
-            query_embedding=query_embedding,
+        # ── 1 & 2. Embed query + vector search (retrieval cache first) ──
+        vector_results = await retrieve(
+            question,
             company_id=company_id,
             top_k=top_k,
             db=db,
+            ef_search=ef_search,
+            probes=probes,
+            mode=mode,
         )
 
         # ── 3. Episodic memory recall ──
@@ -200,6 +200,7 @@ class FeedbackReindexer:
         """
         Re-index documents that have shown significant prediction gaps.
         This improves future RAG retrieval accuracy.
+        Re-indexing is incremental: unchanged chunks keep their vectors.
         """
         import uuid
         results = []
@@ -211,6 +212,8 @@ class FeedbackReindexer:
                     "document_id": doc_id_str,
                     "status": result.status,
                     "chunks_created": result.chunks_created,
+                    "chunks_reused": result.chunks_reused,
+                    "chunks_embedded": result.chunks_embedded,
                 })
             except Exception as e:
                 results.append({
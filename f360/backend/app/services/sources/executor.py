@@ -0,0 +1,278 @@
+"""
+F360 – Parser Execution
+Per-format pools that keep parsing off the event loop.
+Each format family has its own concurrency limit and wait-queue depth:
+- pdf, spreadsheet, text: blocking parsers run on a dedicated thread pool
+  (large PDFs still fan their pages out to the PDF process pool)
+- image, media: parsers that are already asynchronous (OCR process pool,
+  ffmpeg subprocesses) only take a slot, which bounds how many run at once
+A parse waits for a free slot; once `max_queued` parses are waiting, new ones
+are rejected with ParserBusyError instead of piling up. Queue-wait and run
+times are recorded per pool.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, TypeVar
+
+import numpy as np
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+METRIC_SAMPLES = 1024   # most recent parses kept for the latency percentiles
+THREADED_POOLS = ("pdf", "spreadsheet", "text")
+ASYNC_POOLS = ("image", "media")
+
+FORMAT_POOLS = {
+    "pdf": "pdf",
+    "xlsx": "spreadsheet", "xls": "spreadsheet", "csv": "spreadsheet",
+    "png": "image", "jpg": "image", "jpeg": "image", "tiff": "image", "bmp": "image",
+    "mp3": "media", "wav": "media", "m4a": "media", "ogg": "media", "flac": "media",
+    "mp4": "media", "avi": "media", "mkv": "media", "mov": "media",
+}
+_DONE = object()
+
+
+class ParserBusyError(RuntimeError):
+    """A parser pool is saturated: every worker busy and the wait queue full."""
+
+    def __init__(self, pool: str, queued: int, retry_after: int):
+        super().__init__(f"Parser pool '{pool}' is saturated ({queued} parses waiting); retry in {retry_after} s")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+def spawn_process_pool(workers: int, initializer: Callable[[], None] | None = None) -> ProcessPoolExecutor:
+    """
+    Process pool for CPU-bound parsing (PDF pages, OCR bands). Workers are
+    spawned, not forked: the API process runs threads (asyncio, DB drivers)
+    that must not be forked.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max(1, workers),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer,
+    )
+
+
+def parse_pool_spec(spec: str) -> dict[str, tuple[int, int]]:
+    """"pdf=2:16,media=1:4" → {"pdf": (2, 16), "media": (1, 4)} (workers : queue depth)."""
+    pools: dict[str, tuple[int, int]] = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            name, limits = entry.split("=")
+            workers, queued = limits.split(":")
+            pools[name.strip()] = (max(1, int(workers)), max(0, int(queued)))
+        except ValueError:
+            raise ValueError(f"Invalid parser pool '{entry}' (expected name=workers:queue_depth)")
+    unknown = set(pools) - set(THREADED_POOLS) - set(ASYNC_POOLS)
+    if unknown:
+        raise ValueError(f"Unknown parser pools: {', '.join(sorted(unknown))}")
+    return pools
+
+
+# ═══════════════════════════════════════════════════════════════
+# POOL
+# ═══════════════════════════════════════════════════════════════
+
+class ParserPool:
+    """
+    At most `workers` parses at once, at most `max_queued` waiting for a slot.
+    With `threaded`, blocking work runs on the pool's own threads.
+    """
+
+    def __init__(self, name: str, workers: int, max_queued: int, threaded: bool = True):
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_queued = max(0, max_queued)
+        self.executor = (
+            ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"parser-{name}") if threaded else None
+        )
+        self.running = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._waits: deque[float] = deque(maxlen=METRIC_SAMPLES)
+        self._runs: deque[float] = deque(maxlen=METRIC_SAMPLES)
+
+    # ── Slots ──
+
+    async def _acquire(self) -> None:
+        if self.running < self.workers and not self._waiters:
+            self.running += 1
+            return
+        if len(self._waiters) >= self.max_queued:
+            self.rejected += 1
+            raise ParserBusyError(self.name, len(self._waiters), self._retry_after())
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter   # resolved by _release, which hands its slot over
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled():
+                self._release()   # the slot arrived together with the cancellation
+            raise
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[list[float]]:
+        """Hold a slot; the yielded accumulator collects the time spent parsing."""
+        queued = time.perf_counter()
+        await self._acquire()
+        self._waits.append(time.perf_counter() - queued)
+        busy = [0.0]
+        try:
+            yield busy
+        except GeneratorExit:
+            self.completed += 1   # the consumer stopped early
+            raise
+        except BaseException:
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+        finally:
+            self._runs.append(busy[0])
+            self._release()
+
+    @staticmethod
+    async def _timed(busy: list[float], work: Awaitable[T]) -> T:
+        started = time.perf_counter()
+        try:
+            return await work
+        finally:
+            busy[0] += time.perf_counter() - started
+
+    # ── Execution ──
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Blocking `fn(*args)` on the pool's threads."""
+        async with self._slot() as busy:
+            loop = asyncio.get_running_loop()
+            return await self._timed(busy, loop.run_in_executor(self.executor, fn, *args))
+
+    async def call(self, fn: Callable[..., Awaitable[T]], *args: Any) -> T:
+        """An asynchronous parser, within the pool's concurrency limit."""
+        async with self._slot() as busy:
+            return await self._timed(busy, fn(*args))
+
+    async def iterate(self, factory: Callable[..., Iterator[T]], *args: Any) -> AsyncIterator[T]:
+        """
+        Items of the blocking generator `factory(*args)`, each one produced on
+        the pool's threads. The slot is held until the generator is exhausted;
+        time the consumer spends between items does not count as run time.
+        """
+        async with self._slot() as busy:
+            loop = asyncio.get_running_loop()
+            items = await self._timed(busy, loop.run_in_executor(self.executor, lambda: iter(factory(*args))))
+            try:
+                while (item := await self._timed(busy, loop.run_in_executor(self.executor, next, items, _DONE))) \
+                        is not _DONE:
+                    yield item
+            finally:
+                close = getattr(items, "close", None)
+                if close is not None:
+                    close()
+
+    async def aiterate(self, items: AsyncIterator[T]) -> AsyncIterator[T]:
+        """Items of an asynchronous parser, within the pool's concurrency limit."""
+        async with self._slot() as busy:
+            iterator = aiter(items)
+            try:
+                while True:
+                    try:
+                        item = await self._timed(busy, anext(iterator))
+                    except StopAsyncIteration:
+                        return
+                    yield item
+            finally:
+                close = getattr(iterator, "aclose", None)
+                if close is not None:
+                    await close()
+
+    # ── Metrics ──
+
+    def _retry_after(self) -> int:
+        """Rough seconds until a slot frees up: median run time × queue rounds."""
+        typical = float(np.median(self._runs)) if self._runs else 1.0
+        rounds = (len(self._waiters) // self.workers) + 1
+        return max(1, round(typical * rounds))
+
+    def stats(self) -> dict[str, Any]:
+        waits = np.array(self._waits) if self._waits else np.zeros(1)
+        runs = np.array(self._runs) if self._runs else np.zeros(1)
+        return {
+            "pool": self.name,
+            "threaded": self.executor is not None,
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "running": self.running,
+            "queued": sum(not w.done() for w in self._waiters),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_p50_ms": round(float(np.percentile(waits, 50)) * 1000, 1),
+            "wait_p95_ms": round(float(np.percentile(waits, 95)) * 1000, 1),
+            "run_p50_ms": round(float(np.percentile(runs, 50)) * 1000, 1),
+            "run_p95_ms": round(float(np.percentile(runs, 95)) * 1000, 1),
+        }
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ═══════════════════════════════════════════════════════════════
+# REGISTRY
+# ═══════════════════════════════════════════════════════════════
+
+@lru_cache()
+def get_parser_pools() -> dict[str, ParserPool]:
+    """Process-wide pools configured from settings (PARSER_POOLS)."""
+    limits = parse_pool_spec(settings.parser_pools)
+    return {
+        name: ParserPool(name, *limits.get(name, (2, 16)), threaded=name in THREADED_POOLS)
+        for name in THREADED_POOLS + ASYNC_POOLS
+    }
+
+
+def get_parser_pool(file_type: str) -> ParserPool:
+    """Pool for a file type; anything unknown is decoded as text."""
+    return get_parser_pools()[FORMAT_POOLS.get(file_type.lower().lstrip("."), "text")]
+
+
+def parser_pool_stats() -> list[dict[str, Any]]:
+    if not get_parser_pools.cache_info().currsize:
+        return []
+    return [pool.stats() for pool in get_parser_pools().values()]
+
+
+def close_parser_pools() -> None:
+    """Shut the parser threads down (application shutdown)."""
+    if get_parser_pools.cache_info().currsize:
+        for pool in get_parser_pools().values():
+            pool.shutdown()
+        get_parser_pools.cache_clear()
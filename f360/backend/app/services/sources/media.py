@@ -0,0 +1,294 @@
+"""
+F360 – Media Pipeline
+Audio / video decoding through ffmpeg pipes, without temporary files.
+ffmpeg runs as an asyncio subprocess: stored uploads are opened by ffmpeg
+itself (seekable), in-memory sources are streamed into its stdin block by
+block, and its stdout is consumed as it is produced – fixed-length PCM
+segments for transcription, grayscale keyframes (sampled on scene changes)
+for OCR. Memory stays bounded by one segment / one frame per pipe, and
+nothing blocks the event loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import os
+import re
+import shutil
+import wave
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+AUDIO_SAMPLE_RATE = 16_000   # speech models work on 16 kHz mono; smaller segments to upload
+AUDIO_SAMPLE_WIDTH = 2       # s16le
+PIPE_BLOCK_BYTES = 1 << 20   # stdin writes / stdout reads
+_PTS_TIME_RE = re.compile(r"\bpts_time:\s*(-?[\d.]+)")
+_ERROR_TAGS = ("[error]", "[fatal]", "[panic]")   # "-loglevel level+…" prefixes each line with its level
+
+
+class FfmpegError(RuntimeError):
+    """ffmpeg exited with an error or stopped producing output."""
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which(settings.ffmpeg_binary) is not None
+
+
+class AudioSegment:
+    """A run of decoded mono PCM, `start` seconds into the recording."""
+
+    __slots__ = ("index", "start", "pcm")
+
+    def __init__(self, index: int, start: float, pcm: bytes):
+        self.index = index
+        self.start = start
+        self.pcm = pcm
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / (AUDIO_SAMPLE_RATE * AUDIO_SAMPLE_WIDTH)
+
+    def to_wav(self) -> io.BytesIO:
+        """The segment as an in-memory WAV file, named for upload."""
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(AUDIO_SAMPLE_WIDTH)
+            out.setframerate(AUDIO_SAMPLE_RATE)
+            out.writeframes(self.pcm)
+        buffer.seek(0)
+        buffer.name = f"segment-{self.index:04d}.wav"
+        return buffer
+
+
+class Keyframe:
+    """A grayscale frame kept on a scene change, `time` seconds into the video."""
+
+    __slots__ = ("index", "time", "image")
+
+    def __init__(self, index: int, time: float | None, image: Any):
+        self.index = index
+        self.time = time
+        self.image = image
+
+
+# ═══════════════════════════════════════════════════════════════
+# FFMPEG PROCESS
+# ═══════════════════════════════════════════════════════════════
+
+class _FfmpegRun:
+    """A running ffmpeg: stdout reads with an idle timeout, stderr consumed in the background."""
+
+    def __init__(self, proc: asyncio.subprocess.Process, on_stderr: Callable[[str], None] | None):
+        self.proc = proc
+        self.errors: deque[str] = deque(maxlen=20)
+        self.stderr_done = asyncio.Event()
+        self.stderr_changed = asyncio.Event()   # set on every stderr line and at its end
+        self._on_stderr = on_stderr
+        self._stderr_task = asyncio.create_task(self._drain_stderr())
+
+    async def _drain_stderr(self) -> None:
+        try:
+            async for raw in self.proc.stderr:
+                line = raw.decode("utf-8", errors="replace").rstrip()
+                if any(tag in line for tag in _ERROR_TAGS):
+                    self.errors.append(line)
+                if self._on_stderr is not None:
+                    self._on_stderr(line)
+                self.stderr_changed.set()
+        finally:
+            self.stderr_done.set()
+            self.stderr_changed.set()
+
+    async def read(self, size: int) -> bytes:
+        """Up to `size` bytes of stdout (fewer only at end of stream)."""
+        parts: list[bytes] = []
+        remaining = size
+        while remaining:
+            try:
+                block = await asyncio.wait_for(
+                    self.proc.stdout.read(min(remaining, PIPE_BLOCK_BYTES)), settings.media_idle_timeout,
+                )
+            except asyncio.TimeoutError:
+                raise FfmpegError(f"ffmpeg produced no output for {settings.media_idle_timeout} s")
+            if not block:
+                break
+            parts.append(block)
+            remaining -= len(block)
+        return b"".join(parts)
+
+    async def readline(self) -> bytes:
+        try:
+            return await asyncio.wait_for(self.proc.stdout.readline(), settings.media_idle_timeout)
+        except asyncio.TimeoutError:
+            raise FfmpegError(f"ffmpeg produced no output for {settings.media_idle_timeout} s")
+
+    async def finish(self, produced: bool) -> None:
+        """
+        Wait for ffmpeg to exit; raise with its last error lines if it failed.
+        ffmpeg exits 0 on unreadable input (e.g. an MP4 without "faststart"
+        fed through a pipe), so errors with no output count as a failure.
+        """
+        code = await self.proc.wait()
+        await self.stderr_done.wait()
+        if code != 0 or (not produced and self.errors):
+            raise FfmpegError(f"ffmpeg failed (exit {code}): " + " | ".join(self.errors))
+
+
+async def _feed_stdin(proc: asyncio.subprocess.Process, payload: Any) -> None:
+    view = memoryview(payload)
+    try:
+        for start in range(0, len(view), PIPE_BLOCK_BYTES):
+            proc.stdin.write(view[start:start + PIPE_BLOCK_BYTES])
+            await proc.stdin.drain()   # backpressure: ffmpeg reads at its own pace
+    except (BrokenPipeError, ConnectionResetError):
+        pass  # ffmpeg stopped reading; its exit status tells why
+    finally:
+        proc.stdin.close()
+
+
+@asynccontextmanager
+async def _ffmpeg(
+    source: Any,
+    output_args: list[str],
+    loglevel: str = "error",
+    on_stderr: Callable[[str], None] | None = None,
+) -> AsyncIterator[_FfmpegRun]:
+    """
+    Run ffmpeg on `source` (a path, bytes or a memory map) with output to stdout.
+    The process is killed if the consumer stops early.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        input_args, payload = ["-nostdin", "-i", os.fspath(source)], None
+    else:
+        input_args, payload = ["-i", "pipe:0"], source
+
+    proc = await asyncio.create_subprocess_exec(
+        settings.ffmpeg_binary, "-hide_banner", "-loglevel", f"level+{loglevel}", *input_args, *output_args,
+        stdin=asyncio.subprocess.PIPE if payload is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    run = _FfmpegRun(proc, on_stderr)
+    feeder = asyncio.create_task(_feed_stdin(proc, payload)) if payload is not None else None
+    try:
+        yield run
+    finally:
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+        await proc.wait()
+        if feeder is not None:
+            feeder.cancel()
+            await asyncio.gather(feeder, return_exceptions=True)
+        await run.stderr_done.wait()
+
+
+# ═══════════════════════════════════════════════════════════════
+# AUDIO
+# ═══════════════════════════════════════════════════════════════
+
+async def iter_audio_segments(source: Any, segment_seconds: int | None = None) -> AsyncIterator[AudioSegment]:
+    """
+    Decode the audio track to 16 kHz mono PCM and yield it in segments of
+    `segment_seconds` (last one shorter). The next segment is decoded while
+    the caller handles the current one; ffmpeg pauses when the pipe is full.
+    """
+    seconds = segment_seconds or settings.media_segment_seconds
+    segment_bytes = seconds * AUDIO_SAMPLE_RATE * AUDIO_SAMPLE_WIDTH
+    output = ["-vn", "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE), "-f", "s16le", "pipe:1"]
+
+    async with _ffmpeg(source, output) as run:
+        index = 0
+        while pcm := await run.read(segment_bytes):
+            yield AudioSegment(index, index * seconds, pcm)
+            index += 1
+        await run.finish(produced=index > 0)
+
+
+# ═══════════════════════════════════════════════════════════════
+# KEYFRAMES
+# ═══════════════════════════════════════════════════════════════
+
+def keyframe_filter(threshold: float, max_width: int) -> str:
+    """First frame + every frame whose scene-change score exceeds `threshold`, grayscale."""
+    return (
+        f"select='eq(n,0)+gt(scene,{threshold})',showinfo,"
+        f"scale='min(iw,{max_width})':-2:flags=area,format=gray"
+    )
+
+
+async def _read_pgm(run: _FfmpegRun) -> tuple[int, int, bytes] | None:
+    """One binary PGM frame from ffmpeg's image2pipe stream ("P5\\n<w> <h>\\n255\\n" + pixels)."""
+    tokens: list[bytes] = []
+    while len(tokens) < 4:
+        line = await run.readline()
+        if not line:
+            return None
+        tokens.extend(line.split())
+    if tokens[0] != b"P5":
+        raise FfmpegError(f"Unexpected frame header {tokens[0]!r}")
+    width, height = int(tokens[1]), int(tokens[2])
+    pixels = await run.read(width * height)
+    if len(pixels) < width * height:
+        return None
+    return width, height, pixels
+
+
+async def iter_keyframes(
+    source: Any,
+    threshold: float | None = None,
+    max_frames: int | None = None,
+    max_width: int | None = None,
+) -> AsyncIterator[Keyframe]:
+    """
+    Yield scene-change keyframes as grayscale PIL images, in order, with their
+    timestamps (read from ffmpeg's showinfo log on stderr).
+    """
+    from PIL import Image
+
+    threshold = settings.video_scene_threshold if threshold is None else threshold
+    max_frames = max_frames or settings.video_max_keyframes
+    max_width = max_width or settings.video_frame_width
+
+    times: list[float] = []
+
+    def _on_stderr(line: str) -> None:
+        match = _PTS_TIME_RE.search(line)
+        if match and "showinfo" in line:
+            times.append(float(match.group(1)))
+
+    output = [
+        "-an", "-vf", keyframe_filter(threshold, max_width), "-fps_mode", "vfr",
+        "-frames:v", str(max_frames), "-f", "image2pipe", "-c:v", "pgm", "pipe:1",
+    ]
+    async with _ffmpeg(source, output, loglevel="info", on_stderr=_on_stderr) as run:
+        index = 0
+        while (frame := await _read_pgm(run)) is not None:
+            # showinfo logs a frame before it is encoded; wait for that line
+            while True:
+                run.stderr_changed.clear()
+                if len(times) > index or run.stderr_done.is_set():
+                    break
+                await run.stderr_changed.wait()
+            width, height, pixels = frame
+            image = Image.frombytes("L", (width, height), pixels)
+            yield Keyframe(index, times[index] if index < len(times) else None, image)
+            index += 1
+        await run.finish(produced=index > 0)
+
+
+def format_timestamp(seconds: float | None) -> str:
+    if seconds is None:
+        return "--:--:--"
+    total = int(seconds)
+    return f"{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
@@ -0,0 +1,301 @@
+"""
+F360 – OCR Service
+Tesseract OCR off the event loop, on a process pool.
+Very tall scans are split into horizontal bands (cut on the whitest pixel
+row near each boundary, so no text line is sliced) and the bands are
+recognized in parallel. Results are cached by a hash of the grayscale
+pixels, so re-indexing a document never re-OCRs an image it has seen.
+Used for uploaded images and for image-only PDF pages (no text layer).
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.disk_cache import DiskLRU
+from app.services.sources.executor import spawn_process_pool
+
+logger = logging.getLogger(__name__)
+
+OCR_CACHE_VERSION = 1        # bump when preprocessing changes what Tesseract sees
+TILE_SEARCH_FRACTION = 0.1   # cut searched within ±10 % of the band height around each boundary
+
+
+# ═══════════════════════════════════════════════════════════════
+# PREPROCESSING
+# ═══════════════════════════════════════════════════════════════
+
+def ocr_available() -> bool:
+    """Pillow, pytesseract and the tesseract binary are all present."""
+    try:
+        import PIL  # noqa: F401
+        import pytesseract
+    except ImportError:
+        return False
+    return shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+
+def to_grayscale(image: Any) -> Any:
+    """Tesseract reads grayscale best; palette / alpha images are flattened first."""
+    if image.mode == "L":
+        return image
+    if image.mode in ("P", "LA", "RGBA"):
+        image = image.convert("RGBA")
+        from PIL import Image
+
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, image)
+    return image.convert("L")
+
+
+def image_key(image: Any, lang: str, tile_height: int) -> str:
+    """Content hash of a grayscale image + the settings that shape its OCR output."""
+    digest = hashlib.sha256()
+    digest.update(f"{OCR_CACHE_VERSION}\x00{lang}\x00{tile_height}\x00{image.width}x{image.height}\x00".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def plan_tiles(rows: np.ndarray, tile_height: int) -> list[tuple[int, int]]:
+    """
+    Split a page into horizontal bands of about `tile_height` pixels.
+    `rows` holds the mean brightness of each pixel row; each cut is moved to
+    the whitest row near the boundary (the gap between two text lines).
+    """
+    height = len(rows)
+    if tile_height <= 0 or height <= tile_height * 1.5:
+        return [(0, height)]
+    window = max(1, int(tile_height * TILE_SEARCH_FRACTION))
+    bands: list[tuple[int, int]] = []
+    start = 0
+    while height - start > tile_height * 1.5:
+        lo, hi = start + tile_height - window, start + tile_height + window
+        cut = lo + int(np.argmax(rows[lo:hi]))
+        bands.append((start, cut))
+        start = cut
+    bands.append((start, height))
+    return bands
+
+
+def split_tiles(image: Any, tile_height: int) -> list[Any]:
+    """Grayscale image → list of horizontal bands (full width, text lines kept whole)."""
+    if tile_height <= 0 or image.height <= tile_height * 1.5:
+        return [image]
+    rows = np.asarray(image, dtype=np.uint8).mean(axis=1)
+    return [image.crop((0, top, image.width, bottom)) for top, bottom in plan_tiles(rows, tile_height)]
+
+
+# ═══════════════════════════════════════════════════════════════
+# WORKERS
+# ═══════════════════════════════════════════════════════════════
+
+def _init_worker() -> None:
+    # Parallelism comes from the pool; one OpenMP thread per Tesseract process
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def _recognize_tile(tile: Any, lang: str) -> str:
+    """Worker entry point: Tesseract on one grayscale band."""
+    import pytesseract
+
+    return pytesseract.image_to_string(tile, lang=lang)
+
+
+@lru_cache()
+def get_ocr_process_pool() -> ProcessPoolExecutor:
+    """Process pool for Tesseract (CPU bound; bands of one page run side by side)."""
+    settings = get_settings()
+    return spawn_process_pool(settings.ocr_workers or os.cpu_count() or 1, initializer=_init_worker)
+
+
+def close_ocr_process_pool() -> None:
+    """Shut the OCR workers down (application shutdown)."""
+    if get_ocr_process_pool.cache_info().currsize:
+        get_ocr_process_pool().shutdown(cancel_futures=True)
+        get_ocr_process_pool.cache_clear()
+
+
+# ═══════════════════════════════════════════════════════════════
+# RESULT CACHE
+# ═══════════════════════════════════════════════════════════════
+
+class OcrCache:
+    """
+    LRU memory tier in front of an optional SQLite disk tier (DiskLRU), keyed by image_key.
+    Eviction:
+    - memory: least recently used entry once `memory_entries` is exceeded
+    - disk:   least recently used rows once the stored text exceeds `disk_bytes`
+    """
+
+    def __init__(self, memory_entries: int = 1000, disk_path: Path | str | None = None, disk_bytes: int = 0):
+        self.memory_entries = max(0, memory_entries)
+        self.disk_bytes = max(0, disk_bytes)
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: DiskLRU | None = None
+
+        self.hits = 0
+        self.misses = 0
+
+        if disk_path and self.disk_bytes:
+            self._disk = DiskLRU(
+                disk_path, "ocr_results", {"text": "TEXT"}, max_bytes=self.disk_bytes, label="OCR disk cache",
+            )
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        """Cached texts for the keys that are present (memory first, then disk)."""
+        found: dict[str, str] = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                else:
+                    missing.append(key)
+            if missing and self._disk is not None:
+                for key, (text,) in self._disk.get_many(missing).items():
+                    found[key] = text
+                    self._remember(key, text)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: dict[str, str]) -> None:
+        if not items:
+            return
+        with self._lock:
+            for key, text in items.items():
+                self._remember(key, text)
+            if self._disk is not None:
+                self._disk.put_many({key: ((text,), len(text.encode("utf-8"))) for key, text in items.items()})
+
+    def _remember(self, key: str, text: str) -> None:
+        if not self.memory_entries:
+            return
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            disk = self._disk.stats() if self._disk is not None else {"disk_size": 0, "disk_bytes": 0}
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self._disk.evictions if self._disk is not None else 0,
+                "memory_size": len(self._memory),
+                **disk,
+            }
+
+
+# ═══════════════════════════════════════════════════════════════
+# SERVICE
+# ═══════════════════════════════════════════════════════════════
+
+class OcrService:
+    """
+    Recognize batches of images: cached ones are answered immediately, the
+    bands of all the others are submitted to the pool together, so the
+    pages of a scanned PDF are OCR'd in parallel and not one after another.
+    With `workers <= 1` Tesseract runs in the calling thread.
+    """
+
+    def __init__(
+        self,
+        lang: str = "fra+eng",
+        workers: int = 0,
+        tile_height: int = 0,
+        cache: OcrCache | None = None,
+    ):
+        self.lang = lang
+        self.workers = workers or os.cpu_count() or 1
+        self.tile_height = tile_height
+        self.cache = cache
+
+    def recognize(self, image: Any) -> str:
+        return self.recognize_many([image])[0]
+
+    def recognize_many(self, images: Iterable[Any]) -> list[str]:
+        """Text of each image, in order (blocking)."""
+        keys, texts, tiles = self._plan(images)
+        if self.workers > 1 and tiles:
+            pool = get_ocr_process_pool()
+            results = list(pool.map(_recognize_tile, [t for _, t in tiles], [self.lang] * len(tiles)))
+        else:
+            results = [_recognize_tile(tile, self.lang) for _, tile in tiles]
+        return self._finish(keys, texts, tiles, results)
+
+    async def arecognize_many(self, images: Iterable[Any]) -> list[str]:
+        """Text of each image, in order, without blocking the event loop."""
+        keys, texts, tiles = await asyncio.to_thread(self._plan, images)
+        if self.workers > 1 and tiles:
+            loop = asyncio.get_running_loop()
+            pool = get_ocr_process_pool()
+            results = await asyncio.gather(
+                *(loop.run_in_executor(pool, _recognize_tile, tile, self.lang) for _, tile in tiles)
+            )
+        else:
+            results = await asyncio.to_thread(lambda: [_recognize_tile(tile, self.lang) for _, tile in tiles])
+        return self._finish(keys, texts, tiles, list(results))
+
+    def _plan(self, images: Iterable[Any]) -> tuple[list[str], list[str | None], list[tuple[int, Any]]]:
+        """Grayscale + hash every image, look the hashes up, and band the misses."""
+        grays = [to_grayscale(image) for image in images]
+        keys = [image_key(gray, self.lang, self.tile_height) for gray in grays]
+        cached = self.cache.get_many(keys) if self.cache is not None else {}
+
+        texts: list[str | None] = [cached.get(key) for key in keys]
+        tiles: list[tuple[int, Any]] = []
+        planned: dict[str, int] = {}
+        for position, (key, gray) in enumerate(zip(keys, grays)):
+            if texts[position] is not None or key in planned:
+                continue   # cached, or the same image already appears earlier in the batch
+            planned[key] = position
+            tiles.extend((position, tile) for tile in split_tiles(gray, self.tile_height))
+        return keys, texts, tiles
+
+    def _finish(
+        self,
+        keys: list[str],
+        texts: list[str | None],
+        tiles: list[tuple[int, Any]],
+        results: list[str],
+    ) -> list[str]:
+        parts: dict[int, list[str]] = {}
+        for (position, _), text in zip(tiles, results):
+            parts.setdefault(position, []).append(text.strip())
+        fresh = {keys[position]: "\n".join(p for p in chunks if p) for position, chunks in parts.items()}
+        if self.cache is not None:
+            self.cache.put_many(fresh)
+        logger.debug(f"OCR: {len(texts)} images, {len(fresh)} recognized in {len(tiles)} bands")
+        return [text if text is not None else fresh[key] for text, key in zip(texts, keys)]
+
+
+@lru_cache()
+def get_ocr_service() -> OcrService:
+    """Process-wide OCR service configured from settings."""
+    settings = get_settings()
+    return OcrService(
+        lang=settings.ocr_languages,
+        workers=settings.ocr_workers,
+        tile_height=settings.ocr_tile_height,
+        cache=OcrCache(
+            memory_entries=settings.ocr_cache_memory_entries,
+            disk_path=settings.cache_path / "ocr.sqlite3" if settings.ocr_cache_disk_mb else None,
+            disk_bytes=settings.ocr_cache_disk_mb * 1024 * 1024,
+        ),
+    )
@@ -0,0 +1,244 @@
+"""
+F360 – Parse Cache
+Parsed text of documents, keyed by the SHA-256 of their raw bytes and the
+parser version, so re-indexing a document or ingesting the same file again
+skips parsing altogether (OCR and transcription included).
+An entry is the document text, zlib-compressed, plus the offset where each
+page / sheet segment starts. Entries live in a SQLite file on local disk and
+are evicted least recently used first once their size exceeds the budget.
+OCR and transcription failures leave a placeholder in the text: such parses
+are never stored.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Iterable
+
+from app.core.config import get_settings
+from app.core.disk_cache import DiskLRU
+from app.services.sources.ocr import ocr_available
+from app.services.sources.parsers import SEGMENT_PARSERS, DocumentSource, iter_file_segments, pdf_ocr_dpi
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PARSER_VERSION = 1           # bump whenever parser output changes: older entries stop matching
+COMPRESSION_LEVEL = 6
+_HASH_BLOCK = 1 << 20
+# Placeholders written when a backend is missing or failed (OCR errors included): not worth remembering
+_DEGRADED_RE = re.compile(r"\[(?:IMAGE|AUDIO|VIDEO|UNSUPPORTED): ")
+_OCR_TYPES = {"pdf", "png", "jpg", "jpeg", "tiff", "bmp", "mp4", "avi", "mkv", "mov"}
+_MEDIA_TYPES = {"mp3", "wav", "m4a", "ogg", "flac", "mp4", "avi", "mkv", "mov"}
+
+
+def hash_source(source: DocumentSource) -> str:
+    """SHA-256 of the raw document bytes (a stored file is hashed block by block)."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    digest = hashlib.sha256()
+    view = memoryview(source)
+    for start in range(0, len(view), _HASH_BLOCK):
+        digest.update(view[start:start + _HASH_BLOCK])
+    return digest.hexdigest()
+
+
+def parser_fingerprint(file_type: str) -> str:
+    """PARSER_VERSION plus the settings that change what this format's parser outputs."""
+    parts = [f"v{PARSER_VERSION}"]
+    if file_type in SEGMENT_PARSERS:
+        parts.append(f"rows={settings.spreadsheet_segment_rows}")
+    if file_type in _OCR_TYPES:
+        # The effective setting: without an OCR backend, PDF scans are left out
+        if ocr_available():
+            parts.append(f"ocr={settings.ocr_languages}@{pdf_ocr_dpi() if file_type == 'pdf' else 0}")
+        else:
+            parts.append("ocr=off")
+    if file_type in _MEDIA_TYPES:
+        parts.append(f"asr={settings.transcription_backend}/{settings.transcription_split}")
+    return ";".join(parts)
+
+
+def parse_cache_key(content_sha256: str, file_type: str) -> str:
+    """SHA-256 over (content hash, file type, parser fingerprint)."""
+    file_type = file_type.lower().lstrip(".")
+    payload = f"{content_sha256}\x00{file_type}\x00{parser_fingerprint(file_type)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SegmentEncoder:
+    """
+    Compresses segments as they stream by, keeping only the compressed bytes
+    and segment offsets. Degraded output (a missing OCR / transcription
+    backend) marks the document as not cacheable.
+    """
+
+    __slots__ = ("_compressor", "_parts", "_length", "offsets", "cacheable")
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(COMPRESSION_LEVEL)
+        self._parts: list[bytes] = []
+        self._length = 0
+        self.offsets: list[int] = []
+        self.cacheable = True
+
+    def add(self, segment: str) -> None:
+        if _DEGRADED_RE.search(segment):
+            self.cacheable = False
+        if not self.cacheable:
+            return
+        self.offsets.append(self._length)
+        self._length += len(segment)
+        self._parts.append(self._compressor.compress(segment.encode("utf-8")))
+
+    def finish(self) -> tuple[bytes, list[int]]:
+        self._parts.append(self._compressor.flush())
+        return b"".join(self._parts), self.offsets
+
+
+def decode_segments(data: bytes, offsets: list[int]) -> list[str]:
+    text = zlib.decompress(data).decode("utf-8")
+    bounds = offsets + [len(text)]
+    return [text[bounds[i]:bounds[i + 1]] for i in range(len(offsets))]
+
+
+# ═══════════════════════════════════════════════════════════════
+# DISK CACHE
+# ═══════════════════════════════════════════════════════════════
+
+class ParseCache:
+    """
+    Compressed parse results in a SQLite tier (DiskLRU), keyed by
+    parse_cache_key. Least recently used entries are dropped once the
+    compressed data exceeds `disk_bytes`.
+    """
+
+    def __init__(self, disk_path: Path | str, disk_bytes: int = 1 << 30):
+        self.disk_bytes = max(0, disk_bytes)
+        self._lock = threading.Lock()
+        self._disk = DiskLRU(
+            disk_path, "parsed_documents", {"data": "BLOB", "offsets": "TEXT"},
+            max_bytes=self.disk_bytes, label="Parse cache",
+        )
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> list[str] | None:
+        """Cached segments of a document, or None."""
+        row = self._disk.get(key)
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return decode_segments(row[0], json.loads(row[1]))
+
+    def put(self, key: str, segments: Iterable[str]) -> bool:
+        """Store a document's segments; False when they are not cacheable."""
+        encoder = SegmentEncoder()
+        for segment in segments:
+            encoder.add(segment)
+        if not encoder.cacheable:
+            return False
+        self.put_encoded(key, *encoder.finish())
+        return True
+
+    def put_encoded(self, key: str, data: bytes, offsets: list[int]) -> None:
+        if len(data) > self.disk_bytes:
+            return
+        self._disk.put_many({key: ((data, json.dumps(offsets)), len(data))})
+
+    def stats(self) -> dict[str, Any]:
+        disk = self._disk.stats()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self._disk.evictions,
+                "size": disk["disk_size"],
+                "disk_bytes": disk["disk_bytes"],
+            }
+
+
+@lru_cache()
+def get_parse_cache() -> ParseCache | None:
+    """Process-wide parse cache, or None when disabled."""
+    if not (settings.parse_cache_enabled and settings.parse_cache_disk_mb):
+        return None
+    return ParseCache(
+        disk_path=settings.cache_path / "parsed.sqlite3",
+        disk_bytes=settings.parse_cache_disk_mb * 1024 * 1024,
+    )
+
+
+# ═══════════════════════════════════════════════════════════════
+# CACHED PARSING
+# ═══════════════════════════════════════════════════════════════
+
+async def iter_cached_segments(
+    source: DocumentSource,
+    file_type: str,
+    content_sha256: str | None = None,
+    cache: ParseCache | None = None,
+) -> AsyncIterator[str]:
+    """
+    iter_file_segments behind the parse cache: a known document is replayed
+    from the cache; otherwise segments stream through as they are parsed and
+    the complete result is stored. `content_sha256` saves hashing the source
+    again when the caller already knows it (uploads hash while spooling).
+    """
+    cache = cache or get_parse_cache()
+    if cache is None:
+        async for segment in iter_file_segments(source, file_type):
+            yield segment
+        return
+
+    key = parse_cache_key(content_sha256 or await asyncio.to_thread(hash_source, source), file_type)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        logger.info(f"Parse cache hit: {len(cached)} segments replayed")
+        for segment in cached:
+            yield segment
+        return
+
+    encoder = SegmentEncoder()
+    async for segment in iter_file_segments(source, file_type):
+        encoder.add(segment)
+        yield segment
+    if encoder.cacheable:
+        await asyncio.to_thread(cache.put_encoded, key, *encoder.finish())
+
+
+def cached_segments(
+    source: DocumentSource,
+    file_type: str,
+    parse: Callable[[], Iterable[str]],
+    content_sha256: str | None = None,
+    cache: ParseCache | None = None,
+) -> list[str]:
+    """
+    Synchronous counterpart for the bulk and legacy pipelines: `parse` must
+    produce the same segments as iter_file_segments for this file type.
+    Blocking – run it in a worker thread.
+    """
+    cache = cache or get_parse_cache()
+    if cache is None:
+        return list(parse())
+
+    key = parse_cache_key(content_sha256 or hash_source(source), file_type)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    segments = list(parse())
+    cache.put(key, segments)
+    return segments
@@ -2,113 +2,537 @@
 F360 – Multimodal Parsers
 Unified parsers for PDF, Images (OCR), Audio (transcription), Video (frames + audio).
 Extends the original PDF/Excel parsers with multimodal capabilities.
+Every parser takes raw bytes, the path of a stored upload, or a memory map;
+paths are preferred so large files are read lazily instead of copied.
 """
 from __future__ import annotations
 
+import asyncio
+import csv
 import io
 import logging
-from pathlib import Path
-from typing import Any
-
+import mmap
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
+from typing import Any, AsyncIterator, Iterable, Iterator, Union
+
+import numpy as np
+import openpyxl
 import pdfplumber
 import pandas as pd
 
+from app.core.config import get_settings
+from app.services.sources.executor import ParserBusyError, get_parser_pool, spawn_process_pool
+from app.services.sources.media import ffmpeg_available, format_timestamp, iter_keyframes
+from app.services.sources.ocr import OcrService, get_ocr_service, ocr_available, to_grayscale
+from app.services.sources.transcription import TranscriptionUnavailable, transcribe_audio
+
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PDF_MIN_PAGES_PER_TASK = 4
+CSV_SNIFF_BYTES = 64 * 1024          # head of a CSV inspected to guess its delimiter
+CSV_DELIMITERS = ",;\t|"
+
+# What parsers accept: raw bytes, the path of a stored upload, or a memory-mapped file
+DocumentSource = Union[bytes, str, os.PathLike, mmap.mmap]
+
+
+# ═══════════════════════════════════════════════════════════════
+# SOURCE HELPERS
+# ═══════════════════════════════════════════════════════════════
+
+def _as_file(source: DocumentSource) -> Any:
+    """
+    Something pdfplumber / pandas / PIL can open without copying the document:
+    a filesystem path (read lazily by the library), a rewound memory map,
+    or a BytesIO view over in-memory bytes.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def _picklable(source: DocumentSource) -> bytes | str:
+    """Form of the source shipped to worker processes (a path costs nothing to send)."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return bytes(source) if not isinstance(source, bytes) else source
+
+
+@contextmanager
+def map_file(path: str | os.PathLike) -> Iterator[mmap.mmap | bytes]:
+    """Read-only memory map of a stored file (pages are loaded on demand, not copied)."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""  # mmap cannot map empty files
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def read_text_source(source: DocumentSource) -> str:
+    """Decode a plain-text document (UTF-8, undecodable bytes dropped)."""
+    if isinstance(source, (str, os.PathLike)):
+        with map_file(source) as mapped:
+            return mapped[:].decode("utf-8", errors="ignore")
+    return bytes(source).decode("utf-8", errors="ignore")
 
 
 # ═══════════════════════════════════════════════════════════════
 # PDF PARSER
 # ═══════════════════════════════════════════════════════════════
 
-def parse_pdf(raw_bytes: bytes) -> str:
+def _page_text(page: Any) -> str:
+    """Text layer + tables (as ' | '-joined rows) of one pdfplumber page."""
+    text_parts: list[str] = []
+    page_text = page.extract_text()
+    if page_text:
+        text_parts.append(page_text)
+
+    # Also extract tables as structured text
+    tables = page.extract_tables()
+    for table in tables:
+        for row in table:
+            cleaned_row = [str(cell).strip() if cell else "" for cell in row]
+            text_parts.append(" | ".join(cleaned_row))
+
+    # Release pdfplumber's per-page object cache
+    page.flush_cache()
+    return "\n".join(text_parts)
+
+
+def _page_content(page: Any, ocr_dpi: int = 0) -> Any:
+    """
+    Text of a page, or – for a scan (no text layer, but images) when OCR is
+    enabled – its grayscale rendering, to be recognized by the OCR service.
+    """
+    text = _page_text(page)
+    if text or not ocr_dpi or not page.images:
+        return text
+    return to_grayscale(page.to_image(resolution=ocr_dpi).original)
+
+
+def _extract_page_range(source: DocumentSource, start: int, stop: int, ocr_dpi: int = 0) -> list[Any]:
+    """Worker entry point: contents of pages [start, stop) of a PDF (empty pages included)."""
+    with pdfplumber.open(_as_file(source)) as pdf:
+        return [_page_content(page, ocr_dpi) for page in pdf.pages[start:stop]]
+
+
+def _iter_page_contents(source: DocumentSource, ocr_dpi: int) -> Iterator[Any]:
+    with pdfplumber.open(_as_file(source)) as pdf:
+        for page in pdf.pages:
+            yield _page_content(page, ocr_dpi)
+
+
+def iter_pdf_pages(source: DocumentSource) -> Iterator[str]:
+    """
+    Yield the text of each PDF page (text layer + tables as rows) lazily,
+    so downstream stages can start before the whole document is parsed.
+    Scanned pages are OCR'd.
+    """
+    for text in _recognize_pages(_iter_page_contents(source, pdf_ocr_dpi())):
+        if text:
+            yield text
+
+
+def parse_pdf(source: DocumentSource) -> str:
     """
     Extract text from a PDF file using pdfplumber.
     Falls back gracefully on OCR-resistant PDFs.
+    Large PDFs are split across the PDF process pool.
     """
-    text_parts: list[str] = []
-    with pdfplumber.open(io.BytesIO(raw_bytes)) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text_parts.append(page_text)
+    return "\n".join(iter_pdf_pages_parallel(source))
 
-            # Also extract tables as structured text
-            tables = page.extract_tables()
-            for table in tables:
-                for row in table:
-                    cleaned_row = [str(cell).strip() if cell else "" for cell in row]
-                    text_parts.append(" | ".join(cleaned_row))
 
-    return "\n".join(text_parts)
+# ── Page-parallel backend ──
+
+@lru_cache()
+def get_pdf_process_pool() -> ProcessPoolExecutor:
+    """Process pool for page-parallel PDF extraction (pdfplumber is pure-Python, CPU bound)."""
+    return spawn_process_pool(settings.pdf_parallel_workers or os.cpu_count() or 1)
+
+
+def close_pdf_process_pool() -> None:
+    """Shut the PDF workers down (application shutdown)."""
+    if get_pdf_process_pool.cache_info().currsize:
+        get_pdf_process_pool().shutdown(cancel_futures=True)
+        get_pdf_process_pool.cache_clear()
+
+
+def plan_page_ranges(page_count: int, workers: int) -> list[tuple[int, int]]:
+    """
+    Split pages into contiguous ranges, about four per worker so a slow range
+    (scanned tables, dense layouts) does not leave the other workers idle.
+    """
+    if page_count <= 0:
+        return []
+    size = max(PDF_MIN_PAGES_PER_TASK, -(-page_count // (max(1, workers) * 4)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def _parallel_page_ranges(source: DocumentSource) -> list[tuple[int, int]] | None:
+    """Page ranges to farm out, or None when the PDF should be parsed in-process."""
+    workers = settings.pdf_parallel_workers or os.cpu_count() or 1
+    if workers <= 1 or settings.pdf_parallel_min_pages <= 0:
+        return None
+    with pdfplumber.open(_as_file(source)) as pdf:
+        page_count = len(pdf.pages)
+    if page_count < settings.pdf_parallel_min_pages:
+        return None
+    return plan_page_ranges(page_count, workers)
+
+
+def iter_pdf_pages_parallel(source: DocumentSource) -> Iterator[str]:
+    """
+    Same output as iter_pdf_pages. PDFs with at least `pdf_parallel_min_pages`
+    pages are extracted range by range on the process pool; ranges are yielded
+    in page order as soon as each one (and all before it) is done.
+    """
+    ranges = _parallel_page_ranges(source)
+    if ranges is None:
+        yield from iter_pdf_pages(source)
+        return
+
+    pool = get_pdf_process_pool()
+    payload = _picklable(source)
+    ocr_dpi = pdf_ocr_dpi()
+    futures = [pool.submit(_extract_page_range, payload, start, stop, ocr_dpi) for start, stop in ranges]
+    try:
+        for future in futures:
+            yield from (text for text in _recognize_pages(future.result()) if text)
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+async def aiter_pdf_pages(source: DocumentSource, executor: Executor | None = None) -> AsyncIterator[str]:
+    """
+    Async variant of iter_pdf_pages_parallel that never parses on the event-loop
+    thread. In-process parsing runs on `executor` (default: asyncio's threads).
+    """
+    loop = asyncio.get_running_loop()
+    ranges = await loop.run_in_executor(executor, _parallel_page_ranges, source)
+    ocr_dpi = pdf_ocr_dpi()
+    if ranges is None:
+        pages = _iter_page_contents(source, ocr_dpi)
+        batch = get_ocr_service().workers if ocr_dpi else 1
+        scans: list[Any] = []
+        while (item := await loop.run_in_executor(executor, next, pages, None)) is not None:
+            if not isinstance(item, str):
+                scans.append(item)
+                if len(scans) < batch:
+                    continue
+            if scans:
+                for text in await _arecognize_pages(scans):
+                    if text:
+                        yield text
+                scans = []
+            if isinstance(item, str) and item:
+                yield item
+        for text in await _arecognize_pages(scans):
+            if text:
+                yield text
+        return
+
+    pool = get_pdf_process_pool()
+    payload = _picklable(source)
+    futures = [
+        loop.run_in_executor(pool, _extract_page_range, payload, start, stop, ocr_dpi)
+        for start, stop in ranges
+    ]
+    try:
+        for future in futures:
+            for text in await _arecognize_pages(await future):
+                if text:
+                    yield text
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+# ── Scanned pages ──
+
+def pdf_ocr_dpi() -> int:
+    """Resolution at which pages without a text layer are rendered for OCR (0 = leave them out)."""
+    return settings.ocr_pdf_dpi if settings.ocr_pdf_dpi > 0 and ocr_available() else 0
+
+
+def _recognize_pages(contents: Iterable[Any]) -> Iterator[str]:
+    """
+    Page contents → texts, in order. Rendered scans are sent to the OCR
+    service in batches of consecutive pages, one page per OCR worker.
+    """
+    service: OcrService | None = None
+    scans: list[Any] = []
+    for item in contents:
+        if not isinstance(item, str):
+            service = service or get_ocr_service()
+            scans.append(item)
+            if len(scans) < service.workers:
+                continue
+        if scans:
+            yield from _ocr_scans(service, scans)
+            scans = []
+        if isinstance(item, str):
+            yield item
+    if scans:
+        yield from _ocr_scans(service, scans)
+
+
+def _ocr_failed(scans: list[Any], error: Exception) -> list[str]:
+    """
+    Texts of scans whose OCR failed: a placeholder in place of the first one,
+    so the failure shows in the text and the parse is not cached.
+    """
+    logger.warning(f"OCR of {len(scans)} scanned PDF page(s) failed: {error}")
+    return [f"[IMAGE: OCR of {len(scans)} scanned page(s) failed – {error}]"] + [""] * (len(scans) - 1)
+
+
+def _ocr_scans(service: OcrService, scans: list[Any]) -> list[str]:
+    try:
+        return service.recognize_many(scans)
+    except Exception as e:
+        return _ocr_failed(scans, e)
+
+
+async def _arecognize_pages(contents: list[Any]) -> list[str]:
+    """Async _recognize_pages over an already extracted list of page contents."""
+    scans = [item for item in contents if not isinstance(item, str)]
+    if not scans:
+        return contents
+    try:
+        texts = iter(await get_ocr_service().arecognize_many(scans))
+    except Exception as e:
+        texts = iter(_ocr_failed(scans, e))
+    return [item if isinstance(item, str) else next(texts) for item in contents]
 
 
 # ═══════════════════════════════════════════════════════════════
 # EXCEL / CSV PARSER
 # ═══════════════════════════════════════════════════════════════
 
-def parse_excel(raw_bytes: bytes, file_type: str = "xlsx") -> str:
+def iter_sheet_frames(
+    source: DocumentSource,
+    file_type: str = "xlsx",
+    rows_per_frame: int | None = None,
+) -> Iterator[tuple[str, Iterator[pd.DataFrame]]]:
     """
-    Extract text from Excel/CSV files.
-    Converts all sheets into a text representation.
+    (sheet name, DataFrames of `rows_per_frame` rows) for every sheet.
+    Rows are read incrementally (CSV in chunks, xlsx in openpyxl read-only
+    mode), so memory is bounded by one frame whatever the sheet size.
+    Frames are indexed by data row (0 = first row under the header), blank
+    rows included even where they are left out of the frames.
+    Each sheet's frames must be consumed before moving to the next sheet.
     """
-    buffer = io.BytesIO(raw_bytes)
+    rows = max(1, rows_per_frame or settings.spreadsheet_segment_rows)
 
     if file_type == "csv":
-        df = pd.read_csv(buffer, sep=None, engine="python", on_bad_lines="skip")
-        return _dataframe_to_text(df, "Sheet1")
+        yield "Sheet1", _iter_csv_frames(source, rows)
+        return
 
-    xls = pd.ExcelFile(buffer)
-    text_parts: list[str] = []
+    if file_type == "xlsx":
+        yield from _iter_xlsx_frames(source, rows)
+        return
+
+    # Legacy .xls has no streaming reader: load each sheet, then slice it
+    xls = pd.ExcelFile(_as_file(source))
     for sheet_name in xls.sheet_names:
         df = pd.read_excel(xls, sheet_name=sheet_name)
-        text_parts.append(_dataframe_to_text(df, sheet_name))
+        yield sheet_name, (df.iloc[start:start + rows] for start in range(0, len(df), rows))
 
-    return "\n\n".join(text_parts)
 
+def iter_excel_sheets(
+    source: DocumentSource,
+    file_type: str = "xlsx",
+    rows_per_segment: int | None = None,
+) -> Iterator[str]:
+    """
+    Yield the text of every sheet in row groups of `rows_per_segment` rows.
+    Every row of every sheet is rendered, at most two row groups in memory
+    at a time.
+    """
+    for sheet_name, frames in iter_sheet_frames(source, file_type, rows_per_segment):
+        yield from _frames_to_segments(frames, sheet_name)
 
-def _dataframe_to_text(df: pd.DataFrame, sheet_name: str) -> str:
-    """Convert a DataFrame to a structured text representation."""
-    lines = [f"=== Sheet: {sheet_name} ==="]
-    lines.append(f"Columns: {', '.join(df.columns.astype(str))}")
-    lines.append(f"Rows: {len(df)}")
-    lines.append("")
 
-    for idx, row in df.head(200).iterrows():
-        row_text = " | ".join(f"{col}: {val}" for col, val in row.items() if pd.notna(val))
-        lines.append(row_text)
+def parse_excel(source: DocumentSource, file_type: str = "xlsx") -> str:
+    """
+    Extract text from Excel/CSV files.
+    Converts all sheets into a text representation.
+    """
+    return "\n\n".join(iter_excel_sheets(source, file_type))
+
+
+def sniff_csv_delimiter(source: DocumentSource, sample_bytes: int = CSV_SNIFF_BYTES) -> str:
+    """Guess the delimiter from the head of the file only (defaults to a comma)."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            head = f.read(sample_bytes)
+    else:
+        head = bytes(source[:sample_bytes])
+    sample = head.decode("utf-8-sig", errors="ignore")
+    # Drop the last, probably truncated, line
+    if len(head) == sample_bytes and "\n" in sample:
+        sample = sample[:sample.rindex("\n")]
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        return ","
 
-    if len(df) > 200:
-        lines.append(f"... ({len(df) - 200} additional rows truncated)")
 
-    return "\n".join(lines)
+def _iter_csv_frames(source: DocumentSource, rows: int) -> Iterator[pd.DataFrame]:
+    """CSV in chunks of `rows` rows via the C parser; cells kept as written."""
+    try:
+        reader = pd.read_csv(
+            _as_file(source),
+            sep=sniff_csv_delimiter(source),
+            dtype=str,
+            chunksize=rows,
+            on_bad_lines="skip",
+            encoding="utf-8",
+            encoding_errors="replace",
+        )
+    except pd.errors.EmptyDataError:
+        return
+    with reader:
+        yield from reader
+
+
+def _iter_xlsx_frames(source: DocumentSource, rows: int) -> Iterator[tuple[str, Iterator[pd.DataFrame]]]:
+    """(sheet name, frames of `rows` rows) per worksheet, streamed with openpyxl read-only mode."""
+    workbook = openpyxl.load_workbook(_as_file(source), read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield sheet.title, _sheet_frames(sheet, rows)
+    finally:
+        workbook.close()
+
+
+def _sheet_frames(sheet: Any, rows: int) -> Iterator[pd.DataFrame]:
+    # Read-only iter_rows yields every sheet row from the first, blank ones included
+    values = enumerate(sheet.iter_rows(values_only=True))
+    header = next(values, None)
+    if header is None:
+        return
+    columns = [f"Unnamed: {i}" if name is None else str(name) for i, name in enumerate(header[1])]
+    width = len(columns)
+    while True:
+        raw = list(islice(values, rows))
+        if not raw:
+            return
+        kept = [(n, row) for n, row in raw if any(cell is not None for cell in row)]
+        if kept:
+            yield pd.DataFrame.from_records(
+                [row[:width] + (None,) * (width - len(row)) for _, row in kept],
+                columns=columns,
+                index=[n - 1 for n, _ in kept],   # blank rows skipped, not renumbered
+            )
+
+
+def clean_column_labels(columns: Iterable[Any]) -> list[str]:
+    """Header labels on one line: line breaks collapsed, stray BOMs removed."""
+    return [" ".join(str(column).replace("\ufeff", "").split()) for column in columns]
+
+
+def _frames_to_segments(frames: Iterable[pd.DataFrame], sheet_name: str) -> Iterator[str]:
+    """
+    One text segment per row group, headed with the sheet, the data rows it
+    covers (as numbered in the source, blank rows included) and the columns.
+    The sheet's last segment also gives its row count.
+    """
+    frames = (df for df in frames if not df.empty)
+    df = next(frames, None)
+    while df is not None:
+        following = next(frames, None)   # one frame ahead, to know which segment is the last
+        labels = clean_column_labels(df.columns)
+        first, last = int(df.index[0]) + 1, int(df.index[-1]) + 1
+        lines = [
+            f"=== Sheet: {sheet_name} (rows {first}-{last}) ===",
+            f"Columns: {', '.join(labels)}",
+        ]
+        if following is None:
+            lines.append(f"Rows: {last}")
+        lines.append("")
+        lines.extend(line for line in _render_rows(df, labels) if line)
+        yield "\n".join(lines)
+        df = following
+
+
+def _render_rows(df: pd.DataFrame, labels: list[str]) -> np.ndarray:
+    """
+    Render every row as "label: value | label: value", skipping empty cells.
+    Built column by column with vectorized string operations instead of
+    a Python loop over rows.
+    """
+    lines = np.full(len(df), "", dtype=object)
+    for position, label in enumerate(labels):
+        series = df.iloc[:, position]
+        present = series.notna().to_numpy()
+        if not present.any():
+            continue
+        cells = (f"{label}: " + series[present].astype(str)).to_numpy(dtype=object)
+        current = lines[present]
+        lines[present] = current + np.where(current != "", " | ", "") + cells
+    return lines
 
 
 # ═══════════════════════════════════════════════════════════════
 # IMAGE PARSER (OCR)
 # ═══════════════════════════════════════════════════════════════
 
-def parse_image(raw_bytes: bytes, lang: str = "fra+eng") -> str:
+def _image_frames(source: DocumentSource) -> list[Any]:
+    """Every frame of an image file (multi-page TIFF scans have several)."""
+    from PIL import Image, ImageSequence
+
+    with Image.open(_as_file(source)) as image:
+        return [frame.copy() for frame in ImageSequence.Iterator(image)]
+
+
+def _image_ocr_service(lang: str | None) -> OcrService:
+    service = get_ocr_service()
+    if lang is None or lang == service.lang:
+        return service
+    # Same pool and cache (keys include the language)
+    return OcrService(lang, service.workers, service.tile_height, service.cache)
+
+
+def parse_image(source: DocumentSource, lang: str | None = None) -> str:
     """
-    Extract text from images using Tesseract OCR.
+    Extract text from images using Tesseract OCR (via the OCR service:
+    process pool, tiling of tall scans, result cache).
     Supports scanned invoices, contracts, receipts.
     """
+    if not ocr_available():
+        logger.warning("Pillow/pytesseract/tesseract not installed – image OCR unavailable")
+        return "[IMAGE: OCR extraction requires Pillow + pytesseract]"
     try:
-        from PIL import Image
-        import pytesseract
-
-        image = Image.open(io.BytesIO(raw_bytes))
-
-        # Pre-process: convert to grayscale for better OCR
-        if image.mode != "L":
-            image = image.convert("L")
-
-        text = pytesseract.image_to_string(image, lang=lang)
+        texts = _image_ocr_service(lang).recognize_many(_image_frames(source))
+        text = "\n\n".join(t for t in texts if t)
         logger.info(f"OCR extracted {len(text)} characters from image")
-        return text.strip()
+        return text
+    except Exception as e:
+        logger.error(f"Image OCR failed: {e}")
+        return f"[IMAGE: OCR extraction failed – {e}]"
 
-    except ImportError:
-        logger.warning("PIL/pytesseract not installed – image OCR unavailable")
+
+async def aparse_image(source: DocumentSource, lang: str | None = None) -> str:
+    """parse_image without blocking the event loop."""
+    if not ocr_available():
+        logger.warning("Pillow/pytesseract/tesseract not installed – image OCR unavailable")
         return "[IMAGE: OCR extraction requires Pillow + pytesseract]"
+    try:
+        frames = await asyncio.to_thread(_image_frames, source)
+        texts = await _image_ocr_service(lang).arecognize_many(frames)
+        text = "\n\n".join(t for t in texts if t)
+        logger.info(f"OCR extracted {len(text)} characters from image")
+        return text
     except Exception as e:
         logger.error(f"Image OCR failed: {e}")
         return f"[IMAGE: OCR extraction failed – {e}]"
@@ -118,35 +542,20 @@ def parse_image(raw_bytes: bytes, lang: str = "fra+eng") -> str:
 # AUDIO PARSER (Transcription)
 # ═══════════════════════════════════════════════════════════════
 
-async def parse_audio(raw_bytes: bytes, language: str = "fr") -> str:
+async def parse_audio(source: DocumentSource, language: str = "fr") -> str:
     """
-    Transcribe audio files using OpenAI Whisper API.
-    Supports: mp3, wav, m4a, ogg, flac.
+    Transcribe audio files (Whisper API by default, see TRANSCRIPTION_BACKEND).
+    Supports: mp3, wav, m4a, ogg, flac – and the audio track of videos.
+    Long recordings are cut at pauses and the segments transcribed
+    concurrently; the transcript has one "[hh:mm:ss] text" line per segment.
     Used for: meeting recordings, phone calls, voice notes.
     """
     try:
-        from openai import AsyncOpenAI
-        from app.core.config import get_settings
-
-        settings = get_settings()
-        if not settings.openai_api_key or settings.openai_api_key.startswith("sk-your"):
-            return "[AUDIO: Transcription requires a valid OpenAI API key]"
-
-        client = AsyncOpenAI(api_key=settings.openai_api_key)
-        audio_file = io.BytesIO(raw_bytes)
-        audio_file.name = "audio.mp3"
-
-        response = await client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file,
-            language=language,
-            response_format="text",
-        )
-        logger.info(f"Audio transcription: {len(response)} characters")
-        return response
-
-    except ImportError:
-        return "[AUDIO: openai package not installed]"
+        transcript = await transcribe_audio(source, language)
+        logger.info(f"Audio transcription: {len(transcript)} characters")
+        return transcript
+    except TranscriptionUnavailable as e:
+        return f"[AUDIO: {e}]"
     except Exception as e:
         logger.error(f"Audio transcription failed: {e}")
         return f"[AUDIO: Transcription failed – {e}]"
@@ -156,54 +565,77 @@ async def parse_audio(raw_bytes: bytes, language: str = "fr") -> str:
 # VIDEO PARSER (Frames + Audio)
 # ═══════════════════════════════════════════════════════════════
 
-async def parse_video(raw_bytes: bytes, extract_frames: bool = True) -> str:
+async def parse_video(source: DocumentSource, extract_frames: bool = True) -> str:
     """
     Extract information from video files:
     1. Extract audio track → transcribe via Whisper
-    2. Extract key frames → OCR for on-screen text
+    2. Extract key frames (scene changes) → OCR for on-screen text
+    Both run concurrently, each on its own ffmpeg pipe.
     Used for: training videos, presentation recordings, dashboards.
     """
-    parts: list[str] = []
-
-    # 1. Extract and transcribe audio
-    try:
-        import subprocess
-        import tempfile
-
-        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp_video:
-            tmp_video.write(raw_bytes)
-            video_path = tmp_video.name
+    if not ffmpeg_available():
+        return "[VIDEO: Audio extraction requires ffmpeg]"
 
-        audio_path = video_path.replace(".mp4", ".mp3")
+    tasks = [_video_transcript(source)]
+    if extract_frames:
+        tasks.append(_video_onscreen_text(source))
+    parts = [part for part in await asyncio.gather(*tasks) if part]
+    return "\n\n".join(parts) if parts else "[VIDEO: No content extracted]"
 
-        # Extract audio using ffmpeg
-        result = subprocess.run(
-            ["ffmpeg", "-i", video_path, "-q:a", "0", "-map", "a", audio_path, "-y"],
-            capture_output=True, timeout=120,
-        )
 
-        if result.returncode == 0:
-            with open(audio_path, "rb") as af:
-                audio_bytes = af.read()
-            transcript = await parse_audio(audio_bytes)
-            parts.append(f"=== Audio Transcript ===\n{transcript}")
+async def _video_transcript(source: DocumentSource) -> str:
+    transcript = await parse_audio(source)
+    return f"=== Audio Transcript ===\n{transcript}" if transcript else ""
 
-            # Clean up
-            Path(audio_path).unlink(missing_ok=True)
 
-        Path(video_path).unlink(missing_ok=True)
+async def _video_onscreen_text(source: DocumentSource) -> str:
+    """
+    OCR of the scene-change keyframes, one line per distinct screen.
+    Frames are sent to the OCR service in batches while decoding goes on;
+    at most two batches are held in memory at once.
+    """
+    if not ocr_available():
+        return "[VIDEO: Frame OCR requires Pillow + pytesseract]"
+
+    service = get_ocr_service()
+    in_flight: list[tuple[list[Any], asyncio.Task]] = []
+    lines: list[str] = []
+    previous = ""
+
+    async def _collect(keyframes: list[Any], task: asyncio.Task) -> None:
+        nonlocal previous
+        for keyframe, text in zip(keyframes, await task):
+            if text and text != previous:   # slides stay on screen across cuts
+                lines.append(f"[{format_timestamp(keyframe.time)}] {text}")
+                previous = text
+
+    def _submit(keyframes: list[Any]) -> None:
+        task = asyncio.create_task(service.arecognize_many([k.image for k in keyframes]))
+        in_flight.append((keyframes, task))
+        for keyframe in keyframes:
+            keyframe.image = None
 
-    except (ImportError, FileNotFoundError) as e:
-        parts.append(f"[VIDEO: Audio extraction requires ffmpeg – {e}]")
+    try:
+        batch: list[Any] = []
+        async for keyframe in iter_keyframes(source):
+            batch.append(keyframe)
+            if len(batch) >= service.workers:
+                _submit(batch)
+                batch = []
+                # one batch in flight while the next is collected: two in memory at most
+                while len(in_flight) >= 2:
+                    await _collect(*in_flight.pop(0))
+        if batch:
+            _submit(batch)
+        while in_flight:
+            await _collect(*in_flight.pop(0))
     except Exception as e:
-        logger.error(f"Video audio extraction failed: {e}")
-        parts.append(f"[VIDEO: Audio extraction failed – {e}]")
-
-    # 2. Extract key frames for OCR (if enabled)
-    if extract_frames:
-        parts.append("[VIDEO: Frame OCR – requires opencv-python for key frame extraction]")
+        logger.error(f"Video frame OCR failed: {e}")
+        for _, task in in_flight:
+            task.cancel()
+        return f"[VIDEO: Frame OCR failed – {e}]"
 
-    return "\n\n".join(parts) if parts else "[VIDEO: No content extracted]"
+    return "=== On-screen Text ===\n" + "\n".join(lines) if lines else ""
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -215,14 +647,14 @@ SYNC_PARSERS = {
     "xlsx": lambda b: parse_excel(b, "xlsx"),
     "xls": lambda b: parse_excel(b, "xls"),
     "csv": lambda b: parse_excel(b, "csv"),
-    "png": parse_image,
-    "jpg": parse_image,
-    "jpeg": parse_image,
-    "tiff": parse_image,
-    "bmp": parse_image,
 }
 
 ASYNC_PARSERS = {
+    "png": aparse_image,
+    "jpg": aparse_image,
+    "jpeg": aparse_image,
+    "tiff": aparse_image,
+    "bmp": aparse_image,
     "mp3": parse_audio,
     "wav": parse_audio,
     "m4a": parse_audio,
@@ -235,21 +667,54 @@ ASYNC_PARSERS = {
 }
 
 
-async def parse_file(raw_bytes: bytes, file_type: str) -> str:
+async def parse_file(source: DocumentSource, file_type: str) -> str:
     """
     Unified file parser — dispatches to the correct parser based on file type.
     Returns extracted text content.
+    Parsing runs in the format's parser pool (see executor), never on the
+    event loop; raises ParserBusyError when that pool is saturated.
     """
     file_type = file_type.lower().lstrip(".")
+    pool = get_parser_pool(file_type)
 
     if file_type in SYNC_PARSERS:
-        return SYNC_PARSERS[file_type](raw_bytes)
+        return await pool.run(SYNC_PARSERS[file_type], source)
 
     if file_type in ASYNC_PARSERS:
-        return await ASYNC_PARSERS[file_type](raw_bytes)
+        return await pool.call(ASYNC_PARSERS[file_type], source)
 
     # Fallback: try to decode as plain text
     try:
-        return raw_bytes.decode("utf-8", errors="ignore")
+        return await pool.run(read_text_source, source)
+    except ParserBusyError:
+        raise
     except Exception:
         return f"[UNSUPPORTED: Cannot parse file type '{file_type}']"
+
+
+SEGMENT_PARSERS = {
+    "xlsx": lambda b: iter_excel_sheets(b, "xlsx"),
+    "xls": lambda b: iter_excel_sheets(b, "xls"),
+    "csv": lambda b: iter_excel_sheets(b, "csv"),
+}
+
+
+async def iter_file_segments(source: DocumentSource, file_type: str) -> AsyncIterator[str]:
+    """
+    Streaming counterpart of parse_file: yields page / sheet texts as they are
+    parsed. Formats without a natural page structure yield a single segment.
+    """
+    file_type = file_type.lower().lstrip(".")
+    pool = get_parser_pool(file_type)
+
+    if file_type == "pdf":
+        async for page in pool.aiterate(aiter_pdf_pages(source, executor=pool.executor)):
+            yield page
+        return
+
+    if file_type in SEGMENT_PARSERS:
+        async for segment in pool.iterate(SEGMENT_PARSERS[file_type], source):
+            yield segment
+        return
+
+    yield await parse_file(source, file_type)
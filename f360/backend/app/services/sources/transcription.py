@@ -0,0 +1,286 @@
+"""
+F360 – Audio Transcription
+Segmented, concurrent speech-to-text for long recordings.
+Audio decoded by the ffmpeg pipe is cut into segments at pauses (or fixed
+windows), segments are transcribed concurrently up to a cap, and the
+texts are stitched back in order with their timestamps.
+The backend is pluggable: Whisper (OpenAI API) in production, a
+deterministic offline stand-in for tests and benchmarks.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import os
+import wave
+from typing import Any, AsyncIterator, BinaryIO
+
+import numpy as np
+
+from app.core.backends import BackendRegistry
+from app.core.config import get_settings
+from app.services.sources.media import (
+    AUDIO_SAMPLE_RATE,
+    AUDIO_SAMPLE_WIDTH,
+    AudioSegment,
+    ffmpeg_available,
+    format_timestamp,
+    iter_audio_segments,
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+FRAME_MS = 20                 # loudness is measured over 20 ms frames
+READ_BLOCK_SECONDS = 30       # audio pulled from ffmpeg per read
+_FRAME = AUDIO_SAMPLE_RATE * FRAME_MS // 1000
+
+
+class TranscriptionUnavailable(RuntimeError):
+    """The configured backend cannot run (missing key or package)."""
+
+
+# ═══════════════════════════════════════════════════════════════
+# BACKENDS
+# ═══════════════════════════════════════════════════════════════
+
+class Transcriber:
+    """Backend interface: one audio file (a WAV segment or a whole upload) → text."""
+
+    name = "base"
+
+    def check(self) -> None:
+        """Raise TranscriptionUnavailable when the backend cannot run."""
+
+    async def transcribe(self, audio_file: BinaryIO, language: str) -> str:
+        raise NotImplementedError
+
+
+class WhisperTranscriber(Transcriber):
+    """OpenAI Whisper API (25 MB per request, hence segmenting)."""
+
+    name = "openai"
+
+    def __init__(self):
+        self._client: Any = None
+
+    def check(self) -> None:
+        if not settings.openai_api_key or settings.openai_api_key.startswith("sk-your"):
+            raise TranscriptionUnavailable("Transcription requires a valid OpenAI API key")
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            raise TranscriptionUnavailable("openai package not installed")
+
+    async def transcribe(self, audio_file: BinaryIO, language: str) -> str:
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(api_key=settings.openai_api_key)
+        return await self._client.audio.transcriptions.create(
+            model="whisper-1",
+            file=audio_file,
+            language=language,
+            response_format="text",
+        )
+
+
+class OfflineTranscriber(Transcriber):
+    """
+    Deterministic local stand-in: describes each segment instead of
+    transcribing it. A remote call is simulated by sleeping
+    `latency + realtime_factor × audio seconds`.
+    """
+
+    name = "offline"
+
+    def __init__(self, latency: float = 0.0, realtime_factor: float = 0.0):
+        self.latency = latency
+        self.realtime_factor = realtime_factor
+        self.calls = 0
+
+    async def transcribe(self, audio_file: BinaryIO, language: str) -> str:
+        self.calls += 1
+        try:
+            with wave.open(audio_file) as reader:
+                seconds = reader.getnframes() / reader.getframerate()
+                samples = np.frombuffer(reader.readframes(reader.getnframes()), dtype=np.int16)
+            text = f"[offline transcript: {seconds:.1f} s, {loudness_db(samples):.0f} dBFS, {language}]"
+        except (wave.Error, EOFError):
+            seconds = 0.0
+            audio_file.seek(0)
+            text = f"[offline transcript: {len(audio_file.read())} bytes, {language}]"
+        delay = self.latency + self.realtime_factor * seconds
+        if delay:
+            await asyncio.sleep(delay)
+        return text
+
+
+TRANSCRIBERS = {
+    WhisperTranscriber.name: WhisperTranscriber,
+    OfflineTranscriber.name: OfflineTranscriber,
+}
+
+_backends: BackendRegistry[Transcriber] = BackendRegistry("transcription", "transcription_backend", TRANSCRIBERS)
+get_transcriber = _backends.get
+set_transcriber = _backends.set
+
+
+# ═══════════════════════════════════════════════════════════════
+# SEGMENTER
+# ═══════════════════════════════════════════════════════════════
+
+def loudness_db(samples: np.ndarray) -> float:
+    """RMS level of int16 samples in dBFS (-100 for digital silence)."""
+    if not len(samples):
+        return -100.0
+    rms = np.sqrt(np.mean(samples.astype(np.float32) ** 2)) / 32768.0
+    return float(20 * np.log10(max(rms, 1e-5)))
+
+
+def frame_levels(samples: np.ndarray) -> np.ndarray:
+    """dBFS of each 20 ms frame (a trailing partial frame is ignored)."""
+    count = len(samples) // _FRAME
+    frames = samples[:count * _FRAME].reshape(count, _FRAME).astype(np.float32)
+    rms = np.sqrt((frames ** 2).mean(axis=1)) / 32768.0
+    return 20 * np.log10(np.maximum(rms, 1e-5))
+
+
+def is_silent(segment: AudioSegment, silence_db: float) -> bool:
+    """No 20 ms frame of the segment rises above `silence_db`."""
+    levels = frame_levels(np.frombuffer(segment.pcm, dtype=np.int16))
+    return not len(levels) or float(levels.max()) < silence_db
+
+
+def find_cut(samples: np.ndarray, lo: int, hi: int, silence_db: float) -> int:
+    """
+    Sample index in [lo, hi) to cut at: the middle of the longest pause
+    (frames below `silence_db`), or the quietest frame if nobody pauses.
+    """
+    levels = frame_levels(samples[lo:hi])
+    if not len(levels):
+        return hi
+    silent = levels < silence_db
+    if silent.any():
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], silent.astype(np.int8), [0]])))
+        starts, ends = edges[::2], edges[1::2]
+        longest = int(np.argmax(ends - starts))
+        frame = (starts[longest] + ends[longest]) // 2
+    else:
+        frame = int(np.argmin(levels))
+    return lo + int(frame) * _FRAME
+
+
+async def iter_speech_segments(
+    source: Any,
+    mode: str | None = None,
+    max_seconds: int | None = None,
+    min_seconds: int | None = None,
+    silence_db: float | None = None,
+) -> AsyncIterator[AudioSegment]:
+    """
+    Segments of at most `max_seconds` for transcription.
+    "silence": each cut falls in the longest pause between `min_seconds`
+    and `max_seconds`, so words are not split across requests.
+    "fixed": windows of exactly `max_seconds`.
+    Memory holds at most one maximal segment plus one read block.
+    """
+    mode = mode or settings.transcription_split
+    max_samples = (max_seconds or settings.media_segment_seconds) * AUDIO_SAMPLE_RATE
+    min_samples = min((min_seconds or settings.transcription_min_segment_seconds) * AUDIO_SAMPLE_RATE, max_samples)
+    silence_db = settings.transcription_silence_db if silence_db is None else silence_db
+    if mode not in ("silence", "fixed"):
+        raise ValueError(f"Unknown segmenting mode '{mode}' (silence | fixed)")
+
+    buffer = bytearray()
+    start = 0            # samples already emitted
+    index = 0
+    block_seconds = min(READ_BLOCK_SECONDS, max_samples // AUDIO_SAMPLE_RATE)
+
+    async for block in iter_audio_segments(source, segment_seconds=max(1, block_seconds)):
+        buffer += block.pcm
+        while len(buffer) >= max_samples * AUDIO_SAMPLE_WIDTH:
+            cut = max_samples if mode == "fixed" else find_cut(
+                np.frombuffer(bytes(buffer[:max_samples * AUDIO_SAMPLE_WIDTH]), dtype=np.int16),
+                min_samples, max_samples, silence_db,
+            )
+            cut = max(cut, 1)
+            yield AudioSegment(index, start / AUDIO_SAMPLE_RATE, bytes(buffer[:cut * AUDIO_SAMPLE_WIDTH]))
+            del buffer[:cut * AUDIO_SAMPLE_WIDTH]
+            start += cut
+            index += 1
+    if buffer:
+        yield AudioSegment(index, start / AUDIO_SAMPLE_RATE, bytes(buffer))
+
+
+# ═══════════════════════════════════════════════════════════════
+# TRANSCRIPTION
+# ═══════════════════════════════════════════════════════════════
+
+async def transcribe_segments(
+    segments: AsyncIterator[AudioSegment],
+    transcriber: Transcriber,
+    language: str,
+    concurrency: int,
+    silence_db: float,
+) -> list[tuple[float, str]]:
+    """
+    (start, text) per segment, in order. At most `concurrency` requests run
+    at once; reading pauses meanwhile, so undecoded audio stays in ffmpeg.
+    Silent segments are skipped (speech models invent text on silence);
+    a failed segment is reported in place and the others are kept.
+    """
+    async def _one(segment: AudioSegment) -> tuple[float, str]:
+        try:
+            text = await transcriber.transcribe(segment.to_wav(), language)
+        except Exception as e:
+            logger.warning(f"Transcription of segment {segment.index} failed: {e}")
+            text = f"[AUDIO: segment failed – {e}]"
+        return segment.start, text.strip()
+
+    tasks: list[asyncio.Task] = []
+    try:
+        async for segment in segments:
+            if is_silent(segment, silence_db):
+                continue
+            while sum(not task.done() for task in tasks) >= max(1, concurrency):
+                await asyncio.wait([t for t in tasks if not t.done()], return_when=asyncio.FIRST_COMPLETED)
+            tasks.append(asyncio.create_task(_one(segment)))
+        return list(await asyncio.gather(*tasks))
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def stitch(parts: list[tuple[float, str]]) -> str:
+    """One "[hh:mm:ss] text" line per non-empty segment."""
+    return "\n".join(f"[{format_timestamp(start)}] {text}" for start, text in parts if text)
+
+
+async def transcribe_audio(source: Any, language: str = "fr", transcriber: Transcriber | None = None) -> str:
+    """
+    Transcript of an audio (or video) source. Without ffmpeg the file is
+    sent whole in one request, as the backend's own limits allow.
+    Raises TranscriptionUnavailable when the backend cannot run.
+    """
+    transcriber = transcriber or get_transcriber()
+    transcriber.check()
+
+    if not ffmpeg_available():
+        if isinstance(source, (str, os.PathLike)):
+            audio_file = open(source, "rb")   # streamed from disk by the HTTP client
+        else:
+            audio_file = io.BytesIO(source)
+            audio_file.name = "audio.mp3"
+        with audio_file:
+            return (await transcriber.transcribe(audio_file, language)).strip()
+
+    parts = await transcribe_segments(
+        iter_speech_segments(source),
+        transcriber,
+        language,
+        concurrency=settings.transcription_concurrency,
+        silence_db=settings.transcription_silence_db,
+    )
+    return stitch(parts)
@@ -0,0 +1,67 @@
+"""
+F360 – Upload Spooling
+Streams uploaded files to the upload directory in fixed-size blocks,
+enforcing the size limit and hashing the content on the way, so an upload
+never has to be held in memory as a whole.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_BLOCK_SIZE = 1024 * 1024  # 1 MiB
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured maximum size."""
+
+
+class StoredUpload:
+    """A file spooled to disk, with its size and SHA-256 digest."""
+
+    __slots__ = ("path", "size", "sha256")
+
+    def __init__(self, path: Path, size: int, sha256: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+
+async def spool_upload(
+    upload: Any,
+    dest: Path,
+    max_bytes: int,
+    block_size: int = UPLOAD_BLOCK_SIZE,
+) -> StoredUpload:
+    """
+    Copy an UploadFile (anything with `async read(n)`) to `dest` block by block.
+    The file is written under a temporary name and renamed once complete;
+    an oversized or failed upload leaves nothing behind.
+    """
+    declared = getattr(upload, "size", None)
+    if declared is not None and declared > max_bytes:
+        raise UploadTooLargeError(f"Upload of {declared} bytes exceeds {max_bytes} bytes")
+
+    digest = hashlib.sha256()
+    size = 0
+    partial = dest.with_name(dest.name + ".part")
+    try:
+        with open(partial, "wb") as out:
+            while block := await upload.read(block_size):
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                digest.update(block)
+                await asyncio.to_thread(out.write, block)
+        partial.replace(dest)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+    logger.debug(f"Spooled {size} bytes to {dest}")
+    return StoredUpload(dest, size, digest.hexdigest())
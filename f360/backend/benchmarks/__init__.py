@@ -0,0 +1 @@
+"""F360 – Offline benchmarks (run from f360/backend with `python -m benchmarks.<name>`)."""
@@ -0,0 +1,180 @@
+"""
+F360 – Benchmark: Entity Extraction
+Times the single-pass entity engine against the previous implementation
+(one `re.finditer` per pattern, patterns re-parsed on every call) over a
+directory of texts, by default the CUAD contracts, and checks that both
+find the same entities.
+
+Usage (from f360/backend):
+    python -m benchmarks.entity_extraction [corpus_dir] [--limit N] [--repeat R] [--json out.json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from app.services.cognitive_ingestion.extractor import EntityCollector, extract_financial_entities
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[3] / "Input/Contracts_30_English/CUAD_v1/full_contract_txt"
+PAGE_SIZE = 4000   # characters per simulated page for the streamed run
+
+
+def legacy_extract_financial_entities(text: str) -> dict[str, Any]:
+    """Reference: the multi-pass extractor this engine replaced, kept verbatim."""
+    entities: dict[str, Any] = {
+        "amounts": [],
+        "dates": [],
+        "counterparties": [],
+        "payment_terms": [],
+        "penalty_clauses": [],
+        "indexation_clauses": [],
+    }
+
+    amount_patterns = [
+        r"(\d[\d\s]*[\d](?:[.,]\d{2})?)\s*(?:€|EUR|euros?)",
+        r"(?:€|EUR)\s*(\d[\d\s]*[\d](?:[.,]\d{2})?)",
+        r"[Mm]ontant\s*(?::\s*|de\s+)(\d[\d\s]*[\d](?:[.,]\d{2})?)",
+        r"[Tt]otal\s*(?::\s*|TTC\s*:\s*)(\d[\d\s]*[\d](?:[.,]\d{2})?)",
+    ]
+    for pattern in amount_patterns:
+        for match in re.finditer(pattern, text):
+            raw_amount = match.group(1).replace(" ", "").replace(",", ".")
+            try:
+                amount = float(raw_amount)
+                if amount > 0:
+                    entities["amounts"].append(amount)
+            except ValueError:
+                pass
+    entities["amounts"] = sorted(set(entities["amounts"]), reverse=True)
+
+    date_patterns = [
+        r"(\d{2}[/.-]\d{2}[/.-]\d{4})",
+        r"(\d{4}[/.-]\d{2}[/.-]\d{2})",
+        r"(\d{1,2}\s+(?:janvier|février|mars|avril|mai|juin|juillet|août|septembre|octobre|novembre|décembre)\s+\d{4})",
+    ]
+    for pattern in date_patterns:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            entities["dates"].append(match.group(1))
+    entities["dates"] = list(set(entities["dates"]))
+
+    payment_patterns = [
+        r"(?:paiement|règlement|payment)\s*(?:à|:)?\s*([\w\s]+(?:jours?|days?))",
+        r"(net\s+\d+\s*(?:jours?|days?))",
+        r"(\d+\s*(?:jours?|days?)\s*(?:date\s+de\s+facture|fin\s+de\s+mois))",
+    ]
+    for pattern in payment_patterns:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            entities["payment_terms"].append(match.group(1).strip())
+
+    penalty_patterns = [
+        r"((?:pénalité|penalty|indemnité)[^.]*\.)",
+        r"((?:clause\s+pénale|liquidated\s+damages)[^.]*\.)",
+        r"((?:retard|late\s+payment)[^.]*(?:intérêt|interest|pénalité|penalty)[^.]*\.)",
+    ]
+    for pattern in penalty_patterns:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            entities["penalty_clauses"].append(match.group(1).strip())
+
+    indexation_patterns = [
+        r"((?:indexation|indexé|indexed|révision)[^.]*(?:inflation|CPI|IPC|indice|index)[^.]*\.)",
+        r"((?:inflation|CPI|IPC)[^.]*(?:clause|ajustement|adjustment)[^.]*\.)",
+    ]
+    for pattern in indexation_patterns:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            entities["indexation_clauses"].append(match.group(1).strip())
+
+    company_patterns = [
+        r"(?:société|company|fournisseur|supplier|client|prestataire)\s*(?::\s*)?([A-Z][\w\s&.-]{2,50}(?:SAS|SARL|SA|SNC|EURL|GmbH|Ltd|Inc|Corp)?)",
+    ]
+    for pattern in company_patterns:
+        for match in re.finditer(pattern, text):
+            name = match.group(1).strip()
+            if len(name) > 2:
+                entities["counterparties"].append(name)
+    entities["counterparties"] = list(set(entities["counterparties"]))
+
+    return entities
+
+
+def extract_streamed(text: str) -> dict[str, Any]:
+    """Feed the text to an EntityCollector in PAGE_SIZE pieces, as the pipeline does per page."""
+    collector = EntityCollector()
+    for start in range(0, len(text), PAGE_SIZE):
+        collector.feed(text[start:start + PAGE_SIZE])
+    return collector.entities
+
+
+def _normalized(entities: dict[str, Any]) -> dict[str, list[str]]:
+    # Both sides deduplicate the same keys; list order differs (per pattern vs. text order)
+    return {key: sorted(map(str, values)) for key, values in entities.items()}
+
+
+def _time(extract: Callable[[str], Any], texts: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            extract(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(corpus: Path, limit: int | None = None, repeat: int = 3) -> dict[str, Any]:
+    files = sorted(corpus.glob("*.txt"))[:limit]
+    if not files:
+        raise FileNotFoundError(f"No .txt files in {corpus}")
+    texts = [path.read_text(encoding="utf-8", errors="replace") for path in files]
+    megabytes = sum(len(text.encode("utf-8")) for text in texts) / 1e6
+
+    mismatches = [
+        path.name for path, text in zip(files, texts)
+        if _normalized(legacy_extract_financial_entities(text)) != _normalized(extract_financial_entities(text))
+    ]
+
+    report: dict[str, Any] = {"corpus": str(corpus), "documents": len(texts), "megabytes": round(megabytes, 2)}
+    for name, extract in (
+        ("legacy", legacy_extract_financial_entities),
+        ("engine", extract_financial_entities),
+        ("engine_streamed", extract_streamed),
+    ):
+        seconds = _time(extract, texts, repeat)
+        report[name] = {
+            "seconds": round(seconds, 3),
+            "docs_per_s": round(len(texts) / seconds, 1),
+            "mb_per_s": round(megabytes / seconds, 2),
+        }
+    report["speedup"] = round(report["legacy"]["seconds"] / report["engine"]["seconds"], 2)
+    report["mismatches"] = mismatches
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.entity_extraction",
+        description="Compare the single-pass entity engine with the legacy extractor.",
+    )
+    parser.add_argument("corpus", type=Path, nargs="?", default=DEFAULT_CORPUS, help="directory of .txt files")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N files")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per implementation (best is kept)")
+    parser.add_argument("--json", type=Path, default=None, help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args.corpus, args.limit, args.repeat)
+    print(f"{report['documents']} documents, {report['megabytes']} MB")
+    for name in ("legacy", "engine", "engine_streamed"):
+        r = report[name]
+        print(f"  {name:<16} {r['seconds']:>8.3f} s  {r['docs_per_s']:>8.1f} docs/s  {r['mb_per_s']:>7.2f} MB/s")
+    print(f"  speedup          {report['speedup']:.2f}x")
+    print(f"  mismatches       {len(report['mismatches'])}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    return 1 if report["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
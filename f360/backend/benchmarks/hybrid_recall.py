@@ -0,0 +1,206 @@
+"""
+F360 – Benchmark: Hybrid vs Vector Retrieval Recall
+Offline comparison of the retrieval modes on chunks of a fixed CUAD subset,
+served by the local vector index (no database, no embedding API):
+- vector: cosine search alone
+- lexical: the question's terms matched literally (vector order breaks ties)
+- hybrid: both rankings fused by RRF, at each --weights setting
+Two query sets are generated from the chunks themselves, each query keeping
+the chunk it was drawn from as ground truth:
+- reference: a few topical words of the chunk plus an identifier (a token
+  with a digit, or a capitalised name) found in at most two chunks of the
+  corpus – the "invoice INV-2291 from Dalton" kind of question
+- topical: words of the chunk that are common contract vocabulary only
+Embeddings come from a proxy model – a feature-hashed bag of words in which
+every token holding a digit shares one feature, as dense embedding models
+barely tell one number or reference from another. Absolute figures are
+therefore only indicative. Lexical-only scores run high because the queries
+reuse their chunk's words verbatim, which real questions rarely do; the
+comparison that carries over is hybrid against vector.
+A query counts as found at k when a chunk containing its identifier (for
+topical queries: its source chunk) ranks in the top k.
+
+Usage (from f360/backend):
+    python -m benchmarks.hybrid_recall [--txt N] [--queries Q] [--top-k K] [--dim D]
+                                       [--weights 1:1 1:0.5 1:2] [--json out.json]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import tempfile
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.services.cognitive_ingestion.chunker import chunk_text
+from app.services.cognitive_ingestion.hybrid import STOPWORDS, lexical_terms
+from app.services.cognitive_ingestion.vector_store import LocalVectorIndex
+from benchmarks.ingestion import DEFAULT_CORPUS, select_subset
+
+_WORD_RE = re.compile(r"\w+")
+_IDENTIFIER_RE = re.compile(r"\b(?:[A-Z][A-Za-z]{3,}|[A-Za-z]*\d[\w.\-/]*\d|[A-Za-z]+-?\d+)\b")
+NUMBER_FEATURE = "<num>"
+COMMON_WORD_CHUNKS = 10   # topical query words occur in at least this many chunks
+
+
+def proxy_embedding(text_input: str, dim: int) -> np.ndarray:
+    """Feature-hashed bag of lower-cased words, numbers folded into one feature."""
+    vector = np.zeros(dim, dtype=np.float32)
+    counts = Counter(
+        NUMBER_FEATURE if any(ch.isdigit() for ch in word) else word
+        for word in _WORD_RE.findall(text_input.lower())
+        if word not in STOPWORDS
+    )
+    for word, count in counts.items():
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign * (1.0 + np.log(count))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def topical_words(chunk: str) -> set[str]:
+    return {
+        word for word in _WORD_RE.findall(chunk.lower())
+        if len(word) >= 5 and word.isalpha() and word not in STOPWORDS
+    }
+
+
+def make_queries(chunks: list[str], count: int, seed: int = 23) -> list[dict[str, Any]]:
+    """`count` reference queries and `count` topical queries, drawn from random chunks."""
+    frequency: Counter[str] = Counter()
+    identifiers = [set(_IDENTIFIER_RE.findall(chunk)) for chunk in chunks]
+    for found in identifiers:
+        frequency.update(found)
+    # topical words are common contract vocabulary, not distinctive on their own
+    vocabulary = [topical_words(chunk) for chunk in chunks]
+    spread = Counter(word for words in vocabulary for word in words)
+
+    rng = random.Random(seed)
+    queries: list[dict[str, Any]] = []
+    order = list(range(len(chunks)))
+    rng.shuffle(order)
+    for n in order:
+        words = sorted(word for word in vocabulary[n] if spread[word] >= COMMON_WORD_CHUNKS)
+        if len(words) < 4:
+            continue
+        rare = sorted(i for i in identifiers[n] if frequency[i] <= 2 and i.lower() not in STOPWORDS)
+        if rare and sum(q["kind"] == "reference" for q in queries) < count:
+            identifier = rng.choice(rare)
+            relevant = {m for m, found in enumerate(identifiers) if identifier in found}
+            question = f"what about the {' '.join(rng.sample(words, 3))} for {identifier}?"
+            queries.append({"kind": "reference", "question": question, "relevant": relevant})
+        elif sum(q["kind"] == "topical" for q in queries) < count:
+            question = f"what about the {' '.join(rng.sample(words, 4))}?"
+            queries.append({"kind": "topical", "question": question, "relevant": {n}})
+        if len(queries) >= 2 * count:
+            break
+    return queries
+
+
+def _parse_weights(values: list[str]) -> list[tuple[float, float]]:
+    try:
+        return [tuple(float(part) for part in value.split(":", 1)) for value in values]
+    except ValueError:
+        raise argparse.ArgumentTypeError("weights are VECTOR:LEXICAL pairs, e.g. 1:0.5")
+
+
+def run(corpus: Path, txt: int, count: int, top_k: int, dim: int, weights: list[tuple[float, float]]) -> dict[str, Any]:
+    paths = select_subset(corpus, "txt", txt)
+    chunks = [chunk for path in paths for chunk in chunk_text(path.read_text(encoding="utf-8", errors="replace"))]
+    queries = make_queries(chunks, count)
+
+    with tempfile.TemporaryDirectory(prefix="f360-hybrid-") as folder:
+        index = LocalVectorIndex(folder, dim)
+        ids = [uuid.uuid4() for _ in chunks]
+        index.add([
+            {
+                "chunk_id": chunk_id,
+                "document_id": chunk_id,
+                "company_id": None,
+                "filename": None,
+                "content": chunk,
+                "metadata": {},
+                "embedding": proxy_embedding(chunk, dim),
+            }
+            for chunk_id, chunk in zip(ids, chunks)
+        ])
+        position = {str(chunk_id): n for n, chunk_id in enumerate(ids)}
+
+        modes: list[tuple[str, Any]] = [
+            ("vector", lambda q, e: index.search(e, top_k)),
+            ("lexical", lambda q, e: index.hybrid_search(e, lexical_terms(q), top_k, weights=(0.0, 1.0))),
+        ] + [
+            (f"hybrid {v:g}:{l:g}", lambda q, e, w=(v, l): index.hybrid_search(e, lexical_terms(q), top_k, weights=w))
+            for v, l in weights
+        ]
+
+        runs = []
+        for name, search in modes:
+            found: dict[str, list[float]] = {"reference": [], "topical": []}
+            for query in queries:
+                rows = search(query["question"], proxy_embedding(query["question"], dim))
+                ranks = [r for r, row in enumerate(rows, start=1) if position[row["chunk_id"]] in query["relevant"]]
+                found[query["kind"]].append(1.0 / ranks[0] if ranks else 0.0)
+            for kind, reciprocal in found.items():
+                if reciprocal:
+                    runs.append({
+                        "mode": name,
+                        "queries": kind,
+                        "recall": round(sum(r > 0 for r in reciprocal) / len(reciprocal), 4),
+                        "mrr": round(float(np.mean(reciprocal)), 4),
+                    })
+        index.close()
+
+    return {
+        "documents": len(paths),
+        "chunks": len(chunks),
+        "queries": Counter(q["kind"] for q in queries),
+        "top_k": top_k,
+        "dim": dim,
+        "runs": runs,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.hybrid_recall",
+        description="Recall@k of vector, lexical and hybrid (RRF) retrieval over CUAD chunks, offline.",
+    )
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="CUAD_v1 directory")
+    parser.add_argument("--txt", type=int, default=40, help="contracts taken from full_contract_txt")
+    parser.add_argument("--queries", type=int, default=200, help="queries per set (reference, topical)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=1024, help="dimension of the proxy embeddings")
+    parser.add_argument("--weights", nargs="*", default=["1:1", "1:0.5", "1:2"], metavar="VECTOR:LEXICAL",
+                        help="hybrid RRF weight pairs")
+    parser.add_argument("--json", type=Path, default=None, help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        weights = _parse_weights(args.weights)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    report = run(args.corpus, args.txt, args.queries, args.top_k, args.dim, weights)
+
+    print(f"{report['documents']} contracts, {report['chunks']} chunks, "
+          f"{dict(report['queries'])} queries, recall@{report['top_k']}")
+    print(f"  {'mode':<14} {'queries':<10} {'recall':>7} {'mrr':>7}")
+    for r in report["runs"]:
+        print(f"  {r['mode']:<14} {r['queries']:<10} {r['recall']:>7.3f} {r['mrr']:>7.3f}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
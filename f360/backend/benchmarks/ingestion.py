@@ -0,0 +1,211 @@
+"""
+F360 – Benchmark: Cognitive Ingestion
+Runs the staged ingestion pipeline (parse → extract → chunk → embed → store)
+over a fixed subset of the CUAD contracts – PDFs from full_contract_pdf and
+texts from full_contract_txt – with the deterministic hash embedding backend,
+and reports docs/s, chunks/s, MB/s and p50/p95 per stage.
+The parse and embedding caches are bypassed so every run does the same work.
+Without --database the store stage encodes the chunk rows as the COPY would
+(JSON metadata, float32 vectors) and drops them.
+The JSON results carry the subset fingerprint, the relevant settings and the
+git revision; --baseline prints the change against an earlier results file.
+
+Usage (from f360/backend):
+    python -m benchmarks.ingestion [--pdf N] [--txt N] [--embed-latency S] [--workers parse=2 embed=4]
+                                   [--database] [--json out.json] [--baseline old.json]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.services.cognitive_ingestion.bulk import STAGES, BulkIngestionPipeline, BulkItem, store_item
+from app.services.cognitive_ingestion.vectorizer import HashEmbeddingBackend, set_embedding_backend, settings
+from app.services.sources.parse_cache import get_parse_cache
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[3] / "Input/Contracts_30_English/CUAD_v1"
+SUBSETS = {"pdf": ("full_contract_pdf", {".pdf"}), "txt": ("full_contract_txt", {".txt"})}
+COMPARED = ("docs_per_s", "chunks_per_s", "mb_per_s", "doc_p50_ms", "doc_p95_ms")
+
+
+def select_subset(corpus: Path, kind: str, count: int) -> list[Path]:
+    """`count` files spread evenly over the sorted listing, so the subset is the same everywhere."""
+    folder, suffixes = SUBSETS[kind]
+    root = corpus / folder
+    files = sorted(
+        (p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in suffixes),
+        key=lambda p: p.relative_to(root).as_posix(),
+    )
+    if count >= len(files):
+        return files
+    return [files[i * len(files) // count] for i in range(count)]
+
+
+def subset_fingerprint(corpus: Path, paths: list[Path]) -> str:
+    """SHA-256 over the relative paths and sizes of the selected files."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(f"{path.relative_to(corpus).as_posix()}\x00{path.stat().st_size}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+async def encode_rows(item: BulkItem) -> uuid.UUID:
+    """Offline store: build the rows bulk_insert_chunks would COPY, then drop them."""
+    document_id = uuid.uuid4()
+
+    def _encode() -> int:
+        size = 0
+        for chunk, meta, vector in zip(item.chunks, item.chunk_metadata(), item.embeddings):
+            size += len(chunk.content.encode("utf-8"))
+            size += len(json.dumps(meta, default=str))
+            size += np.asarray(vector, dtype=np.float32).nbytes
+        return size
+
+    await asyncio.to_thread(_encode)
+    return document_id
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    corpus: Path,
+    pdf_count: int,
+    txt_count: int,
+    embed_latency: float = 0.0,
+    workers: dict[str, int] | None = None,
+    database: bool = False,
+) -> dict[str, Any]:
+    paths = select_subset(corpus, "pdf", pdf_count) + select_subset(corpus, "txt", txt_count)
+    if not paths:
+        raise FileNotFoundError(f"No CUAD documents under {corpus}")
+
+    # Same work on every run: nothing served from the parse / embedding caches
+    settings.parse_cache_enabled = False
+    settings.embedding_cache_enabled = False
+    get_parse_cache.cache_clear()
+    backend = HashEmbeddingBackend(latency=embed_latency)
+    set_embedding_backend(backend)
+    try:
+        pipeline = BulkIngestionPipeline(workers=workers, store=store_item if database else encode_rows)
+        report = asyncio.run(pipeline.run(BulkItem(path, entity_type="contract") for path in paths))
+    finally:
+        set_embedding_backend(None)
+
+    return {
+        "benchmark": "ingestion",
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "subset": {
+            "pdf": pdf_count,
+            "txt": txt_count,
+            "files": len(paths),
+            "fingerprint": subset_fingerprint(corpus, paths),
+        },
+        "config": {
+            "store": "database" if database else "encode-only",
+            "embedding_backend": backend.model,
+            "embed_latency_s": embed_latency,
+            "embed_requests": backend.calls,
+            "workers": pipeline.workers,
+            "chunking_mode": settings.chunking_mode,
+            "chunk_max_tokens": settings.chunk_max_tokens,
+            "embedding_batch_size": settings.embedding_batch_size,
+            "pdf_parallel_workers": settings.pdf_parallel_workers,
+        },
+        "results": report,
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    """Relative change of the headline rates and per-stage latencies against a baseline run."""
+    lines = [f"vs baseline {baseline.get('git_revision') or '?'} ({baseline.get('created_at', '?')})"]
+    if baseline.get("subset", {}).get("fingerprint") != current["subset"]["fingerprint"]:
+        lines.append("  warning: different document subset, numbers are not comparable")
+
+    def _delta(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    old, new = baseline["results"], current["results"]
+    for key in COMPARED:
+        lines.append(f"  {key:<14} {old[key]:>10} → {new[key]:>10}  {_delta(new[key], old[key])}")
+    old_stages = {s["stage"]: s for s in old["stages"]}
+    for stage in new["stages"]:
+        before = old_stages.get(stage["stage"])
+        if before:
+            lines.append(
+                f"  {stage['stage']:<8} p50 {_delta(stage['p50_ms'], before['p50_ms']):>8}"
+                f"   p95 {_delta(stage['p95_ms'], before['p95_ms']):>8}"
+            )
+    return lines
+
+
+def _parse_workers(values: list[str]) -> dict[str, int]:
+    workers: dict[str, int] = {}
+    for value in values:
+        stage, _, count = value.partition("=")
+        if stage not in STAGES or not count.isdigit():
+            raise argparse.ArgumentTypeError(f"expected stage=N with stage in {', '.join(STAGES)}: {value}")
+        workers[stage] = int(count)
+    return workers
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.ingestion",
+        description="Cognitive ingestion throughput over a fixed CUAD subset with a deterministic embedding backend.",
+    )
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="CUAD_v1 directory")
+    parser.add_argument("--pdf", type=int, default=8, help="contracts taken from full_contract_pdf")
+    parser.add_argument("--txt", type=int, default=40, help="contracts taken from full_contract_txt")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="simulated seconds per embedding request")
+    parser.add_argument("--workers", nargs="*", default=[], metavar="STAGE=N", help="stage concurrency overrides")
+    parser.add_argument("--database", action="store_true", help="store into PostgreSQL instead of encoding only")
+    parser.add_argument("--json", type=Path, default=None, help="also write the results to this file")
+    parser.add_argument("--baseline", type=Path, default=None, help="results file of an earlier run to compare with")
+    args = parser.parse_args(argv)
+
+    try:
+        workers = _parse_workers(args.workers)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    results = run(args.corpus, args.pdf, args.txt, args.embed_latency, workers, args.database)
+
+    report = results["results"]
+    print(f"{report['documents']} documents ({results['subset']['pdf']} PDF + {results['subset']['txt']} TXT, "
+          f"subset {results['subset']['fingerprint']}), {report['failed']} failed")
+    print(f"  {report['docs_per_s']} docs/s, {report['chunks_per_s']} chunks/s, {report['mb_per_s']} MB/s "
+          f"({report['megabytes']} MB, {report['chunks']} chunks in {report['elapsed_s']} s)")
+    print(f"  {'stage':<8} {'workers':>7} {'items':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for s in report["stages"]:
+        print(f"  {s['stage']:<8} {s['workers']:>7} {s['items']:>6} {s['p50_ms']:>9} {s['p95_ms']:>9}")
+    if args.baseline:
+        print("\n".join(compare(results, json.loads(args.baseline.read_text()))))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
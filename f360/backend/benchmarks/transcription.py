@@ -0,0 +1,147 @@
+"""
+F360 – Benchmark: Segmented Transcription
+Synthesizes a long "speech-like" recording (tone bursts separated by
+pauses), then transcribes it with the offline backend simulating a remote
+API (fixed latency + time proportional to the audio sent): one request for
+the whole file versus pause-aligned segments at increasing concurrency.
+Also reports how many segment cuts fell inside a pause. Requires ffmpeg.
+
+Usage (from f360/backend):
+    python -m benchmarks.transcription [--minutes M] [--latency S] [--realtime-factor F]
+                                       [--concurrency 1 4 8] [--json out.json]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.services.sources.media import AUDIO_SAMPLE_RATE, ffmpeg_available
+from app.services.sources.transcription import (
+    OfflineTranscriber,
+    iter_speech_segments,
+    settings,
+    stitch,
+    transcribe_segments,
+)
+
+
+def synthesize_speech(path: Path, minutes: float, seed: int = 7) -> list[tuple[float, float]]:
+    """Write a 16 kHz mono WAV of 2–12 s utterances and 0.3–1.5 s pauses. Returns the pauses."""
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * AUDIO_SAMPLE_RATE)
+    pieces: list[np.ndarray] = []
+    pauses: list[tuple[float, float]] = []
+    position = 0
+    while position < total:
+        length = int(rng.uniform(2, 12) * AUDIO_SAMPLE_RATE)
+        t = np.arange(length) / AUDIO_SAMPLE_RATE
+        pitch = rng.uniform(110, 260)
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(2, 5) * t) ** 2   # syllable-like modulation
+        pieces.append((np.sin(2 * np.pi * pitch * t) * envelope * 9000).astype(np.int16))
+        position += length
+        gap = int(rng.uniform(0.3, 1.5) * AUDIO_SAMPLE_RATE)
+        pauses.append((position / AUDIO_SAMPLE_RATE, (position + gap) / AUDIO_SAMPLE_RATE))
+        pieces.append((rng.normal(0, 30, gap)).astype(np.int16))                 # room noise
+        position += gap
+    with wave.open(str(path), "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(AUDIO_SAMPLE_RATE)
+        out.writeframes(np.concatenate(pieces)[:total].tobytes())
+    return pauses
+
+
+async def _whole_file(path: Path, transcriber: OfflineTranscriber) -> None:
+    with open(path, "rb") as audio_file:
+        await transcriber.transcribe(audio_file, "fr")
+
+
+async def _segmented(path: Path, transcriber: OfflineTranscriber, concurrency: int) -> tuple[str, list[float]]:
+    starts: list[float] = []
+
+    async def _segments():
+        async for segment in iter_speech_segments(path):
+            starts.append(segment.start)
+            yield segment
+
+    parts = await transcribe_segments(
+        _segments(), transcriber, "fr", concurrency=concurrency, silence_db=settings.transcription_silence_db,
+    )
+    return stitch(parts), starts
+
+
+def run(minutes: float, latency: float, realtime_factor: float, concurrency: list[int]) -> dict[str, Any]:
+    if not ffmpeg_available():
+        raise RuntimeError(f"ffmpeg not found ({settings.ffmpeg_binary})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "speech.wav"
+        pauses = synthesize_speech(path, minutes)
+        report: dict[str, Any] = {
+            "audio_minutes": minutes,
+            "latency_s": latency,
+            "realtime_factor": realtime_factor,
+            "max_segment_s": settings.media_segment_seconds,
+        }
+
+        transcriber = OfflineTranscriber(latency, realtime_factor)
+        started = time.perf_counter()
+        asyncio.run(_whole_file(path, transcriber))
+        report["whole_file_s"] = round(time.perf_counter() - started, 3)
+
+        runs = []
+        for workers in concurrency:
+            transcriber = OfflineTranscriber(latency, realtime_factor)
+            started = time.perf_counter()
+            transcript, starts = asyncio.run(_segmented(path, transcriber, workers))
+            runs.append({
+                "concurrency": workers,
+                "seconds": round(time.perf_counter() - started, 3),
+                "requests": transcriber.calls,
+                "transcript_lines": len(transcript.splitlines()),
+            })
+        report["segmented"] = runs
+
+    cuts = starts[1:]
+    in_pause = sum(any(lo <= cut <= hi for lo, hi in pauses) for cut in cuts)
+    report["segments"] = len(starts)
+    report["cuts_in_pause"] = f"{in_pause}/{len(cuts)}"
+    report["speedup_vs_whole"] = round(report["whole_file_s"] / runs[-1]["seconds"], 2)
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.transcription",
+        description="Whole-file vs segmented concurrent transcription with a simulated backend.",
+    )
+    parser.add_argument("--minutes", type=float, default=60.0, help="length of the synthetic recording")
+    parser.add_argument("--latency", type=float, default=0.5, help="simulated per-request latency (s)")
+    parser.add_argument("--realtime-factor", type=float, default=0.02, help="simulated seconds per audio second")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--json", type=Path, default=None, help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args.minutes, args.latency, args.realtime_factor, args.concurrency)
+    print(f"{report['audio_minutes']} min of audio, {report['segments']} segments, "
+          f"cuts in pauses {report['cuts_in_pause']}")
+    print(f"  whole file          {report['whole_file_s']:>8.3f} s  (1 request)")
+    for r in report["segmented"]:
+        print(f"  concurrency {r['concurrency']:<7} {r['seconds']:>8.3f} s  ({r['requests']} requests)")
+    print(f"  speedup             {report['speedup_vs_whole']:.2f}x")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+F360 – Benchmark: Vector Index Recall vs Latency
+Loads embeddings into a scratch table (synthetic clustered vectors, or a
+sample of document_chunks with --source chunks), computes the exact top-k of
+every query with numpy, then measures recall@k and query latency:
+- exact search in PostgreSQL (index scans disabled), the baseline latency
+- HNSW at each --ef-search value
+- IVFFlat (lists sized as the index manager would) at each --probes value
+Index build times are reported too. Requires PostgreSQL with pgvector; the
+scratch table is dropped afterwards.
+
+Usage (from f360/backend):
+    python -m benchmarks.vector_recall [--rows N] [--dim D] [--queries Q] [--top-k K]
+                                       [--ef-search 10 40 100 200] [--probes 1 5 10 40]
+                                       [--source synthetic|chunks] [--json out.json]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.services.cognitive_ingestion.vector_index import ivfflat_lists
+
+settings = get_settings()
+TABLE = "bench_vector_recall"
+
+
+def synthesize(rows: int, dim: int, clusters: int = 64, seed: int = 11) -> np.ndarray:
+    """Unit vectors around `clusters` random centres – embeddings are far from uniform."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    data = rng.standard_normal((rows, dim), dtype=np.float32)
+    data *= 0.6
+    data += centres[rng.integers(0, clusters, rows)]
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    return data
+
+
+def make_queries(data: np.ndarray, count: int, noise: float = 0.3, seed: int = 12) -> np.ndarray:
+    """Perturbed copies of random rows, so each query has a meaningful neighbourhood."""
+    rng = np.random.default_rng(seed)
+    picked = data[rng.choice(len(data), size=count, replace=False)]
+    queries = picked + rng.standard_normal(picked.shape, dtype=np.float32) * (noise / np.sqrt(data.shape[1]))
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def exact_top_k(data: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Row ids of the k nearest rows by cosine distance, nearest first."""
+    scores = queries @ data.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+
+def recall_at_k(found: list[list[int]], truth: np.ndarray) -> float:
+    hits = sum(len(set(ids) & set(expected.tolist())) for ids, expected in zip(found, truth))
+    return hits / truth.size
+
+
+def _latency(seconds: list[float]) -> dict[str, float]:
+    samples = np.array(seconds) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)), 2),
+        "p95_ms": round(float(np.percentile(samples, 95)), 2),
+        "mean_ms": round(float(samples.mean()), 2),
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# DATABASE
+# ═══════════════════════════════════════════════════════════════
+
+async def _connect():
+    import asyncpg
+    from pgvector.asyncpg import register_vector
+
+    conn = await asyncpg.connect(settings.database_url.replace("postgresql+asyncpg", "postgresql"))
+    await register_vector(conn)
+    return conn
+
+
+async def _load(conn, data: np.ndarray) -> None:
+    await conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    await conn.execute(f"CREATE TABLE {TABLE} (id INTEGER PRIMARY KEY, embedding vector({data.shape[1]}))")
+    await conn.copy_records_to_table(TABLE, records=((i, row) for i, row in enumerate(data)))
+    await conn.execute(f"ANALYZE {TABLE}")
+
+
+async def _sample_chunks(conn, rows: int) -> np.ndarray:
+    records = await conn.fetch(
+        "SELECT embedding FROM document_chunks WHERE embedding IS NOT NULL LIMIT $1", rows,
+    )
+    if not records:
+        raise RuntimeError("document_chunks holds no embeddings – use --source synthetic")
+    data = np.stack([np.asarray(r["embedding"], dtype=np.float32) for r in records])
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+async def _search(conn, queries: np.ndarray, k: int, setup: list[str]) -> tuple[list[list[int]], list[float]]:
+    """Run every query in its own transaction after the `setup` SET LOCAL statements."""
+    statement = await conn.prepare(f"SELECT id FROM {TABLE} ORDER BY embedding <=> $1 LIMIT $2")
+    found, seconds = [], []
+    for query in queries:
+        async with conn.transaction():
+            for sql in setup:
+                await conn.execute(sql)
+            started = time.perf_counter()
+            rows = await statement.fetch(query, k)
+            seconds.append(time.perf_counter() - started)
+        found.append([r["id"] for r in rows])
+    return found, seconds
+
+
+async def _build(conn, method: str, options: str) -> float:
+    await conn.execute("SET maintenance_work_mem = '1GB'")
+    started = time.perf_counter()
+    await conn.execute(
+        f"CREATE INDEX {TABLE}_{method} ON {TABLE} USING {method} (embedding vector_cosine_ops) WITH ({options})"
+    )
+    return time.perf_counter() - started
+
+
+async def _run(args: argparse.Namespace) -> dict[str, Any]:
+    conn = await _connect()
+    try:
+        if args.source == "chunks":
+            data = await _sample_chunks(conn, args.rows)
+        else:
+            data = synthesize(args.rows, args.dim)
+        queries = make_queries(data, args.queries)
+        truth = exact_top_k(data, queries, args.top_k)
+        await _load(conn, data)
+
+        def _entry(name: str, setting: str | None, found: list[list[int]], seconds: list[float]) -> dict[str, Any]:
+            return {"index": name, "setting": setting, "recall": round(recall_at_k(found, truth), 4), **_latency(seconds)}
+
+        runs = [_entry("exact", None, *await _search(conn, queries, args.top_k, ["SET LOCAL enable_indexscan = off"]))]
+        builds: dict[str, float] = {}
+
+        if args.ef_search:
+            options = f"m = {settings.hnsw_m}, ef_construction = {settings.hnsw_ef_construction}"
+            builds["hnsw"] = round(await _build(conn, "hnsw", options), 2)
+            for ef in args.ef_search:
+                setup = [f"SET LOCAL hnsw.ef_search = {max(int(ef), args.top_k)}"]
+                runs.append(_entry("hnsw", f"ef_search={ef}", *await _search(conn, queries, args.top_k, setup)))
+            await conn.execute(f"DROP INDEX {TABLE}_hnsw")
+
+        if args.probes:
+            lists = ivfflat_lists(len(data))
+            builds["ivfflat"] = round(await _build(conn, "ivfflat", f"lists = {lists}"), 2)
+            for probes in args.probes:
+                setup = [f"SET LOCAL ivfflat.probes = {int(probes)}"]
+                runs.append(_entry("ivfflat", f"probes={probes}/{lists}", *await _search(conn, queries, args.top_k, setup)))
+            await conn.execute(f"DROP INDEX {TABLE}_ivfflat")
+    finally:
+        await conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        await conn.close()
+
+    return {
+        "source": args.source,
+        "rows": len(data),
+        "dim": data.shape[1],
+        "queries": len(queries),
+        "top_k": args.top_k,
+        "hnsw": {"m": settings.hnsw_m, "ef_construction": settings.hnsw_ef_construction},
+        "build_s": builds,
+        "runs": runs,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.vector_recall",
+        description="Recall@k and latency of HNSW / IVFFlat search settings against exact search.",
+    )
+    parser.add_argument("--rows", type=int, default=50_000, help="vectors loaded into the scratch table")
+    parser.add_argument("--dim", type=int, default=settings.embedding_dimension, help="dimension of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, nargs="*", default=[10, 20, 40, 100, 200], help="HNSW settings (none: skip)")
+    parser.add_argument("--probes", type=int, nargs="*", default=[1, 5, 10, 20, 50], help="IVFFlat settings (none: skip)")
+    parser.add_argument("--source", choices=("synthetic", "chunks"), default="synthetic")
+    parser.add_argument("--json", type=Path, default=None, help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(_run(args))
+    print(f"{report['rows']} vectors × {report['dim']} ({report['source']}), "
+          f"{report['queries']} queries, recall@{report['top_k']}")
+    for method, seconds in report["build_s"].items():
+        print(f"  {method} build {seconds} s")
+    print(f"  {'index':<8} {'setting':<18} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in report["runs"]:
+        print(f"  {r['index']:<8} {r['setting'] or '-':<18} {r['recall']:>7.3f} {r['p50_ms']:>8} {r['p95_ms']:>8}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -149,12 +149,16 @@ CREATE TABLE IF NOT EXISTS documents (
     file_type       VARCHAR(20),          -- 'pdf', 'xlsx', 'docx', 'email'
     file_path       TEXT,
     file_size_bytes BIGINT,
+    content_sha256  CHAR(64),             -- SHA-256 of the stored upload
     entity_type     VARCHAR(50),          -- 'contract', 'invoice', 'budget', 'email'
     entity_id       UUID,                 -- FK to related entity
     processed       BOOLEAN DEFAULT FALSE,
     created_at      TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Databases created before upload deduplication: add the hash column
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_sha256 CHAR(64);
+
 -- ──────────────────────────────────────────────
 -- DOCUMENT CHUNKS (for RAG / vector search)
 -- ──────────────────────────────────────────────
@@ -165,20 +169,91 @@ CREATE TABLE IF NOT EXISTS document_chunks (
     content         TEXT NOT NULL,
     metadata        JSONB DEFAULT '{}',
     embedding       vector(1536),          -- OpenAI text-embedding-3-small dimension
+    company_id      UUID,                  -- copied from documents by trg_chunks_tenant: tenant filter
+    entity_type     VARCHAR(50),           -- without a join, inside the vector index scan
     created_at      TIMESTAMPTZ DEFAULT NOW()
 );
 
--- Index for vector similarity search (IVFFlat for large datasets)
-CREATE INDEX IF NOT EXISTS idx_chunks_embedding
-    ON document_chunks
-    USING ivfflat (embedding vector_cosine_ops)
-    WITH (lists = 100);
+-- Databases created before the tenant columns: add and backfill them
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS company_id UUID;
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS entity_type VARCHAR(50);
+UPDATE document_chunks dc
+SET company_id = d.company_id, entity_type = d.entity_type
+FROM documents d
+WHERE d.id = dc.document_id
+  AND (dc.company_id IS DISTINCT FROM d.company_id OR dc.entity_type IS DISTINCT FROM d.entity_type);
+
+CREATE INDEX IF NOT EXISTS idx_chunks_company ON document_chunks(company_id, entity_type);
+
+-- Chunks take their company / entity type from their document (COPY included) …
+CREATE OR REPLACE FUNCTION chunks_copy_document_tenant() RETURNS trigger AS $$
+BEGIN
+    SELECT d.company_id, d.entity_type INTO NEW.company_id, NEW.entity_type
+    FROM documents d WHERE d.id = NEW.document_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_chunks_tenant ON document_chunks;
+CREATE TRIGGER trg_chunks_tenant
+    BEFORE INSERT OR UPDATE OF document_id ON document_chunks
+    FOR EACH ROW EXECUTE FUNCTION chunks_copy_document_tenant();
+
+-- … and follow it when it moves
+CREATE OR REPLACE FUNCTION documents_propagate_tenant() RETURNS trigger AS $$
+BEGIN
+    UPDATE document_chunks
+    SET company_id = NEW.company_id, entity_type = NEW.entity_type
+    WHERE document_id = NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_documents_tenant ON documents;
+CREATE TRIGGER trg_documents_tenant
+    AFTER UPDATE OF company_id, entity_type ON documents
+    FOR EACH ROW
+    WHEN (OLD.company_id IS DISTINCT FROM NEW.company_id OR OLD.entity_type IS DISTINCT FROM NEW.entity_type)
+    EXECUTE FUNCTION documents_propagate_tenant();
+
+-- Vector similarity index (idx_chunks_embedding): not created here. IVFFlat
+-- centroids trained on an empty table give poor recall, so the backend builds
+-- HNSW (or IVFFlat) CONCURRENTLY once enough chunks exist – see
+-- app/services/cognitive_ingestion/vector_index.py – together with partial
+-- indexes (WHERE company_id = …) for the largest companies
 
 -- Full-text search index
 CREATE INDEX IF NOT EXISTS idx_chunks_content_trgm
     ON document_chunks
     USING gin (content gin_trgm_ops);
 
+-- Change counter of each company's chunks (company id, '' for documents
+-- without one), bumped by the transaction that changes them: the retrieval
+-- cache of every process checks it before serving a stored answer
+CREATE TABLE IF NOT EXISTS chunk_generations (
+    company_key     VARCHAR(36) PRIMARY KEY,
+    generation      BIGINT NOT NULL DEFAULT 0
+);
+
+-- ──────────────────────────────────────────────
+-- DOCUMENT TABLES (spreadsheets unpivoted to Parquet)
+-- ──────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS document_tables (
+    id              UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    document_id     UUID REFERENCES documents(id) ON DELETE CASCADE,
+    sheet_name      VARCHAR(255) NOT NULL,
+    file_path       TEXT NOT NULL,         -- long format: dimensions…, variable, period, value, row
+    layout          VARCHAR(20),           -- 'periods' | 'numeric'
+    dimensions      JSONB DEFAULT '[]',
+    measures        JSONB DEFAULT '[]',
+    source_rows     INTEGER DEFAULT 0,
+    row_count       INTEGER DEFAULT 0,
+    size_bytes      INTEGER DEFAULT 0,
+    created_at      TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_document_tables_document ON document_tables(document_id);
+
 -- ──────────────────────────────────────────────
 -- CASHFLOW ENTRIES (for projection)
 -- ──────────────────────────────────────────────
@@ -237,3 +312,4 @@ CREATE INDEX IF NOT EXISTS idx_budgets_company_year ON budgets(company_id, fisca
 CREATE INDEX IF NOT EXISTS idx_cashflow_date ON cashflow_entries(entry_date);
 CREATE INDEX IF NOT EXISTS idx_recommendations_company ON recommendations(company_id);
 CREATE INDEX IF NOT EXISTS idx_documents_entity ON documents(entity_type, entity_id);
+CREATE INDEX IF NOT EXISTS idx_documents_content_sha256 ON documents(content_sha256);   -- duplicate uploads
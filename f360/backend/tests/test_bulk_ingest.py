@@ -0,0 +1,94 @@
+"""
+F360 – Tests: Bulk Ingestion Pipeline
+"""
+import asyncio
+import json
+import uuid
+
+import pytest
+from app.services.cognitive_ingestion import bulk
+from app.services.cognitive_ingestion.bulk import BulkIngestionPipeline, Checkpoint, discover_files
+from app.services.cognitive_ingestion.tokenizer import TokenCounter
+from app.services.sources.parse_cache import ParseCache
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    async def fake_embeddings(texts, token_counts=None):
+        return [[0.0, 1.0]] * len(texts)
+
+    monkeypatch.setattr(bulk, "get_embeddings", fake_embeddings)
+    monkeypatch.setattr(bulk, "get_token_counter", lambda: TokenCounter(None))
+    cache = ParseCache(tmp_path / "parsed.sqlite3")
+    monkeypatch.setattr(bulk, "get_parse_cache", lambda: cache)
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(6):
+        (docs / f"contract_{i}.txt").write_text(
+            f"Contract {i}. The buyer pays 1 200,00 EUR to Acme SARL on 12/03/2024. " * 40
+        )
+    (docs / "notes.md").write_text("ignored")
+    return docs
+
+
+class TestDiscovery:
+    def test_directory_walk_filters_extensions(self, corpus):
+        items = list(discover_files(corpus))
+        assert [i.path.name for i in items] == [f"contract_{i}.txt" for i in range(6)]
+
+    def test_jsonl_manifest(self, corpus, tmp_path):
+        company = uuid.uuid4()
+        manifest = tmp_path / "manifest.jsonl"
+        manifest.write_text(
+            json.dumps({"path": "docs/contract_0.txt", "company_id": str(company)}) + "\n"
+            + json.dumps({"path": "docs/contract_1.txt", "entity_type": "invoice"}) + "\n"
+        )
+        items = list(discover_files(manifest, entity_type="contract"))
+        assert items[0].company_id == company and items[0].entity_type == "contract"
+        assert items[1].entity_type == "invoice"
+        assert items[1].path.exists()
+
+
+class TestBulkPipeline:
+    def test_all_documents_flow_through_every_stage(self, corpus):
+        stored = []
+
+        async def store(item):
+            stored.append(item)
+            return uuid.uuid4()
+
+        pipeline = BulkIngestionPipeline(workers={"parse": 2, "embed": 3}, queue_size=2, store=store)
+        report = asyncio.run(pipeline.run(discover_files(corpus)))
+
+        assert report["documents"] == 6 and report["failed"] == 0
+        assert [s["items"] for s in report["stages"]] == [6] * 5
+        assert report["chunks"] == sum(len(i.chunks) for i in stored)
+        metadata = stored[0].chunk_metadata()[0]
+        assert metadata["total_chunks"] == len(stored[0].chunks)
+        assert metadata["entities"]
+        assert {"token_count", "fingerprint", "chunk_index"} <= set(metadata)
+
+    def test_checkpoint_resume(self, corpus, tmp_path):
+        checkpoint_path = tmp_path / "run.checkpoint.jsonl"
+        calls = 0
+
+        async def flaky_store(item):
+            nonlocal calls
+            calls += 1
+            if item.path.name == "contract_3.txt":
+                raise RuntimeError("database unavailable")
+            return uuid.uuid4()
+
+        first = BulkIngestionPipeline(checkpoint=Checkpoint(checkpoint_path), store=flaky_store)
+        report = asyncio.run(first.run(discover_files(corpus)))
+        assert report["documents"] == 5 and report["failed"] == 1
+
+        async def store(item):
+            return uuid.uuid4()
+
+        second = BulkIngestionPipeline(checkpoint=Checkpoint(checkpoint_path), store=store)
+        report = asyncio.run(second.run(discover_files(corpus)))
+        assert report["skipped"] == 5
+        assert report["documents"] == 1
+        assert bulk.get_parse_cache().stats()["hits"] == 1   # parsed in the first run
@@ -0,0 +1,57 @@
+"""
+F360 – Tests: Bulk Chunk Store
+"""
+import asyncio
+import uuid
+
+import numpy as np
+import pytest
+from app.services.cognitive_ingestion.chunk_store import bulk_insert_chunks
+
+
+class FakeSession:
+    """Records executed statements instead of talking to PostgreSQL."""
+
+    bind = None
+
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, statement, params=None):
+        self.calls.append((str(statement), params))
+
+
+class TestBulkInsert:
+    def test_single_round_trip(self):
+        db = FakeSession()
+        doc_id = uuid.uuid4()
+        ids = asyncio.run(bulk_insert_chunks(
+            db,
+            document_id=doc_id,
+            contents=["first chunk", "second chunk", "third chunk"],
+            embeddings=[[0.1, 0.2]] * 3,
+            metadatas=[{"chunk_index": i} for i in range(3)],
+        ))
+        assert len(db.calls) == 1
+        assert len(ids) == 3 and len(set(ids)) == 3
+
+        sql, rows = db.calls[0]
+        assert sql.startswith("INSERT INTO document_chunks")
+        assert [r["id"] for r in rows] == ids
+        assert [r["chunk_index"] for r in rows] == [0, 1, 2]
+        assert rows[2]["metadata"] == {"chunk_index": 2}
+
+    def test_embeddings_sent_as_float32(self):
+        db = FakeSession()
+        asyncio.run(bulk_insert_chunks(db, uuid.uuid4(), ["a"], [[0.5, 0.25]], [{}]))
+        vector = db.calls[0][1][0]["embedding"]
+        assert isinstance(vector, np.ndarray) and vector.dtype == np.float32
+
+    def test_empty_document(self):
+        db = FakeSession()
+        assert asyncio.run(bulk_insert_chunks(db, uuid.uuid4(), [], [], [])) == []
+        assert db.calls == []
+
+    def test_length_mismatch(self):
+        with pytest.raises(ValueError):
+            asyncio.run(bulk_insert_chunks(FakeSession(), uuid.uuid4(), ["a"], [], [{}]))
@@ -29,3 +29,87 @@ class TestChunking:
         chunks = chunk_text(text, chunk_size=500, overlap=100)
         # With overlap, later chunks should start before previous chunk ends
         assert len(chunks) >= 4
+
+
+class TestStreamingChunker:
+    def test_offsets_match_joined_text(self):
+        from app.services.cognitive_ingestion.chunker import SEGMENT_JOINER, iter_chunks
+
+        pages = ["First page. " * 60, "Second page. " * 60, "Third page. " * 60]
+        joined = SEGMENT_JOINER.join(pages)
+        for chunk in iter_chunks(pages, chunk_size=300, overlap=50):
+            assert joined[chunk.start:chunk.end] == chunk.content
+
+    def test_paged_input_equals_joined_input(self):
+        from app.services.cognitive_ingestion.chunker import SEGMENT_JOINER, iter_chunks
+
+        pages = [f"Clause {i}. The supplier shall deliver goods. " * 20 for i in range(5)]
+        paged = [c.content for c in iter_chunks(pages, chunk_size=400, overlap=80)]
+        whole = chunk_text(SEGMENT_JOINER.join(pages), chunk_size=400, overlap=80)
+        assert paged == whole
+
+    def test_segment_index(self):
+        from app.services.cognitive_ingestion.chunker import iter_chunks
+
+        pages = ["A" * 500, "B" * 500]
+        chunks = list(iter_chunks(pages, chunk_size=200, overlap=0))
+        assert chunks[0].segment == 0
+        assert chunks[-1].segment == 1
+
+    def test_large_overlap_terminates(self):
+        text = "word " * 400
+        chunks = chunk_text(text, chunk_size=100, overlap=99)
+        assert 0 < len(chunks) <= len(text)
+
+
+class WordCounter:
+    """Deterministic stand-in for tiktoken: one token per word."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def count_many(self, texts):
+        self.calls += 1
+        return [len(t.split()) for t in texts]
+
+
+class TestTokenChunker:
+    def test_chunks_respect_budget(self):
+        from app.services.cognitive_ingestion.chunker import TokenChunker
+
+        pages = ["The buyer pays the seller within thirty days. " * 40] * 3
+        chunker = TokenChunker(max_tokens=50, overlap_tokens=10, counter=WordCounter())
+        chunks = [c for p in pages for c in chunker.feed(p)] + chunker.finish()
+        assert len(chunks) > 1
+        for chunk in chunks:
+            assert 0 < chunk.metadata["token_count"] <= 50
+            assert chunk.metadata["token_count"] == len(chunk.content.split())
+
+    def test_offsets_and_order(self):
+        from app.services.cognitive_ingestion.chunker import SEGMENT_JOINER, TokenChunker
+
+        pages = ["".join(f"Page {p} sentence {i}. " for i in range(30)) for p in range(4)]
+        chunker = TokenChunker(max_tokens=20, overlap_tokens=5, counter=WordCounter())
+        chunks = [c for p in pages for c in chunker.feed(p)] + chunker.finish()
+        joined = SEGMENT_JOINER.join(pages)
+        assert [c.index for c in chunks] == list(range(len(chunks)))
+        for chunk in chunks:
+            assert joined[chunk.start:chunk.end] == chunk.content
+        assert chunks[-1].end == len(joined.rstrip())
+
+    def test_oversized_sentence_is_split(self):
+        from app.services.cognitive_ingestion.chunker import TokenChunker
+
+        chunker = TokenChunker(max_tokens=10, overlap_tokens=0, counter=WordCounter())
+        chunks = chunker.feed("word " * 95) + chunker.finish()
+        assert all(c.metadata["token_count"] <= 10 for c in chunks)
+        assert sum(c.metadata["token_count"] for c in chunks) == 95
+
+    def test_tokenizes_in_batches(self):
+        from app.services.cognitive_ingestion.chunker import TokenChunker
+
+        counter = WordCounter()
+        chunker = TokenChunker(max_tokens=30, overlap_tokens=0, counter=counter)
+        chunker.feed("One sentence here. " * 200)
+        # one call for the page's sentences + one for the emitted chunks
+        assert counter.calls == 2
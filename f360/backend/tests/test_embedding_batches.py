@@ -0,0 +1,101 @@
+"""
+F360 – Tests: Embedding Batch Planning
+"""
+import pytest
+from app.services.cognitive_ingestion.vectorizer import plan_embedding_batches
+
+
+class TestEmbeddingBatches:
+    def test_empty_input(self):
+        assert plan_embedding_batches([]) == []
+
+    def test_batch_size_limit(self):
+        texts = ["chunk"] * 10
+        batches = plan_embedding_batches(texts, max_batch_size=4, max_batch_tokens=10_000)
+        assert [len(b) for b in batches] == [4, 4, 2]
+
+    def test_token_limit(self):
+        texts = ["A" * 400] * 6  # ~101 tokens each
+        batches = plan_embedding_batches(texts, max_batch_size=100, max_batch_tokens=250)
+        assert all(len(b) <= 2 for b in batches)
+        assert sum(len(b) for b in batches) == 6
+
+    def test_oversized_text_gets_own_batch(self):
+        texts = ["short", "B" * 10_000, "short"]
+        batches = plan_embedding_batches(texts, max_batch_size=100, max_batch_tokens=100)
+        assert [1] in batches
+
+    def test_order_preserved(self):
+        texts = [f"chunk {i}" for i in range(25)]
+        batches = plan_embedding_batches(texts, max_batch_size=7, max_batch_tokens=10_000)
+        assert [i for b in batches for i in b] == list(range(25))
+
+    def test_stored_token_counts_override_estimate(self):
+        texts = ["x"] * 4  # estimate would be 1 token each
+        batches = plan_embedding_batches(
+            texts, max_batch_size=100, max_batch_tokens=100, token_counts=[60, 60, 30, 30],
+        )
+        assert batches == [[0], [1, 2], [3]]
+
+    def test_token_counter_fallback(self):
+        from app.services.cognitive_ingestion.tokenizer import TokenCounter
+
+        counter = TokenCounter(encoding=None)
+        assert counter.count_many(["A" * 400, ""]) == [101, 1]
+        assert counter.count_many([]) == []
+
+
+class TestEmbeddingBackends:
+    def test_hash_backend_is_deterministic_unit_vectors(self):
+        import asyncio
+
+        import numpy as np
+        from app.services.cognitive_ingestion.vectorizer import HashEmbeddingBackend
+
+        backend = HashEmbeddingBackend()
+        first = asyncio.run(backend.embed(["net 30 days", "penalty clause"]))
+        again = asyncio.run(HashEmbeddingBackend().embed(["net 30 days"]))
+        assert first[0] == again[0] and first[0] != first[1]
+        assert np.linalg.norm(first[0]) == pytest.approx(1.0, abs=1e-5)
+
+    def test_override_drives_get_embeddings(self, monkeypatch):
+        import asyncio
+
+        from app.services.cognitive_ingestion import vectorizer
+
+        monkeypatch.setattr(vectorizer.settings, "embedding_cache_enabled", False)
+        monkeypatch.setattr(vectorizer.settings, "embedding_batch_size", 2)
+        backend = vectorizer.HashEmbeddingBackend()
+        vectorizer.set_embedding_backend(backend)
+        try:
+            assert vectorizer.get_embedding_backend() is backend
+            vectors = asyncio.run(vectorizer.get_embeddings(["a", "b", "a", "c"]))
+        finally:
+            vectorizer.set_embedding_backend(None)
+        assert vectors[0] == vectors[2] == backend.vector("a").tolist()
+        assert backend.calls == 2   # three distinct texts in batches of two
+        assert vectorizer.get_embedding_backend().name == vectorizer.settings.embedding_backend
+
+    def test_failed_batch_is_none_and_not_cached(self, monkeypatch, caplog):
+        import asyncio
+
+        from app.services.cognitive_ingestion import vectorizer
+        from app.services.cognitive_ingestion.embedding_cache import EmbeddingCache
+
+        class Failing(vectorizer.EmbeddingBackend):
+            async def embed(self, texts):
+                raise RuntimeError("quota exceeded")
+
+        cache = EmbeddingCache(memory_entries=10)
+        monkeypatch.setattr(vectorizer.settings, "embedding_cache_enabled", True)
+        monkeypatch.setattr(vectorizer, "get_embedding_cache", lambda: cache)
+        vectorizer.set_embedding_backend(Failing())
+        try:
+            vectors = asyncio.run(vectorizer.get_embeddings(["a", "b"]))
+            query = asyncio.run(vectorizer.get_embedding("a"))
+        finally:
+            vectorizer.set_embedding_backend(None)
+        assert vectors == [None, None]
+        assert query == [0.0] * vectorizer.settings.embedding_dimension
+        assert cache.stats()["memory_size"] == 0
+        assert "quota exceeded" in caplog.text and caplog.records[0].levelname == "WARNING"
@@ -0,0 +1,68 @@
+"""
+F360 – Tests: Embedding Cache
+"""
+import pytest
+from app.services.cognitive_ingestion.embedding_cache import EmbeddingCache, make_cache_key
+
+
+class TestCacheKey:
+    def test_whitespace_normalized(self):
+        a = make_cache_key("Total  TTC:\n 12000 €", "m", 1536)
+        b = make_cache_key("Total TTC: 12000 €", "m", 1536)
+        assert a == b
+
+    def test_model_and_dimension_in_key(self):
+        base = make_cache_key("text", "model-a", 1536)
+        assert base != make_cache_key("text", "model-b", 1536)
+        assert base != make_cache_key("text", "model-a", 512)
+
+
+class TestMemoryTier:
+    def test_hit_and_miss_counters(self):
+        cache = EmbeddingCache(memory_entries=10)
+        cache.put_many({"k1": [0.5, 0.25]})
+        found = cache.get_many(["k1", "k2"])
+        assert found == {"k1": [0.5, 0.25]}
+        stats = cache.stats()
+        assert stats["memory_hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(memory_entries=2)
+        cache.put_many({"a": [1.0]})
+        cache.put_many({"b": [2.0]})
+        cache.get_many(["a"])           # "a" becomes most recent
+        cache.put_many({"c": [3.0]})    # evicts "b"
+        assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+        assert cache.stats()["memory_evictions"] == 1
+
+
+class TestDiskTier:
+    def test_persists_across_instances(self, tmp_path):
+        path = tmp_path / "embeddings.sqlite3"
+        EmbeddingCache(memory_entries=10, disk_path=path).put_many({"k": [1.0, 2.0]})
+
+        reopened = EmbeddingCache(memory_entries=10, disk_path=path)
+        assert reopened.get_many(["k"]) == {"k": [1.0, 2.0]}
+        assert reopened.stats()["disk_hits"] == 1
+
+    def test_disk_eviction(self, tmp_path):
+        cache = EmbeddingCache(memory_entries=0, disk_path=tmp_path / "e.sqlite3", disk_entries=3)
+        for i in range(5):
+            cache.put_many({f"k{i}": [float(i)]})
+        stats = cache.stats()
+        assert stats["disk_size"] == 3
+        assert stats["disk_evictions"] == 2
+
+    def test_table_of_an_older_layout_is_rebuilt(self, tmp_path):
+        import sqlite3
+
+        path = tmp_path / "embeddings.sqlite3"
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)")
+        conn.commit()
+        conn.close()
+
+        cache = EmbeddingCache(memory_entries=0, disk_path=path)
+        cache.put_many({"k": [1.0]})
+        assert cache.get_many(["k"]) == {"k": [1.0]}
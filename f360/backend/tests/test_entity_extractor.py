@@ -53,3 +53,74 @@ class TestIndexationClauses:
         text = "Le prix est indexé sur l'indice d'inflation CPI publié par l'INSEE."
         result = extract_financial_entities(text)
         assert len(result["indexation_clauses"]) > 0
+
+
+class TestSinglePassEngine:
+    def test_overlapping_matches_of_different_patterns(self):
+        # "late payment" starts a penalty clause that contains an amount and a payment term
+        text = "Late payment interest of 40 EUR applies, net 30 days."
+        result = extract_financial_entities(text)
+        assert result["amounts"] == [40.0]
+        assert result["penalty_clauses"] == ["Late payment interest of 40 EUR applies, net 30 days."]
+        assert result["payment_terms"] == ["net 30 days"]
+
+    def test_overlapping_anchor_words(self):
+        # "EUR" at the end of "FOURNISSEUR" still anchors an amount
+        result = extract_financial_entities("FOURNISSEUR 1200")
+        assert result["amounts"] == [1200.0]
+
+    def test_offsets_survive_case_folding(self):
+        # "İ" lowercases to two characters; the scanner must not drift
+        result = extract_financial_entities("İİİ Total: 500 et 01/02/2026")
+        assert result["amounts"] == [500.0]
+        assert result["dates"] == ["01/02/2026"]
+
+    def test_collector_matches_whole_text_per_page(self):
+        from app.services.ingestion.entity_extractor import EntityCollector
+
+        pages = [
+            "Montant: 1000 € payable le 15/03/2026.",
+            "Supplier: ACME Ltd. Total: 1000 EUR, paiement à 30 jours.",
+            "Pénalité de retard de 3%. Échéance 2026-04-30, 15/03/2026.",
+        ]
+        collector = EntityCollector()
+        for page in pages:
+            collector.feed(page)
+        whole = extract_financial_entities("\n".join(pages))
+        assert collector.entities == whole
+        assert collector.entities["amounts"] == [1000.0]
+        assert collector.entities["dates"] == ["15/03/2026", "2026-04-30"]
+
+    def test_unicode_digits_anchor_like_ascii_ones(self):
+        # The patterns' \d matches any Unicode digit, so must the anchor
+        from benchmarks.entity_extraction import legacy_extract_financial_entities
+
+        text = "Échéance ١٥/٠٣/٢٠٢٦, montant ４２０ €, paiement ３０ jours fin de mois."
+        result = extract_financial_entities(text)
+        assert result["dates"] == ["١٥/٠٣/٢٠٢٦"]
+        assert result["amounts"] == [420.0]
+        legacy = legacy_extract_financial_entities(text)
+        assert result["amounts"] == legacy["amounts"]
+        assert result["payment_terms"] == legacy["payment_terms"]
+
+    def test_clauses_in_pattern_order_like_the_multi_pass_extractor(self):
+        from benchmarks.entity_extraction import legacy_extract_financial_entities
+        from app.services.ingestion.entity_extractor import EntityCollector
+
+        # Each pattern's matches come before the next pattern's, whatever the text order
+        pages = [
+            "Late payment interest applies. Net 30 days. Révision selon l'indice INSEE.",
+            "Une pénalité de 5% est due. Paiement à 45 jours. Inflation adjustment yearly.",
+        ]
+        text = " ".join(pages)
+        legacy = legacy_extract_financial_entities(text)
+        result = extract_financial_entities(text)
+        for key in ("payment_terms", "penalty_clauses", "indexation_clauses"):
+            assert result[key] == legacy[key]
+        assert result["penalty_clauses"][0].startswith("pénalité")
+
+        collector = EntityCollector()
+        for page in pages:
+            collector.feed(page)
+        for key in ("payment_terms", "penalty_clauses", "indexation_clauses"):
+            assert collector.entities[key] == legacy[key]
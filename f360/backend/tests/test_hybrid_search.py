@@ -0,0 +1,158 @@
+"""
+F360 – Tests: Hybrid Retrieval
+"""
+import asyncio
+import uuid
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.schemas import RAGQuery
+from app.services.cognitive_ingestion import hybrid, indexer, vector_store
+
+DIM = 8
+ACME, GLOBEX = uuid.uuid4(), uuid.uuid4()
+
+
+def _row(content, embedding, company_id=ACME):
+    chunk_id = uuid.uuid4()
+    return {
+        "chunk_id": chunk_id,
+        "document_id": chunk_id,
+        "company_id": company_id,
+        "filename": f"{content[:12]}.pdf",
+        "content": content,
+        "metadata": {},
+        "embedding": np.asarray(embedding, dtype=np.float32),
+    }
+
+
+def _axis(n, tilt=0.0):
+    vector = np.zeros(DIM, dtype=np.float32)
+    vector[n] = 1.0
+    vector[(n + 1) % DIM] = tilt
+    return vector
+
+
+class _RecordingBackend(vector_store.VectorBackend):
+    name = "recording"
+
+    def __init__(self):
+        self.calls = []
+
+    async def search(self, query_embedding, company_id, top_k, similarity_threshold, db,
+                     ef_search=None, probes=None):
+        self.calls.append(("search", None))
+        return []
+
+    async def hybrid_search(self, query_embedding, terms, company_id, top_k, similarity_threshold, db,
+                            ef_search=None, probes=None):
+        self.calls.append(("hybrid", terms))
+        return []
+
+
+class TestLexicalTerms:
+    def test_references_amounts_and_names_first(self):
+        terms = hybrid.lexical_terms("Which invoices from Dalton Logistics mention INV-2291 and 12,500.00 EUR penalties?")
+        assert [t for t, s in terms if s == hybrid.MEDIUM] == ["Dalton", "Logistics", "INV-2291", "12,500.00", "EUR"]
+        assert ("penalties", hybrid.WEAK) in terms and ("invoices", hybrid.WEAK) in terms
+        assert terms.index(("EUR", hybrid.MEDIUM)) < terms.index(("invoices", hybrid.WEAK))
+
+    def test_quoted_phrases_stopwords_and_limit(self):
+        terms = hybrid.lexical_terms('Quels contrats contiennent « clause de révision » pour Globex ?', max_terms=2)
+        assert terms == [("clause de révision", hybrid.STRONG), ("Globex", hybrid.MEDIUM)]
+        assert hybrid.lexical_terms("what is in the contract?") == []
+
+    def test_duplicates_keep_the_strongest(self):
+        terms = hybrid.lexical_terms("supplier terms for the Supplier")
+        assert terms == [("Supplier", hybrid.MEDIUM), ("terms", hybrid.WEAK)]
+
+    def test_like_pattern_escapes_wildcards(self):
+        assert hybrid.like_pattern("50%_off\\") == "%50\\%\\_off\\\\%"
+
+
+class TestFusion:
+    def test_rrf_rewards_agreement(self):
+        fused = hybrid.rrf_fuse([["a", "b", "c"], ["c", "d"]], [1.0, 1.0], k=60)
+        assert fused[0][0] == "c"
+        assert fused[0][1] == pytest.approx(1 / 63 + 1 / 61)
+        assert [key for key, _ in fused[1:]] == ["a", "b", "d"]   # b and d tie: first seen first
+
+    def test_weights(self):
+        fused = hybrid.rrf_fuse([["a"], ["b"]], [1.0, 2.0], k=1)
+        assert fused == [("b", 1.0), ("a", 0.5)]
+
+
+class TestLocalHybrid:
+    def test_literal_match_outranks_near_neighbours(self, tmp_path):
+        index = vector_store.LocalVectorIndex(tmp_path, DIM)
+        index.add([
+            _row("Payment terms apply to all purchases", _axis(0, 0.1)),
+            _row("Purchases are payable at 60 days", _axis(0, 0.2)),
+            _row("Late payment interest applies to purchases", _axis(0, 0.3)),
+            _row("Invoice INV-2291 issued by Dalton for 12,500.00 EUR", _axis(3)),
+            _row("Invoice INV-2291 issued by Dalton", _axis(3), company_id=GLOBEX),
+        ])
+        question = "invoice INV-2291 from Dalton"
+        terms = hybrid.lexical_terms(question)
+
+        vector_only = index.search(_axis(0), top_k=3, company_id=ACME)
+        assert "INV-2291" not in " ".join(r["content"] for r in vector_only)
+
+        fused = index.hybrid_search(_axis(0), terms, top_k=3, company_id=ACME, rrf_k=60)
+        assert fused[0]["content"].startswith("Invoice INV-2291 issued by Dalton for")
+        assert fused[0]["similarity"] == pytest.approx(0.0, abs=1e-4)
+        assert [r["rrf_score"] for r in fused] == sorted((r["rrf_score"] for r in fused), reverse=True)
+        assert set(fused[0]) == {"chunk_id", "content", "metadata", "filename", "document_id", "similarity", "rrf_score"}
+
+        vector_heavy = index.hybrid_search(_axis(0), terms, top_k=1, company_id=ACME, weights=(1.0, 0.0))
+        assert vector_heavy[0]["chunk_id"] == vector_only[0]["chunk_id"]
+
+    def test_lexical_ranking_by_term_strength_then_similarity(self, tmp_path):
+        index = vector_store.LocalVectorIndex(tmp_path, DIM)
+        rows = [
+            _row("Globex renewal", _axis(1)),
+            _row("Globex renewal clause 7.3", _axis(2)),
+            _row("Globex", _axis(0)),
+        ]
+        index.add(rows)
+        slots = index._lexical_search(_axis(0), [("7.3", 2), ("Globex", 2), ("renewal", 1)], 10, ACME)
+        assert slots == [index._slots[str(r["chunk_id"])] for r in (rows[1], rows[0], rows[2])]
+        assert index._lexical_search(_axis(0), [("100%", 2)], 10, ACME) == []
+
+
+class TestSearchIndex:
+    def test_mode_routing(self, monkeypatch):
+        backend = _RecordingBackend()
+        vector_store.set_vector_backend(backend)
+        try:
+            asyncio.run(indexer.search_index([0.0] * DIM, query_text="invoice INV-2291", mode="hybrid"))
+            asyncio.run(indexer.search_index([0.0] * DIM, query_text="invoice INV-2291", mode="vector"))
+            asyncio.run(indexer.search_index([0.0] * DIM, query_text="what is it?", mode="hybrid"))
+            monkeypatch.setattr(indexer.settings, "retrieval_mode", "hybrid")
+            asyncio.run(indexer.search_index([0.0] * DIM, query_text="Dalton"))
+            with pytest.raises(ValueError):
+                asyncio.run(indexer.search_index([0.0] * DIM, mode="bm25"))
+        finally:
+            vector_store.set_vector_backend(None)
+        assert backend.calls == [
+            ("hybrid", [("INV-2291", hybrid.MEDIUM), ("invoice", hybrid.WEAK)]),
+            ("search", None),
+            ("search", None),
+            ("hybrid", [("Dalton", hybrid.WEAK)]),
+        ]
+
+    def test_base_backend_falls_back_to_vector_search(self):
+        class VectorOnly(_RecordingBackend):
+            hybrid_search = vector_store.VectorBackend.hybrid_search
+
+        backend = VectorOnly()
+        asyncio.run(backend.hybrid_search([0.0] * DIM, [("x", 1)], None, 5, 0.0, None))
+        assert backend.calls == [("search", None)]
+
+    def test_query_schema_mode(self):
+        assert RAGQuery(question="q", mode="hybrid").mode == "hybrid"
+        assert RAGQuery(question="q").mode is None
+        with pytest.raises(ValidationError):
+            RAGQuery(question="q", mode="bm25")
@@ -0,0 +1,130 @@
+"""
+F360 – Tests: Incremental Re-indexing
+"""
+import asyncio
+import uuid
+from collections import namedtuple
+
+import pytest
+from app.services.cognitive_ingestion import vectorizer
+from app.services.cognitive_ingestion.tokenizer import TokenCounter
+
+StoredChunk = namedtuple("StoredChunk", "id chunk_index content metadata embedded")
+
+
+class FakeChunkTable:
+    """Minimal in-memory document_chunks table behind a session-like `execute`."""
+
+    bind = None
+
+    def __init__(self):
+        self.rows = {}
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql.split()[0])
+        if sql.startswith("SELECT"):
+            rows = [
+                StoredChunk(r["id"], r["chunk_index"], r["content"], r["metadata"], r["embedding"] is not None)
+                for r in self.rows.values()
+            ]
+            return FakeResult(rows)
+        if sql.startswith("INSERT"):
+            for row in params:
+                self.rows[row["id"]] = dict(row)
+        elif sql.startswith("UPDATE document_chunks SET chunk_index"):
+            for row in params:
+                self.rows[row["chunk_id"]].update(
+                    chunk_index=row["new_index"], content=row["new_content"], metadata=row["new_metadata"],
+                )
+        elif sql.startswith("DELETE"):
+            ids = statement.compile().params
+            for chunk_id in [v for values in ids.values() for v in values]:
+                self.rows.pop(chunk_id, None)
+        return FakeResult([])
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def all(self):
+        return self._rows
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    embedded = []
+
+    async def fake_embeddings(texts, token_counts=None):
+        embedded.extend(texts)
+        return [[0.0, 1.0]] * len(texts)
+
+    monkeypatch.setattr(vectorizer, "get_embeddings", fake_embeddings)
+    monkeypatch.setattr(vectorizer, "get_token_counter", lambda: TokenCounter(None))
+    return embedded
+
+
+def _pages(n, changed=None):
+    return [
+        ("Revised clause. " if i == changed else "") + f"Section {i}. The supplier delivers goods monthly. " * 40
+        for i in range(n)
+    ]
+
+
+def _run(db, pages, incremental):
+    return asyncio.run(vectorizer.vectorize_segments(
+        pages, uuid.UUID(int=1), {"filename": "contract.pdf"}, db, incremental=incremental,
+    ))
+
+
+class TestIncrementalReindex:
+    def test_unchanged_document_reuses_everything(self, offline):
+        db = FakeChunkTable()
+        first = _run(db, _pages(4), incremental=False)
+        offline.clear()
+
+        second = _run(db, _pages(4), incremental=True)
+        assert second.reused == len(first.chunk_ids)
+        assert second.embedded == 0 and second.deleted == 0
+        assert second.chunk_ids == first.chunk_ids
+        assert offline == []
+
+    def test_changed_page_only_reembeds_its_chunks(self, offline):
+        db = FakeChunkTable()
+        first = _run(db, _pages(4), incremental=False)
+        offline.clear()
+
+        second = _run(db, _pages(4, changed=3), incremental=True)
+        assert second.reused > 0
+        assert 0 < second.embedded < len(first.chunk_ids)
+        assert second.reused + second.embedded == len(second.chunk_ids)
+        assert len(db.rows) == len(second.chunk_ids)
+        assert sorted(r["chunk_index"] for r in db.rows.values()) == list(range(len(second.chunk_ids)))
+
+    def test_removed_pages_are_deleted(self, offline):
+        db = FakeChunkTable()
+        first = _run(db, _pages(4), incremental=False)
+
+        second = _run(db, _pages(2), incremental=True)
+        assert second.embedded <= 1  # at most the new tail chunk
+        assert second.deleted == len(first.chunk_ids) - second.reused
+        assert set(db.rows) == set(second.chunk_ids)
+
+    def test_failed_embeddings_are_stored_null_and_redone(self, offline, monkeypatch):
+        healthy = vectorizer.get_embeddings
+
+        async def failing_embeddings(texts, token_counts=None):
+            return [None] * len(texts)
+
+        db = FakeChunkTable()
+        monkeypatch.setattr(vectorizer, "get_embeddings", failing_embeddings)
+        first = _run(db, _pages(2), incremental=False)
+        assert all(r["embedding"] is None for r in db.rows.values())
+
+        monkeypatch.setattr(vectorizer, "get_embeddings", healthy)
+        second = _run(db, _pages(2), incremental=True)
+        assert second.reused == 0 and second.embedded == len(first.chunk_ids)
+        assert second.deleted == len(first.chunk_ids)
+        assert all(r["embedding"] is not None for r in db.rows.values())
@@ -0,0 +1,200 @@
+"""
+F360 – Tests: Background Ingestion Jobs
+"""
+import asyncio
+import uuid
+
+import pytest
+from app.schemas.schemas import IngestionJobStatus, IngestionResult
+from app.models.financial import Document
+from app.services.cognitive_ingestion.jobs import IngestionJobQueue, QueueFullError, queue_upload
+from app.services.cognitive_ingestion.progress import IngestionProgress
+
+
+def _result(job, status="success"):
+    return IngestionResult(
+        document_id=job.document_id,
+        filename=job.filename,
+        file_type="pdf",
+        entities_extracted={},
+        chunks_created=3,
+        status=status,
+    )
+
+
+class TestIngestionProgress:
+    def test_stage_timing_and_items(self):
+        progress = IngestionProgress()
+        with progress.stage("parse", items=2):
+            pass
+        progress.advance("chunk", 5)
+        progress.finish()
+        stages = {s["name"]: s for s in progress.to_list()}
+        assert stages["parse"]["status"] == "done"
+        assert stages["parse"]["items"] == 2
+        assert stages["chunk"]["items"] == 5
+        assert stages["embed"]["status"] == "skipped"
+
+    def test_timed_async_iteration(self):
+        async def pages():
+            for page in ("a", "b", "c"):
+                yield page
+
+        async def consume(progress):
+            return [p async for p in progress.timed("parse", pages())]
+
+        progress = IngestionProgress()
+        assert asyncio.run(consume(progress)) == ["a", "b", "c"]
+        assert progress.stages["parse"].items == 3
+
+
+class TestIngestionJobQueue:
+    def test_jobs_run_in_background(self):
+        async def runner(job):
+            with job.progress.stage("parse", items=1):
+                await asyncio.sleep(0)
+            return _result(job)
+
+        async def scenario():
+            queue = IngestionJobQueue(workers=2, runner=runner)
+            jobs = [queue.submit(uuid.uuid4(), f"doc{i}.pdf") for i in range(5)]
+            assert all(job.status == "queued" for job in jobs)
+            await queue.join()
+            await queue.stop()
+            return jobs
+
+        jobs = asyncio.run(scenario())
+        assert all(job.status == "success" for job in jobs)
+        status = IngestionJobStatus(**jobs[0].to_dict())
+        assert status.result.chunks_created == 3
+        assert status.stages[0].name == "parse" and status.stages[0].status == "done"
+        assert status.duration_ms is not None
+
+    def test_bounded_concurrency(self):
+        running, peak = 0, 0
+
+        async def runner(job):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return _result(job)
+
+        async def scenario():
+            queue = IngestionJobQueue(workers=2, runner=runner)
+            for i in range(6):
+                queue.submit(uuid.uuid4(), f"doc{i}.pdf")
+            await queue.join()
+            await queue.stop()
+
+        asyncio.run(scenario())
+        assert peak == 2
+
+    def test_failures_are_reported(self):
+        async def runner(job):
+            raise FileNotFoundError("missing upload")
+
+        async def scenario():
+            queue = IngestionJobQueue(workers=1, runner=runner)
+            job = queue.submit(uuid.uuid4(), "gone.pdf")
+            await queue.join()
+            await queue.stop()
+            return job
+
+        job = asyncio.run(scenario())
+        assert job.status == "error"
+        assert job.error == "missing upload"
+
+    def test_queue_full(self):
+        async def runner(job):
+            await asyncio.sleep(1)
+            return _result(job)
+
+        async def scenario():
+            queue = IngestionJobQueue(workers=1, max_queued=1, runner=runner)
+            queue.submit(uuid.uuid4(), "a.pdf")
+            with pytest.raises(QueueFullError):
+                queue.submit(uuid.uuid4(), "b.pdf")
+            await queue.stop()
+
+        asyncio.run(scenario())
+
+    def test_full_queue_leaves_no_orphaned_upload(self, tmp_path):
+        class _Session:
+            def __init__(self):
+                self.rows, self.pending = set(), set()
+
+            def add(self, row):
+                self.pending.add(row)
+
+            async def delete(self, row):
+                self.pending.discard(row)
+                self.rows.discard(row)
+
+            async def commit(self):
+                self.rows |= self.pending
+                self.pending.clear()
+
+        async def runner(job):
+            await asyncio.sleep(1)
+            return _result(job)
+
+        async def scenario():
+            queue = IngestionJobQueue(workers=1, max_queued=1, runner=runner)
+            queue.submit(uuid.uuid4(), "a.pdf")
+            path = tmp_path / "b.pdf"
+            path.write_bytes(b"%PDF")
+            db = _Session()
+            doc = Document(id=uuid.uuid4(), filename="b.pdf", file_path=str(path))
+            db.add(doc)
+            with pytest.raises(QueueFullError):
+                await queue_upload(doc, db, queue)
+            await queue.stop()
+            return db, path
+
+        db, path = asyncio.run(scenario())
+        assert not db.rows and not db.pending and not path.exists()
+
+    def test_dead_worker_is_replaced_without_losing_jobs(self):
+        release = asyncio.Event()
+
+        async def runner(job):
+            await release.wait()
+            return _result(job)
+
+        async def scenario():
+            queue = IngestionJobQueue(workers=2, runner=runner)
+            first = [queue.submit(uuid.uuid4(), f"doc{i}.pdf") for i in range(4)]
+            await asyncio.sleep(0)
+            survivor = queue._tasks[1]
+            queue._tasks[0].cancel()
+            await asyncio.sleep(0)
+            late = queue.submit(uuid.uuid4(), "late.pdf")
+            assert queue._tasks[1] is survivor and len(queue._tasks) == 2
+            release.set()
+            await queue.join()
+            await queue.stop()
+            return first[1:] + [late]
+
+        jobs = asyncio.run(scenario())   # the cancelled worker's own job is abandoned
+        assert all(job.status == "success" for job in jobs)
+
+    def test_pending_jobs_survive_a_new_event_loop(self):
+        async def runner(job):
+            return _result(job)
+
+        queue = IngestionJobQueue(workers=1, runner=runner)
+
+        async def submit_only():
+            return queue.submit(uuid.uuid4(), "a.pdf")
+
+        async def drain():
+            late = queue.submit(uuid.uuid4(), "b.pdf")
+            await queue.join()
+            await queue.stop()
+            return late
+
+        early = asyncio.run(submit_only())   # loop closes before the worker picks it up
+        late = asyncio.run(drain())
+        assert early.status == "success" and late.status == "success"
@@ -0,0 +1,83 @@
+"""
+F360 – Tests: Media Pipeline (ffmpeg pipes)
+"""
+import asyncio
+import shutil
+import subprocess
+import wave
+
+import pytest
+
+from app.services.sources import media, ocr, parsers
+
+HAS_FFMPEG = shutil.which(media.settings.ffmpeg_binary) is not None
+
+
+def _collect(iterator):
+    async def _run():
+        return [item async for item in iterator]
+
+    return asyncio.run(_run())
+
+
+class TestSegments:
+    def test_wav_wrapping(self):
+        segment = media.AudioSegment(3, 900, b"\x00\x01" * media.AUDIO_SAMPLE_RATE)
+        assert segment.duration == 1.0
+        wav = segment.to_wav()
+        assert wav.name == "segment-0003.wav"
+        with wave.open(wav) as reader:
+            assert reader.getframerate() == media.AUDIO_SAMPLE_RATE
+            assert reader.getnframes() == media.AUDIO_SAMPLE_RATE
+
+    def test_timestamps(self):
+        assert media.format_timestamp(3725.4) == "01:02:05"
+        assert media.format_timestamp(None) == "--:--:--"
+
+
+@pytest.mark.skipif(not HAS_FFMPEG, reason="ffmpeg not installed")
+class TestFfmpegPipes:
+    @pytest.fixture(scope="class")
+    def video(self, tmp_path_factory):
+        """6 s: a white then a black screen (one scene change), with a tone."""
+        path = tmp_path_factory.mktemp("media") / "clip.mkv"
+        subprocess.run(
+            [
+                media.settings.ffmpeg_binary, "-hide_banner", "-loglevel", "error", "-y",
+                "-f", "lavfi", "-i", "color=white:s=320x240:d=3[a];color=black:s=320x240:d=3[b];[a][b]concat=n=2",
+                "-f", "lavfi", "-i", "sine=frequency=440:duration=6",
+                "-shortest", str(path),
+            ],
+            check=True,
+        )
+        return path
+
+    def test_audio_segments_from_path_and_bytes(self, video):
+        from_path = _collect(media.iter_audio_segments(video, segment_seconds=4))
+        assert [s.start for s in from_path] == [0, 4]
+        assert from_path[0].duration == 4.0
+        assert from_path[1].duration == pytest.approx(2.0, abs=0.1)
+
+        from_bytes = _collect(media.iter_audio_segments(video.read_bytes(), segment_seconds=4))
+        assert [s.pcm for s in from_bytes] == [s.pcm for s in from_path]
+
+    def test_keyframes_on_scene_change(self, video):
+        keyframes = _collect(media.iter_keyframes(video, threshold=0.3))
+        assert len(keyframes) == 2
+        assert keyframes[0].time == pytest.approx(0.0, abs=0.1)
+        assert keyframes[1].time == pytest.approx(3.0, abs=0.1)
+        assert keyframes[0].image.mode == "L" and keyframes[0].image.size == (320, 240)
+
+    def test_unreadable_input(self):
+        with pytest.raises(media.FfmpegError):
+            _collect(media.iter_audio_segments(b"not a media file"))
+
+    def test_parse_video_ocrs_keyframes(self, video, monkeypatch):
+        monkeypatch.setattr(ocr, "_recognize_tile", lambda tile, lang: f"mean {tile.getextrema()[0]}")
+        monkeypatch.setattr(parsers, "ocr_available", lambda: True)
+        monkeypatch.setattr(parsers, "get_ocr_service", lambda: ocr.OcrService(workers=1))
+        monkeypatch.setattr(parsers.settings, "openai_api_key", "")
+
+        text = asyncio.run(parsers.parse_video(str(video)))
+        assert text.startswith("=== Audio Transcript ===\n[AUDIO: ")
+        assert "=== On-screen Text ===\n[00:00:00] mean 255\n[00:00:03] mean 0" in text
@@ -0,0 +1,101 @@
+"""
+F360 – Tests: OCR Service
+"""
+import asyncio
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from app.services.sources import ocr, parsers
+
+
+def _scan(height: int = 400, lines: int = 4) -> Image.Image:
+    image = Image.new("L", (300, height), 255)
+    draw = ImageDraw.Draw(image)
+    for n in range(lines):
+        top = 20 + n * (height - 40) // lines
+        draw.rectangle((20, top, 280, top + 12), fill=0)
+    return image
+
+
+@pytest.fixture()
+def recognized(monkeypatch):
+    """Fake Tesseract: reports the size of each band it is given."""
+    calls = []
+
+    def _fake(tile, lang):
+        calls.append(tile.size)
+        return f"{tile.width}x{tile.height}\n"
+
+    monkeypatch.setattr(ocr, "_recognize_tile", _fake)
+    return calls
+
+
+class TestTiling:
+    def test_small_image_is_one_band(self):
+        assert ocr.plan_tiles(np.full(100, 255.0), 80) == [(0, 100)]
+
+    def test_cut_on_whitest_row(self):
+        rows = np.full(1000, 100.0)
+        rows[310] = 255.0           # the gap between two text lines near the first boundary
+        bands = ocr.plan_tiles(rows, 300)
+        assert bands[0] == (0, 310)
+        assert bands[-1][1] == 1000
+        assert all(a[1] == b[0] for a, b in zip(bands, bands[1:]))
+
+    def test_split_tiles_covers_image(self):
+        tiles = ocr.split_tiles(_scan(height=1000, lines=12), 200)
+        assert len(tiles) > 1
+        assert sum(tile.height for tile in tiles) == 1000
+
+
+class TestService:
+    def test_cache_and_duplicates(self, recognized):
+        service = ocr.OcrService(workers=1, cache=ocr.OcrCache(memory_entries=10))
+        first, second = _scan(), _scan(lines=2)
+        assert service.recognize_many([first, second, first.copy()]) == ["300x400"] * 3
+        assert len(recognized) == 2            # identical pixels recognized once
+        assert service.recognize(first.convert("RGB")) == "300x400"
+        assert len(recognized) == 2            # cache hit on a re-encoded copy
+        assert service.cache.stats()["hits"] == 1
+
+    def test_tall_scan_bands_joined_in_order(self, recognized):
+        service = ocr.OcrService(workers=1, tile_height=200)
+        text = service.recognize(_scan(height=1000, lines=12))
+        assert len(recognized) > 1
+        assert sum(int(line.split("x")[1]) for line in text.splitlines()) == 1000
+
+    def test_async(self, recognized):
+        service = ocr.OcrService(workers=1)
+        assert asyncio.run(service.arecognize_many([_scan()])) == ["300x400"]
+
+    def test_disk_tier_evicts_by_size(self, tmp_path):
+        cache = ocr.OcrCache(memory_entries=0, disk_path=tmp_path / "ocr.sqlite3", disk_bytes=250)
+        for n in range(5):
+            cache.put_many({f"k{n}": "x" * 100})
+        assert cache.stats()["disk_bytes"] <= 250
+        assert cache.get_many(["k0", "k4"]) == {"k4": "x" * 100}
+
+
+class TestScannedPdf:
+    def test_image_only_pages_are_ocrd(self, recognized, monkeypatch):
+        pdf = io.BytesIO()
+        _scan().convert("RGB").save(pdf, "PDF", resolution=72)
+        monkeypatch.setattr(parsers, "ocr_available", lambda: True)
+        monkeypatch.setattr(parsers, "get_ocr_service", lambda: ocr.OcrService(workers=1))
+        monkeypatch.setattr(parsers.settings, "ocr_pdf_dpi", 72)
+
+        assert list(parsers.iter_pdf_pages(pdf.getvalue())) == ["300x400"]
+
+        async def _collect():
+            return [text async for text in parsers.aiter_pdf_pages(pdf.getvalue())]
+
+        assert asyncio.run(_collect()) == ["300x400"]
+
+    def test_scans_skipped_without_ocr(self, monkeypatch):
+        pdf = io.BytesIO()
+        _scan().convert("RGB").save(pdf, "PDF")
+        monkeypatch.setattr(parsers, "ocr_available", lambda: False)
+        assert parsers.parse_pdf(pdf.getvalue()) == ""
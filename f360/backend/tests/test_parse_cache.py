@@ -0,0 +1,145 @@
+"""
+F360 – Tests: Parse Cache
+"""
+import asyncio
+import os
+import uuid
+
+from app.services.cognitive_ingestion import indexer
+from app.services.sources import parse_cache
+from app.services.sources.parse_cache import ParseCache, SegmentEncoder, cached_segments, parse_cache_key
+
+
+def _collect(iterator):
+    async def _run():
+        return [item async for item in iterator]
+
+    return asyncio.run(_run())
+
+
+class TestKeysAndEncoding:
+    def test_hash_matches_for_path_and_bytes(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_bytes(b"x" * 3_000_000)
+        assert parse_cache.hash_source(path) == parse_cache.hash_source(path.read_bytes())
+
+    def test_key_depends_on_type_and_parser_version(self, monkeypatch):
+        sha = "ab" * 32
+        key = parse_cache_key(sha, "pdf")
+        assert key == parse_cache_key(sha, ".PDF")
+        assert key != parse_cache_key(sha, "txt")
+        monkeypatch.setattr(parse_cache, "PARSER_VERSION", parse_cache.PARSER_VERSION + 1)
+        assert key != parse_cache_key(sha, "pdf")
+
+    def test_key_follows_effective_ocr_settings(self, monkeypatch):
+        from app.services.sources import parsers
+
+        sha = "ab" * 32
+        monkeypatch.setattr(parse_cache, "ocr_available", lambda: True)
+        monkeypatch.setattr(parsers, "ocr_available", lambda: True)
+        with_ocr = parse_cache_key(sha, "pdf")
+        monkeypatch.setattr(parsers.settings, "ocr_pdf_dpi", parsers.settings.ocr_pdf_dpi + 100)
+        assert parse_cache_key(sha, "pdf") != with_ocr
+        monkeypatch.setattr(parse_cache, "ocr_available", lambda: False)
+        monkeypatch.setattr(parsers, "ocr_available", lambda: False)
+        assert parse_cache_key(sha, "pdf") != with_ocr
+        assert parse_cache.parser_fingerprint("png").endswith("ocr=off")
+
+    def test_segments_round_trip(self):
+        encoder = SegmentEncoder()
+        segments = ["Page 1 – Total: 1 200 €", "", "page 3\nβ"]
+        for segment in segments:
+            encoder.add(segment)
+        assert parse_cache.decode_segments(*encoder.finish()) == segments
+
+    def test_degraded_output_not_cached(self, tmp_path):
+        cache = ParseCache(tmp_path / "parsed.sqlite3")
+        assert not cache.put("k", ["[IMAGE: OCR extraction requires Pillow + pytesseract]"])
+        assert cache.get("k") is None
+
+    def test_failed_page_ocr_not_cached(self, tmp_path):
+        from app.services.sources import parsers
+
+        class _BrokenOcr:
+            def recognize_many(self, scans):
+                raise RuntimeError("tesseract crashed")
+
+        texts = parsers._ocr_scans(_BrokenOcr(), ["scan 1", "scan 2"])
+        assert len(texts) == 2 and texts[1] == ""
+        cache = ParseCache(tmp_path / "parsed.sqlite3")
+        assert not cache.put("k", ["Page 1 text", *texts])
+        assert cache.get("k") is None
+
+
+class TestParseCache:
+    def test_lru_eviction_by_size(self, tmp_path):
+        cache = ParseCache(tmp_path / "parsed.sqlite3", disk_bytes=25_000)
+        blobs = {key: os.urandom(10_000).hex() for key in "abc"}   # incompressible
+        cache.put("a", [blobs["a"]])
+        cache.put("b", [blobs["b"]])
+        assert cache.get("a") == [blobs["a"]]   # "a" is now more recent than "b"
+        cache.put("c", [blobs["c"]])
+        assert cache.get("b") is None
+        assert cache.get("a") and cache.get("c")
+        assert cache.stats()["evictions"] == 1
+
+    def test_persists_across_instances(self, tmp_path):
+        ParseCache(tmp_path / "parsed.sqlite3").put("k", ["one", "two"])
+        assert ParseCache(tmp_path / "parsed.sqlite3").get("k") == ["one", "two"]
+
+    def test_sync_parse_runs_once(self, tmp_path):
+        cache = ParseCache(tmp_path / "parsed.sqlite3")
+        calls = []
+
+        def parse():
+            calls.append(1)
+            return ["sheet 1", "sheet 2"]
+
+        first = cached_segments(b"raw", "csv", parse, cache=cache)
+        second = cached_segments(b"raw", "csv", parse, cache=cache)
+        assert first == second == ["sheet 1", "sheet 2"]
+        assert len(calls) == 1
+
+
+class TestCachedIngestion:
+    def test_iter_cached_segments_skips_parser(self, tmp_path, monkeypatch):
+        cache = ParseCache(tmp_path / "parsed.sqlite3")
+        parsed = []
+
+        async def fake_segments(source, file_type):
+            for page in ("page one", "page two"):
+                parsed.append(page)
+                yield page
+
+        monkeypatch.setattr(parse_cache, "iter_file_segments", fake_segments)
+        source = tmp_path / "scan.pdf"
+        source.write_bytes(b"%PDF-1.4 scanned")
+
+        first = _collect(parse_cache.iter_cached_segments(source, "pdf", cache=cache))
+        second = _collect(parse_cache.iter_cached_segments(source, "pdf", cache=cache))
+        assert first == second == ["page one", "page two"]
+        assert parsed == ["page one", "page two"]
+
+    def test_interrupted_parse_not_stored(self, tmp_path, monkeypatch):
+        cache = ParseCache(tmp_path / "parsed.sqlite3")
+
+        async def failing_segments(source, file_type):
+            yield "page one"
+            raise RuntimeError("corrupt page")
+
+        monkeypatch.setattr(parse_cache, "iter_file_segments", failing_segments)
+        try:
+            _collect(parse_cache.iter_cached_segments(b"bytes", "pdf", cache=cache))
+        except RuntimeError:
+            pass
+        assert cache.stats()["size"] == 0
+
+    def test_duplicate_result_points_at_existing_document(self):
+        class _Db:
+            async def scalar(self, statement):
+                return 7
+
+        existing = indexer.Document(id=uuid.uuid4(), filename="contract.pdf", file_type="pdf")
+        result = asyncio.run(indexer.duplicate_result(existing, _Db()))
+        assert result.status == "duplicate"
+        assert result.document_id == existing.id and result.chunks_created == 7
@@ -0,0 +1,116 @@
+"""
+F360 – Tests: Parser Execution Pools
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.sources import executor, parsers
+from app.services.sources.executor import ParserBusyError, ParserPool, parse_pool_spec
+
+
+def _collect(iterator):
+    async def _run():
+        return [item async for item in iterator]
+
+    return asyncio.run(_run())
+
+
+class TestPoolSpec:
+    def test_parse(self):
+        assert parse_pool_spec("pdf=2:16, media=1:0") == {"pdf": (2, 16), "media": (1, 0)}
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            parse_pool_spec("pdf=2")
+        with pytest.raises(ValueError):
+            parse_pool_spec("docx=1:1")
+
+    def test_formats_map_to_pools(self):
+        assert executor.get_parser_pool(".XLSX").name == "spreadsheet"
+        assert executor.get_parser_pool("mkv").name == "media"
+        assert executor.get_parser_pool("docx").name == "text"
+
+
+class TestParserPool:
+    def test_blocking_work_leaves_the_loop_free(self):
+        pool = ParserPool("pdf", workers=1, max_queued=0)
+
+        async def _run():
+            ticks = 0
+
+            async def _heartbeat():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            beat = asyncio.create_task(_heartbeat())
+            name = await pool.run(lambda: time.sleep(0.3) or threading.current_thread().name)
+            beat.cancel()
+            return name, ticks
+
+        name, ticks = asyncio.run(_run())
+        assert name.startswith("parser-pdf")
+        assert ticks >= 10
+        pool.shutdown()
+
+    def test_saturated_pool_queues_then_rejects(self):
+        pool = ParserPool("spreadsheet", workers=1, max_queued=1)
+        release = threading.Event()
+
+        async def _run():
+            first = asyncio.create_task(pool.run(release.wait, 5))
+            second = asyncio.create_task(pool.run(lambda: "queued"))
+            await asyncio.sleep(0.05)
+            assert pool.stats()["running"] == 1 and pool.stats()["queued"] == 1
+            with pytest.raises(ParserBusyError) as busy:
+                await pool.run(lambda: "rejected")
+            assert busy.value.pool == "spreadsheet" and busy.value.retry_after >= 1
+            release.set()
+            return await first, await second
+
+        assert asyncio.run(_run()) == (True, "queued")
+        stats = pool.stats()
+        assert (stats["completed"], stats["rejected"], stats["running"]) == (2, 1, 0)
+        assert stats["run_p95_ms"] > 0 and stats["wait_p95_ms"] > 0
+        pool.shutdown()
+
+    def test_iterate_in_order_and_release_on_early_stop(self):
+        pool = ParserPool("text", workers=1, max_queued=0)
+        assert _collect(pool.iterate(lambda n: (f"segment {i}" for i in range(n)), 3)) == [
+            "segment 0", "segment 1", "segment 2",
+        ]
+
+        async def _first():
+            items = pool.iterate(lambda: iter(["a", "b", "c"]))
+            async for item in items:
+                await items.aclose()
+                return item
+
+        assert asyncio.run(_first()) == "a"
+        assert pool.stats()["running"] == 0 and pool.stats()["completed"] == 2
+        pool.shutdown()
+
+    def test_failures_counted(self):
+        pool = ParserPool("image", workers=2, max_queued=0, threaded=False)
+
+        async def _broken():
+            raise ValueError("corrupt")
+
+        with pytest.raises(ValueError):
+            asyncio.run(pool.call(_broken))
+        assert pool.stats()["failed"] == 1 and pool.stats()["running"] == 0
+
+
+class TestParseFile:
+    def test_csv_segments_parsed_in_pool(self, tmp_path):
+        path = tmp_path / "ledger.csv"
+        path.write_text("account;amount\n601;1200\n706;-800\n")
+        pool = executor.get_parser_pool("csv")
+        before = pool.stats()["completed"]
+        segments = _collect(parsers.iter_file_segments(path, "csv"))
+        assert "601" in segments[0]
+        assert pool.stats()["completed"] == before + 1
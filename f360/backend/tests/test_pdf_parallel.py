@@ -0,0 +1,43 @@
+"""
+F360 – Tests: Page-Parallel PDF Extraction
+"""
+from pathlib import Path
+
+import pytest
+from app.services.sources import parsers
+
+CONTRACT_PDF = Path(__file__).resolve().parents[3] / "Input" / "Contracts_30_English" / "Contract_1.pdf"
+
+
+class TestPageRanges:
+    def test_empty(self):
+        assert parsers.plan_page_ranges(0, 4) == []
+
+    def test_ranges_cover_all_pages_in_order(self):
+        ranges = parsers.plan_page_ranges(301, 4)
+        assert ranges[0][0] == 0 and ranges[-1][1] == 301
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        assert len(ranges) >= 4
+
+    def test_minimum_range_size(self):
+        ranges = parsers.plan_page_ranges(10, 8)
+        assert all(stop - start >= parsers.PDF_MIN_PAGES_PER_TASK for start, stop in ranges[:-1])
+
+
+@pytest.mark.skipif(not CONTRACT_PDF.exists(), reason="sample contract not available")
+class TestParallelExtraction:
+    def test_parallel_matches_sequential(self, monkeypatch):
+        raw = CONTRACT_PDF.read_bytes()
+        sequential = "\n".join(parsers.iter_pdf_pages(raw))
+
+        monkeypatch.setattr(parsers.settings, "pdf_parallel_workers", 2)
+        monkeypatch.setattr(parsers.settings, "pdf_parallel_min_pages", 1)
+        monkeypatch.setattr(parsers, "PDF_MIN_PAGES_PER_TASK", 1)
+        try:
+            assert parsers.parse_pdf(raw) == sequential
+        finally:
+            parsers.close_pdf_process_pool()
+
+    def test_small_pdf_stays_in_process(self, monkeypatch):
+        monkeypatch.setattr(parsers.settings, "pdf_parallel_min_pages", 10_000)
+        assert parsers._parallel_page_ranges(CONTRACT_PDF.read_bytes()) is None
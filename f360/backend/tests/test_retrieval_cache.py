@@ -0,0 +1,176 @@
+"""
+F360 – Tests: Retrieval Cache
+"""
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.services.cognitive_ingestion import indexer, retrieval_cache, vector_store
+from app.services.cognitive_ingestion.retrieval_cache import RetrievalCache
+
+ACME, GLOBEX = uuid.uuid4(), uuid.uuid4()
+ROWS = [{"chunk_id": "c1", "content": "Invoice INV-2291", "metadata": {"page": 1}, "similarity": 0.9}]
+
+
+def _key(cache, company_id=ACME, question="What is the total of INV-2291?", **options):
+    return cache.key(company_id, question, 5, 0.3, **options)
+
+
+class TestLookup:
+    def test_hit_miss_and_normalized_question(self):
+        cache = RetrievalCache(max_entries=10)
+        assert cache.get(_key(cache), 0) is None
+        cache.put(_key(cache), ROWS, 0)
+        assert cache.get(_key(cache, question="  what is the TOTAL of  inv-2291 "), 0) == ROWS
+        assert cache.get(_key(cache, mode="hybrid"), 0) is None
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+    def test_returned_rows_are_copies(self):
+        cache = RetrievalCache(max_entries=10)
+        cache.put(_key(cache), ROWS, 0)
+        cache.get(_key(cache), 0)[0]["metadata"]["page"] = 99
+        assert cache.get(_key(cache), 0) == ROWS
+
+    def test_ttl_expiry(self, monkeypatch):
+        clock = [100.0]
+        monkeypatch.setattr(retrieval_cache.time, "monotonic", lambda: clock[0])
+        cache = RetrievalCache(max_entries=10, ttl=60)
+        cache.put(_key(cache), ROWS, 0)
+        clock[0] += 59
+        assert cache.get(_key(cache), 0) == ROWS
+        clock[0] += 2
+        assert cache.get(_key(cache), 0) is None
+        assert cache.stats()["expired"] == 1 and cache.stats()["size"] == 0
+
+    def test_lru_eviction(self):
+        cache = RetrievalCache(max_entries=2)
+        for question in ("a?", "b?"):
+            cache.put(_key(cache, question=question), ROWS, 0)
+        cache.get(_key(cache, question="a?"), 0)               # "a" becomes most recent
+        cache.put(_key(cache, question="c?"), ROWS, 0)      # evicts "b"
+        assert cache.get(_key(cache, question="b?"), 0) is None
+        assert cache.get(_key(cache, question="a?"), 0) == ROWS
+        assert cache.stats()["evictions"] == 1
+
+    def test_disabled(self):
+        cache = RetrievalCache(max_entries=0)
+        cache.put(_key(cache), ROWS, 0)
+        assert cache.get(_key(cache), 0) is None
+
+
+class TestGenerations:
+    def test_entry_of_another_generation_is_dropped(self):
+        cache = RetrievalCache(max_entries=10)
+        cache.put(_key(cache), ROWS, 3)
+        assert cache.get(_key(cache), 3) == ROWS
+        assert cache.get(_key(cache), 4) is None
+        assert cache.get(_key(cache), 3) is None            # dropped, not kept for later
+        assert cache.stats()["stale"] == 1
+
+    @pytest.fixture
+    def session(self):
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE chunk_generations (company_key VARCHAR(36) PRIMARY KEY, generation BIGINT NOT NULL)"
+            ))
+        with Session(engine) as session:
+            yield session
+
+    def test_bumps_land_with_the_commit(self, session):
+        db = SimpleNamespace(sync_session=session)
+
+        class _Async:
+            async def scalar(self, statement, params=None):
+                return session.scalar(statement, params)
+
+        def generation(company_id):
+            return asyncio.run(retrieval_cache.chunk_generation(_Async(), company_id))
+
+        retrieval_cache.bump_on_commit(db, ACME)
+        session.rollback()                                   # an ingest that failed bumps nothing
+        assert generation(ACME) == 0
+        retrieval_cache.bump_on_commit(db, ACME)
+        retrieval_cache.bump_on_commit(db, ACME)             # once per transaction
+        retrieval_cache.bump_on_commit(db, None)
+        session.commit()
+        assert (generation(ACME), generation(GLOBEX), generation(None)) == (1, 0, 2)
+        retrieval_cache.bump_on_commit(db, GLOBEX)
+        session.commit()
+        assert (generation(ACME), generation(GLOBEX), generation(None)) == (1, 1, 3)
+
+
+class _CountingBackend(vector_store.VectorBackend):
+    name = "counting"
+
+    def __init__(self):
+        self.searches = 0
+        self.invalidated = []
+
+    async def search(self, query_embedding, company_id, top_k, similarity_threshold, db,
+                     ef_search=None, probes=None):
+        self.searches += 1
+        return [dict(row) for row in ROWS]
+
+    def invalidate(self, company_id):
+        self.invalidated.append(company_id)
+
+
+class TestRetrieve:
+    @pytest.fixture
+    def setup(self, monkeypatch):
+        cache = RetrievalCache(max_entries=10)
+        monkeypatch.setattr(indexer, "get_retrieval_cache", lambda: cache)
+        generations = {}
+
+        async def fake_generation(db, company_id):
+            return generations.get(company_id, 0)
+
+        monkeypatch.setattr(indexer, "chunk_generation", fake_generation)
+        embedded = []
+
+        async def fake_embeddings(texts):
+            embedded.extend(texts)
+            return [None if text_input.startswith("offline") else [0.0] * 8 for text_input in texts]
+
+        monkeypatch.setattr(indexer, "get_embeddings", fake_embeddings)
+        backend = _CountingBackend()
+        vector_store.set_vector_backend(backend)
+        yield SimpleNamespace(backend=backend, embedded=embedded, generations=generations)
+        vector_store.set_vector_backend(None)
+
+    def test_hit_skips_embedding_and_search(self, setup):
+        first = asyncio.run(indexer.retrieve("Total of INV-2291?", company_id=ACME, mode="vector"))
+        again = asyncio.run(indexer.retrieve("total of inv-2291", company_id=ACME, mode="vector"))
+        assert first == again == ROWS
+        assert setup.embedded == ["Total of INV-2291?"] and setup.backend.searches == 1
+
+        asyncio.run(indexer.retrieve("Total of INV-2291?", company_id=ACME, top_k=10, mode="vector"))
+        assert setup.backend.searches == 2
+
+    def test_hybrid_key_keeps_term_casing(self, setup):
+        asyncio.run(indexer.retrieve("invoices from Dalton", company_id=ACME, mode="hybrid"))
+        asyncio.run(indexer.retrieve("invoices from dalton", company_id=ACME, mode="hybrid"))
+        assert setup.backend.searches == 2
+
+    def test_a_change_committed_elsewhere_is_seen(self, setup):
+        asyncio.run(indexer.retrieve("Total of INV-2291?", company_id=ACME, mode="vector"))
+        asyncio.run(indexer.retrieve("Total of INV-2291?", company_id=GLOBEX, mode="vector"))
+        setup.generations[ACME] = 1                          # e.g. the bulk CLI loaded ACME documents
+
+        asyncio.run(indexer.retrieve("Total of INV-2291?", company_id=ACME, mode="vector"))
+        asyncio.run(indexer.retrieve("Total of INV-2291?", company_id=GLOBEX, mode="vector"))
+        assert setup.backend.searches == 3
+
+    def test_answer_to_a_failed_embedding_is_not_cached(self, setup):
+        for _ in range(2):
+            asyncio.run(indexer.retrieve("offline question", company_id=ACME, mode="vector"))
+        assert setup.backend.searches == 2
+
+    def test_invalidation_reaches_the_vector_backend(self, setup):
+        vector_store.invalidate_company(ACME)
+        assert setup.backend.invalidated == [ACME]
@@ -0,0 +1,80 @@
+"""
+F360 – Tests: Spreadsheet Parser
+"""
+import openpyxl
+
+from app.services.sources import parsers
+
+
+def _csv(rows: int, sep: str = ",") -> bytes:
+    lines = [sep.join(["date", "account", "amount"])]
+    lines += [sep.join([f"2026-01-{i % 28 + 1:02d}", f"6{i:04d}", f"{i}.50"]) for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+class TestCsv:
+    def test_every_row_is_rendered_in_row_groups(self):
+        segments = list(parsers.iter_excel_sheets(_csv(1200), "csv", rows_per_segment=500))
+        assert len(segments) == 3
+        assert segments[0].startswith("=== Sheet: Sheet1 (rows 1-500) ===\nColumns: date, account, amount\n")
+        assert segments[2].startswith("=== Sheet: Sheet1 (rows 1001-1200) ===")
+        assert "date: 2026-01-24 | account: 61199 | amount: 1199.50" in segments[2]
+        assert sum(s.count("account: ") for s in segments) == 1200
+
+    def test_delimiter_is_sniffed(self):
+        text = parsers.parse_excel(_csv(3, sep=";"), "csv")
+        assert "account: 60002 | amount: 2.50" in text
+
+    def test_cells_kept_as_written_and_empty_cells_skipped(self):
+        raw = "vendor;amount;note\nAcme;1 200,00;\nGlobex;0300;late\n".encode()
+        lines = parsers.parse_excel(raw, "csv").splitlines()
+        assert "vendor: Acme | amount: 1 200,00" in lines
+        assert "vendor: Globex | amount: 0300 | note: late" in lines
+
+    def test_empty_file(self):
+        assert parsers.parse_excel(b"", "csv") == ""
+
+
+class TestXlsx:
+    def test_sheets_streamed_in_row_groups(self, tmp_path):
+        workbook = openpyxl.Workbook()
+        ledger = workbook.active
+        ledger.title = "Ledger"
+        ledger.append(["account", "debit", None])
+        for i in range(7):
+            ledger.append([f"60{i}", i * 10, None])
+        ledger.append([None, None, None])
+        summary = workbook.create_sheet("Summary")
+        summary.append(["total"])
+        summary.append([210])
+        path = tmp_path / "ledger.xlsx"
+        workbook.save(path)
+
+        segments = list(parsers.iter_excel_sheets(path, "xlsx", rows_per_segment=3))
+        assert [s.splitlines()[0] for s in segments] == [
+            "=== Sheet: Ledger (rows 1-3) ===",
+            "=== Sheet: Ledger (rows 4-6) ===",
+            "=== Sheet: Ledger (rows 7-7) ===",
+            "=== Sheet: Summary (rows 1-1) ===",
+        ]
+        assert segments[2].splitlines()[1] == "Columns: account, debit, Unnamed: 2"
+        assert segments[2].splitlines()[-1] == "account: 606 | debit: 60"
+        assert parsers.parse_excel(path.read_bytes(), "xlsx") == "\n\n".join(parsers.iter_excel_sheets(path, "xlsx"))
+
+    def test_blank_rows_keep_source_row_numbers(self, tmp_path):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["account", "debit"])
+        for i in range(6):
+            sheet.append([f"60{i}", i] if i != 2 else [None, None])
+        path = tmp_path / "gaps.xlsx"
+        workbook.save(path)
+
+        segments = list(parsers.iter_excel_sheets(path, "xlsx", rows_per_segment=3))
+        assert [s.splitlines()[0] for s in segments] == [
+            "=== Sheet: Sheet (rows 1-2) ===",
+            "=== Sheet: Sheet (rows 4-6) ===",
+        ]
+        assert "Rows:" not in segments[0]
+        assert segments[1].splitlines()[2] == "Rows: 6"
+        assert segments[1].splitlines()[4] == "account: 603 | debit: 3"
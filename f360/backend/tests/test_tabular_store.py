@@ -0,0 +1,213 @@
+"""
+F360 – Tests: Columnar Tabular Store
+"""
+import asyncio
+import contextlib
+import uuid
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.orm import Session
+
+from app.services.cognitive_ingestion import tabular_store
+
+MONTHLY_CSV = (
+    Path(__file__).resolve().parents[3] / "Input" / "data_economie_gouv" / "situations_mensuelles_budgetaires.csv"
+)
+
+
+def _wide_csv() -> bytes:
+    return (
+        "Catégorie;Poste;31/01/2025;28/02/2025;31/03/2025\n"
+        "Recettes;TVA;1 200,50;1 300,00;\n"
+        "Recettes;IS;400,25;410,75;420,00\n"
+        "Dépenses;Personnel;-900,10;-905,00;-910,40\n"
+    ).encode()
+
+
+class TestPlan:
+    def test_period_headers(self):
+        assert tabular_store.parse_period("31/01/2025") == date(2025, 1, 31)
+        assert tabular_store.parse_period("2024-03") == date(2024, 3, 1)
+        assert tabular_store.parse_period("2023") == date(2023, 1, 1)
+        assert tabular_store.parse_period("Montant") is None
+
+    def test_numbers_french_and_english(self):
+        values = tabular_store.to_numbers(pd.Series(["1 234,56", "1,234.56", "-25741980707.95", "12 %", "n/a", None]))
+        assert values[:4].tolist() == [1234.56, 1234.56, -25741980707.95, 12.0]
+        assert np.isnan(values[4]) and np.isnan(values[5])
+
+    def test_wide_by_period_sheet(self):
+        df = pd.DataFrame({"Poste": ["TVA"], "31/01/2025": ["1,5"], "2025-02": ["2"]})
+        plan = tabular_store.plan_unpivot(df)
+        assert plan.layout == "periods"
+        assert plan.dimensions == ["Poste"]
+        assert plan.periods == [date(2025, 1, 31), date(2025, 2, 1)]
+
+    def test_numeric_sheet_keeps_codes_as_dimensions(self):
+        df = pd.DataFrame({"Code": ["101", "102"], "Libellé": ["a", "b"], "Montant": ["10,5", "Sans objet"]})
+        plan = tabular_store.plan_unpivot(df)
+        assert plan.layout == "numeric"
+        assert plan.measures == ["Montant"] and plan.dimensions == ["Code", "Libellé"]
+
+    def test_whole_number_amounts_are_measures(self):
+        df = pd.DataFrame({
+            "N° compte": ["401000", "411000"],
+            "Année": [2024, 2025],
+            "Budget": ["12 000", "8 500"],
+            "Effectif": pd.Series([12, 30], dtype="int64"),
+        })
+        plan = tabular_store.plan_unpivot(df)
+        assert plan.measures == ["Budget", "Effectif"] and plan.dimensions == ["N° compte", "Année"]
+
+    def test_no_numbers(self):
+        assert tabular_store.plan_unpivot(pd.DataFrame({"a": ["x"], "b": ["y"]})) is None
+
+    def test_unpivot_rows_follow_the_frame_index(self):
+        df = pd.DataFrame({"Code": ["101", "102"], "Libellé": ["a", "b"], "Montant": ["10,5", "20,5"]}, index=[4, 6])
+        long = tabular_store.unpivot(df, tabular_store.plan_unpivot(df))
+        assert long["row"].tolist() == [5, 7]
+
+
+class TestStoreAndQuery:
+    @pytest.fixture()
+    def table(self, tmp_path):
+        written = tabular_store.write_tables(_wide_csv(), "csv", tmp_path, rows_per_frame=2)
+        assert len(written) == 1
+        return written[0]
+
+    def test_unpivoted_rows(self, table):
+        assert table["layout"] == "periods"
+        assert table["source_rows"] == 3
+        assert table["row_count"] == 8   # 9 cells, one empty
+        result = tabular_store.query_table(table["path"], limit=100)
+        assert result["columns"] == ["Catégorie", "Poste", "variable", "period", "value", "row"]
+        first = result["rows"][0]
+        assert first["Poste"] == "TVA" and first["period"] == date(2025, 1, 31) and first["value"] == 1200.5
+
+    def test_filter_and_period_range(self, table):
+        result = tabular_store.query_table(
+            table["path"],
+            filters={"Catégorie": "Recettes"},
+            period_from=date(2025, 2, 1),
+        )
+        assert result["matched_rows"] == 3
+        assert sorted(row["value"] for row in result["rows"]) == [410.75, 420.0, 1300.0]
+
+    def test_group_by_aggregates(self, table):
+        result = tabular_store.query_table(
+            table["path"], group_by=["Catégorie"], aggregates=["sum", "count"],
+        )
+        assert result["columns"] == ["Catégorie", "value_sum", "value_count"]
+        rows = {row["Catégorie"]: row for row in result["rows"]}
+        assert rows["Recettes"]["value_count"] == 5
+        assert rows["Dépenses"]["value_sum"] == pytest.approx(-2715.5)
+
+    def test_global_aggregate_and_limit(self, table):
+        assert tabular_store.query_table(table["path"], aggregates=["max"])["rows"] == [{"value_max": 1300.0}]
+        result = tabular_store.query_table(table["path"], limit=3)
+        assert len(result["rows"]) == 3 and result["truncated"]
+
+    def test_unknown_column(self, table):
+        with pytest.raises(ValueError):
+            tabular_store.query_table(table["path"], group_by=["nope"])
+        with pytest.raises(ValueError):
+            tabular_store.query_table(table["path"], aggregates=["median"])
+
+
+@pytest.mark.skipif(not MONTHLY_CSV.exists(), reason="sample dataset not available")
+class _FakeSession:
+    """Session double: savepoints, statements and the after_commit / after_rollback hooks."""
+
+    def __init__(self, fail_flush=False):
+        self.sync_session = Session()
+        self.fail_flush = fail_flush
+        self.added = []
+        self.savepoints = []
+
+    @contextlib.asynccontextmanager
+    async def begin_nested(self):
+        try:
+            yield
+            self.savepoints.append("released")
+        except Exception:
+            self.savepoints.append("rolled back")
+            raise
+
+    async def execute(self, statement):
+        return None
+
+    def add_all(self, rows):
+        self.added.extend(rows)
+
+    async def flush(self):
+        if self.fail_flush:
+            raise RuntimeError("flush failed")
+
+    def commit(self):
+        self.sync_session.dispatch.after_commit(self.sync_session)
+
+    def rollback(self):
+        self.sync_session.dispatch.after_rollback(self.sync_session)
+
+
+class TestStoreDocumentTables:
+    @pytest.fixture()
+    def doc(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(tabular_store.settings, "tables_dir", str(tmp_path))
+        return SimpleNamespace(id=uuid.uuid4(), file_type="csv")
+
+    def test_previous_version_removed_only_after_commit(self, doc, tmp_path):
+        root = tmp_path / str(doc.id)
+        root.mkdir()
+        (root / "000.parquet").write_bytes(b"previous layout")
+        db = _FakeSession()
+
+        tables = asyncio.run(tabular_store.store_document_tables(doc, _wide_csv(), db))
+        assert db.savepoints == ["released"] and len(tables) == 1
+        assert (root / "000.parquet").exists()
+        assert Path(tables[0].file_path).exists()
+
+        db.commit()
+        assert [p.name for p in root.iterdir()] == [Path(tables[0].file_path).parent.name]
+
+    def test_rollback_removes_the_new_version(self, doc, tmp_path):
+        root = tmp_path / str(doc.id)
+        root.mkdir()
+        (root / "000.parquet").write_bytes(b"previous layout")
+        db = _FakeSession()
+
+        tables = asyncio.run(tabular_store.store_document_tables(doc, _wide_csv(), db))
+        assert Path(tables[0].file_path).exists()
+        db.rollback()                                   # a later ingestion step failed
+        assert [p.name for p in root.iterdir()] == ["000.parquet"]
+        db.commit()                                     # the next transaction of the session
+        assert (root / "000.parquet").exists()
+
+    def test_rebuilt_twice_in_one_transaction(self, doc, tmp_path):
+        db = _FakeSession()
+        asyncio.run(tabular_store.store_document_tables(doc, _wide_csv(), db))
+        tables = asyncio.run(tabular_store.store_document_tables(doc, _wide_csv(), db))
+        db.commit()
+        assert [p.name for p in (tmp_path / str(doc.id)).iterdir()] == [Path(tables[0].file_path).parent.name]
+
+    def test_failure_keeps_previous_tables_and_session(self, doc, tmp_path):
+        root = tmp_path / str(doc.id)
+        root.mkdir()
+        (root / "000.parquet").write_bytes(b"previous layout")
+        db = _FakeSession(fail_flush=True)
+
+        assert asyncio.run(tabular_store.ingest_document_tables(doc, _wide_csv(), db)) == []
+        assert db.savepoints == ["rolled back"]
+        assert [p.name for p in root.iterdir()] == ["000.parquet"]
+
+
+class TestRealDataset:
+    def test_monthly_budget_situation(self, tmp_path):
+        written = tabular_store.write_tables(MONTHLY_CSV, "csv", tmp_path)
+        assert written and written[0]["layout"] == "periods"
+        assert written[0]["row_count"] > written[0]["source_rows"]
@@ -0,0 +1,138 @@
+"""
+F360 – Tests: Segmented Transcription
+"""
+import asyncio
+import shutil
+import wave
+
+import numpy as np
+import pytest
+
+from app.services.sources import parsers, transcription
+from app.services.sources.media import AUDIO_SAMPLE_RATE, AudioSegment
+
+HAS_FFMPEG = shutil.which(transcription.settings.ffmpeg_binary) is not None
+
+
+def _tone(seconds: float) -> np.ndarray:
+    t = np.arange(int(seconds * AUDIO_SAMPLE_RATE)) / AUDIO_SAMPLE_RATE
+    return (np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16)
+
+
+def _pause(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * AUDIO_SAMPLE_RATE), dtype=np.int16)
+
+
+async def _segments(*pcms: np.ndarray):
+    start = 0.0
+    for index, pcm in enumerate(pcms):
+        yield AudioSegment(index, start, pcm.tobytes())
+        start += len(pcm) / AUDIO_SAMPLE_RATE
+
+
+class _Recorder(transcription.Transcriber):
+    """Tracks how many requests run at once; fails on request."""
+
+    def __init__(self, fail_on: int | None = None):
+        self.running = self.peak = 0
+        self.fail_on = fail_on
+
+    async def transcribe(self, audio_file, language):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        with wave.open(audio_file) as reader:
+            seconds = reader.getnframes() / reader.getframerate()
+        if seconds == self.fail_on:
+            raise RuntimeError("rate limited")
+        return f" {seconds:g}s "
+
+
+class TestSegmenter:
+    def test_cut_in_longest_pause(self):
+        samples = np.concatenate([_tone(3), _pause(0.1), _tone(2), _pause(0.8), _tone(4)])
+        cut = transcription.find_cut(samples, 0, len(samples), -40.0) / AUDIO_SAMPLE_RATE
+        assert 5.1 <= cut <= 5.9
+
+    def test_no_pause_cuts_at_quietest_frame(self):
+        samples = _tone(4)
+        samples[2 * AUDIO_SAMPLE_RATE:2 * AUDIO_SAMPLE_RATE + 320] //= 100
+        cut = transcription.find_cut(samples, 0, len(samples), -40.0)
+        assert cut == 2 * AUDIO_SAMPLE_RATE
+
+    def test_silence_detection(self):
+        assert transcription.is_silent(AudioSegment(0, 0, _pause(1).tobytes()), -40.0)
+        assert not transcription.is_silent(AudioSegment(0, 0, np.concatenate([_pause(5), _tone(0.1)]).tobytes()), -40.0)
+
+
+class TestConcurrentTranscription:
+    def test_order_cap_and_stitching(self):
+        recorder = _Recorder()
+        pcms = [_tone(n) for n in (1, 2, 3, 4, 5, 6)]
+        parts = asyncio.run(transcription.transcribe_segments(_segments(*pcms), recorder, "fr", 2, -40.0))
+        assert [text for _, text in parts] == ["1s", "2s", "3s", "4s", "5s", "6s"]
+        assert recorder.peak == 2
+        assert transcription.stitch(parts).splitlines()[3] == "[00:00:06] 4s"
+
+    def test_silent_segments_skipped_and_failures_kept_in_place(self):
+        recorder = _Recorder(fail_on=2)
+        parts = asyncio.run(
+            transcription.transcribe_segments(_segments(_tone(1), _pause(3), _tone(2), _tone(1)), recorder, "fr", 4, -40.0)
+        )
+        assert [text for _, text in parts] == ["1s", "[AUDIO: segment failed – rate limited]", "1s"]
+        assert [start for start, _ in parts] == [0.0, 4.0, 6.0]
+
+    def test_offline_backend_is_deterministic(self):
+        segment = AudioSegment(0, 0, _tone(2).tobytes())
+        backend = transcription.OfflineTranscriber()
+        first = asyncio.run(backend.transcribe(segment.to_wav(), "fr"))
+        assert first == asyncio.run(backend.transcribe(segment.to_wav(), "fr"))
+        assert first.startswith("[offline transcript: 2.0 s")
+
+    def test_backend_override(self, monkeypatch):
+        backend = transcription.OfflineTranscriber()
+        transcription.set_transcriber(backend)
+        try:
+            assert transcription.get_transcriber() is backend
+            assert transcription._backends.get() is backend
+        finally:
+            transcription.set_transcriber(None)
+        assert isinstance(transcription._backends.get(), transcription.Transcriber)
+        monkeypatch.setattr(transcription.settings, "openai_api_key", "")
+        with pytest.raises(transcription.TranscriptionUnavailable):
+            transcription.WhisperTranscriber().check()
+
+
+@pytest.mark.skipif(not HAS_FFMPEG, reason="ffmpeg not installed")
+class TestFromFile:
+    def test_parse_audio_segments_at_pauses(self, tmp_path, monkeypatch):
+        path = tmp_path / "talk.wav"
+        samples = np.concatenate([_tone(7), _pause(1), _tone(6), _pause(1), _tone(5)])
+        with wave.open(str(path), "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(AUDIO_SAMPLE_RATE)
+            out.writeframes(samples.tobytes())
+
+        starts = asyncio.run(_collect_starts(path))
+        assert starts == [0.0, pytest.approx(7.5, abs=0.05), pytest.approx(14.5, abs=0.05)]
+
+        monkeypatch.setattr(transcription.settings, "media_segment_seconds", 10)
+        monkeypatch.setattr(transcription.settings, "transcription_min_segment_seconds", 5)
+        transcription.set_transcriber(transcription.OfflineTranscriber())
+        try:
+            text = asyncio.run(parsers.parse_audio(str(path)))
+        finally:
+            transcription.set_transcriber(None)
+        lines = text.splitlines()
+        assert len(lines) == 3
+        assert lines[0].startswith("[00:00:00] [offline transcript: 7.5 s")
+        assert lines[1].startswith("[00:00:07]") and lines[2].startswith("[00:00:14]")
+
+
+async def _collect_starts(path):
+    return [
+        segment.start
+        async for segment in transcription.iter_speech_segments(path, "silence", max_seconds=10, min_seconds=5)
+    ]
@@ -0,0 +1,74 @@
+"""
+F360 – Tests: Upload Spooling & Path-Based Parsing
+"""
+import asyncio
+import hashlib
+import mmap
+from pathlib import Path
+
+import pytest
+from app.services.sources import parsers
+from app.services.sources.uploads import UploadTooLargeError, spool_upload
+
+CONTRACT_PDF = Path(__file__).resolve().parents[3] / "Input" / "Contracts_30_English" / "Contract_1.pdf"
+
+
+class FakeUpload:
+    """Mimics starlette's UploadFile.read(n) over an in-memory payload."""
+
+    def __init__(self, payload: bytes, size=None):
+        self.payload = payload
+        self.size = size
+        self.reads = []
+
+    async def read(self, n=-1):
+        self.reads.append(n)
+        block, self.payload = self.payload[:n], self.payload[n:]
+        return block
+
+
+class TestSpoolUpload:
+    def test_streams_in_blocks_and_hashes(self, tmp_path):
+        payload = b"invoice line\n" * 10_000
+        upload = FakeUpload(payload)
+        stored = asyncio.run(spool_upload(upload, tmp_path / "doc.csv", max_bytes=1_000_000, block_size=4096))
+        assert stored.size == len(payload)
+        assert stored.sha256 == hashlib.sha256(payload).hexdigest()
+        assert stored.path.read_bytes() == payload
+        assert set(upload.reads) == {4096}
+
+    def test_size_limit_removes_partial_file(self, tmp_path):
+        upload = FakeUpload(b"x" * 10_000)
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(spool_upload(upload, tmp_path / "big.pdf", max_bytes=5_000, block_size=1024))
+        assert list(tmp_path.iterdir()) == []
+
+    def test_declared_size_rejected_before_reading(self, tmp_path):
+        upload = FakeUpload(b"x" * 10, size=10_000)
+        with pytest.raises(UploadTooLargeError):
+            asyncio.run(spool_upload(upload, tmp_path / "big.pdf", max_bytes=5_000))
+        assert upload.reads == []
+
+
+class TestPathSources:
+    def test_csv_from_path_matches_bytes(self, tmp_path):
+        raw = b"vendor,amount\nAcme,1200\nGlobex,300\n"
+        path = tmp_path / "ledger.csv"
+        path.write_bytes(raw)
+        assert parsers.parse_excel(path, "csv") == parsers.parse_excel(raw, "csv")
+
+    def test_text_from_path_and_mmap(self, tmp_path):
+        path = tmp_path / "note.txt"
+        path.write_bytes("Montant : 1 200 €".encode())
+        assert parsers.read_text_source(path) == "Montant : 1 200 €"
+        empty = tmp_path / "empty.txt"
+        empty.write_bytes(b"")
+        assert parsers.read_text_source(empty) == ""
+
+    @pytest.mark.skipif(not CONTRACT_PDF.exists(), reason="sample contract not available")
+    def test_pdf_from_path_and_mmap_match_bytes(self):
+        expected = parsers.parse_pdf(CONTRACT_PDF.read_bytes())
+        assert parsers.parse_pdf(CONTRACT_PDF) == expected
+        with parsers.map_file(CONTRACT_PDF) as mapped:
+            assert isinstance(mapped, mmap.mmap)
+            assert parsers.parse_pdf(mapped) == expected
@@ -0,0 +1,218 @@
+"""
+F360 – Tests: Vector Index Management
+"""
+import asyncio
+import uuid
+
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.schemas import RAGQuery
+from app.services.cognitive_ingestion import vector_index
+
+
+def _status(rows, method=None, valid=True, **options):
+    index = None if method is None else {"method": method, "valid": valid, "options": options}
+    return {"rows": rows, "index": index}
+
+
+def _hnsw(valid=True, m=16):
+    return {"method": "hnsw", "valid": valid, "options": {"m": m, "ef_construction": 64}}
+
+
+class _Recorder:
+    """Stands in for an AsyncSession: records the statements executed."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, statement, params=None):
+        self.calls.append((str(statement), params))
+
+
+class TestPlan:
+    def test_ivfflat_lists_follow_pgvector_guideline(self):
+        assert vector_index.ivfflat_lists(0) == 1
+        assert vector_index.ivfflat_lists(250_000) == 250
+        assert vector_index.ivfflat_lists(4_000_000) == 2000
+
+    def test_index_definition(self):
+        hnsw = vector_index.index_definition("hnsw", 50_000)
+        assert hnsw.startswith("CREATE INDEX CONCURRENTLY idx_chunks_embedding_build ON document_chunks USING hnsw")
+        assert f"m = {vector_index.settings.hnsw_m}" in hnsw
+        assert "lists = 50)" in vector_index.index_definition("ivfflat", 50_000)
+        with pytest.raises(ValueError):
+            vector_index.index_definition("flat", 10)
+
+    def test_nothing_below_min_rows(self, monkeypatch):
+        monkeypatch.setattr(vector_index.settings, "vector_index_min_rows", 10_000)
+        assert vector_index.plan_vector_index(_status(9_999), "hnsw")[0] is None
+        assert vector_index.plan_vector_index(_status(10_000), "hnsw")[0] == "build"
+
+    def test_rebuild_on_method_change_or_invalid_index(self, monkeypatch):
+        monkeypatch.setattr(vector_index.settings, "vector_index_min_rows", 100)
+        legacy = _status(50_000, "ivfflat", lists=100)
+        assert vector_index.plan_vector_index(legacy, "hnsw")[0] == "rebuild"
+        broken = _status(50_000, "hnsw", valid=False, m=16, ef_construction=64)
+        assert vector_index.plan_vector_index(broken, "hnsw")[0] == "rebuild"
+
+    def test_hnsw_parameters(self, monkeypatch):
+        monkeypatch.setattr(vector_index.settings, "vector_index_min_rows", 100)
+        monkeypatch.setattr(vector_index.settings, "hnsw_m", 16)
+        monkeypatch.setattr(vector_index.settings, "hnsw_ef_construction", 64)
+        assert vector_index.plan_vector_index(_status(5_000, "hnsw", m=16, ef_construction=64), "hnsw")[0] is None
+        assert vector_index.plan_vector_index(_status(5_000, "hnsw", m=32, ef_construction=64), "hnsw")[0] == "rebuild"
+
+    def test_ivfflat_retrained_once_outgrown(self, monkeypatch):
+        monkeypatch.setattr(vector_index.settings, "vector_index_min_rows", 100)
+        monkeypatch.setattr(vector_index.settings, "vector_index_retrain_factor", 2.0)
+        assert vector_index.plan_vector_index(_status(150_000, "ivfflat", lists=100), "ivfflat")[0] is None
+        assert vector_index.plan_vector_index(_status(200_000, "ivfflat", lists=100), "ivfflat")[0] == "rebuild"
+
+    def test_partial_index_definition(self):
+        company = uuid.uuid4()
+        sql = vector_index.index_definition(
+            "hnsw", 1, vector_index.tenant_index_name(company), vector_index.tenant_predicate(company, alias=None),
+        )
+        assert sql.startswith(f"CREATE INDEX CONCURRENTLY idx_chunks_embedding_t_{company.hex} ON document_chunks")
+        assert sql.endswith(f"WHERE company_id = '{company}'::uuid")
+        assert len(vector_index.tenant_index_name(company)) <= 63    # PostgreSQL identifier limit
+
+    def test_tenant_predicate_only_takes_uuids(self):
+        company = uuid.uuid4()
+        assert vector_index.tenant_predicate(str(company)) == f"dc.company_id = '{company}'::uuid"
+        with pytest.raises(ValueError):
+            vector_index.tenant_predicate("x' OR '1'='1")
+
+    def test_parse_reloptions(self):
+        assert vector_index.parse_reloptions(["m=16", "ef_construction=64"]) == {"m": 16, "ef_construction": 64}
+        assert vector_index.parse_reloptions(None) == {}
+
+
+class TestTenantPlan:
+    @pytest.fixture(autouse=True)
+    def _settings(self, monkeypatch):
+        monkeypatch.setattr(vector_index.settings, "vector_tenant_index_min_rows", 1000)
+        monkeypatch.setattr(vector_index.settings, "vector_tenant_index_max", 2)
+        monkeypatch.setattr(vector_index.settings, "hnsw_m", 16)
+        monkeypatch.setattr(vector_index.settings, "hnsw_ef_construction", 64)
+
+    def test_largest_companies_first_up_to_the_cap(self):
+        counts = {"small": 999, "big": 5000, "bigger": 9000, "biggest": 20000}
+        assert vector_index.plan_tenant_indexes(counts, {}, "hnsw") == {"build": ["biggest", "bigger"], "drop": []}
+        plan = vector_index.plan_tenant_indexes(counts, {"big": _hnsw()}, "hnsw")
+        assert plan == {"build": ["biggest"], "drop": []}
+
+    def test_dropped_below_half_the_threshold(self):
+        indexes = {"shrinking": _hnsw(), "gone": _hnsw()}
+        plan = vector_index.plan_tenant_indexes({"shrinking": 600}, indexes, "hnsw")
+        assert plan == {"build": [], "drop": ["gone"]}
+        assert vector_index.plan_tenant_indexes({"shrinking": 400}, indexes, "hnsw")["drop"] == ["gone", "shrinking"]
+
+    def test_invalid_or_outdated_rebuilt(self):
+        counts = {"a": 2000, "b": 2000, "c": 2000}
+        indexes = {"a": _hnsw(valid=False), "b": _hnsw(m=32), "c": _hnsw()}
+        assert vector_index.plan_tenant_indexes(counts, indexes, "hnsw") == {"build": ["a", "b"], "drop": []}
+        assert vector_index.plan_tenant_indexes(counts, indexes, "ivfflat")["build"] == ["a", "b", "c"]
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(vector_index.settings, "vector_tenant_index_min_rows", 0)
+        assert vector_index.plan_tenant_indexes({"a": 10**6}, {"b": _hnsw()}) == {"build": [], "drop": ["b"]}
+
+
+class TestSearchTuning:
+    def test_defaults_and_bounds(self, monkeypatch):
+        monkeypatch.setattr(vector_index.settings, "hnsw_ef_search", 40)
+        monkeypatch.setattr(vector_index.settings, "ivfflat_probes", 10)
+        assert vector_index.search_params(5) == {"ef_search": "40", "probes": "10"}
+        assert vector_index.search_params(5, ef_search=200, probes=3) == {"ef_search": "200", "probes": "3"}
+        # HNSW never returns more than ef_search rows
+        assert vector_index.search_params(100, ef_search=20)["ef_search"] == "100"
+        assert vector_index.search_params(5, ef_search=5000)["ef_search"] == "1000"
+
+    def test_settings_are_transaction_local(self):
+        db = _Recorder()
+        asyncio.run(vector_index.tune_search(db, 10, ef_search=80, probes=4))
+        (sql, params), = db.calls
+        assert "set_config('hnsw.ef_search', :ef_search, true)" in sql
+        assert "set_config('ivfflat.probes', :probes, true)" in sql
+        assert params == {"ef_search": "80", "probes": "4"}
+
+    def test_filtered_searches_scan_iteratively(self, monkeypatch):
+        monkeypatch.setattr(vector_index.settings, "vector_iterative_scan", "relaxed_order")
+        db = _Recorder()
+        asyncio.run(vector_index.tune_search(db, 10, filtered=True))
+        (sql, params), = db.calls
+        assert "set_config('hnsw.iterative_scan', :hnsw_scan, true)" in sql
+        assert "set_config('ivfflat.iterative_scan', 'relaxed_order', true)" in sql
+        assert params["hnsw_scan"] == "relaxed_order"
+
+        monkeypatch.setattr(vector_index.settings, "vector_iterative_scan", "off")
+        asyncio.run(vector_index.tune_search(db, 10, filtered=True))
+        assert "iterative_scan" not in db.calls[1][0]
+
+    def test_query_schema_bounds(self):
+        assert RAGQuery(question="q", ef_search=100, probes=8).ef_search == 100
+        with pytest.raises(ValidationError):
+            RAGQuery(question="q", ef_search=0)
+        with pytest.raises(ValidationError):
+            RAGQuery(question="q", ef_search=1001)
+
+
+class TestMaintainer:
+    def test_poke_is_debounced(self, monkeypatch):
+        monkeypatch.setattr(vector_index.settings, "vector_index_auto", True)
+        runs = []
+
+        async def fake_ensure(engine=None):
+            runs.append(1)
+            return {"status": "unchanged", "reason": "test"}
+
+        monkeypatch.setattr(vector_index, "ensure_vector_index", fake_ensure)
+        monkeypatch.setattr(vector_index.settings, "vector_tenant_index_min_rows", 0)
+        maintainer = vector_index.VectorIndexMaintainer(interval=3600)
+
+        async def scenario():
+            assert maintainer.poke()
+            assert not maintainer.poke()        # still running
+            await maintainer._task
+            assert not maintainer.poke()        # checked recently
+            assert maintainer.rebuild("hnsw")   # explicit rebuilds are not debounced
+            await maintainer._task
+
+        monkeypatch.setattr(vector_index, "build_vector_index", lambda method: fake_ensure())
+        asyncio.run(scenario())
+        assert len(runs) == 2
+        assert maintainer.last_result["status"] == "unchanged"
+
+    def test_failures_are_recorded(self, monkeypatch):
+        async def failing():
+            raise ConnectionRefusedError("no database")
+
+        maintainer = vector_index.VectorIndexMaintainer()
+
+        async def scenario():
+            maintainer.start(failing)
+            await maintainer._task
+
+        asyncio.run(scenario())
+        assert maintainer.last_result == {"status": "error", "reason": "no database"}
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(vector_index.settings, "vector_index_auto", False)
+        assert not vector_index.VectorIndexMaintainer(interval=0).poke()
+
+    def test_poke_on_commit(self, monkeypatch):
+        from types import SimpleNamespace
+
+        from sqlalchemy.orm import Session
+
+        pokes = []
+        maintainer = SimpleNamespace(poke=lambda: pokes.append(1))
+        monkeypatch.setattr(vector_index, "get_vector_index_maintainer", lambda: maintainer)
+        db = SimpleNamespace(sync_session=Session())
+        vector_index.poke_on_commit(db)
+        assert not pokes
+        db.sync_session.commit()
+        db.sync_session.commit()
+        assert pokes == [1]
@@ -0,0 +1,286 @@
+"""
+F360 – Tests: Vector Store Backends
+"""
+import asyncio
+import importlib.util
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services.cognitive_ingestion import indexer, vector_store
+
+HAS_HNSWLIB = importlib.util.find_spec("hnswlib") is not None
+DIM = 16
+ACME, GLOBEX = uuid.uuid4(), uuid.uuid4()
+
+
+def _rows(count, company_id=ACME, document_id=None, seed=0):
+    rng = np.random.default_rng(seed)
+    document_id = document_id or uuid.uuid4()
+    return [
+        {
+            "chunk_id": uuid.uuid4(),
+            "document_id": document_id,
+            "company_id": company_id,
+            "filename": f"doc-{seed}.pdf",
+            "content": f"chunk {seed}-{n}",
+            "metadata": {"chunk_index": n},
+            "embedding": rng.standard_normal(DIM).astype(np.float32),
+        }
+        for n in range(count)
+    ]
+
+
+def _brute_force(rows, query, k):
+    vectors = np.stack([r["embedding"] / np.linalg.norm(r["embedding"]) for r in rows])
+    scores = vectors @ (query / np.linalg.norm(query))
+    return [str(rows[i]["chunk_id"]) for i in np.argsort(-scores)[:k]]
+
+
+class _StaticBackend(vector_store.VectorBackend):
+    """Stands in for pgvector: counts queries, returns nothing."""
+
+    name = "static"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def search(self, query_embedding, company_id, top_k, similarity_threshold, db,
+                     ef_search=None, probes=None):
+        self.calls += 1
+        return []
+
+
+class TestLocalIndex:
+    def test_exact_top_k_across_shards(self, tmp_path):
+        index = vector_store.LocalVectorIndex(tmp_path, DIM, shard_rows=7)
+        rows = _rows(40)
+        index.add(rows)
+        query = np.random.default_rng(9).standard_normal(DIM)
+
+        results = index.search(query, top_k=5)
+        assert [r["chunk_id"] for r in results] == _brute_force(rows, query, 5)
+        assert set(results[0]) == {"chunk_id", "content", "metadata", "filename", "document_id", "similarity"}
+        assert results[0]["metadata"] == {"chunk_index": int(results[0]["content"].split("-")[1])}
+        assert [r["similarity"] for r in results] == sorted((r["similarity"] for r in results), reverse=True)
+        assert index.stats()["shards"] == 6
+
+    def test_company_filter_and_threshold(self, tmp_path):
+        index = vector_store.LocalVectorIndex(tmp_path, DIM, shard_rows=16)
+        acme, globex = _rows(10, ACME, seed=1), _rows(10, GLOBEX, seed=2)
+        index.add(acme + globex)
+        query = globex[3]["embedding"]
+
+        hits = index.search(query, top_k=20, company_id=ACME)
+        assert len(hits) == 10 and {h["filename"] for h in hits} == {"doc-1.pdf"}
+        top = index.search(query, top_k=3, company_id=GLOBEX, similarity_threshold=0.99)
+        assert [h["chunk_id"] for h in top] == [str(globex[3]["chunk_id"])]
+        assert top[0]["similarity"] == pytest.approx(1.0, abs=1e-4)
+        assert index.search(query, top_k=3, company_id=uuid.uuid4()) == []
+
+    def test_persistence_removal_and_slot_reuse(self, tmp_path):
+        index = vector_store.LocalVectorIndex(tmp_path, DIM, shard_rows=8)
+        first, second = _rows(6, seed=3), _rows(6, seed=4)
+        index.add(first + second)
+        assert index.remove_document(first[0]["document_id"]) == 6
+        index.close()
+
+        reopened = vector_store.LocalVectorIndex(tmp_path, DIM, shard_rows=8)
+        assert reopened.stats()["chunks"] == 6
+        query = second[2]["embedding"]
+        assert reopened.search(query, top_k=1)[0]["chunk_id"] == str(second[2]["chunk_id"])
+
+        reopened.add(_rows(4, seed=5))
+        assert reopened.size == 12          # freed slots reused, nothing appended
+        with pytest.raises(ValueError):
+            vector_store.LocalVectorIndex(tmp_path, DIM * 2, shard_rows=8)
+
+    def test_re_adding_a_chunk_replaces_it(self, tmp_path):
+        index = vector_store.LocalVectorIndex(tmp_path, DIM)
+        rows = _rows(3)
+        index.add(rows)
+        moved = dict(rows[0], embedding=rows[1]["embedding"], content="moved")
+        index.add([moved])
+        assert index.stats()["chunks"] == 3
+        hits = index.search(rows[1]["embedding"], top_k=2)
+        assert {h["content"] for h in hits} == {"moved", rows[1]["content"]}
+
+    def test_replace_company(self, tmp_path):
+        index = vector_store.LocalVectorIndex(tmp_path, DIM)
+        index.add(_rows(5, ACME, seed=6) + _rows(5, GLOBEX, seed=7))
+        index.replace_company(ACME, _rows(2, ACME, seed=8))
+        assert len(index.search(np.ones(DIM), top_k=10, company_id=ACME)) == 2
+        assert len(index.search(np.ones(DIM), top_k=10, company_id=GLOBEX)) == 5
+
+
+class TestBackends:
+    def test_search_index_uses_the_configured_backend(self, tmp_path):
+        index = vector_store.LocalVectorIndex(tmp_path, DIM)
+        rows = _rows(8)
+        index.add(rows)
+        vector_store.set_vector_backend(vector_store.LocalVectorBackend(index))
+        try:
+            results = asyncio.run(indexer.search_index(list(rows[4]["embedding"]), company_id=ACME, top_k=2))
+        finally:
+            vector_store.set_vector_backend(None)
+        assert results[0]["chunk_id"] == str(rows[4]["chunk_id"])
+        assert results[0]["document_id"] == str(rows[4]["document_id"])
+
+    def test_cached_backend_loads_then_serves_locally(self, tmp_path):
+        rows = _rows(6)
+        loads = []
+
+        async def loader(company_id):
+            loads.append(company_id)
+            return rows
+
+        fallback = _StaticBackend()
+        backend = vector_store.CachedVectorBackend(
+            fallback, vector_store.LocalVectorIndex(tmp_path, DIM), loader,
+        )
+        query = list(rows[2]["embedding"])
+
+        async def scenario():
+            assert await backend.search(query, ACME, 3, 0.0, None) == []    # miss: pgvector, load starts
+            await asyncio.gather(*backend._loading.values())
+            hit = await backend.search(query, ACME, 3, 0.0, None)
+            backend.invalidate(ACME)                                         # chunks changed
+            after = await backend.search(query, ACME, 3, 0.0, None)
+            await asyncio.gather(*backend._loading.values())
+            return hit, after
+
+        hit, after = asyncio.run(scenario())
+        assert hit[0]["chunk_id"] == str(rows[2]["chunk_id"])
+        assert after == [] and fallback.calls == 2
+        assert loads == [ACME, ACME] and backend.is_loaded(ACME)
+        assert backend.stats()["hits"] == 1
+
+    def test_local_backend_follows_document_chunks(self, tmp_path):
+        table = {ACME: _rows(4, ACME, seed=1)}
+
+        async def companies():
+            return list(table)
+
+        async def loader(company_id):
+            return table.get(company_id, [])
+
+        index = vector_store.LocalVectorIndex(tmp_path, DIM)
+        index.add(_rows(3, GLOBEX, seed=2))   # left over from chunks deleted since
+        backend = vector_store.LocalVectorBackend(index, loader, companies)
+        query = list(table[ACME][0]["embedding"])
+
+        async def scenario():
+            backend.invalidate(ACME)            # before sync: nothing is loaded
+            assert await backend.search(query, ACME, 5, 0.0, None) == []
+            assert await backend.sync() == 4
+            table[ACME] = table[ACME][:1]       # a document's chunks are deleted
+            backend.invalidate(ACME)
+            await asyncio.gather(*backend._loading.values())
+            return await backend.search(query, ACME, 5, 0.0, None)
+
+        hits = asyncio.run(scenario())
+        assert [h["chunk_id"] for h in hits] == [str(table[ACME][0]["chunk_id"])]
+        assert index.companies() == [str(ACME)]
+
+    def test_local_backend_reloads_a_change_made_mid_load(self, tmp_path):
+        backend = vector_store.LocalVectorBackend(vector_store.LocalVectorIndex(tmp_path, DIM))
+        reads = []
+
+        async def loader(company_id):
+            reads.append(company_id)
+            if len(reads) == 1:
+                backend.invalidate(company_id)   # an ingest commits while the rows are read
+            return _rows(len(reads))
+
+        backend.loader = loader
+        assert asyncio.run(backend.load(ACME)) == 2
+        assert backend.index.stats()["chunks"] == 2
+
+    def test_load_overlapping_a_change_is_discarded(self, tmp_path):
+        backend = vector_store.CachedVectorBackend(_StaticBackend(), vector_store.LocalVectorIndex(tmp_path, DIM))
+
+        async def loader(company_id):
+            backend.invalidate(company_id)   # an ingest commits while the rows are read
+            return _rows(2)
+
+        backend.loader = loader
+        assert asyncio.run(backend.load(ACME)) is False
+        assert not backend.is_loaded(ACME)
+
+    def test_oversized_company_stays_on_fallback(self, tmp_path):
+        async def loader(company_id):
+            return None
+
+        fallback = _StaticBackend()
+        backend = vector_store.CachedVectorBackend(fallback, vector_store.LocalVectorIndex(tmp_path, DIM), loader)
+
+        async def scenario():
+            await backend.search([1.0] * DIM, ACME, 3, 0.0, None)
+            await asyncio.gather(*backend._loading.values())
+            await backend.search([1.0] * DIM, ACME, 3, 0.0, None)
+            return dict(backend._loading)
+
+        assert asyncio.run(scenario()) == {}
+        assert fallback.calls == 2 and not backend.is_loaded(ACME)
+
+    def test_pgvector_filters_chunks_inside_the_scan(self):
+        class Recorder:
+            def __init__(self):
+                self.calls = []
+
+            async def execute(self, statement, params=None):
+                self.calls.append(str(statement))
+                return self
+
+            def fetchall(self):
+                return []
+
+        db = Recorder()
+        asyncio.run(vector_store.PgVectorBackend().search([0.0] * DIM, ACME, 5, 0.3, db))
+        tuning, sql = db.calls
+        assert "iterative_scan" in tuning
+        nearest = sql.split("ORDER BY dc.embedding")[0]
+        assert f"dc.company_id = '{ACME}'::uuid" in nearest and "documents" not in nearest
+        assert "JOIN documents d ON d.id = n.document_id" in sql
+
+        asyncio.run(vector_store.PgVectorBackend().search([0.0] * DIM, None, 5, 0.3, db))
+        assert "iterative_scan" not in db.calls[2] and "company_id" not in db.calls[3]
+
+    def test_unknown_backend(self, monkeypatch):
+        monkeypatch.setattr(vector_store.settings, "vector_backend", "faiss")
+        vector_store._backends.reset()
+        try:
+            with pytest.raises(ValueError):
+                vector_store.get_vector_backend()
+        finally:
+            vector_store._backends.reset()
+
+
+@pytest.mark.skipif(not HAS_HNSWLIB, reason="hnswlib not installed")
+class TestHnswGraph:
+    def test_graph_agrees_with_exact_search(self, tmp_path):
+        exact = vector_store.LocalVectorIndex(tmp_path / "exact", DIM)
+        graph = vector_store.LocalVectorIndex(tmp_path / "graph", DIM, hnsw=True)
+        rows = _rows(300)
+        exact.add(rows)
+        graph.add(rows)
+        query = np.random.default_rng(3).standard_normal(DIM)
+        expected = [r["chunk_id"] for r in exact.search(query, top_k=5)]
+        assert [r["chunk_id"] for r in graph.search(query, top_k=5, ef_search=200)] == expected
+
+    def test_graph_follows_removals_and_reopening(self, tmp_path):
+        graph = vector_store.LocalVectorIndex(tmp_path, DIM, hnsw=True)
+        kept, dropped = _rows(200, seed=4), _rows(100, seed=5)
+        graph.add(kept + dropped)
+        graph.remove_document(dropped[0]["document_id"])
+        replacement = _rows(50, GLOBEX, seed=6)
+        graph.add(replacement)                        # reuses the freed slots
+        query = np.random.default_rng(7).standard_normal(DIM)
+        expected = _brute_force(kept, query, 5)
+        assert [r["chunk_id"] for r in graph.search(query, top_k=5, company_id=ACME, ef_search=200)] == expected
+        graph.close()
+
+        reopened = vector_store.LocalVectorIndex(tmp_path, DIM, hnsw=True)
+        assert reopened.stats()["hnsw"] and reopened.stats()["chunks"] == 250
+        assert [r["chunk_id"] for r in reopened.search(query, top_k=5, company_id=ACME, ef_search=200)] == expected